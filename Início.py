@@ -1,87 +1,24 @@
 # marketlens/Início.py
 
 import streamlit as st
-import plotly.graph_objects as go
 import pandas as pd
-from datetime import datetime
+import plotly.graph_objects as go
 from view_utils import setup_sidebar
 from utils.journal_utils import get_journal_entries
 from utils.playbook_utils import get_playbook_setups
-from utils.reporting_engine import calculate_dashboard_metrics
+from utils.reporting_engine import IncrementalReport
 from utils.accounts_utils import get_trading_accounts
-
-# --- FUNÇÕES AUXILIARES DE RENDERIZAÇÃO (COM SUPORTE A TEMAS) ---
-
-def create_calendar_plot(pnl_data: pd.Series, theme: dict):
-    """Cria um gráfico de heatmap para o mês atual, com cores de fundo contextuais."""
-    plotly_layout = theme['plotly_layout']
-    if pnl_data.empty:
-        fig = go.Figure().update_layout(title_text="Sem dados para exibir", **plotly_layout)
-        return fig
-
-    today = datetime.now().date()
-    start_date, end_date = today.replace(day=1), pd.to_datetime(today.replace(day=1)) + pd.offsets.MonthEnd(1)
-    all_days = pd.date_range(start=start_date, end=end_date, freq='D')
-    
-    df_cal = pd.DataFrame(index=all_days).join(pnl_data.rename('pnl')).fillna(0)
-    df_cal['day_of_week'] = df_cal.index.dayofweek
-    df_cal['week_of_month'] = (df_cal.index.day - 1) // 7
-    df_cal['day_text'] = df_cal.index.day
-    
-    fig = go.Figure(go.Heatmap(
-        x=df_cal['week_of_month'], y=df_cal['day_of_week'], z=df_cal['pnl'], text=df_cal['day_text'], texttemplate="%{text}",
-        colorscale=[[0, theme['loss_color']], [0.5, theme['calendar_neutral']], [1, theme['win_color']]],
-        zmid=0, showscale=False, hoverongaps=False, hovertemplate='<b>%{customdata|%d/%m/%Y}</b><br>Resultado: $%{z:,.2f}<extra></extra>', customdata=df_cal.index
-    ))
-    fig.update_layout(
-        **plotly_layout, height=300,
-        yaxis=dict(autorange='reversed', showgrid=False, zeroline=False, tickvals=list(range(7)), ticktext=['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']),
-        xaxis=dict(showgrid=False, zeroline=False, visible=False), title=dict(text=f"Performance Diária ({start_date.strftime('%B %Y')})", x=0.5), margin=dict(t=50, b=20, l=20, r=20)
-    )
-    return fig
-
-def create_synapse_score_chart(score_data: dict, theme: dict):
-    plotly_layout = theme['plotly_layout']
-    categories = ['Taxa de Acerto', 'Rácio Lucro/Prejuízo', 'Fator de Lucro']
-    win_rate, awl_ratio, profit_factor = score_data.get('win_rate', 0), score_data.get('avg_win_loss_ratio', 0), score_data.get('profit_factor', 0)
-    awl_score, pf_score = min(awl_ratio, 3) / 3 * 100, min(profit_factor, 3) / 3 * 100
-    
-    fig = go.Figure(go.Scatterpolar(r=[win_rate, awl_score, pf_score], theta=categories, fill='toself', line=dict(color='cyan'), fillcolor='rgba(0, 255, 255, 0.4)'))
-    fig.update_layout(
-        polar=dict(radialaxis=dict(visible=True, range=[0, 100], color='grey'), angularaxis=dict(color=plotly_layout['font_color'])),
-        **plotly_layout, showlegend=False, height=250, margin=dict(t=40, b=40, l=40, r=40)
-    )
-    return fig
-
-def create_asset_pie_chart(asset_data: pd.Series, theme: dict):
-    plotly_layout = theme['plotly_layout']
-    if asset_data.empty:
-        fig = go.Figure().update_layout(title_text="Sem dados de ativos", **plotly_layout)
-        return fig
-    
-    fig = go.Figure(data=[go.Pie(labels=asset_data.index, values=asset_data.values, hole=.3, textinfo='percent', hoverinfo='label+value')])
-    fig.update_layout(**plotly_layout, showlegend=True, legend=dict(orientation="h", yanchor="bottom", y=-0.4, xanchor="center", x=0.5), height=350, margin=dict(t=40, b=20, l=20, r=20))
-    return fig
-
-def render_styled_trades_table(df, theme: dict):
-    """Converte o DataFrame de trades recentes numa tabela HTML com estilos."""
-    def style_row(row):
-        resultado_color = theme['win_font'] if row['Resultado'] == 'Ganho' else theme['loss_font']
-        direcao_color = theme['win_font'] if row['Direção'] == 'Compra' else theme['loss_font']
-        pnl_str = f"${row['PnL (USD)']:,.2f}"
-        rr_str = f"1:{row['RR']:.2f}" if pd.notna(row['RR']) else "N/A"
-        return f"<tr><td>{row['Data']}</td><td>{row['Ativo']}</td><td style='color: {direcao_color};'>{row['Direção']}</td><td style='color: {resultado_color};'>{row['Resultado']}</td><td style='color: {resultado_color}; text-align: right;'>{pnl_str}</td><td style='text-align: right;'>{rr_str}</td></tr>"
-    
-    header = "".join([f"<th>{col}</th>" for col in df.columns])
-    rows_html = "".join([style_row(row) for _, row in df.iterrows()])
-    table_html = f"""<style>.styled-table {{ width: 100%; border-collapse: collapse; color: {theme['plotly_layout']['font_color']}; }} .styled-table th, .styled-table td {{ padding: 8px 4px; text-align: left; border-bottom: 1px solid {theme['table_border']}; }} .styled-table th {{ font-weight: bold; background-color: {theme['table_header_bg']}; }}</style><table class='styled-table'><thead><tr>{header}</tr></thead><tbody>{rows_html}</tbody></table>"""
-    st.markdown(table_html, unsafe_allow_html=True)
+from utils.parallel_loader import load_page_data
+from utils.account_attribution import cached_weights, attribute_to_account, capital_signature
+from utils.risk_analytics import compute_risk_analytics
+from utils.trade_excursion import get_trade_excursions, excursion_summary
+from utils.rollup_utils import get_pnl_rollups, reconcile_rollups, rollup_summaries
+from utils.journal_cache import get_journal_cache
+from utils.components import (
+    THEMES, create_calendar_plot, create_synapse_score_chart, create_asset_pie_chart, render_styled_trades_table
+)
 
 # --- CONFIGURAÇÃO DE TEMA E ESTILOS ---
-THEMES = {
-    "dark": {"plotly_layout": {"plot_bgcolor":'rgba(0,0,0,0)', "paper_bgcolor":'rgba(0,0,0,0)', "font_color":'white'}, "calendar_neutral": "rgba(44, 44, 44, 0.8)", "table_header_bg": "rgba(44, 44, 44, 0.8)", "table_border": "#3c3c3c", "win_color": "rgba(102, 187, 106, 0.8)", "loss_color": "rgba(239, 83, 80, 0.8)", "win_font": "#66BB6A", "loss_font": "#EF5350"},
-    "light": {"plotly_layout": {"plot_bgcolor":'rgba(255,255,255,0)', "paper_bgcolor":'rgba(255,255,255,0)', "font_color":'#1E1E1E'}, "calendar_neutral": "#E8E8E8", "table_header_bg": "#F0F2F6", "table_border": "#dddddd", "win_color": "rgba(102, 187, 106, 0.8)", "loss_color": "rgba(239, 83, 80, 0.8)", "win_font": "#1a936f", "loss_font": "#c94c4c"}
-}
 if 'theme' not in st.session_state: st.session_state.theme = "dark"
 active_theme = THEMES[st.session_state.theme]
 
@@ -100,7 +37,18 @@ with st.sidebar:
 
 if 'user_info' not in st.session_state or st.session_state['user_info'] is None: st.switch_page("pages/0_👤_Login.py")
 user_id = st.session_state['user_info'].get('localId'); user_email = st.session_state['user_info'].get('email')
-accounts = get_trading_accounts(user_id)
+
+# --- CARREGAMENTO DE DADOS (EM PARALELO) ---
+page_data = load_page_data({
+    "accounts": lambda: get_trading_accounts(user_id),
+    "journal": lambda: get_journal_entries(user_id),
+    "setups": lambda: get_playbook_setups(user_id),
+}, page="Início")
+accounts, df_journal_all, setups = page_data["accounts"], page_data["journal"], page_data["setups"]
+if (journal_cache := get_journal_cache(user_id, create=False)) is not None:
+    # Custo das leituras do diário: só os documentos alterados são lidos depois da primeira sincronização.
+    st.sidebar.caption(f"Diário: {journal_cache.stats['last_sync_reads']} documentos lidos na última sincronização "
+                       f"({journal_cache.stats['docs_read']} desde o arranque).")
 account_options = {"Geral (Todas as Contas)": "all", **{acc['account_name']: acc['doc_id'] for acc in accounts}}
 
 # --- FILTROS DO DASHBOARD ---
@@ -110,20 +58,45 @@ st.markdown("---")
 
 # --- LÓGICA DE FILTRAGEM E CÁLCULO ---
 with st.spinner("A analisar o seu histórico de operações..."):
-    df_journal_all = get_journal_entries(user_id)
     if df_journal_all.empty: st.info("Bem-vindo! Registe a sua primeira operação no Diário para começar."); st.stop()
 
+    # Numa conta, cada operação entra com a fração de capital dessa conta (sem explode nem linhas duplicadas).
     if (selected_account_id := account_options[selected_account_name]) != "all":
-        df_journal_all = df_journal_all.explode('accounts')
-        df_filtered = df_journal_all[df_journal_all['accounts'] == selected_account_id].copy()
-    else: df_filtered = df_journal_all.copy()
-
-    setups = get_playbook_setups(user_id)
-    dashboard_data = calculate_dashboard_metrics(df_filtered, setups)
+        weights = cached_weights(df_journal_all, accounts, st.session_state)
+        df_filtered = attribute_to_account(df_journal_all, weights, selected_account_id)
+    else: df_filtered = df_journal_all
+
+    # O motor incremental guarda os trades preparados entre reruns (tema, seletores) e só
+    # reprocessa os trades novos ou alterados.
+    report_engines = st.session_state.setdefault('report_engines', {})
+    engine = report_engines.setdefault((user_id, selected_account_id, capital_signature(accounts)), IncrementalReport())
+    dashboard_data = engine.update(df_filtered)
     kpis = dashboard_data["kpis"]
 
     if kpis["total_trades"] == 0: st.warning(f"Ainda não há operações finalizadas para a conta '{selected_account_name}'."); st.stop()
 
+    # Em todas as contas, o calendário e os sumários diário e semanal vêm dos agregados de P&L,
+    # guardados na sessão: só são relidos quando os totais do diário mudam (depois de uma escrita).
+    # Se não batem certo com o diário (ex.: registos anteriores aos agregados), ficam os valores do
+    # motor e a reconciliação (que relê o diário completo) é pedida no botão da Análise Temporal.
+    rollups_out_of_sync = False
+    if selected_account_id == "all":
+        rollups_key = (user_id, kpis["total_trades"], round(float(kpis["total_pnl"]), 2))
+        if (cached_rollups := st.session_state.get('pnl_rollups')) is None or cached_rollups[0] != rollups_key:
+            cached_rollups = st.session_state['pnl_rollups'] = (rollups_key, get_pnl_rollups(user_id))
+        summaries = rollup_summaries(cached_rollups[1])
+        if summaries["totals"]["total_trades"] == kpis["total_trades"] and abs(summaries["totals"]["total_pnl"] - kpis["total_pnl"]) < 0.01:
+            dashboard_data = {**dashboard_data, **{k: summaries[k] for k in ("calendar_data", "time_summary", "daily_summary", "weekday_summary")}}
+        else: rollups_out_of_sync = True
+
+    # As métricas de risco só são recalculadas quando o motor substitui os seus trades preparados.
+    initial_capital = sum(float(acc.get('initial_capital', 0) or 0) for acc in accounts if selected_account_id in ("all", acc['doc_id']))
+    risk_cache = st.session_state.setdefault('risk_analytics', {})
+    cached_risk = risk_cache.get(selected_account_id)
+    if cached_risk is None or cached_risk[0] is not engine.trades or cached_risk[1] != initial_capital:
+        cached_risk = risk_cache[selected_account_id] = (engine.trades, initial_capital, compute_risk_analytics(engine.trades, initial_capital))
+    risk = cached_risk[2]
+
 # --- RENDERIZAÇÃO DO DASHBOARD ---
 st.subheader("Performance Geral")
 kpi_cols = st.columns(5)
@@ -140,11 +113,54 @@ fig_equity.update_layout(xaxis_title='Número da Operação', yaxis_title='Resul
 st.plotly_chart(fig_equity, use_container_width=True)
 st.markdown("---")
 
+st.subheader("Risco e Drawdown")
+drawdown, streaks, daily_risk = risk["drawdown"], risk["streaks"], risk["daily"]
+risk_cols = st.columns(5)
+risk_cols[0].metric("Drawdown Máximo", f"${drawdown['max_drawdown']:,.2f}", delta=f"{drawdown['max_drawdown_pct']:.2f}%", delta_color="off")
+risk_cols[1].metric("Drawdown Atual", f"${drawdown['current_drawdown']:,.2f}", delta=f"{drawdown['current_drawdown_days']} dias", delta_color="off")
+risk_cols[2].metric("Sequências Máx. (G / P)", f"{streaks['longest_win_streak']} / {streaks['longest_loss_streak']}", delta=f"Atual: {streaks['current_streak']:+d}", delta_color="off")
+last_sharpe, last_sortino = daily_risk['sharpe'].iloc[-1], daily_risk['sortino'].iloc[-1]
+risk_cols[3].metric("Sharpe (30 dias)", "N/A" if pd.isna(last_sharpe) else f"{last_sharpe:.2f}")
+risk_cols[4].metric("Sortino (30 dias)", "N/A" if pd.isna(last_sortino) else f"{last_sortino:.2f}")
+
+risk_col1, risk_col2 = st.columns([3, 2])
+with risk_col1:
+    underwater = risk["underwater"]
+    fig_underwater = go.Figure(go.Scatter(x=list(range(1, len(underwater) + 1)), y=underwater['underwater'].to_numpy(), mode='lines', fill='tozeroy', name='Drawdown', line=dict(color='#FF4B4B', width=1), fillcolor='rgba(255, 75, 75, 0.25)'))
+    fig_underwater.update_layout(title='Curva Underwater', xaxis_title='Número da Operação', yaxis_title='Drawdown (USD)', height=320, margin=dict(t=40, b=30, l=20, r=20), **active_theme['plotly_layout'])
+    st.plotly_chart(fig_underwater, use_container_width=True)
+with risk_col2:
+    r_dist = risk["r_distribution"]
+    counts, edges = r_dist["histogram"]
+    fig_r = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, marker_color='cyan', name='Trades'))
+    fig_r.update_layout(title='Distribuição de R-Múltiplos', xaxis_title='R', yaxis_title='Trades', height=320, margin=dict(t=40, b=30, l=20, r=20), **active_theme['plotly_layout'])
+    st.plotly_chart(fig_r, use_container_width=True)
+    if r_dist["percentiles"]:
+        st.caption(" · ".join(f"P{p}: {v:.2f}R" for p, v in r_dist["percentiles"].items()))
+
+# Excursão das operações (MAE/MFE), calculada uma vez por operação e guardada em cache.
+excursion = excursion_summary(get_trade_excursions(user_id, df_filtered))
+if excursion:
+    st.markdown("##### Excursão das Operações (MAE / MFE)")
+    exc_cols = st.columns(5)
+    exc_cols[0].metric("MAE Médio", f"{excursion['avg_mae_r']:.2f}R")
+    exc_cols[1].metric("MFE Médio", f"{excursion['avg_mfe_r']:.2f}R")
+    exc_cols[2].metric("Stop Tocado Primeiro", f"{excursion['stop_first_pct']:.1f}%")
+    exc_cols[3].metric("Alvo Tocado Primeiro", f"{excursion['target_first_pct']:.1f}%")
+    exc_cols[4].metric("Dias em Operação (média)", f"{excursion['avg_days_in_trade']:.1f}")
+st.markdown("---")
+
 col1, col2, col3 = st.columns([4, 3, 3])
 with col1:
     st.subheader("Análise Temporal")
     fig_calendar = create_calendar_plot(dashboard_data["calendar_data"], active_theme)
     st.plotly_chart(fig_calendar, use_container_width=True)
+    if rollups_out_of_sync:
+        st.caption("Os agregados de P&L não batem certo com o diário; os sumários são calculados a partir das operações.")
+        if st.button("🔄 Reconciliar agregados", key="reconcile_rollups"):
+            with st.spinner("A recalcular os agregados a partir do diário..."):
+                reconcile_rollups(user_id, fix=True, accounts=accounts)
+            st.session_state.pop('pnl_rollups', None); st.rerun()
     st.markdown("##### Trades Recentes")
     render_styled_trades_table(dashboard_data["recent_trades"], active_theme)
 
@@ -0,0 +1,4 @@
+# marketlens/benchmarks/__init__.py
+# Benchmarks de performance. Executar a partir da raiz do projeto, ex.:
+#   python -m benchmarks.run                  (suite completa, com comparação com a baseline)
+#   python -m benchmarks.bench_fetch_scheduler
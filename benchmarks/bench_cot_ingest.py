@@ -0,0 +1,152 @@
+# marketlens/benchmarks/bench_cot_ingest.py
+
+"""
+Ingestão incremental do COT (utils.cot_ingest) contra um dataset Socrata local, sem rede,
+numa base de dados temporária.
+
+O StubSocrata serve registos no formato do dataset Legacy Futures Only da CFTC (texto, datas
+com hora) e aplica o subconjunto de SoQL usado pela ingestão (data > x, código in (...),
+ordenação, limit/offset). Cenários:
+
+- carga inicial de todos os mercados (tabela vazia);
+- nova semana publicada: só essa semana é pedida e gravada;
+- nenhuma semana nova;
+- só os mercados de cot_market_map e, a seguir, todos os mercados (âmbitos independentes);
+- comparação da gravação: executemany numa transação vs. um INSERT e um commit por linha.
+
+    python -m benchmarks.bench_cot_ingest [--weeks 150] [--markets 300]
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from utils import cot_ingest
+from utils.config import cot_market_map
+
+class StubSocrata:
+    """Dataset Socrata em memória com a interface de sodapy.Socrata.get."""
+
+    def __init__(self, markets, seed=11):
+        self.markets = markets  # [(código, nome)]
+        self.rng = np.random.default_rng(seed)
+        self.records = []
+        self.calls = 0
+
+    def publish(self, report_date):
+        """Acrescenta o relatório de uma semana para todos os mercados."""
+        stamp = pd.Timestamp(report_date).strftime("%Y-%m-%dT00:00:00.000")
+        values = self.rng.integers(0, 250_000, size=(len(self.markets), len(cot_ingest.VALUE_FIELDS)))
+        for (code, name), row in zip(self.markets, values):
+            record = {cot_ingest.DATE_FIELD: stamp, cot_ingest.NAME_FIELD: name, cot_ingest.CODE_FIELD: code,
+                      "id": f"{stamp[:10]}{code}"}
+            record.update({field: str(v) for field, v in zip(cot_ingest.VALUE_FIELDS.values(), row)})
+            self.records.append(record)
+
+    def get(self, dataset, select=None, where=None, order=None, limit=1000, offset=0):
+        self.calls += 1
+        records = self.records
+        for clause in (where or "").split(" AND "):
+            if m := re.fullmatch(r"(\w+) > '([^']+)'", clause):
+                records = [r for r in records if r[m[1]] > m[2]]
+            elif m := re.fullmatch(r"(\w+) in\((.*)\)", clause):
+                allowed = set(re.findall(r"'([^']*)'", m[2]))
+                records = [r for r in records if r[m[1]] in allowed]
+        if order:
+            fields = [f.strip() for f in order.split(",")]
+            records = sorted(records, key=lambda r: tuple(r[f] for f in fields))
+        fields = [f.strip() for f in select.split(",")] if select else None
+        return [{f: r[f] for f in fields} if fields else dict(r) for r in records[offset:offset + limit]]
+
+def make_markets(n_markets):
+    """Mercados de cot_market_map (com os seus códigos) e outros até n_markets."""
+    markets = [(code, f"{name.upper()} - STUB EXCHANGE") for name, code in cot_market_map.items()]
+    markets += [(f"9{i:05d}", f"MARKET {i:04d} - STUB EXCHANGE") for i in range(max(0, n_markets - len(markets)))]
+    return markets
+
+def run(label, stub, db_path, **kwargs):
+    calls = stub.calls
+    stats = cot_ingest.ingest_cot(client=stub, db_path=db_path, refresh_snapshot=False, **kwargs)
+    print(f"  -> {label}: {stats['rows']} linhas, {stub.calls - calls} pedidos, {stats['seconds'] * 1000:.0f} ms")
+    return stats
+
+def per_row_commits(rows, db_path):
+    conn = cot_ingest.get_connection(db_path)
+    try:
+        t0 = time.perf_counter()
+        for row in rows:
+            conn.execute(f"INSERT OR REPLACE INTO cot_data ({', '.join(cot_ingest.COT_COLUMNS)}) VALUES ({', '.join('?' * len(row))})", row)
+            conn.commit()
+        return time.perf_counter() - t0
+    finally:
+        conn.close()
+
+def executemany_once(rows, db_path):
+    conn = cot_ingest.get_connection(db_path)
+    try:
+        t0 = time.perf_counter()
+        conn.executemany(f"INSERT OR REPLACE INTO cot_data ({', '.join(cot_ingest.COT_COLUMNS)}) VALUES ({', '.join('?' * len(cot_ingest.COT_COLUMNS))})", rows)
+        conn.commit()
+        return time.perf_counter() - t0
+    finally:
+        conn.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingestão incremental do COT contra um dataset Socrata local.")
+    parser.add_argument("--weeks", type=int, default=150, help="Semanas na carga inicial.")
+    parser.add_argument("--markets", type=int, default=300, help="Mercados no dataset.")
+    parser.add_argument("--page-size", type=int, default=cot_ingest.PAGE_SIZE, help="Registos por pedido.")
+    args = parser.parse_args(argv)
+
+    stub = StubSocrata(make_markets(args.markets))
+    weeks = pd.date_range("2022-01-04", periods=args.weeks + 3, freq="W-TUE")
+    for day in weeks[:args.weeks]:
+        stub.publish(day)
+    tmp = tempfile.mkdtemp(prefix="marketlens_cot_")
+    db_path = os.path.join(tmp, "cot.db")
+    mapped = len(set(cot_market_map.values()))
+    try:
+        print(f"Dataset local: {len(stub.records)} registos, {len(stub.markets)} mercados ({mapped} em cot_market_map)")
+        stats = run("carga inicial", stub, db_path, all_markets=True, page_size=args.page_size)
+        assert stats["rows"] == args.weeks * len(stub.markets)
+
+        stub.publish(weeks[args.weeks])
+        stats = run("nova semana", stub, db_path, all_markets=True, page_size=args.page_size)
+        assert stats["rows"] == len(stub.markets)
+        stats = run("sem semanas novas", stub, db_path, all_markets=True, page_size=args.page_size)
+        assert stats["rows"] == 0
+
+        stub.publish(weeks[args.weeks + 1])
+        stats = run("só cot_market_map", stub, db_path, page_size=args.page_size)
+        assert stats["rows"] == mapped
+        stats = run("todos os mercados depois do mapa", stub, db_path, all_markets=True, page_size=args.page_size)
+        assert stats["rows"] == len(stub.markets)
+
+        conn = sqlite3.connect(db_path)
+        stored = conn.execute("SELECT COUNT(*) FROM cot_data").fetchone()[0]
+        sample = conn.execute("SELECT * FROM cot_data WHERE market_name = ? AND report_date = ?",
+                              (stub.markets[0][1], weeks[0].strftime("%Y-%m-%d"))).fetchone()
+        conn.close()
+        assert stored == len(stub.records)
+        first = next(r for r in stub.records if r[cot_ingest.CODE_FIELD] == stub.markets[0][0])
+        assert sample == cot_ingest.records_to_rows([first])[0]
+        print(f"Tabela: {stored} linhas, iguais ao dataset.")
+
+        rows = cot_ingest.records_to_rows(stub.records)
+        batch = executemany_once(rows, os.path.join(tmp, "batch.db"))
+        single = per_row_commits(rows, os.path.join(tmp, "single.db"))
+        print(f"\nGravação de {len(rows)} linhas: executemany numa transação {batch * 1000:.0f} ms "
+              f"({len(rows) / batch:,.0f} linhas/s) vs. commit por linha {single * 1000:.0f} ms "
+              f"({len(rows) / single:,.0f} linhas/s), {single / batch:.0f}x")
+    finally:
+        for name in ("cot.db", "batch.db", "single.db"):
+            path = os.path.join(tmp, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# marketlens/benchmarks/bench_fetch_scheduler.py
+
+"""
+Compara pedidos individuais por ticker com o FetchScheduler para o universo de
+'yahoo_finance_map', usando um fornecedor falso com latência simulada (sem rede).
+
+    python -m benchmarks.bench_fetch_scheduler
+"""
+
+import time
+import threading
+import numpy as np
+import pandas as pd
+from utils.config import yahoo_finance_map
+from utils.fetch_scheduler import FetchScheduler
+
+LATENCY_SECONDS = 0.2
+
+def make_fake_fetcher(counter):
+    """Fornecedor falso: dorme LATENCY_SECONDS por chamada, independentemente do número de tickers."""
+    def fetcher(tickers, start, end=None):
+        counter.append(len(tickers))
+        time.sleep(LATENCY_SECONDS)
+        index = pd.bdate_range(start, end or "2025-01-01", inclusive="left")
+        return pd.DataFrame({t: np.linspace(1, 2, len(index)) for t in tickers}, index=index)
+    return fetcher
+
+def run_concurrently(fetch, tickers, start, end):
+    threads = [threading.Thread(target=fetch, args=(t, start, end)) for t in tickers]
+    t0 = time.perf_counter()
+    for th in threads: th.start()
+    for th in threads: th.join()
+    return time.perf_counter() - t0
+
+def main():
+    tickers = list(yahoo_finance_map.values())
+    # Cada gráfico pede o seu ticker; alguns pedem o mesmo (ex.: dois gráficos do US500).
+    requests = tickers + tickers[:5]
+    start, end = "2024-01-01", "2025-01-01"
+
+    direct_calls = []
+    direct_time = run_concurrently(make_fake_fetcher(direct_calls), requests, start, end)
+
+    batched_calls = []
+    scheduler = FetchScheduler(make_fake_fetcher(batched_calls))
+    batched_time = run_concurrently(scheduler.fetch, requests, start, end)
+
+    print(f"Pedidos: {len(requests)} ({len(tickers)} tickers distintos)")
+    print(f"Direto:    {len(direct_calls):3d} chamadas ao fornecedor, {direct_time:.3f}s")
+    print(f"Agendador: {len(batched_calls):3d} chamadas ao fornecedor, {batched_time:.3f}s")
+    print(f"Chamadas poupadas: {len(direct_calls) - len(batched_calls)} | estatísticas: {scheduler.stats}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# marketlens/benchmarks/bench_http_fetch.py
+
+"""
+Pedidos de preços pela API de gráficos (price_store.fetch_closes_async) contra um servidor
+HTTP local que imita o Yahoo e conta pedidos, ligações TCP e revalidações (304).
+
+Casos medidos, com o mesmo universo de tickers:
+
+- sem sessão: um requests.get por ticker, em série (uma ligação nova por pedido);
+- sessão partilhada: pedidos asyncio com concorrência limitada sobre uma sessão com pool;
+- 2.ª passagem: as respostas estão em cache, expiradas (max-age=0), e são revalidadas com
+  If-None-Match: o servidor responde 304 sem corpo;
+- falhas transitórias: parte dos tickers responde 503 (com Retry-After) na primeira tentativa
+  e o pedido é repetido com backoff.
+
+O servidor acrescenta uma latência fixa a cada resposta, como um servidor remoto.
+
+    python -m benchmarks.bench_http_fetch [--tickers 40] [--latency-ms 30]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+import requests
+from benchmarks.synthetic import make_prices
+from utils.http_client import new_session
+from utils.price_store import fetch_closes_async
+
+START, END = "2021-01-04", "2025-01-01"
+
+class ChartStub(ThreadingHTTPServer):
+    """Servidor local da API de gráficos, com contadores."""
+
+    daemon_threads = True
+
+    def __init__(self, prices, latency=0.0, fail_first=()):
+        super().__init__(("127.0.0.1", 0), ChartHandler)
+        self.bodies = {ticker: self._body(ticker, prices[ticker]) for ticker in prices.columns}
+        self.latency = latency
+        self.fail_first = set(fail_first)
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "connections": 0, "not_modified": 0, "errors": 0, "bytes": 0}
+
+    @staticmethod
+    def _body(ticker, closes):
+        timestamps = (closes.index.tz_localize("America/New_York") + pd.Timedelta(hours=16)).as_unit("s").astype("int64")
+        payload = {"chart": {"result": [{
+            "meta": {"symbol": ticker, "exchangeTimezoneName": "America/New_York"},
+            "timestamp": timestamps.tolist(),
+            "indicators": {"quote": [{"close": closes.round(6).tolist()}], "adjclose": [{"adjclose": closes.tolist()}]},
+        }], "error": None}}
+        return json.dumps(payload).encode()
+
+    def count(self, key, n=1):
+        with self.lock:
+            self.counts[key] += n
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v8/finance/chart/{{ticker}}"
+
+class ChartHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.count("connections")
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=b"", headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count("bytes", len(body))
+
+    def do_GET(self):
+        server = self.server
+        server.count("requests")
+        time.sleep(server.latency)
+        ticker = self.path.split("?")[0].rsplit("/", 1)[-1]
+        with server.lock:
+            fail = ticker in server.fail_first
+            server.fail_first.discard(ticker)
+        if fail:
+            server.count("errors")
+            return self._reply(503, b"{}", [("Retry-After", "0.05")])
+        body = server.bodies.get(ticker)
+        if body is None:
+            return self._reply(404, b'{"chart": {"result": null}}')
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        headers = [("ETag", etag), ("Last-Modified", "Wed, 01 Jan 2025 00:00:00 GMT"), ("Cache-Control", "max-age=0")]
+        if self.headers.get("If-None-Match") == etag:
+            server.count("not_modified")
+            return self._reply(304, headers=headers)
+        self._reply(200, body, headers + [("Content-Type", "application/json")])
+
+def serve(prices, **kwargs):
+    server = ChartStub(prices, **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run_case(name, server, fetch):
+    before = dict(server.counts)
+    t0 = time.perf_counter()
+    result = fetch()
+    elapsed = time.perf_counter() - t0
+    delta = {k: server.counts[k] - before[k] for k in server.counts}
+    print(f"{name:<26}{elapsed * 1000:>9.0f}{delta['requests']:>10}{delta['connections']:>10}"
+          f"{delta['not_modified']:>8}{delta['errors']:>7}{delta['bytes'] / 1024:>10.0f}")
+    return result
+
+def check(frame, errors, prices):
+    assert not errors, errors
+    expected = prices.loc[(prices.index >= START) & (prices.index < END)]
+    np.testing.assert_allclose(frame[expected.columns].to_numpy(), expected.to_numpy(), rtol=1e-12)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pedidos de preços contra um servidor HTTP local.")
+    parser.add_argument("--tickers", type=int, default=40, help="Número de tickers.")
+    parser.add_argument("--latency-ms", type=float, default=30, help="Latência de cada resposta do servidor.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Pedidos simultâneos.")
+    args = parser.parse_args(argv)
+
+    tickers = [f"T{i:03d}" for i in range(args.tickers)]
+    prices = make_prices(tickers, end=END)
+    cache_dir = tempfile.mkdtemp(prefix="marketlens_http_")
+    server = serve(prices, latency=args.latency_ms / 1000)
+    try:
+        print(f"{args.tickers} tickers, {len(prices)} barras cada, latência {args.latency_ms:.0f} ms, concorrência {args.concurrency}")
+        print(f"{'caso':<26}{'ms':>9}{'pedidos':>10}{'ligações':>10}{'304':>8}{'erros':>7}{'KiB':>10}")
+
+        def naive():
+            for t in tickers:
+                requests.get(server.url.format(ticker=t), params={"period1": 0}, headers={"Connection": "close"}, timeout=10).json()
+        run_case("sem sessão (em série)", server, naive)
+
+        session = new_session(cache_path=os.path.join(cache_dir, "http_cache.db"))
+        fetch = lambda: asyncio.run(fetch_closes_async(tickers, START, END, session=session,
+                                                       concurrency=args.concurrency, base_url=server.url))
+        check(*run_case("sessão partilhada", server, fetch), prices)
+        check(*run_case("2.ª passagem (revalidação)", server, fetch), prices)
+
+        server.fail_first = set(tickers[::4])
+        fresh = new_session(cache_path=None)
+        check(*run_case("falhas transitórias (503)", server, lambda: asyncio.run(fetch_closes_async(
+            tickers, START, END, session=fresh, concurrency=args.concurrency, base_url=server.url))), prices)
+        print("\nResultados iguais aos preços servidos em todos os casos com sessão.")
+    finally:
+        server.shutdown()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
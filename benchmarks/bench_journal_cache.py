@@ -0,0 +1,89 @@
+# marketlens/benchmarks/bench_journal_cache.py
+
+"""
+Leituras do Firestore feitas pela cache do diário (utils.journal_cache) contra um Firestore em
+memória (benchmarks.firestore_stub), que conta as leituras como o Firestore as cobra.
+
+Cenários, com um diário de --trades operações:
+
+- primeira sincronização (leitura completa);
+- rerun sem alterações;
+- operações editadas por outro cliente (com 'updated_at');
+- operações criadas por um cliente antigo, só com 'created_at';
+- referência: ler o diário completo em cada rerun.
+
+No fim, o diário em cache é comparado com uma leitura completa.
+
+    python -m benchmarks.bench_journal_cache [--trades 2000] [--edits 25] [--legacy 10]
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+from benchmarks.firestore_stub import StubFirestore
+from benchmarks.synthetic import make_journal
+from utils.journal_cache import JournalCache
+
+USER_ID = "bench-user"
+
+def journal_collection(client):
+    return client.collection("user_profiles").document(USER_ID).collection("journal_entries")
+
+def seed(client, n_trades, now):
+    collection = journal_collection(client)
+    batch = client.batch()
+    for record in make_journal(n_trades).to_dict("records"):
+        doc_id = record.pop("doc_id")
+        record["trade_date"] = record["trade_date"].strftime("%Y-%m-%d %H:%M:%S")
+        record["created_at"] = record["updated_at"] = now - timedelta(days=30)
+        batch.set(collection.document(doc_id), record)
+    batch.commit()
+
+def run(label, client, action):
+    client.reset_counters()
+    t0 = time.perf_counter()
+    docs = action()
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<44}{client.reads:>9}{client.queries:>10}{docs:>11}{elapsed * 1000:>10.1f}")
+    return client.reads
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Leituras do Firestore feitas pela cache do diário.")
+    parser.add_argument("--trades", type=int, default=2000, help="Operações no diário.")
+    parser.add_argument("--edits", type=int, default=25, help="Operações editadas por outro cliente.")
+    parser.add_argument("--legacy", type=int, default=10, help="Operações criadas só com 'created_at'.")
+    args = parser.parse_args(argv)
+
+    client = StubFirestore()
+    now = datetime.utcnow()
+    seed(client, args.trades, now)
+    collection = journal_collection(client)
+    cache = JournalCache(USER_ID, client=client)
+    full_read = lambda: sum(1 for _ in collection.stream())
+
+    print(f"{'cenário':<44}{'leituras':>9}{'consultas':>10}{'documentos':>11}{'ms':>10}")
+    assert run("primeira sincronização", client, cache.sync) == args.trades
+    assert run("rerun sem alterações", client, cache.sync) == 1
+
+    doc_ids = list(client.store[collection.path])
+    for i, doc_id in enumerate(doc_ids[:args.edits]):
+        collection.document(doc_id).update({"notes": f"editada {i}", "updated_at": now + timedelta(seconds=i)})
+    assert run(f"{args.edits} editadas por outro cliente", client, cache.sync) == args.edits
+
+    for i in range(args.legacy):
+        collection.document(f"legacy-{i}").set({"asset": "EUR/USD", "direction": "Compra", "status": "Em Aberto",
+                                                 "entry_price": 1.1, "stop_loss": 1.09, "target_price": 1.12,
+                                                 "trade_date": "2024-12-02 10:00:00", "created_at": now + timedelta(minutes=5)})
+    assert run(f"{args.legacy} criadas só com 'created_at'", client, cache.sync) == args.legacy
+    assert run("rerun sem alterações", client, cache.sync) == 1
+    run("referência: leitura completa por rerun", client, full_read)
+
+    cached = cache.to_dataframe().set_index("doc_id")
+    stored = client.store[collection.path]
+    assert set(cached.index) == set(stored)
+    assert all(cached.loc[doc_id, "notes"] == stored[doc_id]["notes"] for doc_id in doc_ids[:args.edits])
+    print(f"\nDiário em cache igual ao do Firestore ({len(cached)} operações). "
+          f"Leituras acumuladas da cache: {cache.stats['docs_read']} em {cache.stats['syncs']} sincronizações.")
+
+if __name__ == "__main__":
+    main()
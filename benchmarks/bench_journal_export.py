@@ -0,0 +1,84 @@
+# marketlens/benchmarks/bench_journal_export.py
+
+"""
+Pico de memória (RSS) da exportação do diário à medida que o diário cresce.
+
+Para cada tamanho, e em processos novos (o pico de RSS de um processo só cresce), compara:
+
+- streaming: utils.journal_export.write_export com blocos sintéticos gerados um a um,
+  escritos num ficheiro temporário (CSV e Parquet);
+- DataFrame completo: o diário inteiro em memória, colunas derivadas de uma vez e um único
+  to_csv / to_parquet (a abordagem que a exportação em streaming substitui).
+
+O valor reportado é o pico de RSS acima do RSS depois das importações, em MiB.
+
+    python -m benchmarks.bench_journal_export [--sizes 10000 50000 200000]
+"""
+
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASE_SCRIPT = """
+import os, resource, sys, tempfile, time
+import pandas as pd
+from benchmarks.synthetic import make_journal, make_accounts
+from utils import journal_export
+
+mode, fmt, n_trades, chunk_size = sys.argv[1], sys.argv[2], int(sys.argv[3]), int(sys.argv[4])
+accounts = make_accounts()
+
+def chunks():
+    for i, start in enumerate(range(0, n_trades, chunk_size)):
+        chunk = make_journal(min(chunk_size, n_trades - start), seed=i)
+        chunk['doc_id'] = [f"t{start + k:08d}" for k in range(len(chunk))]
+        yield chunk
+
+base_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+path = tempfile.mktemp(suffix="." + fmt)
+t0 = time.perf_counter()
+try:
+    with open(path, "wb") as sink:
+        if mode == "streaming":
+            rows = journal_export.write_export(chunks(), sink, fmt, accounts)
+        else:
+            full = journal_export.derive_export_columns(pd.concat(list(chunks()), ignore_index=True), accounts)
+            full.to_parquet(sink, compression="zstd") if fmt == "parquet" else sink.write(full.to_csv(index=False).encode("utf-8"))
+            rows = len(full)
+    elapsed = time.perf_counter() - t0
+    size = os.path.getsize(path)
+finally:
+    os.remove(path)
+peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print({"rows": rows, "seconds": elapsed, "peak_mib": (peak_kb - base_kb) / 1024, "file_mib": size / 2**20})
+"""
+
+def run_case(mode, fmt, n_trades, chunk_size):
+    env = {**os.environ, "PYTHONPATH": ROOT + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    proc = subprocess.run([sys.executable, "-c", CASE_SCRIPT, mode, fmt, str(n_trades), str(chunk_size)],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+    if proc.returncode or not lines:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "sem resultado")
+    return ast.literal_eval(lines[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pico de memória da exportação do diário.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000, 200_000], help="Operações no diário.")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Registos por bloco na exportação em streaming.")
+    args = parser.parse_args(argv)
+
+    print(f"{'operações':>10} {'formato':>8} {'streaming (MiB)':>16} {'DataFrame (MiB)':>16} {'streaming (s)':>14} {'ficheiro (MiB)':>15}")
+    for n_trades in args.sizes:
+        for fmt in ("csv", "parquet"):
+            streaming = run_case("streaming", fmt, n_trades, args.chunk_size)
+            full = run_case("full", fmt, n_trades, args.chunk_size)
+            print(f"{n_trades:>10} {fmt:>8} {streaming['peak_mib']:>16.1f} {full['peak_mib']:>16.1f} "
+                  f"{streaming['seconds']:>14.2f} {streaming['file_mib']:>15.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# marketlens/benchmarks/bench_journal_import.py
+
+"""
+Débito da importação de extratos para o diário (utils.journal_import).
+
+- leitura: linhas por segundo da leitura e normalização de um extrato sintético do MT5
+  (sem Firestore);
+- escrita: importação em WriteBatch contra o emulador do Firestore, comparada com a gravação
+  de uma operação de cada vez (um batch por operação, como add_journal_entry), e uma segunda
+  importação do mesmo extrato para confirmar que nada é duplicado.
+
+A escrita só corre com o emulador ativo (FIRESTORE_EMULATOR_HOST definido, ex.:
+'gcloud emulators firestore start --host-port=localhost:8080'); os dados do utilizador de
+teste são apagados no fim.
+
+    python -m benchmarks.bench_journal_import [--trades 5000] [--single 500]
+"""
+
+import argparse
+import io
+import os
+import time
+import uuid
+from datetime import datetime
+from benchmarks.synthetic import iter_statement_lines, make_accounts
+from utils import journal_import
+from utils.rollup_utils import rollup_delta, apply_rollup_delta, reconcile_rollups
+
+EMULATOR_PROJECT = "marketlens-bench"
+
+def statement_bytes(n_trades):
+    return "".join(iter_statement_lines(n_trades)).encode("utf-8")
+
+def bench_parse(data):
+    t0 = time.perf_counter()
+    rows = entries = 0
+    date_format = [journal_import.DATE_FORMATS[0]]
+    for record in journal_import.iter_statement(io.BytesIO(data)):
+        rows += 1
+        entries += journal_import.build_entry(record, risk_usd=100.0, date_format=date_format) is not None
+    elapsed = time.perf_counter() - t0
+    print(f"leitura + normalização: {rows} linhas em {elapsed * 1000:.0f} ms ({rows / elapsed:,.0f} linhas/s)")
+
+def emulator_client():
+    from google.cloud import firestore
+    return firestore.Client(project=os.environ.get("GCLOUD_PROJECT", EMULATOR_PROJECT))
+
+def delete_user(client, user_id):
+    user = client.collection("user_profiles").document(user_id)
+    for name in ("journal_entries", "pnl_rollups"):
+        refs = [doc.reference for doc in user.collection(name).stream()]
+        for i in range(0, len(refs), journal_import.MAX_BATCH_WRITES):
+            batch = client.batch()
+            for ref in refs[i:i + journal_import.MAX_BATCH_WRITES]:
+                batch.delete(ref)
+            batch.commit()
+
+def bench_single_writes(client, user_id, data, n_trades):
+    """Uma operação por batch (registo + agregados), como no formulário do Journaling."""
+    collection = client.collection("user_profiles").document(user_id).collection("journal_entries")
+    t0 = time.perf_counter()
+    count = 0
+    for record in journal_import.iter_statement(io.BytesIO(data)):
+        entry = journal_import.build_entry(record, risk_usd=100.0)
+        if entry is None:
+            continue
+        entry["created_at"] = entry["updated_at"] = datetime.utcnow()
+        batch = client.batch()
+        batch.set(collection.document(), entry)
+        apply_rollup_delta(batch, user_id, rollup_delta(None, entry), client)
+        batch.commit()
+        count += 1
+        if count >= n_trades:
+            break
+    return count, time.perf_counter() - t0
+
+def bench_writes(data, n_single):
+    client = emulator_client()
+    accounts = make_accounts()
+    kwargs = dict(accounts=accounts, selected_accounts=[accounts[0]["doc_id"]], risk_percentage=1.0,
+                  source="bench.csv", client=client)
+    user_id, single_user = f"bench-{uuid.uuid4().hex[:8]}", f"bench-{uuid.uuid4().hex[:8]}"
+    try:
+        t0 = time.perf_counter()
+        stats = journal_import.import_statement(user_id, io.BytesIO(data), **kwargs)
+        elapsed = time.perf_counter() - t0
+        print(f"importação em lotes:    {stats['imported']} operações em {elapsed:.2f} s "
+              f"({stats['imported'] / elapsed:,.0f} op/s, {stats['batches']} batches)")
+
+        t0 = time.perf_counter()
+        again = journal_import.import_statement(user_id, io.BytesIO(data), **kwargs)
+        print(f"reimportação:           {again['imported']} novas, {again['duplicates']} duplicadas "
+              f"em {time.perf_counter() - t0:.2f} s")
+        mismatches = reconcile_rollups(user_id, client=client)
+        print(f"agregados de P&L:       {'consistentes' if not mismatches else f'{len(mismatches)} diferenças'}")
+
+        if n_single:
+            count, single = bench_single_writes(client, single_user, data, n_single)
+            print(f"uma operação por batch: {count} operações em {single:.2f} s ({count / single:,.0f} op/s)")
+            print(f"ganho da importação em lotes: {(stats['imported'] / elapsed) / (count / single):.1f}x")
+    finally:
+        delete_user(client, user_id)
+        delete_user(client, single_user)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Débito da importação de extratos para o diário.")
+    parser.add_argument("--trades", type=int, default=5000, help="Operações no extrato sintético.")
+    parser.add_argument("--single", type=int, default=500, help="Operações gravadas uma a uma para comparação (0 = não medir).")
+    args = parser.parse_args(argv)
+
+    data = statement_bytes(args.trades)
+    print(f"Extrato sintético MT5: {args.trades} operações, {len(data) / 1024:.0f} KiB")
+    bench_parse(data)
+    if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        print("FIRESTORE_EMULATOR_HOST não definido: a escrita no emulador do Firestore não foi medida.")
+        return
+    bench_writes(data, args.single)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# marketlens/benchmarks/bench_macro_store.py
+
+"""
+Atualização incremental dos indicadores macro (utils.macro_store) com um cliente FRED falso,
+sem rede, numa base de dados temporária.
+
+O cliente falso gera séries mensais para todas as séries de 'macro_indicator_map', agrupa-as
+em releases com um calendário de publicação mensal e conta os pedidos (um por série ou
+release, como os da API do FRED). Cenários:
+
+- carga inicial: todas as séries descarregadas;
+- nova execução logo a seguir: nenhum pedido;
+- dia de publicação de um release, ainda sem dados novos no FRED: só os metadados das séries
+  desse release;
+- o mesmo release, uma hora depois, já publicado: metadados e observações só dessas séries.
+
+No fim mede a leitura local de todos os indicadores de uma zona (get_country_indicators).
+
+    python -m benchmarks.bench_macro_store
+"""
+
+import os
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+from utils import macro_store
+from utils.config import macro_indicator_map
+
+N_RELEASES = 6
+
+class StubFredClient:
+    """Cliente com a interface de macro_store.FredClient, sobre dados em memória."""
+
+    def __init__(self, series_keys, start="1990-01-01", end="2024-12-01", seed=3):
+        rng = np.random.default_rng(seed)
+        self.bases = list(dict.fromkeys(macro_store.split_key(k)[0] for k in series_keys))
+        index = pd.date_range(start, end, freq="MS")
+        self.data = {b: pd.Series(100 + rng.normal(0, 1, len(index)).cumsum(), index=index) for b in self.bases}
+        self.release = {b: i % N_RELEASES + 1 for i, b in enumerate(self.bases)}
+        self.vintage = {b: "2024-12-10 08:00:00-06" for b in self.bases}
+        self.calls = Counter()
+
+    def publish(self, release_id, when):
+        """Acrescenta uma observação às séries do release e muda a vintage."""
+        for b in self.bases:
+            if self.release[b] == release_id:
+                series = self.data[b]
+                self.data[b] = pd.concat([series, pd.Series([series.iloc[-1] + 0.5], index=[series.index[-1] + pd.DateOffset(months=1)])])
+                self.vintage[b] = when.strftime("%Y-%m-%d %H:%M:%S-06")
+
+    def release_day(self, release_id, month):
+        return month.replace(day=2 + 4 * release_id)
+
+    def _count(self, name, items):
+        self.calls[name] += len(items)
+
+    def series_info(self, series_ids):
+        self._count("series", series_ids)
+        return {b: {"title": f"Série {b}", "frequency": "M", "units": "Index", "seasonal_adjustment": "SA",
+                    "last_updated": self.vintage[b]} for b in series_ids}
+
+    def observations(self, series_keys):
+        self._count("series/observations", series_keys)
+        out = {}
+        for key in series_keys:
+            base, units = macro_store.split_key(key)
+            series = self.data[base]
+            out[key] = {"chg": series.diff(), "pch": series.pct_change() * 100,
+                        "pc1": series.pct_change(12) * 100}.get(units, series).dropna()
+        return out
+
+    def release_ids(self, series_ids):
+        self._count("series/release", series_ids)
+        return {b: self.release[b] for b in series_ids}
+
+    def next_release_dates(self, release_ids, after):
+        self._count("release/dates", release_ids)
+        out = {}
+        for rid in release_ids:
+            day = self.release_day(rid, after.replace(day=1))
+            out[rid] = day if day >= after else self.release_day(rid, (after.replace(day=1) + timedelta(days=32)).replace(day=1))
+        return out
+
+def run(label, client, keys, db_path, now):
+    client.calls.clear()
+    stats = macro_store.refresh_macro(keys, client=client, db_path=db_path, now=now)
+    calls = ", ".join(f"{k}={v}" for k, v in sorted(client.calls.items())) or "nenhum"
+    print(f"{label:<44} {stats['checked']:>3} consultadas {stats['updated']:>3} descarregadas "
+          f"{stats['rows']:>6} obs. {stats['seconds'] * 1000:>7.1f} ms | pedidos: {calls}")
+    return stats
+
+def main():
+    keys = macro_store.all_series_keys()
+    client = StubFredClient(keys)
+    db_path = os.path.join(tempfile.mkdtemp(prefix="marketlens_macro_"), "macro.db")
+    try:
+        print(f"{len(keys)} séries ({len(client.bases)} séries base do FRED) em {N_RELEASES} releases")
+        start = datetime(2024, 12, 31, 9, 0)
+        run("carga inicial", client, keys, db_path, start)
+        run("nova execução", client, keys, db_path, start + timedelta(minutes=5))
+
+        release_day = client.release_day(1, date(2025, 1, 1))
+        morning = datetime.combine(release_day, datetime.min.time()).replace(hour=7)
+        in_release = sum(1 for k in keys if client.release[macro_store.split_key(k)[0]] == 1)
+        stats = run(f"release 1 a {release_day}, ainda sem dados", client, keys, db_path, morning)
+        assert stats["checked"] == in_release and stats["updated"] == 0
+        client.publish(1, morning + timedelta(minutes=90))
+        stats = run("release 1 publicado (1 h depois)", client, keys, db_path, morning + timedelta(hours=2))
+        assert stats["checked"] == stats["updated"] == in_release
+        run("nova execução", client, keys, db_path, morning + timedelta(hours=4))
+
+        for country in macro_indicator_map:
+            t0 = time.perf_counter()
+            indicators = macro_store.get_country_indicators(country, refresh=False, db_path=db_path)
+            elapsed = time.perf_counter() - t0
+            points = sum(len(s) for s in indicators.values())
+            print(f"leitura local {country}: {len(indicators)} indicadores, {points} observações em {elapsed * 1000:.1f} ms")
+
+        key = next(k for k in keys if macro_store.split_key(k)[1] is None)
+        stored = macro_store.read_indicators(key, db_path=db_path)[key]
+        expected = client.data[key]
+        assert np.allclose(stored.to_numpy(), expected.to_numpy()) and stored.index.equals(expected.index)
+        print("Valores guardados iguais aos servidos pelo cliente.")
+    finally:
+        os.remove(db_path)
+
+if __name__ == "__main__":
+    main()
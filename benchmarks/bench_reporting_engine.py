@@ -0,0 +1,79 @@
+# marketlens/benchmarks/bench_reporting_engine.py
+
+"""
+Compara o recálculo completo de calculate_dashboard_metrics com o IncrementalReport
+num diário sintético (por defeito 100k trades) e verifica que os resultados coincidem.
+
+    python -m benchmarks.bench_reporting_engine [n_trades]
+"""
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+from utils.reporting_engine import calculate_dashboard_metrics, IncrementalReport
+from benchmarks.synthetic import make_journal
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter(); result = fn(*args); best = min(best, time.perf_counter() - t0)
+    return best, result
+
+def assert_same_metrics(a, b):
+    """Compara dois dicionários de métricas (tolerância numérica para somas incrementais)."""
+    for section in ("kpis", "time_summary", "daily_summary", "synapse_score_data", "weekday_summary"):
+        for key, value in a[section].items():
+            other = b[section][key]
+            if isinstance(value, str):
+                assert value == other, (section, key, value, other)
+            else:
+                assert np.isclose(value, other, rtol=1e-9, atol=1e-6), (section, key, value, other)
+    pd.testing.assert_series_equal(a["calendar_data"], b["calendar_data"], check_exact=False, rtol=1e-9, atol=1e-6)
+    pd.testing.assert_series_equal(a["asset_distribution"].sort_index(), b["asset_distribution"].sort_index())
+    assert np.allclose(a["equity_curve"].to_numpy(), b["equity_curve"].to_numpy(), rtol=1e-9, atol=1e-6)
+
+def main(n_trades=100_000):
+    journal = make_journal(n_trades)
+    full_time, _ = timed(calculate_dashboard_metrics, journal, None)
+
+    engine = IncrementalReport()
+    cold_time, _ = timed(lambda df: (engine.reset(), engine.update(df)), journal, repeat=1)
+    unchanged_time, _ = timed(engine.update, journal)
+
+    # Adicionar um trade novo (o caso habitual) e editar um trade antigo.
+    new_trade = journal.iloc[[0]].copy()
+    new_trade["doc_id"] = "novo"
+    new_trade["trade_date"] = journal["trade_date"].max() + pd.Timedelta(hours=1)
+    with_new = pd.concat([new_trade, journal])
+    add_time, incremental = timed(engine.update, with_new, repeat=1)
+    assert_same_metrics(incremental, calculate_dashboard_metrics(with_new, None))
+
+    # Editar o preço de saída de um trade finalizado antigo.
+    edited = with_new.copy()
+    row = edited.index[(edited["status"] == "Finalizado").to_numpy()][len(edited) // 2]
+    edited.loc[row, "exit_price"] = edited.loc[row, "entry_price"] * 1.01
+    edited.loc[row, "updated_at"] = pd.Timestamp.now()
+    edit_time, incremental = timed(engine.update, edited, repeat=1)
+    assert_same_metrics(incremental, calculate_dashboard_metrics(edited, None))
+
+    # Fechar um trade antigo que estava em aberto (entra a meio da curva de capital).
+    closed = edited.copy()
+    row = closed.index[(closed["status"] == "Em Aberto").to_numpy()][len(closed) // 20]
+    closed.loc[row, "exit_price"] = closed.loc[row, "entry_price"] * 0.99
+    closed.loc[row, "status"] = "Finalizado"
+    closed.loc[row, "updated_at"] = pd.Timestamp.now()
+    close_time, incremental = timed(engine.update, closed, repeat=1)
+    assert_same_metrics(incremental, calculate_dashboard_metrics(closed, None))
+
+    print(f"Diário sintético: {n_trades:,} trades")
+    print(f"Recálculo completo:            {full_time * 1000:8.1f} ms")
+    print(f"Incremental (arranque a frio): {cold_time * 1000:8.1f} ms")
+    print(f"Incremental (sem alterações):  {unchanged_time * 1000:8.1f} ms  ({full_time / unchanged_time:.1f}x)")
+    print(f"Incremental (1 trade novo):    {add_time * 1000:8.1f} ms  ({full_time / add_time:.1f}x)")
+    print(f"Incremental (1 trade editado): {edit_time * 1000:8.1f} ms  ({full_time / edit_time:.1f}x)")
+    print(f"Incremental (1 trade fechado): {close_time * 1000:8.1f} ms  ({full_time / close_time:.1f}x)")
+    print("Resultados incrementais coincidem com o recálculo completo.")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
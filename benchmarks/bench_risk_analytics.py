@@ -0,0 +1,53 @@
+# marketlens/benchmarks/bench_risk_analytics.py
+
+"""
+Mede compute_risk_analytics e account_equity_curves em diários sintéticos (por defeito até 1M
+de trades) e confirma o drawdown máximo e as sequências contra um cálculo direto.
+
+    python -m benchmarks.bench_risk_analytics [n_trades ...]
+"""
+
+import sys
+import time
+import numpy as np
+from utils.reporting_engine import prepare_trades
+from utils.account_attribution import build_weights
+from utils.risk_analytics import compute_risk_analytics, account_equity_curves
+from benchmarks.synthetic import make_journal, make_accounts
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter(); result = fn(*args); best = min(best, time.perf_counter() - t0)
+    return best, result
+
+def check(trades, risk, initial_capital):
+    """Confere o drawdown máximo e as sequências com um ciclo simples sobre os trades."""
+    peak, max_dd, wins, losses, best_win, best_loss = initial_capital, 0.0, 0, 0, 0, 0
+    equity = initial_capital
+    for pnl in trades['pnl_usd'].to_numpy():
+        equity += pnl; peak = max(peak, equity); max_dd = min(max_dd, equity - peak)
+        wins, losses = (wins + 1 if pnl > 0 else 0), (losses + 1 if pnl < 0 else 0)
+        best_win, best_loss = max(best_win, wins), max(best_loss, losses)
+    assert np.isclose(risk["drawdown"]["max_drawdown"], max_dd, rtol=1e-9, atol=1e-6)
+    assert (risk["streaks"]["longest_win_streak"], risk["streaks"]["longest_loss_streak"]) == (best_win, best_loss)
+
+def main(sizes=(10_000, 100_000, 1_000_000), initial_capital=100_000.0):
+    for n_trades in sizes:
+        journal = make_journal(n_trades)
+        trades = prepare_trades(journal).sort_values('trade_date', kind='stable')
+        elapsed, risk = timed(compute_risk_analytics, trades, initial_capital)
+        check(trades, risk, initial_capital)
+
+        accounts = make_accounts(3)
+        weights = build_weights(journal, accounts)
+        pnl = prepare_trades(journal)['pnl_usd'].reindex(journal.index, fill_value=0).to_numpy()
+        curves_time, _ = timed(account_equity_curves, pnl, journal['trade_date'], weights, accounts)
+
+        print(f"{n_trades:>9} trades  compute_risk_analytics {elapsed * 1000:8.1f} ms   "
+              f"account_equity_curves {curves_time * 1000:8.1f} ms")
+    print("\nDrawdown máximo e sequências coincidem com o cálculo direto.")
+
+if __name__ == "__main__":
+    sizes = tuple(int(a) for a in sys.argv[1:]) or (10_000, 100_000, 1_000_000)
+    main(sizes)
@@ -0,0 +1,96 @@
+# marketlens/benchmarks/bench_snapshots.py
+
+"""
+Compara as leituras de price_data e cot_data feitas na base SQLite com as feitas a partir dos
+snapshots colunares (Arrow IPC por memory-map e Parquet), e confirma que o resultado é o mesmo.
+
+A base distribuída é aberta só para leitura e os snapshots são exportados para um diretório
+temporário, removido no fim.
+
+    python -m benchmarks.bench_snapshots [caminho da base]
+"""
+
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import tempfile
+import pandas as pd
+from utils.config import DB_PATH, yahoo_finance_map
+from utils import snapshot_store
+from utils.price_store import read_prices
+from utils.cot_engine import load_cot_data
+
+def best_of(fn, repeat=5):
+    fn()
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+def sqlite_only(fn):
+    """Executa fn com a leitura por snapshot desligada (leitura direta na base)."""
+    def wrapper():
+        enabled, snapshot_store.SNAPSHOTS_ENABLED = snapshot_store.SNAPSHOTS_ENABLED, False
+        try:
+            return fn()
+        finally:
+            snapshot_store.SNAPSHOTS_ENABLED = enabled
+    return wrapper
+
+def check(conn, snapshot, tickers):
+    expected = sqlite_only(lambda: read_prices(tickers, conn=conn))()
+    pd.testing.assert_frame_equal(expected, snapshot_store.read_prices_snapshot(snapshot, tickers, conn), check_freq=False)
+    keys = ["market_name", "report_date"]
+    cot = sqlite_only(lambda: load_cot_data(conn=conn))()
+    from_snapshot = snapshot_store.load_cot_snapshot(snapshot, conn)
+    pd.testing.assert_frame_equal(cot.sort_values(keys).reset_index(drop=True)[from_snapshot.columns],
+                                  from_snapshot.sort_values(keys).reset_index(drop=True), check_dtype=False)
+
+def main(db_path=DB_PATH):
+    if not os.path.exists(db_path):
+        print(f"Base não encontrada: {db_path}")
+        return
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    tickers = list(yahoo_finance_map.values())
+    root = tempfile.mkdtemp(prefix="marketlens_snapshots_")
+    try:
+        rows = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in snapshot_store.TABLES}
+        print(f"Base: {db_path}  " + "  ".join(f"{t}: {n} linhas" for t, n in rows.items()))
+        print(f"{'leitura':<28}{'SQLite (ms)':>12}" + "".join(f"{fmt + ' (ms)':>16}" for fmt in snapshot_store.FORMATS))
+
+        snapshots, export_times = {}, {}
+        for fmt in snapshot_store.FORMATS:
+            snapshot_dir = os.path.join(root, fmt)
+            t0 = time.perf_counter()
+            snapshot_store.export_snapshots(snapshot_dir=snapshot_dir, fmt=fmt, conn=conn)
+            export_times[fmt] = (time.perf_counter() - t0) * 1000
+            t0 = time.perf_counter()
+            snapshot = snapshots[fmt] = snapshot_store.open_snapshot(snapshot_dir)
+            check(conn, snapshot, tickers)
+            export_times[fmt + " 1.ª leitura"] = (time.perf_counter() - t0) * 1000
+
+        cases = {
+            "read_prices[universo]": (lambda: read_prices(tickers, conn=conn),
+                                      lambda s: snapshot_store.read_prices_snapshot(s, tickers, conn)),
+            "read_prices[1 ticker]": (lambda: read_prices(tickers[:1], conn=conn),
+                                      lambda s: snapshot_store.read_prices_snapshot(s, tickers[:1], conn)),
+            "read_prices[desde 2024]": (lambda: read_prices(tickers, start="2024-01-01", conn=conn),
+                                        lambda s: snapshot_store.read_prices_snapshot(s, tickers, conn, start="2024-01-01")),
+            "load_cot_data": (lambda: load_cot_data(conn=conn),
+                              lambda s: snapshot_store.load_cot_snapshot(s, conn)),
+        }
+        for name, (from_sqlite, from_snapshot) in cases.items():
+            line = f"{name:<28}{best_of(sqlite_only(from_sqlite)):>12.1f}"
+            for fmt, snapshot in snapshots.items():
+                line += f"{best_of(lambda: from_snapshot(snapshot)):>16.1f}"
+            print(line)
+        print("\n" + "  ".join(f"{k}: {v:.0f} ms" for k, v in export_times.items()))
+        print("Resultados dos snapshots iguais aos da base.")
+    finally:
+        conn.close()
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,153 @@
+# marketlens/benchmarks/bench_startup.py
+
+"""
+Tempo de arranque de cada página: importações e primeira execução numa sessão nova.
+
+Cada página é medida num processo Python novo (arranque a frio):
+
+- importações: as instruções import do topo da página correm com 'python -X importtime'; o
+  relatório dá o tempo acumulado de cada módulo de topo e os mais pesados são listados;
+- primeira execução: a página corre uma vez no AppTest do Streamlit, sem sessão iniciada
+  (até à verificação do login), como no primeiro pedido de um utilizador.
+
+Os resultados são gravados em JSON (fora do repositório) e comparados com uma baseline, como em benchmarks.run.
+
+    python -m benchmarks.bench_startup                   # todas as páginas
+    python -m benchmarks.bench_startup --report 15       # + os 15 módulos mais pesados por página
+    python -m benchmarks.bench_startup --save-baseline
+"""
+
+import argparse
+import ast
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from benchmarks.run import compare, environment
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+DEFAULT_OUTPUT = os.path.join(tempfile.gettempdir(), "marketlens_startup.json")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "startup_baseline.json")
+# Bibliotecas que só devem ser carregadas pelas páginas que as usam.
+HEAVY_MODULES = ("firebase_admin", "google.cloud.firestore", "pyrebase", "yfinance", "requests_cache", "curl_cffi")
+
+RENDER_SCRIPT = """
+import sys, time
+from streamlit.testing.v1 import AppTest
+t0 = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.run()
+elapsed = (time.perf_counter() - t0) * 1000
+loaded = [m for m in sys.argv[2:] if m in sys.modules]
+print({"render_ms": elapsed, "exceptions": [str(e.value) for e in at.exception], "loaded": loaded})
+"""
+
+def pages():
+    return [os.path.join(ROOT, "Início.py")] + sorted(glob.glob(os.path.join(ROOT, "pages", "*.py")))
+
+def top_level_imports(path):
+    """Instruções import do topo do ficheiro da página, como código executável."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+def _env():
+    return {**os.environ, "PYTHONPATH": ROOT + os.pathsep + os.environ.get("PYTHONPATH", "")}
+
+def parse_importtime(stderr):
+    """Linhas 'import time: self | cumulative | módulo' -> [(módulo, self µs, acumulado µs, profundidade)]."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+def _interpreter_modules():
+    """Módulos carregados pelo próprio arranque do interpretador (site, encodings, ...), a excluir."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "pass"], capture_output=True, text=True)
+    return {name for name, _, _, _ in parse_importtime(proc.stderr)}
+
+def measure_imports(path, exclude=frozenset()):
+    """Importações da página num processo novo: tempo total (ms), módulos de topo e erros."""
+    code = top_level_imports(path)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=_env(),
+                          capture_output=True, text=True)
+    rows = [row for row in parse_importtime(proc.stderr) if row[0] not in exclude]
+    top = [(name, cumulative / 1000) for name, _, cumulative, depth in rows if depth == 0]
+    error = proc.stderr.strip().splitlines()[-1] if proc.returncode else None
+    loaded = {name for name, _, _, _ in rows}
+    heavy = [m for m in HEAVY_MODULES if any(n == m or n.startswith(m + ".") for n in loaded)]
+    return {"import_ms": sum(ms for _, ms in top), "top": sorted(top, key=lambda t: -t[1]), "heavy": heavy, "error": error}
+
+def measure_render(path):
+    """Primeira execução da página no AppTest, num processo novo (inclui as importações)."""
+    proc = subprocess.run([sys.executable, "-c", RENDER_SCRIPT, path, *HEAVY_MODULES], cwd=ROOT, env=_env(),
+                          capture_output=True, text=True)
+    lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+    if proc.returncode or not lines:
+        return {"render_ms": None, "exceptions": [proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "sem resultado"], "loaded": []}
+    return ast.literal_eval(lines[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tempo de arranque das páginas do MarketLens.")
+    parser.add_argument("--repeat", type=int, default=3, help="Medições por página (mediana).")
+    parser.add_argument("--report", type=int, default=0, help="Mostra os N módulos de topo mais pesados de cada página.")
+    parser.add_argument("--no-render", action="store_true", help="Mede apenas as importações.")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Ficheiro JSON de resultados.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Ficheiro JSON da baseline.")
+    parser.add_argument("--tolerance", type=float, default=1.3, help="Rácio máximo face à baseline.")
+    parser.add_argument("--save-baseline", action="store_true", help="Grava os resultados como nova baseline.")
+    args = parser.parse_args(argv)
+
+    cases, exclude = {}, _interpreter_modules()
+    for path in pages():
+        page = os.path.basename(path)
+        imports = [measure_imports(path, exclude) for _ in range(args.repeat)]
+        import_ms = [r["import_ms"] for r in imports]
+        cases[f"import[{page}]"] = {"median_ms": statistics.median(import_ms), "min_ms": min(import_ms), "repeat": args.repeat}
+        line = f"{page:<34} importações {statistics.median(import_ms):8.1f} ms"
+        if not args.no_render:
+            renders = [measure_render(path) for _ in range(args.repeat)]
+            render_ms = [r["render_ms"] for r in renders if r["render_ms"] is not None]
+            if render_ms:
+                cases[f"first_run[{page}]"] = {"median_ms": statistics.median(render_ms), "min_ms": min(render_ms), "repeat": len(render_ms)}
+                line += f"   1.ª execução {statistics.median(render_ms):8.1f} ms"
+            if renders[-1]["exceptions"]:
+                line += f"   erro: {renders[-1]['exceptions'][0][:60]}"
+        if imports[-1]["heavy"]:
+            line += f"   carrega: {', '.join(imports[-1]['heavy'])}"
+        if imports[-1]["error"]:
+            line += f"   erro na importação: {imports[-1]['error'][:60]}"
+        print(line)
+        for name, ms in imports[-1]["top"][:args.report]:
+            print(f"    {ms:8.1f} ms  {name}")
+
+    results = {"created_at": datetime.now().isoformat(timespec="seconds"), "environment": environment(), "cases": cases}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResultados gravados em {args.output}")
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline gravada em {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("Sem baseline para comparar (use --save-baseline).")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    for name, before, after, ratio in regressions:
+        print(f"  {name}: {before:.2f} ms -> {after:.2f} ms ({ratio:.2f}x)")
+    print("Regressões encontradas." if regressions else f"Sem regressões face à baseline (tolerância {args.tolerance:.2f}x).")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
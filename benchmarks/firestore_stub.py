@@ -0,0 +1,214 @@
+# marketlens/benchmarks/firestore_stub.py
+
+"""
+Firestore em memória, com a parte da interface do google-cloud-firestore usada pela aplicação,
+para os benchmarks correrem sem emulador nem rede.
+
+Suporta coleções e subcoleções, document().get/set/update/delete, consultas com
+where(filter=FieldFilter/Or), order_by, limit e start_after, WriteBatch e get_all. Como no
+Firestore, os tempos sem fuso são guardados em UTC e devolvidos com fuso.
+
+As leituras são contadas como o Firestore as cobra: um documento devolvido = uma leitura, e
+uma consulta sem resultados conta uma leitura. 'reads' e 'queries' ficam no cliente.
+"""
+
+import itertools
+from datetime import datetime, timezone
+
+_auto_ids = itertools.count()
+
+def _stored(value):
+    """Valor como o Firestore o devolve (datetimes com fuso UTC)."""
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+    if isinstance(value, list):
+        return [_stored(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _stored(v) for k, v in value.items()}
+    return value
+
+def _merge(base, data):
+    """Escrita com merge, incluindo firestore.Increment e mapas aninhados."""
+    from google.cloud.firestore_v1.transforms import Increment
+    out = dict(base)
+    for key, value in data.items():
+        if isinstance(value, Increment):
+            out[key] = out.get(key, 0) + value.value
+        elif isinstance(value, dict):
+            out[key] = _merge(out.get(key) if isinstance(out.get(key), dict) else {}, value)
+        else:
+            out[key] = _stored(value)
+    return out
+
+class StubSnapshot:
+    def __init__(self, reference, data):
+        self.reference, self._data = reference, data
+
+    @property
+    def id(self):
+        return self.reference.id
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return (self._data or {}).get(field)
+
+class StubDocument:
+    def __init__(self, client, path):
+        self.client, self.path = client, path
+        self.id = path.rsplit("/", 1)[-1]
+
+    @property
+    def _parent(self):
+        return self.client.store.setdefault(self.path.rsplit("/", 1)[0], {})
+
+    def collection(self, name):
+        return StubCollection(self.client, f"{self.path}/{name}")
+
+    def get(self, transaction=None):
+        self.client.reads += 1
+        return StubSnapshot(self, self._parent.get(self.id))
+
+    def set(self, data, merge=False):
+        self._parent[self.id] = _merge(self._parent.get(self.id, {}) if merge else {}, data)
+
+    def update(self, data):
+        self.set(data, merge=True)
+
+    def create(self, data):
+        if self.id in self._parent:
+            from google.api_core.exceptions import Conflict
+            raise Conflict(f"{self.path} já existe")
+        self.set(data)
+
+    def delete(self):
+        self._parent.pop(self.id, None)
+
+class StubQuery:
+    def __init__(self, client, path, filters=(), order=(), limit=None, after=None):
+        self.client, self.path = client, path
+        self._filters, self._order, self._limit, self._after = list(filters), list(order), limit, after
+
+    def _copy(self, **changes):
+        state = dict(filters=self._filters, order=self._order, limit=self._limit, after=self._after)
+        state.update(changes)
+        return StubQuery(self.client, self.path, **state)
+
+    def where(self, filter=None):
+        return self._copy(filters=self._filters + [filter])
+
+    def order_by(self, field, direction="ASCENDING"):
+        return self._copy(order=self._order + [(field, str(direction).upper().endswith("DESCENDING"))])
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def start_after(self, snapshot):
+        return self._copy(after=snapshot)
+
+    @staticmethod
+    def _matches(data, flt):
+        if hasattr(flt, "filters"):  # Or / And
+            results = (StubQuery._matches(data, f) for f in flt.filters)
+            return any(results) if flt.operator.name == "OR" else all(results)
+        value, target = data.get(flt.field_path), _stored(flt.value)
+        op = flt.op_string
+        if op == "==":
+            return value == target
+        if op == "in":
+            return value in target
+        if op == "array_contains":
+            return target in (value or [])
+        if op == "array_contains_any":
+            return any(t in (value or []) for t in target)
+        if value is None:
+            return False
+        try:
+            return {"<": value < target, "<=": value <= target, ">": value > target, ">=": value >= target}[op]
+        except TypeError:  # tipos diferentes nunca se comparam no Firestore
+            return False
+
+    def stream(self, transaction=None):
+        collection = self.client.store.get(self.path, {})
+        rows = [(doc_id, data) for doc_id, data in collection.items() if all(self._matches(data, f) for f in self._filters)]
+        for field, descending in reversed(self._order):
+            rows.sort(key=lambda row: (row[1].get(field) is None, row[1].get(field)), reverse=descending)
+        if self._after is not None and self._order:
+            ids = [doc_id for doc_id, _ in rows]
+            rows = rows[ids.index(self._after.id) + 1:] if self._after.id in ids else rows
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        self.client.queries += 1
+        self.client.reads += max(len(rows), 1)
+        return iter([StubSnapshot(StubDocument(self.client, f"{self.path}/{doc_id}"), dict(data)) for doc_id, data in rows])
+
+    def get(self, transaction=None):
+        return list(self.stream(transaction))
+
+class StubCollection(StubQuery):
+    def __init__(self, client, path):
+        super().__init__(client, path)
+
+    @property
+    def id(self):
+        return self.path.rsplit("/", 1)[-1]
+
+    def document(self, document_id=None):
+        return StubDocument(self.client, f"{self.path}/{document_id or f'auto{next(_auto_ids):08d}'}")
+
+    def add(self, data):
+        reference = self.document()
+        reference.set(data)
+        return datetime.now(timezone.utc), reference
+
+class StubWriteBatch:
+    """WriteBatch (e transação, com as escritas aplicadas no commit)."""
+
+    def __init__(self, client):
+        self.client, self._writes = client, []
+
+    def set(self, reference, data, merge=False):
+        self._writes.append(lambda: reference.set(data, merge=merge))
+
+    def update(self, reference, data):
+        self._writes.append(lambda: reference.update(data))
+
+    def create(self, reference, data):
+        self._writes.append(lambda: reference.create(data))
+
+    def delete(self, reference):
+        self._writes.append(reference.delete)
+
+    def commit(self):
+        self.client.commits += 1
+        writes, self._writes = self._writes, []
+        for write in writes:
+            write()
+
+class StubFirestore:
+    """Cliente Firestore em memória com contadores de leituras, consultas e commits."""
+
+    def __init__(self):
+        self.store = {}  # caminho da coleção -> {doc_id: dados}
+        self.reads = self.queries = self.commits = 0
+
+    def collection(self, name):
+        return StubCollection(self, name)
+
+    def batch(self):
+        return StubWriteBatch(self)
+
+    def transaction(self):
+        return StubWriteBatch(self)
+
+    def get_all(self, references, transaction=None):
+        for reference in references:
+            yield reference.get()
+
+    def reset_counters(self):
+        self.reads = self.queries = self.commits = 0
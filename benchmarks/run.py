@@ -0,0 +1,239 @@
+# marketlens/benchmarks/run.py
+
+"""
+Suite de benchmarks dos caminhos críticos (relatórios, carregamento e gráficos).
+
+Corre sem Firebase nem rede: os diários e preços são sintéticos e as leituras SQLite são feitas
+em modo só-leitura sobre marketlens_data.db. Os resultados são escritos em JSON e comparados com
+uma baseline guardada; um caso mais lento do que a baseline (acima da tolerância) conta como
+regressão e o processo termina com código 1.
+
+Cada caso corre várias vezes (até perfazer cerca de TARGET_SECONDS, com pelo menos MIN_REPEAT
+execuções) e a comparação usa a mediana. Para não contar ruído como regressão, um caso só
+regride se a mediana e o mínimo passarem a tolerância e se a diferença absoluta passar
+NOISE_FLOOR_MS (SMALL_CASE_FLOOR_MS nos casos abaixo de SMALL_CASE_MS); os casos suspeitos são
+medidos uma segunda vez antes de serem dados como regressão.
+
+Os resultados vão, por defeito, para o diretório temporário do sistema (fora do repositório);
+só a baseline fica versionada.
+
+    python -m benchmarks.run                          # tamanhos 1k, 10k e 100k
+    python -m benchmarks.run --sizes 1000,1000000     # inclui 1M de trades
+    python -m benchmarks.run --save-baseline          # grava a baseline atual
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from utils.config import DB_PATH, yahoo_finance_map
+from utils.reporting_engine import calculate_dashboard_metrics, prepare_trades
+from utils.risk_analytics import compute_risk_analytics
+from utils.cross_asset import rolling_covariance
+from utils.plot_utils import prepare_seasonality_data_for_lines, calculate_cot_percentages
+from utils.components import THEMES, create_calendar_plot, build_trades_table_html
+from utils.price_store import read_prices, ensure_schema as ensure_price_schema
+from utils.cot_engine import load_cot_data, build_cot_panel
+from utils.seasonality_engine import SeasonalityCube
+from benchmarks.synthetic import make_journal, make_prices
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(tempfile.gettempdir(), "marketlens_benchmarks.json")
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+# Número de execuções de cada caso: as necessárias para cerca de TARGET_SECONDS, entre MIN_REPEAT e MAX_REPEAT.
+TARGET_SECONDS = 0.5
+MIN_REPEAT, MAX_REPEAT = 7, 200
+# Diferenças abaixo deste valor (em ms) são ruído e nunca contam como regressão.
+NOISE_FLOOR_MS = 1.0
+# Casos rápidos (baseline abaixo de SMALL_CASE_MS) variam mais em termos relativos: exigem uma diferença maior.
+SMALL_CASE_MS = 10.0
+SMALL_CASE_FLOOR_MS = 3.0
+
+def measure(fn, repeat=None):
+    """
+    Corre fn várias vezes (após um aquecimento) e devolve a mediana e o mínimo, em ms.
+    Sem 'repeat', o número de execuções é escolhido a partir da duração do aquecimento.
+    """
+    t0 = time.perf_counter(); fn(); warmup = time.perf_counter() - t0
+    if repeat is None:
+        repeat = min(MAX_REPEAT, max(MIN_REPEAT, int(TARGET_SECONDS / max(warmup, 1e-6))))
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); samples.append((time.perf_counter() - t0) * 1000)
+    return {"median_ms": statistics.median(samples), "min_ms": min(samples), "repeat": repeat}
+
+def make_cot_frame(n_reports=520, seed=3):
+    """Relatório COT sintético de um mercado, com as colunas usadas por calculate_cot_percentages."""
+    rng = np.random.default_rng(seed)
+    columns = ["noncomm_long", "noncomm_short", "comm_long", "comm_short", "nonrept_long", "nonrept_short"]
+    data = rng.integers(1_000, 200_000, (n_reports, len(columns))).astype(float)
+    return pd.DataFrame(data, columns=columns, index=pd.date_range(end="2025-01-07", periods=n_reports, freq="W-TUE"))
+
+# --- CASOS ---
+
+def journal_cases(sizes):
+    cases = {}
+    for n in sizes:
+        journal = make_journal(n)
+        repeat = 1 if n >= 1_000_000 else (3 if n >= 100_000 else None)
+        cases[f"calculate_dashboard_metrics[{n}]"] = measure(lambda: calculate_dashboard_metrics(journal, None), repeat)
+        trades = prepare_trades(journal).sort_values('trade_date', kind='stable')
+        cases[f"compute_risk_analytics[{n}]"] = measure(lambda: compute_risk_analytics(trades, 100_000.0), repeat)
+    return cases
+
+def chart_cases(theme=THEMES["dark"]):
+    cases = {}
+    journal = make_journal(10_000)
+    metrics = calculate_dashboard_metrics(journal, None)
+    # O calendário usa o mês corrente: coloca os dias sintéticos neste mês para desenhar células com dados.
+    today = pd.Timestamp.now().normalize()
+    calendar = pd.Series(metrics["calendar_data"].to_numpy()[:28],
+                         index=pd.date_range(today.replace(day=1), periods=28, freq="D"))
+    cases["create_calendar_plot"] = measure(lambda: create_calendar_plot(calendar, theme))
+    cases["build_trades_table_html"] = measure(lambda: build_trades_table_html(metrics["recent_trades"], theme))
+
+    prices = make_prices(["SYN"], n_days=20 * 252)
+    cases["prepare_seasonality_data_for_lines[20y]"] = measure(lambda: prepare_seasonality_data_for_lines(prices))
+    universe = np.log(make_prices([f"SYN{i}" for i in range(45)], n_days=1300)).diff().to_numpy()
+    cases["rolling_covariance[45 ativos x 1300 dias]"] = measure(lambda: rolling_covariance(universe, 60))
+    cot = make_cot_frame()
+    cases["calculate_cot_percentages"] = measure(lambda: calculate_cot_percentages(cot))
+    return cases
+
+def sqlite_cases(db_path=DB_PATH):
+    """Leituras sobre a base distribuída (modo só-leitura; não cria tabelas nem índices)."""
+    if not os.path.exists(db_path):
+        return {}
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        cases = {}
+        if "price_data" in tables:
+            tickers = list(yahoo_finance_map.values())
+            cases["sqlite_read_prices[universe]"] = measure(lambda: read_prices(tickers, conn=conn))
+            cases["sqlite_read_prices[1 ticker]"] = measure(lambda: read_prices(tickers[0], conn=conn))
+        if "cot_data" in tables:
+            cases["sqlite_load_cot_data"] = measure(lambda: load_cot_data(conn=conn))
+            df_cot = load_cot_data(conn=conn)
+            cases["build_cot_panel"] = measure(lambda: build_cot_panel(df_cot))
+        return cases
+    finally:
+        conn.close()
+
+def seasonality_cases(n_tickers=45, years=20):
+    """Consultas ao cubo de sazonalidade, construído numa base temporária com preços sintéticos."""
+    tickers = [f"SYN{i}" for i in range(n_tickers)]
+    prices = make_prices(tickers, n_days=years * 252)
+    tmp = tempfile.mkdtemp(prefix="marketlens_seasonality_")
+    db_path = os.path.join(tmp, "seasonality.db")
+    try:
+        conn = sqlite3.connect(db_path)
+        ensure_price_schema(conn)  # price_data com o índice (Ticker, Date) do armazenamento de preços
+        long = prices.stack().reset_index()
+        conn.executemany("INSERT INTO price_data VALUES (?, ?, ?)",
+                         zip(long.iloc[:, 0].dt.strftime("%Y-%m-%d"), long.iloc[:, 1], long.iloc[:, 2].astype(float)))
+        conn.commit(); conn.close()
+        cube = SeasonalityCube(db_path)
+        cube.refresh(tickers)
+        cases = {}
+        for granularity in ("monthly", "weekly", "daily"):
+            cases[f"seasonality_cube.stats[{granularity}, 10 anos]"] = measure(lambda: cube.stats(tickers[0], granularity, 10))
+        cases[f"seasonality_cube.refresh[{n_tickers} tickers, sem barras novas]"] = measure(lambda: cube.refresh(tickers))
+        return cases
+    finally:
+        for name in os.listdir(tmp):
+            os.remove(os.path.join(tmp, name))
+        os.rmdir(tmp)
+
+# --- RESULTADOS E BASELINE ---
+
+def environment():
+    return {"python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine(),
+            "pandas": pd.__version__, "numpy": np.__version__, "cpu_count": os.cpu_count()}
+
+def compare(results, baseline, tolerance):
+    """
+    Devolve a lista de regressões: casos com mediana e mínimo acima de baseline * tolerância e
+    uma diferença de medianas acima do mínimo absoluto do caso (ver NOISE_FLOOR_MS).
+    """
+    regressions = []
+    for name, current in results["cases"].items():
+        previous = baseline.get("cases", {}).get(name)
+        if not previous:
+            continue
+        ratio = current["median_ms"] / previous["median_ms"] if previous["median_ms"] else float("inf")
+        min_ratio = current["min_ms"] / previous["min_ms"] if previous.get("min_ms") else ratio
+        floor = SMALL_CASE_FLOOR_MS if previous["median_ms"] < SMALL_CASE_MS else NOISE_FLOOR_MS
+        if ratio > tolerance and min_ratio > tolerance and current["median_ms"] - previous["median_ms"] > floor:
+            regressions.append((name, previous["median_ms"], current["median_ms"], ratio))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do MarketLens.")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES), help="Tamanhos dos diários sintéticos.")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Ficheiro JSON de resultados.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Ficheiro JSON da baseline.")
+    parser.add_argument("--tolerance", type=float, default=1.3, help="Rácio máximo face à baseline.")
+    parser.add_argument("--save-baseline", action="store_true", help="Grava os resultados como nova baseline.")
+    parser.add_argument("--db", default=DB_PATH, help="Base de dados para as leituras SQLite.")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    groups = [lambda: journal_cases(sizes), chart_cases, seasonality_cases, lambda: sqlite_cases(args.db)]
+    cases, origin = {}, {}  # origin: caso -> grupo que o mede
+    for group in groups:
+        measured = group()
+        cases.update(measured)
+        origin.update(dict.fromkeys(measured, group))
+    results = {"created_at": datetime.now().isoformat(timespec="seconds"), "environment": environment(), "cases": cases}
+
+    width = max(len(name) for name in cases)
+    for name, case in cases.items():
+        print(f"{name:<{width}}  {case['median_ms']:10.2f} ms  (mín. {case['min_ms']:.2f} ms)")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResultados gravados em {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline gravada em {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("Sem baseline para comparar (use --save-baseline).")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        # Uma medição lenta isolada (máquina ocupada) não chega: os grupos dos casos suspeitos são
+        # medidos outra vez e fica a melhor mediana de cada caso.
+        print(f"\n{len(regressions)} caso(s) acima da tolerância; a repetir a medição...")
+        for group in dict.fromkeys(origin[name] for name, *_ in regressions):
+            for name, case in group().items():
+                if case["median_ms"] < cases[name]["median_ms"]:
+                    cases[name] = case
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nRegressões (tolerância {args.tolerance:.2f}x):")
+        for name, before, after, ratio in regressions:
+            print(f"  {name}: {before:.2f} ms -> {after:.2f} ms ({ratio:.2f}x)")
+        return 1
+    print(f"\nSem regressões face à baseline (tolerância {args.tolerance:.2f}x).")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+# marketlens/benchmarks/synthetic.py
+
+"""Geradores de dados sintéticos (diários de trading e históricos de preços) para os benchmarks."""
+
+import numpy as np
+import pandas as pd
+from utils.config import yahoo_finance_map
+
+def make_accounts(n_accounts=3):
+    """Contas de trading fictícias, no formato devolvido por get_trading_accounts."""
+    return [{"doc_id": f"acc{i}", "account_name": f"Conta {i}", "initial_capital": float(10_000 * (i + 1)),
+             "currency": "USD", "account_type": "Corretora Pessoal"} for i in range(n_accounts)]
+
+def make_journal(n_trades, n_accounts=3, n_setups=5, seed=42, start="2019-01-01"):
+    """
+    Diário sintético com o mesmo formato de get_journal_entries: uma linha por trade,
+    'trade_date' já convertido para datetime, 'accounts' como lista de doc_ids.
+    """
+    rng = np.random.default_rng(seed)
+    assets = np.array(list(yahoo_finance_map.keys()))
+    entry = rng.uniform(1, 200, n_trades)
+    stop_dist = entry * rng.uniform(0.002, 0.02, n_trades)
+    direction = rng.choice(["Compra", "Venda"], n_trades)
+    sign = np.where(direction == "Compra", 1, -1)
+    r_outcome = rng.normal(0.2, 1.5, n_trades)
+    exit_price = entry + sign * r_outcome * stop_dist
+    status = rng.choice(["Finalizado", "Em Aberto", "Pendente"], n_trades, p=[0.9, 0.07, 0.03])
+    trade_date = pd.Timestamp(start) + pd.to_timedelta(np.sort(rng.uniform(0, 5 * 365, n_trades)), unit="D")
+    account_ids = [f"acc{i}" for i in range(n_accounts)]
+    n_acc = rng.integers(1, min(2, n_accounts) + 1, n_trades)
+    accounts = [list(rng.choice(account_ids, k, replace=False)) for k in n_acc]
+    created = trade_date + pd.Timedelta(minutes=5)
+    return pd.DataFrame({
+        "doc_id": [f"t{i:07d}" for i in range(n_trades)],
+        "asset": rng.choice(assets, n_trades),
+        "direction": direction,
+        "selected_setup": rng.choice([f"Setup {i}" for i in range(n_setups)], n_trades),
+        "entry_price": entry, "stop_loss": entry - sign * stop_dist,
+        "target_price": entry + sign * 2 * stop_dist,
+        "exit_price": np.where(status == "Finalizado", exit_price, 0.0),
+        "status": status, "accounts": accounts,
+        "risk_percentage": 1.0, "risk_usd": rng.choice([100.0, 200.0, 500.0], n_trades),
+        "notes": "", "trade_date": trade_date, "created_at": created, "updated_at": created,
+    }).sort_values("trade_date", ascending=False)
+
+def make_prices(tickers, n_days=1300, seed=7, end="2025-01-01"):
+    """Históricos de fecho sintéticos (passeio aleatório geométrico) em dias úteis."""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=end, periods=n_days)
+    returns = rng.normal(0.0002, 0.01, (n_days, len(tickers)))
+    return pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), index=index, columns=list(tickers))
+
+MT5_HEADER = "Time;Position;Symbol;Type;Volume;Price;S / L;T / P;Time;Price;Commission;Swap;Profit"
+
+def iter_statement_lines(n_trades, seed=42, start="2019-01-01"):
+    """
+    Extrato sintético no formato CSV do relatório "Positions" do MT5 (separador ';'), linha a linha,
+    com símbolos de corretora (sufixos de conta) e ~10% de operações sem stop.
+    """
+    rng = np.random.default_rng(seed)
+    symbols = ["EURUSD.m", "GBPUSDpro", "USDJPY", "XAUUSD", "US500.cash", "NAS100", "GER40", "BTCUSD"]
+    opened = pd.Timestamp(start)
+    yield "Positions\n" + MT5_HEADER + "\n"
+    for position in range(1, n_trades + 1):
+        opened += pd.Timedelta(minutes=int(rng.integers(5, 600)))
+        closed = opened + pd.Timedelta(minutes=int(rng.integers(5, 3000)))
+        price = rng.uniform(1, 200)
+        stop_dist = price * rng.uniform(0.002, 0.02)
+        sign = 1 if rng.random() < 0.5 else -1
+        exit_price = price + sign * rng.normal(0.2, 1.5) * stop_dist
+        risk = rng.choice([100.0, 200.0, 500.0])
+        profit = (exit_price - price) * sign / stop_dist * risk
+        stop = f"{price - sign * stop_dist:.5f}" if rng.random() > 0.1 else ""
+        yield (f"{opened:%Y.%m.%d %H:%M:%S};{position};{rng.choice(symbols)};{'buy' if sign > 0 else 'sell'};1.00;"
+               f"{price:.5f};{stop};;{closed:%Y.%m.%d %H:%M:%S};{exit_price:.5f};0.00;0.00;{profit:.2f}\n")
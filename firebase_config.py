@@ -1,28 +1,44 @@
 # marketlens/firebase_config.py
 
+"""
+Ligações ao Firebase: Admin SDK (Firestore e Storage) e Pyrebase (autenticação de clientes).
+
+Os clientes são criados na primeira chamada a get_db() / get_auth_client(), e não na
+importação: as bibliotecas do Firebase (firebase_admin, google.cloud.firestore, pyrebase)
+só são carregadas pelas páginas que de facto as usam. A criação é protegida por um lock, por
+isso as várias sessões do servidor Streamlit partilham um único cliente de cada tipo. Se a
+inicialização falhar, é tentada de novo na chamada seguinte.
+"""
+
+import threading
 import streamlit as st
-import firebase_admin
-from firebase_admin import credentials, firestore, storage
-import pyrebase
+
+_db = None
+_auth_client = None
+_db_lock = threading.Lock()
+_auth_lock = threading.Lock()
 
 def initialize_firebase_admin():
     """
     Inicializa a conexão de ADMIN com o Firebase, incluindo o Storage.
     """
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
     if not firebase_admin._apps:
         try:
             service_account_creds = st.secrets["firebase_service_account"]
             creds_dict = dict(service_account_creds)
             creds_dict['private_key'] = creds_dict['private_key'].replace('\\n', '\n')
             cred = credentials.Certificate(creds_dict)
-            
+
             # CORREÇÃO DEFINITIVA: Obtém o nome do bucket a partir dos segredos
             # para garantir que está sempre correto.
             storage_bucket_name = st.secrets.get("firebase_storage_bucket")
             if not storage_bucket_name:
                 # Se não estiver nos segredos, constrói-o a partir do project_id como um fallback.
                 storage_bucket_name = f"{creds_dict['project_id']}.firebasestorage.app"
-            
+
             firebase_admin.initialize_app(cred, {
                 'storageBucket': storage_bucket_name
             })
@@ -39,6 +55,7 @@ def initialize_pyrebase():
     Inicializa a conexão de CLIENTE com o Firebase.
     """
     try:
+        import pyrebase
         web_config = st.secrets["firebase_web_config"]
         firebase_client = pyrebase.initialize_app(dict(web_config))
         print("Pyrebase (Client) inicializado com sucesso!")
@@ -48,7 +65,36 @@ def initialize_pyrebase():
         print(f"Erro detalhado (Pyrebase): {e}")
         return None
 
-# Inicializa as conexões
-db = initialize_firebase_admin()
-auth_client = initialize_pyrebase()
+# --- ACESSO AOS CLIENTES ---
+
+def get_db():
+    """Cliente Firestore (Admin SDK), criado na primeira chamada e partilhado pelo processo."""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = initialize_firebase_admin()
+    return _db
+
+def get_auth_client():
+    """Cliente de autenticação do Pyrebase, criado na primeira chamada e partilhado pelo processo."""
+    global _auth_client
+    if _auth_client is None:
+        with _auth_lock:
+            if _auth_client is None:
+                _auth_client = initialize_pyrebase()
+    return _auth_client
+
+def get_admin_auth():
+    """Módulo firebase_admin.auth (gestão de utilizadores), com a app Admin já inicializada."""
+    get_db()
+    from firebase_admin import auth
+    return auth
 
+def __getattr__(name):
+    # Compatibilidade com 'from firebase_config import db / auth_client' (inicializa nesse momento).
+    if name == "db":
+        return get_db()
+    if name == "auth_client":
+        return get_auth_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,8 +1,7 @@
 # marketlens/pages/1_👤_Login.py
 
 import streamlit as st
-from firebase_admin import auth
-from firebase_config import auth_client
+from firebase_config import get_auth_client, get_admin_auth
 from view_utils import setup_sidebar
 
 # --- CONFIGURAÇÃO DA PÁGINA ---
@@ -41,7 +40,7 @@ with tab_login:
                 st.error("Por favor, preencha todos os campos.")
             else:
                 try:
-                    user = auth_client.sign_in_with_email_and_password(email, password)
+                    user = get_auth_client().sign_in_with_email_and_password(email, password)
                     st.session_state['user_info'] = user
                     st.switch_page("Início.py")
                 except Exception as e:
@@ -64,7 +63,7 @@ with tab_register:
                 st.error("A palavra-passe deve ter pelo menos 6 caracteres.")
             else:
                 try:
-                    user = auth.create_user(email=new_email, password=new_password)
+                    user = get_admin_auth().create_user(email=new_email, password=new_password)
                     st.success(f"Conta criada com sucesso para o email: {user.email}")
                     st.info("Pode agora fazer login no separador 'Entrar'.")
                     st.balloons()
@@ -0,0 +1,85 @@
+# marketlens/pages/10_🔗_Correlações.py
+
+import streamlit as st
+from view_utils import setup_sidebar
+from utils.config import ASSET_CATEGORIES
+from utils.cross_asset import get_cross_asset_service, UNIVERSE, DXY_PROXY, BENCHMARKS, DEFAULT_WINDOWS
+from utils.plot_utils import create_correlation_heatmap
+from utils.components import create_simple_line_chart
+
+# --- CONFIGURAÇÃO DA PÁGINA E AUTENTICAÇÃO ---
+st.set_page_config(layout="wide", page_title="Correlações")
+setup_sidebar()
+
+if 'user_info' not in st.session_state or st.session_state['user_info'] is None:
+    st.warning("Acesso restrito. Por favor, faça o login.")
+    st.stop()
+
+# --- CABEÇALHO ---
+st.title("🔗 Correlações entre Ativos")
+st.caption("Correlações móveis, betas ao US500 e ao dólar, e força relativa das moedas de todo o universo de ativos.")
+st.markdown("---")
+
+# --- FILTROS ---
+FREQUENCY_LABELS = {"daily": "Diária", "weekly": "Semanal"}
+filter_cols = st.columns([1, 1, 3])
+with filter_cols[0]:
+    frequency = st.selectbox("Frequência:", list(FREQUENCY_LABELS), format_func=FREQUENCY_LABELS.get)
+with filter_cols[1]:
+    unit = "dias" if frequency == "daily" else "semanas"
+    window = st.slider(f"Janela ({unit}):", min_value=10, max_value=250 if frequency == "daily" else 104,
+                       value=DEFAULT_WINDOWS[frequency], step=1)
+with filter_cols[2]:
+    categories = st.multiselect("Categorias (vazio = todas):", list(ASSET_CATEGORIES))
+assets = [a for c in categories for a in ASSET_CATEGORIES[c] if a in UNIVERSE] + [DXY_PROXY] if categories else None
+
+# --- CARREGAMENTO DE DADOS ---
+# Os fechos e as covariâncias ficam em cache e só as barras novas são processadas.
+with st.spinner("A calcular as correlações de todos os ativos..."):
+    service = get_cross_asset_service()
+    corr = service.correlation(window, frequency)
+
+if corr.empty or corr.isna().all().all():
+    st.info("Não há preços suficientes no armazenamento local para a janela escolhida."); st.stop()
+
+# --- HEATMAP DE CORRELAÇÕES ---
+st.subheader("Matriz de Correlação")
+fig_heatmap = create_correlation_heatmap(corr, title=f"Correlação ({window} {unit})", assets=assets)
+if fig_heatmap:
+    st.plotly_chart(fig_heatmap, use_container_width=True)
+else:
+    st.info("Sem dados para os ativos selecionados.")
+
+# --- BETAS ---
+st.markdown("---")
+st.subheader("Betas ao US500 e ao Dólar")
+betas = service.betas(window, frequency).drop(index=list(BENCHMARKS), errors='ignore')
+if assets:
+    betas = betas.reindex([a for a in assets if a in betas.index])
+st.dataframe(betas.dropna(how='all').style.format("{:+.2f}", na_rep="N/A"), use_container_width=True, height=400)
+
+# --- FORÇA DAS MOEDAS ---
+st.markdown("---")
+st.subheader("Força Relativa das Moedas")
+strength = service.currency_strength(window, frequency)
+strength_cols = st.columns([1, 2])
+with strength_cols[0]:
+    st.dataframe(strength["change"].to_frame(f"Variação ({window} {unit})").style.format("{:+.2f}%"), use_container_width=True)
+with strength_cols[1]:
+    st.line_chart(strength["index"].iloc[-window * 4:])
+
+# --- CORRELAÇÃO DE UM PAR AO LONGO DO TEMPO ---
+st.markdown("---")
+st.subheader("Correlação de um Par ao Longo do Tempo")
+options = list(corr.columns)
+pair_cols = st.columns(2)
+with pair_cols[0]:
+    asset_a = st.selectbox("Ativo A:", options, index=options.index("EUR/USD") if "EUR/USD" in options else 0)
+with pair_cols[1]:
+    asset_b = st.selectbox("Ativo B:", options, index=options.index(DXY_PROXY) if DXY_PROXY in options else 1)
+series = service.correlation_series(asset_a, asset_b, window, frequency).dropna()
+fig_pair = create_simple_line_chart(series, f"{asset_a} x {asset_b}", color='#f59e0b', yaxis_title="Correlação")
+if fig_pair:
+    st.plotly_chart(fig_pair, use_container_width=True)
+else:
+    st.info("Sem janelas completas para este par.")
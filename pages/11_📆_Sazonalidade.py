@@ -0,0 +1,49 @@
+# marketlens/pages/11_📆_Sazonalidade.py
+
+import streamlit as st
+from view_utils import setup_sidebar
+from utils.config import ASSET_CATEGORIES, yahoo_finance_map
+from utils.seasonality_engine import get_seasonality_cube
+from utils.plot_utils import create_seasonality_chart, seasonality_stats_frame
+
+# --- CONFIGURAÇÃO DA PÁGINA E AUTENTICAÇÃO ---
+st.set_page_config(layout="wide", page_title="Sazonalidade")
+setup_sidebar()
+
+if 'user_info' not in st.session_state or st.session_state['user_info'] is None:
+    st.warning("Acesso restrito. Por favor, faça o login.")
+    st.stop()
+
+# --- CABEÇALHO ---
+st.title("📆 Sazonalidade")
+st.caption("Trajetória sazonal média, taxa de acerto e dispersão de cada ativo, a partir do cubo de sazonalidade local.")
+st.markdown("---")
+
+# --- FILTROS ---
+GRANULARITY_LABELS = {"monthly": "Mensal", "weekly": "Semanal", "daily": "Dia do ano"}
+assets = [a for c in ASSET_CATEGORIES.values() for a in c if a in yahoo_finance_map]
+filter_cols = st.columns([2, 1, 2])
+with filter_cols[0]:
+    asset = st.selectbox("Ativo:", assets, index=assets.index("EUR/USD") if "EUR/USD" in assets else 0)
+with filter_cols[1]:
+    granularity = st.selectbox("Granularidade:", list(GRANULARITY_LABELS), format_func=GRANULARITY_LABELS.get)
+with filter_cols[2]:
+    lookback = st.slider("Anos:", min_value=3, max_value=30, value=10, step=1)
+
+# --- CUBO ---
+# O cubo fica em memória; a atualização só relê as barras novas (ou o ticker, se o histórico recuou).
+with st.spinner("A atualizar o cubo de sazonalidade..."):
+    cube = get_seasonality_cube()
+stats = cube.stats(yahoo_finance_map[asset], granularity, lookback)
+
+if stats is None:
+    st.info("Não há preços suficientes no armazenamento local para este ativo."); st.stop()
+
+# --- GRÁFICO E TABELA ---
+fig = create_seasonality_chart(stats, asset, granularity)
+if fig:
+    st.plotly_chart(fig, use_container_width=True)
+table = seasonality_stats_frame(stats, granularity)
+st.dataframe(table.style.format("{:+.2f}", subset=['Retorno Médio (%)', 'Trajetória (%)'])
+             .format("{:.0f}", subset=['Taxa de Acerto (%)']).format("{:.2f}", subset=['Dispersão (%)']),
+             use_container_width=True, height=460 if granularity == "monthly" else 600)
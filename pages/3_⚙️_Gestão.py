@@ -1,7 +1,11 @@
 # marketlens/pages/3_⚙️_Gestão.py
 
 import streamlit as st
+import plotly.graph_objects as go
 from view_utils import setup_sidebar
+from utils.journal_utils import get_journal_entries
+from utils.reporting_engine import prepare_trades
+from utils.monte_carlo import iter_simulation
 from utils.profile_utils import get_user_profile, update_user_profile
 from utils.accounts_utils import (
     get_trading_accounts, add_trading_account,
@@ -27,6 +31,51 @@ if not user_id:
     st.error("Não foi possível identificar o utilizador. Por favor, faça o login novamente.")
     st.stop()
 
+# --- SIMULAÇÃO DE AVALIAÇÃO (MESA PROPRIETÁRIA) ---
+MIN_SIMULATION_TRADES = 10
+
+def render_prop_simulation(account):
+    """Probabilidade de atingir o objetivo antes do drawdown máximo, por bootstrap dos R-múltiplos."""
+    doc_id = account['doc_id']
+    st.markdown("##### 🎲 Simulação Monte Carlo da Avaliação")
+    sc1, sc2, sc3, sc4 = st.columns(4)
+    target = sc1.number_input("Objetivo de Lucro (%)", min_value=0.5, value=10.0, step=0.5, key=f"mc_target_{doc_id}")
+    max_dd = sc2.number_input("Drawdown Máximo (%)", min_value=0.5, value=10.0, step=0.5, key=f"mc_dd_{doc_id}")
+    risk_pct = sc3.number_input("Risco por Trade (%)", min_value=0.05, value=1.0, step=0.05, key=f"mc_risk_{doc_id}")
+    max_trades = sc4.number_input("Máx. de Trades", min_value=10, value=200, step=10, key=f"mc_trades_{doc_id}")
+    sc5, sc6, sc7 = st.columns(3)
+    n_paths = sc5.select_slider("Caminhos", options=[5_000, 10_000, 20_000, 50_000, 100_000], value=20_000, key=f"mc_paths_{doc_id}")
+    seed = sc6.number_input("Semente", min_value=0, value=42, step=1, key=f"mc_seed_{doc_id}")
+    trailing = sc7.checkbox("Drawdown móvel (a partir do máximo)", key=f"mc_trailing_{doc_id}")
+
+    if not st.button("Simular", key=f"mc_run_{doc_id}", use_container_width=True):
+        return
+    trades = prepare_trades(get_journal_entries(user_id, status_filter="Finalizado", account_id=doc_id))
+    if len(trades) < MIN_SIMULATION_TRADES:
+        # Poucos trades nesta conta: usa o histórico completo do utilizador.
+        trades = prepare_trades(get_journal_entries(user_id, status_filter="Finalizado"))
+        if len(trades) < MIN_SIMULATION_TRADES:
+            st.info(f"São necessárias pelo menos {MIN_SIMULATION_TRADES} operações finalizadas para simular."); return
+        st.caption("Esta conta tem poucas operações: a simulação usa o histórico de todas as contas.")
+
+    rules = {"initial_capital": float(account.get('initial_capital', 0) or 0) or 100_000.0, "risk_pct": risk_pct,
+             "profit_target_pct": target, "max_drawdown_pct": max_dd, "trailing": trailing, "max_trades": int(max_trades)}
+    progress = st.progress(0.0, text="A simular...")
+    for summary in iter_simulation(trades['r_multiple'].to_numpy(), rules, n_paths=int(n_paths), seed=int(seed)):
+        progress.progress(summary["progress"], text=f"A simular... {summary['paths']:,} de {int(n_paths):,} caminhos · aprovação {summary['pass_prob']:.1f}%")
+    progress.empty()
+
+    rc1, rc2, rc3, rc4 = st.columns(4)
+    rc1.metric("Aprovação", f"{summary['pass_prob']:.1f}%")
+    rc2.metric("Reprovação", f"{summary['fail_prob']:.1f}%")
+    rc3.metric("Em Aberto", f"{summary['open_prob']:.1f}%")
+    median_pass = summary['median_trades_to_pass']
+    rc4.metric("Trades até Aprovar (mediana)", f"{median_pass:.0f}" if median_pass is not None else "N/A")
+    fig = go.Figure(go.Histogram(x=summary["final_pct"], nbinsx=60, marker_color='cyan'))
+    fig.update_layout(title=f"Resultado Final ({len(trades)} trades históricos, {summary['paths']:,} caminhos)",
+                      xaxis_title="Resultado (% do capital)", yaxis_title="Caminhos", height=300, margin=dict(t=40, b=30, l=20, r=20))
+    st.plotly_chart(fig, use_container_width=True)
+
 # --- ABAS PARA ORGANIZAÇÃO ---
 tab_profile, tab_accounts = st.tabs(["👤 Perfil do Trader", "🏦 Contas de Trading"])
 
@@ -111,3 +160,6 @@ with tab_accounts:
                         if st.form_submit_button("Apagar", type="primary", use_container_width=True):
                             if delete_trading_account(user_id, doc_id):
                                 st.success("Conta apagada!"); st.rerun()
+
+                if account.get('account_type') == "Mesa Proprietária (Avaliação)":
+                    render_prop_simulation(account)
@@ -11,6 +11,7 @@ from utils.planning_utils import (
 from utils.config import ASSET_CATEGORIES
 from utils.playbook_utils import get_playbook_setups
 from utils.journal_utils import get_journal_entries
+from utils.parallel_loader import load_page_data
 
 # --- CONFIGURAÇÃO DA PÁGINA E AUTENTICAÇÃO ---
 st.set_page_config(layout="wide", page_title="Plano de Trading")
@@ -31,15 +32,23 @@ if not user_id: st.error("Não foi possível identificar o utilizador."); st.sto
 st.markdown("---")
 selected_date = st.date_input("Selecione uma data para ver ou editar o plano e checklist:", value=date.today())
 
-# --- CARREGAMENTO DE DADOS ---
+# --- CARREGAMENTO DE DADOS (EM PARALELO) ---
 week_id = get_week_id_from_date(selected_date)
 date_id = get_date_id_from_date(selected_date)
-weekly_plan_data = get_weekly_plan(user_id, week_id)
-daily_checklist_data = get_daily_checklist(user_id, date_id)
-playbook_setups = get_playbook_setups(user_id)
+page_data = load_page_data({
+    "weekly_plan": lambda: get_weekly_plan(user_id, week_id),
+    "daily_checklist": lambda: get_daily_checklist(user_id, date_id),
+    "setups": lambda: get_playbook_setups(user_id),
+    "journal": lambda: get_journal_entries(user_id),
+    "all_plans": lambda: get_all_weekly_plans(user_id),
+    "all_checklists": lambda: get_all_daily_checklists(user_id),
+}, page="Plano de Trading")
+weekly_plan_data = page_data["weekly_plan"]
+daily_checklist_data = page_data["daily_checklist"]
+playbook_setups = page_data["setups"]
 setup_names = [s['setup_name'] for s in playbook_setups] if playbook_setups else []
 all_assets = sorted([asset for category in ASSET_CATEGORIES.values() for asset in category if "---" not in asset])
-all_journal_entries = get_journal_entries(user_id)
+all_journal_entries = page_data["journal"]
 
 # --- ABAS PARA ORGANIZAÇÃO ---
 tabs = st.tabs([f"🗓️ Plano Semanal (Semana de {selected_date.strftime('%d/%m')})", f"✅ Checklist Diário ({selected_date.strftime('%d/%m/%Y')})", "📈 Trades da Semana"])
@@ -61,7 +70,7 @@ with tabs[0]:
                 st.success("Plano semanal guardado com sucesso!"); st.rerun()
 
     st.markdown("---"); st.header("Histórico de Planos Semanais")
-    all_plans = get_all_weekly_plans(user_id)
+    all_plans = page_data["all_plans"]
     if not all_plans: st.info("Nenhum plano semanal guardado anteriormente.")
     else:
         for plan in all_plans:
@@ -84,7 +93,7 @@ with tabs[1]:
                 st.success("Checklist diário guardado com sucesso!"); st.rerun()
 
     st.markdown("---"); st.header("Histórico de Checklists Diários")
-    all_checklists = get_all_daily_checklists(user_id)
+    all_checklists = page_data["all_checklists"]
     if not all_checklists: st.info("Nenhum checklist diário guardado anteriormente.")
     else:
         for checklist in all_checklists:
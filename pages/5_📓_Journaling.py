@@ -5,11 +5,15 @@ import pandas as pd
 from view_utils import setup_sidebar
 from datetime import datetime
 from utils.journal_utils import (
-    get_journal_entries, add_journal_entry,
-    update_journal_entry, delete_journal_entry
+    get_journal_page, add_journal_entry,
+    update_journal_entry, delete_journal_entry,
+    bulk_close_journal_entries, bulk_update_journal_entries, bulk_delete_journal_entries
 )
 from utils.accounts_utils import get_trading_accounts
 from utils.playbook_utils import get_playbook_setups
+from utils.trade_excursion import get_trade_excursions
+from utils.journal_import import import_statement
+from utils.journal_export import export_journal, EXPORT_FORMATS, MIME_TYPES
 # CORREÇÃO: Importar o yahoo_finance_map do sítio certo
 from utils.config import yahoo_finance_map
 
@@ -131,76 +135,293 @@ with st.expander("➕ Adicionar Nova Operação", expanded=True):
             else:
                 st.error("Erro ao registar a operação.")
 
+# --- IMPORTAÇÃO DE EXTRATOS DA CORRETORA ---
+with st.expander("📥 Importar Extrato (CSV / MT4 / MT5)"):
+    st.caption("Aceita o CSV genérico (símbolo, direção, data, preço de entrada, ...), o 'Detailed Statement' "
+               "do MT4 e o relatório 'Positions' do MT5 (HTML ou CSV). Reimportar o mesmo extrato não duplica operações.")
+    with st.form("import_statement_form"):
+        uploaded = st.file_uploader("Ficheiro do extrato", type=["csv", "txt", "htm", "html"])
+        col_imp_ac, col_imp_setup, col_imp_risk = st.columns([2, 1, 1])
+        with col_imp_ac:
+            import_accounts_display = st.multiselect("Conta(s) de Execução", options=account_display_names, key="import_accounts")
+        with col_imp_setup:
+            import_setup_names = [s['setup_name'] for s in setups] if setups else []
+            import_setup = st.selectbox("Setup do Playbook", options=import_setup_names, index=None, key="import_setup")
+        with col_imp_risk:
+            import_risk = st.number_input("Risco sem S/L (%)", min_value=0.1, max_value=100.0, value=1.0, step=0.1, format="%.2f",
+                                          help="Usado nas operações em aberto e nas que não têm stop no extrato.")
+        import_button = st.form_submit_button("Importar")
+
+    if import_button and uploaded is not None:
+        progress_bar = st.progress(0.0, text="A importar...")
+        size = uploaded.size or 1
+
+        def _show_progress(stats):
+            progress_bar.progress(min(uploaded.tell() / size, 1.0),
+                                  text=f"{stats['rows']} linhas lidas, {stats['imported']} operações importadas...")
+
+        stats = import_statement(
+            user_id, uploaded, progress=_show_progress, accounts=accounts,
+            selected_accounts=[account_options_map[name] for name in import_accounts_display],
+            setup=import_setup, risk_percentage=import_risk, source=uploaded.name,
+        )
+        progress_bar.progress(1.0, text="Importação concluída.")
+        if stats:
+            st.success(f"{stats['imported']} operações importadas, {stats['closed']} atualizadas como finalizadas, "
+                       f"{stats['duplicates']} já existentes, {stats['skipped']} linhas ignoradas (balance, ordens).")
+            if stats['invalid']:
+                st.warning(f"{stats['invalid']} linhas com erros:")
+                st.dataframe(pd.DataFrame(stats['errors'], columns=["Linha", "Motivo"]), hide_index=True)
+            if not stats['rows']:
+                st.warning("Não foi encontrada nenhuma tabela de operações no ficheiro.")
+
+# --- GESTÃO EM MASSA ---
+# Várias operações são fechadas, reatribuídas ou apagadas numa única escrita em lote, seguida de um único rerun.
+# A grelha só é lida quando pedida, e por páginas (como o histórico): o expander fechado não lê o diário.
+BULK_PAGE_SIZE = 100
+
+with st.expander("🗂️ Gestão em Massa (fechar / reatribuir / apagar)"):
+    if bulk_message := st.session_state.pop('bulk_message', None):
+        st.success(bulk_message)
+    bulk_c_status, bulk_c_load = st.columns([3, 1])
+    with bulk_c_status:
+        bulk_status = st.selectbox("Operações a mostrar", options=["Abertos", "Todos", "Pendente", "Em Aberto", "Finalizado"], key="bulk_status")
+    with bulk_c_load:
+        bulk_loaded = st.toggle("Carregar operações", key="bulk_loaded")
+
+    if st.session_state.get('bulk_page_filter') != bulk_status:
+        st.session_state['bulk_page_filter'] = bulk_status
+        st.session_state['bulk_page_cursors'] = [None]
+    bulk_cursors = st.session_state['bulk_page_cursors']
+    df_bulk, bulk_next_cursor = (get_journal_page(user_id, page_size=BULK_PAGE_SIZE, cursor=bulk_cursors[-1], status_filter=bulk_status)
+                                 if bulk_loaded else (pd.DataFrame(), None))
+
+    if not bulk_loaded:
+        st.caption("Ative 'Carregar operações' para ver e selecionar as operações.")
+    elif df_bulk.empty:
+        st.info("Nenhuma operação para o filtro selecionado.")
+    else:
+        bulk_account_names = {acc['doc_id']: acc['account_name'] for acc in accounts}
+        df_bulk = df_bulk.reindex(columns=sorted(set(df_bulk.columns) | {'exit_price', 'selected_setup', 'accounts'}))
+        grid = pd.DataFrame({
+            "Selecionar": False,
+            "Ativo": df_bulk['asset'],
+            "Direção": df_bulk['direction'],
+            "Data": pd.to_datetime(df_bulk['trade_date']),
+            "Entrada": pd.to_numeric(df_bulk['entry_price'], errors='coerce'),
+            "Stop": pd.to_numeric(df_bulk['stop_loss'], errors='coerce'),
+            "Status": df_bulk['status'],
+            "Saída": pd.to_numeric(df_bulk['exit_price'], errors='coerce').where(lambda x: x > 0),
+            "Setup": df_bulk['selected_setup'],
+            "Conta(s)": [", ".join(bulk_account_names.get(a, a) for a in acc_ids) if isinstance(acc_ids, list) else ""
+                         for acc_ids in df_bulk['accounts']],
+        }).set_index(df_bulk['doc_id'])
+        # A chave muda depois de cada alteração, para o editor recomeçar sem seleção.
+        edited = st.data_editor(
+            grid, key=f"bulk_grid_{st.session_state.get('bulk_grid_version', 0)}", hide_index=True, use_container_width=True,
+            disabled=[c for c in grid.columns if c not in ("Selecionar", "Saída")],
+            column_config={
+                "Selecionar": st.column_config.CheckboxColumn("✔", width="small"),
+                "Data": st.column_config.DatetimeColumn(format="DD/MM/YYYY HH:mm"),
+                "Entrada": st.column_config.NumberColumn(format="%.5f"),
+                "Stop": st.column_config.NumberColumn(format="%.5f"),
+                "Saída": st.column_config.NumberColumn("Saída ✏️", format="%.5f", min_value=0.0, help="Preço de saída para fechar a operação."),
+            },
+        )
+        selected_ids = edited.index[edited["Selecionar"]].tolist()
+        # Só as operações por fechar podem ser finalizadas (as finalizadas mantêm a saída registada).
+        open_ids = [doc_id for doc_id in selected_ids if grid.at[doc_id, "Status"] != "Finalizado"]
+        st.caption(f"{len(selected_ids)} operação(ões) selecionada(s), {len(open_ids)} por fechar.")
+
+        bulk_result = None
+        bulk_c1, bulk_c2, bulk_c3 = st.columns([1, 2, 1])
+        with bulk_c1:
+            if st.button("✅ Fechar selecionadas", use_container_width=True, disabled=not open_ids,
+                         help="Fecha apenas as operações selecionadas que ainda não estão finalizadas."):
+                exits = edited.loc[open_ids, "Saída"]
+                missing = exits.isna() | (exits <= 0)
+                if missing.any():
+                    st.warning(f"Indique o preço de saída de todas as operações selecionadas ({int(missing.sum())} em falta).")
+                else:
+                    bulk_result = ("finalizadas", bulk_close_journal_entries(user_id, exits.to_dict()))
+        with bulk_c2:
+            reassign_accounts = st.multiselect("Novas contas", options=account_display_names, key="bulk_accounts")
+            reassign_setup = st.selectbox("Novo setup", options=[s['setup_name'] for s in setups] if setups else [], index=None, key="bulk_setup")
+            if st.button("🔁 Reatribuir selecionadas", use_container_width=True,
+                         disabled=not selected_ids or not (reassign_accounts or reassign_setup)):
+                changes = {}
+                if reassign_accounts:
+                    changes["accounts"] = [account_options_map[name] for name in reassign_accounts]
+                if reassign_setup:
+                    changes["selected_setup"] = reassign_setup
+                bulk_result = ("reatribuídas", bulk_update_journal_entries(user_id, selected_ids, changes, accounts))
+        with bulk_c3:
+            confirm_delete = st.checkbox("Confirmo que quero apagar", key="bulk_confirm_delete")
+            if st.button("🗑️ Apagar selecionadas", type="primary", use_container_width=True, disabled=not (selected_ids and confirm_delete)):
+                bulk_result = ("apagadas", bulk_delete_journal_entries(user_id, selected_ids))
+
+        if bulk_result is not None:
+            action, count = bulk_result
+            if count:
+                st.session_state['bulk_grid_version'] = st.session_state.get('bulk_grid_version', 0) + 1
+                # As páginas seguintes mudam com a alteração: a grelha recomeça na primeira.
+                st.session_state['bulk_page_cursors'] = [None]
+                st.session_state['journal_editing'] = None
+                st.session_state['bulk_message'] = f"{count} operação(ões) {action}."
+                st.rerun()
+
+        bulk_prev, bulk_info, bulk_next = st.columns([1, 2, 1])
+        with bulk_prev:
+            if st.button("⬅️ Anterior", key="bulk_prev", disabled=len(bulk_cursors) == 1, use_container_width=True):
+                bulk_cursors.pop()
+                st.rerun()
+        with bulk_info:
+            st.caption(f"Página {len(bulk_cursors)}")
+        with bulk_next:
+            if st.button("Seguinte ➡️", key="bulk_next", disabled=bulk_next_cursor is None, use_container_width=True):
+                bulk_cursors.append(bulk_next_cursor)
+                st.rerun()
+
+# --- EXPORTAÇÃO DO DIÁRIO ---
+# O ficheiro só é gerado quando o botão é carregado, em blocos (memória limitada a um bloco do diário).
+with st.expander("⬇️ Exportar Diário (CSV / Parquet)"):
+    st.caption("Exporta todas as operações com as colunas derivadas: R-múltiplo, P&L em USD e P&L atribuído a cada conta.")
+    export_c1, export_c2, export_c3 = st.columns([1, 1, 2])
+    with export_c1:
+        export_format = st.radio("Formato", options=EXPORT_FORMATS, format_func=str.upper, horizontal=True, key="export_format")
+    with export_c2:
+        export_status = st.selectbox("Operações", options=["Todos", "Abertos", "Pendente", "Em Aberto", "Finalizado"], key="export_status")
+    with export_c3:
+        st.download_button(
+            "⬇️ Descarregar", use_container_width=True,
+            data=lambda: export_journal(user_id, export_format, accounts, export_status),
+            file_name=f"diario_{datetime.now():%Y%m%d}.{export_format}", mime=MIME_TYPES[export_format],
+        )
+
 # --- HISTÓRICO DE OPERAÇÕES ---
+STATUS_OPTIONS = ["Pendente", "Em Aberto", "Finalizado"]
+PAGE_SIZE = 20
+
 st.markdown("---")
 st.header("Histórico de Operações")
-status_filter = st.selectbox("Filtrar por Status", options=["Todos", "Pendente", "Em Aberto", "Finalizado"], index=0)
+status_filter = st.selectbox("Filtrar por Status", options=["Todos"] + STATUS_OPTIONS, index=0)
+
+# A paginação guarda, por página, o cursor do Firestore onde ela começa.
+# Mudar o filtro recomeça na primeira página.
+if st.session_state.get('journal_page_filter') != status_filter:
+    st.session_state['journal_page_filter'] = status_filter
+    st.session_state['journal_page_cursors'] = [None]
+    st.session_state['journal_editing'] = None
+page_cursors = st.session_state['journal_page_cursors']
+page_number = len(page_cursors) - 1
+
+df_journal, next_cursor = get_journal_page(user_id, page_size=PAGE_SIZE, cursor=page_cursors[-1], status_filter=status_filter)
+
+def render_edit_form(row, doc_id):
+    """Formulário de edição, construído apenas para a operação em edição."""
+    with st.form(f"edit_form_{doc_id}"):
+        st.write("**Editar Operação:**")
+
+        edit_c1, edit_c2, edit_c3 = st.columns(3)
+        with edit_c1:
+            status_edit = st.selectbox("Status", options=STATUS_OPTIONS, index=STATUS_OPTIONS.index(row['status']), key=f"status_{doc_id}")
+        with edit_c2:
+            entry_edit = st.number_input("Preço Entrada", value=float(row['entry_price']), format="%.5f", key=f"entry_{doc_id}")
+        with edit_c3:
+            exit_edit = st.number_input("Preço Saída", value=float(row.get('exit_price', 0) or 0), format="%.5f", key=f"exit_{doc_id}")
+
+        edit_c4, edit_c5, edit_c6 = st.columns(3)
+        with edit_c4:
+            sl_edit = st.number_input("Stop Loss", value=float(row['stop_loss']), format="%.5f", key=f"sl_{doc_id}")
+        with edit_c5:
+            tp_edit = st.number_input("Take Profit", value=float(row['target_price']), format="%.5f", key=f"tp_{doc_id}")
+        with edit_c6:
+            selected_display_edit = [
+                name for name, doc in account_options_map.items() if doc in row.get('accounts', [])
+            ]
+            accounts_edit_display = st.multiselect("Contas", options=account_display_names, default=selected_display_edit, key=f"acc_{doc_id}")
+            accounts_edit = [account_options_map[name] for name in accounts_edit_display]
+
+        notes_edit = st.text_area("Notas", value=row.get('notes', ''), key=f"notes_{doc_id}")
 
-df_journal = get_journal_entries(user_id, status_filter=status_filter)
+        btn_c1, btn_c2, btn_c3, _ = st.columns([1, 1, 1, 4])
+        with btn_c1:
+            if st.form_submit_button("✔️ Guardar", use_container_width=True):
+                updated_data = { "status": status_edit, "entry_price": entry_edit, "exit_price": exit_edit,
+                                 "stop_loss": sl_edit, "target_price": tp_edit, "accounts": accounts_edit, "notes": notes_edit,
+                                 "direction": row.get('direction') }
+                # A data de saída fica registada quando a operação é finalizada (usada na excursão MAE/MFE).
+                if status_edit == "Finalizado" and row['status'] != "Finalizado":
+                    updated_data["exit_date"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                if update_journal_entry(user_id, doc_id, updated_data, accounts):
+                    st.session_state['journal_editing'] = None
+                    st.success("Operação atualizada!"); st.rerun()
+        with btn_c2:
+            if st.form_submit_button("❌ Apagar", type="primary", use_container_width=True):
+                if delete_journal_entry(user_id, doc_id):
+                    st.session_state['journal_editing'] = None
+                    st.success("Operação apagada!"); st.rerun()
+        with btn_c3:
+            if st.form_submit_button("Cancelar", use_container_width=True):
+                st.session_state['journal_editing'] = None
+                st.rerun()
 
 if df_journal.empty:
     st.info("Nenhum registo encontrado para o filtro selecionado.")
 else:
-    for index, row in df_journal.iterrows():
+    account_names_by_id = {
+        acc['doc_id']: f"{acc['account_name']} ({acc.get('currency', 'USD')} {acc.get('initial_capital', 0):,.2f})"
+        for acc in accounts
+    }
+    editing_id = st.session_state.get('journal_editing')
+    # Excursão (MAE/MFE) das operações finalizadas da página, servida pela cache por operação.
+    excursions = get_trade_excursions(user_id, df_journal)
+
+    # Apenas a página visível é desenhada; cada operação mostra um resumo estático
+    # e o formulário de edição só existe para a operação selecionada.
+    for row in df_journal.to_dict('records'):
         doc_id = row.get('doc_id')
         trade_date = pd.to_datetime(row['trade_date']).strftime('%d/%m/%Y %H:%M')
-        
-        trade_accounts_names = [
-            f"{acc['account_name']} ({acc.get('currency', 'USD')} {acc.get('initial_capital', 0):,.2f})"
-            for acc in accounts 
-            if acc['doc_id'] in row.get('accounts', [])
-        ]
-
-        with st.expander(f"{row['asset']} ({row['direction']}) - {trade_date} - Status: {row['status']}"):
-            with st.form(f"edit_form_{doc_id}"):
-                c1, c2, c3, c4 = st.columns(4)
-                with c1:
-                    st.metric("Entrada", f"{row['entry_price']:.5f}")
-                    st.metric("Saída", f"{row.get('exit_price', 0):.5f}" if row.get('exit_price') else "N/A")
-                with c2:
-                    st.metric("Stop Loss", f"{row['stop_loss']:.5f}")
-                    st.metric("Alvo (TP)", f"{row['target_price']:.5f}")
-                with c3:
-                    st.write("**Setup:**")
-                    st.info(f"{row.get('selected_setup', 'N/A')}")
-                with c4:
-                    st.write("**Conta(s):**")
-                    st.info(", ".join(trade_accounts_names) if trade_accounts_names else "N/A")
-
-                st.markdown("---")
-                st.write("**Editar Operação:**")
-                
-                edit_c1, edit_c2, edit_c3 = st.columns(3)
-                with edit_c1:
-                    status_edit = st.selectbox("Status", options=["Pendente", "Em Aberto", "Finalizado"], index=["Pendente", "Em Aberto", "Finalizado"].index(row['status']), key=f"status_{doc_id}")
-                with edit_c2:
-                    entry_edit = st.number_input("Preço Entrada", value=float(row['entry_price']), format="%.5f", key=f"entry_{doc_id}")
-                with edit_c3:
-                    exit_edit = st.number_input("Preço Saída", value=float(row.get('exit_price', 0)), format="%.5f", key=f"exit_{doc_id}")
-
-                edit_c4, edit_c5, edit_c6 = st.columns(3)
-                with edit_c4:
-                    sl_edit = st.number_input("Stop Loss", value=float(row['stop_loss']), format="%.5f", key=f"sl_{doc_id}")
-                with edit_c5:
-                    tp_edit = st.number_input("Take Profit", value=float(row['target_price']), format="%.5f", key=f"tp_{doc_id}")
-                with edit_c6:
-                    selected_display_edit = [
-                        name for name, doc in account_options_map.items() if doc in row.get('accounts', [])
-                    ]
-                    accounts_edit_display = st.multiselect("Contas", options=account_display_names, default=selected_display_edit, key=f"acc_{doc_id}")
-                    accounts_edit = [account_options_map[name] for name in accounts_edit_display]
-
-                notes_edit = st.text_area("Notas", value=row.get('notes', ''), key=f"notes_{doc_id}")
-
-                btn_c1, btn_c2, _ = st.columns([1, 1, 5])
-                with btn_c1:
-                    if st.form_submit_button("✔️ Guardar", use_container_width=True):
-                        updated_data = { "status": status_edit, "entry_price": entry_edit, "exit_price": exit_edit,
-                                         "stop_loss": sl_edit, "target_price": tp_edit, "accounts": accounts_edit, "notes": notes_edit }
-                        if update_journal_entry(user_id, doc_id, updated_data):
-                            st.success("Operação atualizada!"); st.rerun()
-                with btn_c2:
-                    if st.form_submit_button("❌ Apagar", type="primary", use_container_width=True):
-                        if delete_journal_entry(user_id, doc_id):
-                            st.success("Operação apagada!"); st.rerun()
+        trade_accounts_names = [account_names_by_id[a] for a in row.get('accounts', []) or [] if a in account_names_by_id]
+
+        with st.expander(f"{row['asset']} ({row['direction']}) - {trade_date} - Status: {row['status']}", expanded=(doc_id == editing_id)):
+            c1, c2, c3, c4 = st.columns(4)
+            with c1:
+                st.metric("Entrada", f"{row['entry_price']:.5f}")
+                st.metric("Saída", f"{row.get('exit_price', 0):.5f}" if row.get('exit_price') else "N/A")
+            with c2:
+                st.metric("Stop Loss", f"{row['stop_loss']:.5f}")
+                st.metric("Alvo (TP)", f"{row['target_price']:.5f}")
+            with c3:
+                st.write("**Setup:**")
+                st.info(f"{row.get('selected_setup', 'N/A')}")
+            with c4:
+                st.write("**Conta(s):**")
+                st.info(", ".join(trade_accounts_names) if trade_accounts_names else "N/A")
+
+            if doc_id in excursions.index:
+                exc = excursions.loc[doc_id]
+                touch = {"stop": "stop tocado primeiro", "target": "alvo tocado primeiro"}.get(exc['first_touch'], "nem stop nem alvo tocados")
+                st.caption(f"📐 MAE {exc['mae_r']:.2f}R ({exc['mae_pct']:.2f}%) · MFE {exc['mfe_r']:.2f}R ({exc['mfe_pct']:.2f}%) · "
+                           f"{exc['days_in_trade']:.1f} dias em operação · {touch} (fechos diários)")
+
+            if doc_id == editing_id:
+                render_edit_form(row, doc_id)
+            elif st.button("✏️ Editar", key=f"edit_{doc_id}"):
+                st.session_state['journal_editing'] = doc_id
+                st.rerun()
 
+# --- NAVEGAÇÃO ENTRE PÁGINAS ---
+nav_prev, nav_info, nav_next = st.columns([1, 2, 1])
+with nav_prev:
+    if st.button("⬅️ Anterior", disabled=page_number == 0, use_container_width=True):
+        page_cursors.pop()
+        st.session_state['journal_editing'] = None
+        st.rerun()
+with nav_info:
+    st.caption(f"Página {page_number + 1}")
+with nav_next:
+    if st.button("Seguinte ➡️", disabled=next_cursor is None, use_container_width=True):
+        page_cursors.append(next_cursor)
+        st.session_state['journal_editing'] = None
+        st.rerun()
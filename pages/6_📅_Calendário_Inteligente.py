@@ -45,3 +45,45 @@ tradingview_widget_html = """
 # Definimos um valor ligeiramente maior para acomodar o widget e a sua pequena barra de branding.
 components.html(tradingview_widget_html, height=820, scrolling=False)
 
+# --- INDICADORES MACROECONÓMICOS (FRED) ---
+# Secção opcional: pandas/plotly só são importados quando é aberta, e a leitura é local (só de leitura).
+# O FRED só é contactado pelo botão de atualização (ou por python -m utils.macro_store).
+st.markdown("---")
+st.subheader("📈 Indicadores Macroeconómicos")
+st.caption("Séries do FRED guardadas localmente; só são descarregadas de novo depois de cada publicação.")
+if st.toggle("Mostrar indicadores", value=False, key="macro_show"):
+    from utils.config import macro_indicator_map
+    from utils.macro_store import fred_api_key, get_country_indicators, refresh_macro, series_metadata
+    from utils.plot_utils import create_indicator_bar_chart
+
+    sync_cols = st.columns([3, 1])
+    with sync_cols[0]:
+        country = st.selectbox("Zona monetária", list(macro_indicator_map), key="macro_country")
+    series_keys = list(macro_indicator_map[country].values())
+    with sync_cols[1]:
+        has_key = fred_api_key() is not None
+        if st.button("🔄 Atualizar indicadores", use_container_width=True, disabled=not has_key,
+                     help=None if has_key else "Defina FRED_API_KEY (ou 'fred_api_key' nos secrets)."):
+            with st.spinner("A consultar o FRED..."):
+                try:
+                    stats = refresh_macro(series_keys)
+                    st.success(f"{stats['checked']}/{stats['series']} séries consultadas, {stats['updated']} atualizadas ({stats['seconds']:.1f} s).")
+                except Exception as e:
+                    st.error(f"Erro ao atualizar os indicadores do FRED: {e}")
+
+    indicators = get_country_indicators(country)
+    charts = [fig for name, series in indicators.items() if (fig := create_indicator_bar_chart(series, name)) is not None]
+    if not charts:
+        if has_key:
+            st.info("Ainda não há indicadores guardados para esta zona. Use 'Atualizar indicadores' para os descarregar.")
+        else:
+            st.info("Ainda não há indicadores guardados para esta zona. Defina FRED_API_KEY (ou 'fred_api_key' nos secrets) para os descarregar.")
+    else:
+        meta = series_metadata(series_keys)
+        if not meta.empty and meta['last_fetched'].notna().any():
+            next_release = meta['next_release'].dropna().min() if meta['next_release'].notna().any() else "—"
+            st.caption(f"Última atualização: {meta['last_fetched'].dropna().max().replace('T', ' ')} · Próxima publicação: {next_release}")
+        chart_cols = st.columns(2)
+        for i, fig in enumerate(charts):
+            with chart_cols[i % 2]:
+                st.plotly_chart(fig, use_container_width=True)
@@ -2,12 +2,15 @@
 
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
 from view_utils import setup_sidebar
 from utils.journal_utils import get_journal_entries
 from utils.playbook_utils import get_playbook_setups
-from utils.reporting_engine import calculate_dashboard_metrics
+from utils.reporting_engine import calculate_dashboard_metrics, prepare_trades
+from utils.account_attribution import build_weights, attribute_to_account, account_totals
+from utils.risk_analytics import account_equity_curves
 from utils.accounts_utils import get_trading_accounts
+from utils.config import yahoo_finance_map
 
 # --- CONFIGURAÇÃO DA PÁGINA E AUTENTICAÇÃO ---
 st.set_page_config(layout="wide", page_title="Análise Detalhada")
@@ -24,26 +27,24 @@ st.caption("Filtre e analise o seu histórico de operações para encontrar insi
 st.markdown("---")
 
 # --- CARREGAMENTO INICIAL DE DADOS ---
-with st.spinner("A carregar histórico completo..."):
-    df_journal_all = get_journal_entries(user_id)
-    accounts = get_trading_accounts(user_id)
-    setups = get_playbook_setups(user_id)
-
-if df_journal_all.empty:
-    st.info("Ainda não há operações registadas no seu diário para analisar."); st.stop()
+# O diário só é lido depois de escolhidos os filtros, para que estes sejam aplicados no Firestore.
+accounts = get_trading_accounts(user_id)
+setups = get_playbook_setups(user_id)
 
 # --- PAINEL DE FILTROS ---
 with st.expander("🔍 Aplicar Filtros", expanded=True):
     filter_cols = st.columns(4)
     
     with filter_cols[0]:
-        # Filtro de Datas
+        # Filtro de Datas (limites ao dia: o mesmo período dá a mesma consulta em todas as reexecuções)
+        today = date.today()
+        day_range = lambda first: (datetime.combine(first, time.min), datetime.combine(today, time.max))
         date_options = {
             "Todos": (None, None),
-            "Últimos 7 dias": (datetime.now() - timedelta(days=7), datetime.now()),
-            "Este Mês": (datetime.now().replace(day=1), datetime.now()),
-            "Últimos 90 dias": (datetime.now() - timedelta(days=90), datetime.now()),
-            "Este Ano": (datetime.now().replace(month=1, day=1), datetime.now())
+            "Últimos 7 dias": day_range(today - timedelta(days=7)),
+            "Este Mês": day_range(today.replace(day=1)),
+            "Últimos 90 dias": day_range(today - timedelta(days=90)),
+            "Este Ano": day_range(today.replace(month=1, day=1)),
         }
         selected_date_range = st.selectbox("Período:", list(date_options.keys()))
         start_date, end_date = date_options[selected_date_range]
@@ -56,7 +57,7 @@ with st.expander("🔍 Aplicar Filtros", expanded=True):
 
     with filter_cols[2]:
         # Filtro de Ativos
-        available_assets = sorted(df_journal_all['asset'].unique().tolist())
+        available_assets = list(yahoo_finance_map.keys())
         selected_assets = st.multiselect("Ativo(s):", ["Todos"] + available_assets, default="Todos")
 
     with filter_cols[3]:
@@ -65,26 +66,25 @@ with st.expander("🔍 Aplicar Filtros", expanded=True):
         selected_setups = st.multiselect("Setup(s):", ["Todos"] + available_setups, default="Todos")
 
 # --- LÓGICA DE FILTRAGEM ---
-df_filtered = df_journal_all.copy()
-
-# Aplica filtro de data
-if start_date and end_date:
-    df_filtered = df_filtered[(df_filtered['trade_date'] >= pd.to_datetime(start_date)) & (df_filtered['trade_date'] <= pd.to_datetime(end_date))]
-# Aplica filtro de conta
-if selected_account_id != "all":
-    df_filtered = df_filtered.explode('accounts')
-    df_filtered = df_filtered[df_filtered['accounts'] == selected_account_id]
-# Aplica filtro de ativos
-if "Todos" not in selected_assets:
-    df_filtered = df_filtered[df_filtered['asset'].isin(selected_assets)]
-# Aplica filtro de setups
-if "Todos" not in selected_setups:
-    df_filtered = df_filtered[df_filtered['selected_setup'].isin(selected_setups)]
+# Os filtros seguem para get_journal_entries, que os executa no Firestore sempre que possível.
+with st.spinner("A carregar operações..."):
+    df_filtered = get_journal_entries(
+        user_id,
+        start_date=start_date, end_date=end_date,
+        account_id=selected_account_id if selected_account_id != "all" else None,
+        assets=None if "Todos" in selected_assets else selected_assets,
+        setups=None if "Todos" in selected_setups else selected_setups,
+    )
 
 # --- CÁLCULO DAS MÉTRICAS COM DADOS FILTRADOS ---
 if df_filtered.empty:
     st.warning("Nenhuma operação encontrada com os filtros selecionados."); st.stop()
 
+# Atribuição por conta: cada operação conta com a fração de capital de cada uma das suas contas.
+weights = build_weights(df_filtered, accounts)
+if selected_account_id != "all":
+    df_filtered = attribute_to_account(df_filtered, weights, selected_account_id)
+
 dashboard_data = calculate_dashboard_metrics(df_filtered, setups)
 kpis = dashboard_data["kpis"]
 
@@ -101,6 +101,26 @@ kpi_cols[1].metric("Taxa de Acerto", f"{kpis['win_rate']:.2f}%")
 kpi_cols[2].metric("R/R Médio", f"1 : {kpis['avg_rr_ratio']:.2f}")
 kpi_cols[3].metric("Expectativa", f"${kpis['expectancy']:,.2f}")
 
+if selected_account_id == "all" and len(accounts) > 1:
+    st.markdown("---")
+    st.subheader("Resultado por Conta")
+    prepared = prepare_trades(df_filtered)
+    trade_pnl = prepared['pnl_usd'].reindex(df_filtered.index, fill_value=0)
+    # Só as operações finalizadas contam como trades, como no total de operações acima.
+    by_account = account_totals(trade_pnl.to_numpy(), weights, counted=df_filtered.index.isin(prepared.index))
+    account_names = {acc['doc_id']: acc['account_name'] for acc in accounts}
+    by_account.index = by_account.index.map(lambda a: account_names.get(a, a))
+    st.dataframe(
+        by_account.rename(columns={"pnl": "Resultado (USD)", "trades": "Operações"}),
+        use_container_width=True,
+        column_config={"Resultado (USD)": st.column_config.NumberColumn(format="$%.2f")}
+    )
+    # Curva de capital de cada conta, a partir do capital inicial, com a parte atribuída de cada trade.
+    curves = account_equity_curves(trade_pnl.to_numpy(), df_filtered['trade_date'], weights, accounts)
+    if curves:
+        equity_by_account = pd.concat({account_names.get(a, a): c.groupby(level=0).last() for a, c in curves.items()}, axis=1).ffill()
+        st.line_chart(equity_by_account, y_label="Capital (USD)")
+
 st.markdown("---")
 st.subheader("Tabela de Operações Filtradas")
 
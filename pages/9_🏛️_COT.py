@@ -0,0 +1,98 @@
+# marketlens/pages/9_🏛️_COT.py
+
+import streamlit as st
+from view_utils import setup_sidebar
+from utils.cot_engine import get_cot_panel, latest_positioning, market_history, COT_GROUPS, COT_GROUP_LABELS
+from utils.cot_ingest import ingest_cot, last_sync
+from utils.plot_utils import create_cot_heatmap, style_cot_table
+from utils.components import create_simple_line_chart
+
+# --- CONFIGURAÇÃO DA PÁGINA E AUTENTICAÇÃO ---
+st.set_page_config(layout="wide", page_title="Relatório COT")
+setup_sidebar()
+
+if 'user_info' not in st.session_state or st.session_state['user_info'] is None:
+    st.warning("Acesso restrito. Por favor, faça o login.")
+    st.stop()
+
+# --- CABEÇALHO ---
+st.title("🏛️ Posicionamento COT (Commitment of Traders)")
+st.caption("Posição líquida, variação semanal e COT index de todos os mercados do relatório da CFTC.")
+
+# --- ATUALIZAÇÃO DOS RELATÓRIOS ---
+# Só são pedidos à CFTC os relatórios posteriores ao último já guardado.
+sync_cols = st.columns([3, 1, 1])
+with sync_cols[1]:
+    all_markets = st.checkbox("Todos os mercados", value=False, help="Por defeito só os mercados configurados (cot_market_map).")
+with sync_cols[2]:
+    if st.button("🔄 Atualizar relatórios", use_container_width=True):
+        with st.spinner("A pedir os relatórios novos à CFTC..."):
+            try:
+                stats = ingest_cot(all_markets=all_markets)
+                st.success(f"{stats['rows']} linhas novas até {stats['last_report_date']} ({stats['seconds']:.1f} s).")
+            except Exception as e:
+                st.error(f"Erro ao atualizar o relatório COT: {e}")
+with sync_cols[0]:
+    runs = [s for s in last_sync().values() if s['last_run']]
+    if runs:
+        latest = max(runs, key=lambda s: s['last_run'])
+        st.caption(f"Última atualização: {latest['last_run'].replace('T', ' ')} · relatório mais recente: {latest['last_report_date']}")
+st.markdown("---")
+
+# --- CARREGAMENTO DE DADOS ---
+# Todas as métricas são calculadas de uma vez e ficam em cache até chegarem novos relatórios.
+with st.spinner("A calcular o posicionamento de todos os mercados..."):
+    panel = get_cot_panel()
+
+if panel["noncomm"]["net"].empty:
+    st.info("Não há dados COT disponíveis."); st.stop()
+
+# --- FILTROS ---
+filter_cols = st.columns([1, 1, 3])
+with filter_cols[0]:
+    group = st.selectbox("Participantes:", list(COT_GROUPS.keys()), format_func=COT_GROUP_LABELS.get)
+with filter_cols[1]:
+    weeks = st.slider("Semanas no heatmap:", min_value=4, max_value=104, value=26, step=1)
+with filter_cols[2]:
+    selected_markets = st.multiselect("Mercados (vazio = todos):", list(panel["markets"]))
+markets = selected_markets or None
+
+# --- RESUMO DO ÚLTIMO RELATÓRIO ---
+st.subheader(f"Último Relatório - {COT_GROUP_LABELS[group]}")
+summary = latest_positioning(panel, group)
+if markets:
+    summary = summary.loc[summary.index.intersection(markets)]
+summary_display = summary.rename(columns={
+    "report_date": "Data", "net": "Líquida", "change": "Var. Semanal",
+    "cot_index": "COT Index", "percentile": "Percentil", "long_pct": "% Long"
+})
+st.dataframe(
+    summary_display.style.map(style_cot_table, subset=["COT Index", "% Long"]).format({
+        "Data": "{:%d/%m/%Y}", "Líquida": "{:,.0f}", "Var. Semanal": "{:+,.0f}",
+        "COT Index": "{:.1f}", "Percentil": "{:.1f}", "% Long": "{:.1f}%"
+    }, na_rep="N/A"),
+    use_container_width=True, height=400
+)
+
+# --- HEATMAP DE POSICIONAMENTO ---
+st.markdown("---")
+st.subheader("Heatmap do COT Index")
+fig_heatmap = create_cot_heatmap(panel[group]["cot_index"], title=f"COT Index ({panel['window']} semanas)", weeks=weeks, markets=markets)
+if fig_heatmap:
+    st.plotly_chart(fig_heatmap, use_container_width=True)
+else:
+    st.info("Sem dados para o período selecionado.")
+
+# --- HISTÓRICO DE UM MERCADO ---
+st.markdown("---")
+st.subheader("Histórico de um Mercado")
+market = st.selectbox("Mercado:", selected_markets or list(summary.index))
+history = market_history(panel, market, group)
+if not history.empty:
+    hist_cols = st.columns(2)
+    with hist_cols[0]:
+        fig_net = create_simple_line_chart(history["net"], "Posição Líquida", yaxis_title="Contratos")
+        if fig_net: st.plotly_chart(fig_net, use_container_width=True)
+    with hist_cols[1]:
+        fig_index = create_simple_line_chart(history["cot_index"], "COT Index", color='#f59e0b', yaxis_title="0-100")
+        if fig_index: st.plotly_chart(fig_index, use_container_width=True)
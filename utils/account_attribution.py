@@ -0,0 +1,122 @@
+# marketlens/utils/account_attribution.py
+
+"""
+Atribuição do resultado das operações às contas de trading.
+
+Uma operação pode ser executada em várias contas, e o risco em USD é calculado sobre a soma
+do capital dessas contas. A parte de cada conta é a sua fração do capital: é guardada no
+registo ('account_weights') quando a operação é criada ou as suas contas mudam; para registos
+antigos sem esse campo usa-se o capital atual das contas.
+
+Os pesos de um diário ficam numa matriz esparsa trade x conta, em formato de coordenadas
+(linha, coluna, peso). Filtrar por conta é um corte dessa matriz e os totais de todas as contas
+saem de uma multiplicação e de um np.bincount, sem DataFrame.explode nem duplicação de linhas.
+"""
+
+import numpy as np
+import pandas as pd
+from .reporting_engine import journal_versions
+
+def capital_weights(account_ids, accounts):
+    """
+    Fração do capital de cada conta entre as contas de uma operação (partes iguais se não houver capital).
+
+    Args:
+        account_ids (list): doc_ids das contas da operação.
+        accounts (list): Contas do utilizador, como devolvidas por get_trading_accounts.
+
+    Returns:
+        dict: {doc_id: peso}, com soma 1 (vazio se não houver contas).
+    """
+    account_ids = list(dict.fromkeys(account_ids or []))
+    if not account_ids:
+        return {}
+    capital = {acc['doc_id']: float(acc.get('initial_capital', 0) or 0) for acc in (accounts or [])}
+    values = np.array([max(capital.get(a, 0.0), 0.0) for a in account_ids])
+    total = values.sum()
+    shares = values / total if total > 0 else np.full(len(account_ids), 1 / len(account_ids))
+    return dict(zip(account_ids, shares.tolist()))
+
+def capital_signature(accounts):
+    """Identifica o capital atual das contas (para invalidar resultados que dependam dele)."""
+    return tuple(sorted((acc['doc_id'], float(acc.get('initial_capital', 0) or 0)) for acc in (accounts or [])))
+
+def build_weights(df_journal, accounts):
+    """
+    Constrói a matriz esparsa de pesos trade x conta de um diário.
+
+    Returns:
+        dict: {"rows": posições no DataFrame, "cols": índices de conta, "weights": pesos,
+               "account_ids": lista de doc_ids (ordem das colunas), "n_trades": número de linhas}.
+    """
+    account_ids = [acc['doc_id'] for acc in (accounts or [])]
+    rows, cols, weights = [], [], []
+    if not df_journal.empty and 'accounts' in df_journal.columns:
+        column_of = {a: i for i, a in enumerate(account_ids)}
+        stored = df_journal['account_weights'] if 'account_weights' in df_journal.columns else [None] * len(df_journal)
+        by_combination = {}  # As combinações de contas são poucas: os pesos calculam-se uma vez por combinação.
+        for pos, (trade_accounts, trade_weights) in enumerate(zip(df_journal['accounts'], stored)):
+            if not isinstance(trade_accounts, (list, tuple)) or not trade_accounts:
+                continue
+            if not isinstance(trade_weights, dict) or not trade_weights:
+                combination = tuple(trade_accounts)
+                if combination not in by_combination:
+                    by_combination[combination] = capital_weights(trade_accounts, accounts)
+                trade_weights = by_combination[combination]
+            for account_id, weight in trade_weights.items():
+                if account_id not in column_of:
+                    # Conta entretanto apagada: mantém-se como coluna própria para não perder o peso.
+                    column_of[account_id] = len(account_ids); account_ids.append(account_id)
+                rows.append(pos); cols.append(column_of[account_id]); weights.append(weight)
+    return {
+        "rows": np.asarray(rows, dtype=np.int64), "cols": np.asarray(cols, dtype=np.int64),
+        "weights": np.asarray(weights, dtype=float), "account_ids": account_ids, "n_trades": len(df_journal),
+    }
+
+def cached_weights(df_journal, accounts, store):
+    """
+    build_weights com memória: enquanto o diário (versões dos registos) e o capital das contas
+    não mudarem, devolve a matriz guardada em 'store' (ex.: st.session_state) sem a reconstruir.
+    """
+    _, versions = journal_versions(df_journal) if not df_journal.empty else (None, np.array([], dtype=np.int64))
+    signature = (len(df_journal), int(versions.sum()), int(versions.max()) if len(versions) else 0, capital_signature(accounts))
+    cached = store.get('account_weights')
+    if cached is None or cached[0] != signature:
+        cached = store['account_weights'] = (signature, build_weights(df_journal, accounts))
+    return cached[1]
+
+def attribute_to_account(df_journal, weights, account_id):
+    """
+    Operações de uma conta, com o risco (e o P&L, se existir) reduzidos à parte dessa conta.
+    O DataFrame devolvido é o mesmo formato do diário; serve diretamente os motores de relatório.
+    """
+    if account_id not in weights["account_ids"]:
+        return df_journal.iloc[0:0].copy()
+    mask = weights["cols"] == weights["account_ids"].index(account_id)
+    positions, shares = weights["rows"][mask], weights["weights"][mask]
+    df = df_journal.iloc[positions].copy()
+    for col in ('risk_usd', 'pnl_usd'):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).to_numpy() * shares
+    return df
+
+def account_totals(values, weights, counted=None):
+    """
+    Totais atribuídos a cada conta, para todas as contas de uma só vez.
+
+    Args:
+        values (array-like): Um valor por linha do diário usado em build_weights (ex.: P&L, 0 nas não finalizadas).
+        weights (dict): Resultado de build_weights.
+        counted (array-like, optional): Máscara por linha das operações que contam como trades (as
+                                        finalizadas de reporting_engine.prepare_trades, como o KPI
+                                        'total_trades'). Defaults to todas as linhas.
+
+    Returns:
+        pd.DataFrame: Índice nas contas; colunas 'pnl' (soma atribuída) e 'trades' (operações contadas com a conta).
+    """
+    n_accounts = len(weights["account_ids"])
+    values = np.nan_to_num(np.asarray(values, dtype=float))
+    pnl = np.bincount(weights["cols"], weights=values[weights["rows"]] * weights["weights"], minlength=n_accounts)
+    cols = weights["cols"] if counted is None else weights["cols"][np.asarray(counted, dtype=bool)[weights["rows"]]]
+    trades = np.bincount(cols, minlength=n_accounts)
+    return pd.DataFrame({"pnl": pnl, "trades": trades}, index=pd.Index(weights["account_ids"], name="account"))
@@ -1,9 +1,11 @@
 # synapse_desk/utils/accounts_utils.py
 
 import streamlit as st
-from firebase_config import db
+from firebase_config import get_db
+from .disk_cache import cached, invalidate
 from datetime import datetime
 
+@cached("firestore", tag_param="user_id")
 def get_trading_accounts(user_id):
     """
     Busca todas as contas de trading de um utilizador no Firestore.
@@ -11,7 +13,7 @@ def get_trading_accounts(user_id):
     if not user_id:
         return []
     try:
-        accounts_ref = db.collection("user_profiles").document(user_id).collection("trading_accounts")
+        accounts_ref = get_db().collection("user_profiles").document(user_id).collection("trading_accounts")
         docs = accounts_ref.order_by("created_at", direction="DESCENDING").stream()
 
         accounts_list = []
@@ -34,8 +36,9 @@ def add_trading_account(user_id, account_data):
     try:
         # Adiciona um timestamp de criação para ordenação
         account_data['created_at'] = datetime.utcnow()
-        accounts_ref = db.collection("user_profiles").document(user_id).collection("trading_accounts")
+        accounts_ref = get_db().collection("user_profiles").document(user_id).collection("trading_accounts")
         accounts_ref.add(account_data)
+        invalidate("firestore", tag=user_id)
         return True
     except Exception as e:
         st.error(f"Erro ao adicionar a conta de trading: {e}")
@@ -48,8 +51,9 @@ def update_trading_account(user_id, doc_id, account_data):
     if not user_id or not doc_id or not account_data:
         return False
     try:
-        doc_ref = db.collection("user_profiles").document(user_id).collection("trading_accounts").document(doc_id)
+        doc_ref = get_db().collection("user_profiles").document(user_id).collection("trading_accounts").document(doc_id)
         doc_ref.update(account_data)
+        invalidate("firestore", tag=user_id)
         return True
     except Exception as e:
         st.error(f"Erro ao atualizar a conta: {e}")
@@ -62,8 +66,9 @@ def delete_trading_account(user_id, doc_id):
     if not user_id or not doc_id:
         return False
     try:
-        doc_ref = db.collection("user_profiles").document(user_id).collection("trading_accounts").document(doc_id)
+        doc_ref = get_db().collection("user_profiles").document(user_id).collection("trading_accounts").document(doc_id)
         doc_ref.delete()
+        invalidate("firestore", tag=user_id)
         return True
     except Exception as e:
         st.error(f"Erro ao apagar a conta: {e}")
@@ -4,6 +4,7 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
+from datetime import datetime
 from .config import yahoo_finance_map
 from .data_loader import get_yfinance_data
 
@@ -45,4 +46,81 @@ def create_simple_line_chart(data_series, title, color='#3b82f6', yaxis_title='V
     )
     return fig
 
+# --- TEMAS DO DASHBOARD ---
+THEMES = {
+    "dark": {"plotly_layout": {"plot_bgcolor":'rgba(0,0,0,0)', "paper_bgcolor":'rgba(0,0,0,0)', "font_color":'white'}, "calendar_neutral": "rgba(44, 44, 44, 0.8)", "table_header_bg": "rgba(44, 44, 44, 0.8)", "table_border": "#3c3c3c", "win_color": "rgba(102, 187, 106, 0.8)", "loss_color": "rgba(239, 83, 80, 0.8)", "win_font": "#66BB6A", "loss_font": "#EF5350"},
+    "light": {"plotly_layout": {"plot_bgcolor":'rgba(255,255,255,0)', "paper_bgcolor":'rgba(255,255,255,0)', "font_color":'#1E1E1E'}, "calendar_neutral": "#E8E8E8", "table_header_bg": "#F0F2F6", "table_border": "#dddddd", "win_color": "rgba(102, 187, 106, 0.8)", "loss_color": "rgba(239, 83, 80, 0.8)", "win_font": "#1a936f", "loss_font": "#c94c4c"}
+}
+
+# --- COMPONENTES DO DASHBOARD (COM SUPORTE A TEMAS) ---
+
+def create_calendar_plot(pnl_data: pd.Series, theme: dict):
+    """Cria um gráfico de heatmap para o mês atual, com cores de fundo contextuais."""
+    plotly_layout = theme['plotly_layout']
+    if pnl_data.empty:
+        fig = go.Figure().update_layout(title_text="Sem dados para exibir", **plotly_layout)
+        return fig
+
+    today = datetime.now().date()
+    start_date, end_date = today.replace(day=1), pd.to_datetime(today.replace(day=1)) + pd.offsets.MonthEnd(1)
+    all_days = pd.date_range(start=start_date, end=end_date, freq='D')
+    
+    df_cal = pd.DataFrame(index=all_days).join(pnl_data.rename('pnl')).fillna(0)
+    df_cal['day_of_week'] = df_cal.index.dayofweek
+    df_cal['week_of_month'] = (df_cal.index.day - 1) // 7
+    df_cal['day_text'] = df_cal.index.day
+    
+    fig = go.Figure(go.Heatmap(
+        x=df_cal['week_of_month'], y=df_cal['day_of_week'], z=df_cal['pnl'], text=df_cal['day_text'], texttemplate="%{text}",
+        colorscale=[[0, theme['loss_color']], [0.5, theme['calendar_neutral']], [1, theme['win_color']]],
+        zmid=0, showscale=False, hoverongaps=False, hovertemplate='<b>%{customdata|%d/%m/%Y}</b><br>Resultado: $%{z:,.2f}<extra></extra>', customdata=df_cal.index
+    ))
+    fig.update_layout(
+        **plotly_layout, height=300,
+        yaxis=dict(autorange='reversed', showgrid=False, zeroline=False, tickvals=list(range(7)), ticktext=['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']),
+        xaxis=dict(showgrid=False, zeroline=False, visible=False), title=dict(text=f"Performance Diária ({start_date.strftime('%B %Y')})", x=0.5), margin=dict(t=50, b=20, l=20, r=20)
+    )
+    return fig
+
+def create_synapse_score_chart(score_data: dict, theme: dict):
+    plotly_layout = theme['plotly_layout']
+    categories = ['Taxa de Acerto', 'Rácio Lucro/Prejuízo', 'Fator de Lucro']
+    win_rate, awl_ratio, profit_factor = score_data.get('win_rate', 0), score_data.get('avg_win_loss_ratio', 0), score_data.get('profit_factor', 0)
+    awl_score, pf_score = min(awl_ratio, 3) / 3 * 100, min(profit_factor, 3) / 3 * 100
+    
+    fig = go.Figure(go.Scatterpolar(r=[win_rate, awl_score, pf_score], theta=categories, fill='toself', line=dict(color='cyan'), fillcolor='rgba(0, 255, 255, 0.4)'))
+    fig.update_layout(
+        polar=dict(radialaxis=dict(visible=True, range=[0, 100], color='grey'), angularaxis=dict(color=plotly_layout['font_color'])),
+        **plotly_layout, showlegend=False, height=250, margin=dict(t=40, b=40, l=40, r=40)
+    )
+    return fig
+
+def create_asset_pie_chart(asset_data: pd.Series, theme: dict):
+    plotly_layout = theme['plotly_layout']
+    if asset_data.empty:
+        fig = go.Figure().update_layout(title_text="Sem dados de ativos", **plotly_layout)
+        return fig
+    
+    fig = go.Figure(data=[go.Pie(labels=asset_data.index, values=asset_data.values, hole=.3, textinfo='percent', hoverinfo='label+value')])
+    fig.update_layout(**plotly_layout, showlegend=True, legend=dict(orientation="h", yanchor="bottom", y=-0.4, xanchor="center", x=0.5), height=350, margin=dict(t=40, b=20, l=20, r=20))
+    return fig
+
+def build_trades_table_html(df, theme: dict):
+    """Converte o DataFrame de trades recentes numa tabela HTML com estilos."""
+    def style_row(row):
+        resultado_color = theme['win_font'] if row['Resultado'] == 'Ganho' else theme['loss_font']
+        direcao_color = theme['win_font'] if row['Direção'] == 'Compra' else theme['loss_font']
+        pnl_str = f"${row['PnL (USD)']:,.2f}"
+        rr_str = f"1:{row['RR']:.2f}" if pd.notna(row['RR']) else "N/A"
+        return f"<tr><td>{row['Data']}</td><td>{row['Ativo']}</td><td style='color: {direcao_color};'>{row['Direção']}</td><td style='color: {resultado_color};'>{row['Resultado']}</td><td style='color: {resultado_color}; text-align: right;'>{pnl_str}</td><td style='text-align: right;'>{rr_str}</td></tr>"
+    
+    header = "".join([f"<th>{col}</th>" for col in df.columns])
+    rows_html = "".join([style_row(row) for _, row in df.iterrows()])
+    table_html = f"""<style>.styled-table {{ width: 100%; border-collapse: collapse; color: {theme['plotly_layout']['font_color']}; }} .styled-table th, .styled-table td {{ padding: 8px 4px; text-align: left; border-bottom: 1px solid {theme['table_border']}; }} .styled-table th {{ font-weight: bold; background-color: {theme['table_header_bg']}; }}</style><table class='styled-table'><thead><tr>{header}</tr></thead><tbody>{rows_html}</tbody></table>"""
+    return table_html
+
+def render_styled_trades_table(df, theme: dict):
+    """Desenha a tabela de trades recentes com estilos."""
+    st.markdown(build_trades_table_html(df, theme), unsafe_allow_html=True)
+
 # NOTA: Outras funções de componentes visuais serão adicionadas aqui conforme necessário.
\ No newline at end of file
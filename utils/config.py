@@ -1,5 +1,11 @@
 # synapse_desk/utils/config.py
 
+import os
+
+# --- BASE DE DADOS LOCAL ---
+# Ficheiro SQLite distribuído com a aplicação (tabelas 'price_data' e 'cot_data'; as macro são criadas por macro_store).
+DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "marketlens_data.db")
+
 # --- ESTRUTURA DE CATEGORIAS DE ATIVOS ---
 ASSET_CATEGORIES = {
     "--- Forex Majors ---": [
@@ -87,4 +93,39 @@ cot_market_map = {
     "Dow Jones": "124601",
     "Russell 2000": "239741",
     "VIX": "1170E1"
-}
\ No newline at end of file
+}
+
+# --- INDICADORES MACROECONÓMICOS (FRED) ---
+# Por zona monetária, o nome do indicador e o ID da série no FRED (todas mensais). Um sufixo
+# ":<units>" pede a série já transformada pelo FRED: chg (variação), pch (% face ao período
+# anterior) ou pc1 (% face ao ano anterior).
+macro_indicator_map = {
+    "USD": {
+        "Inflação (CPI, a/a %)": "CPIAUCSL:pc1",
+        "Inflação Core (CPI, a/a %)": "CPILFESL:pc1",
+        "Payrolls (NFP, var. mensal)": "PAYEMS:chg",
+        "Taxa de Desemprego": "UNRATE",
+        "Fed Funds": "FEDFUNDS",
+        "Treasury 10 anos": "GS10",
+        "Produção Industrial (proxy PMI, a/a %)": "INDPRO:pc1",
+        "Vendas a Retalho (m/m %)": "RSAFS:pch",
+    },
+    "EUR": {
+        "Inflação (HICP, a/a %)": "CP0000EZ19M086NEST:pc1",
+        "Taxa de Desemprego": "LRHUTTTTEZM156S",
+        "Yield 10 anos": "IRLTLT01EZM156N",
+        "Confiança Industrial (proxy PMI)": "BSCICP03EZM665S",
+    },
+    "GBP": {
+        "Inflação (CPI, a/a %)": "GBRCPIALLMINMEI:pc1",
+        "Taxa de Desemprego": "LRHUTTTTGBM156S",
+        "Yield 10 anos": "IRLTLT01GBM156N",
+        "Confiança Industrial (proxy PMI)": "BSCICP03GBM665S",
+    },
+    "JPY": {
+        "Inflação (CPI, a/a %)": "JPNCPIALLMINMEI:pc1",
+        "Taxa de Desemprego": "LRHUTTTTJPM156S",
+        "Yield 10 anos": "IRLTLT01JPM156N",
+        "Confiança Industrial (proxy PMI)": "BSCICP03JPM665S",
+    },
+}
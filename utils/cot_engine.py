@@ -0,0 +1,194 @@
+# marketlens/utils/cot_engine.py
+
+"""
+Motor de análise do relatório COT (Commitment of Traders) sobre a tabela 'cot_data'.
+
+A tabela é lida uma única vez para uma estrutura larga (datas de relatório x mercados) por
+grupo de participantes, e todas as métricas são calculadas para todos os mercados de uma vez:
+
+- posição líquida (long - short);
+- variação semanal da posição líquida (face ao relatório anterior do mesmo mercado);
+- COT index: posição da líquida atual entre o mínimo e o máximo da janela (0-100);
+- percentil da líquida atual dentro da janela (0-100);
+- percentagem de posições long.
+
+O resultado fica em memória e só é recalculado quando a tabela muda (novo número de linhas
+ou novo relatório mais recente), ou quando invalidate_cot_cache() é chamado. Também é guardado
+na cache em disco partilhada (classe "cot"), para que outros processos e reinícios não o
+recalculem.
+"""
+
+import sqlite3
+import threading
+import pandas as pd
+from .config import DB_PATH
+from .disk_cache import get_default_cache
+
+# Grupos de participantes e as respetivas colunas (long, short) em 'cot_data'.
+COT_GROUPS = {
+    "noncomm": ("noncomm_long", "noncomm_short"),  # Institucional (não comerciais)
+    "comm": ("comm_long", "comm_short"),           # Comerciais (hedgers)
+    "retail": ("retail_long", "retail_short"),     # Varejo (não reportáveis)
+}
+COT_GROUP_LABELS = {"noncomm": "Institucional", "comm": "Comercial", "retail": "Varejo"}
+# Janela por defeito do COT index: 3 anos de relatórios semanais.
+DEFAULT_WINDOW = 156
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+# --- LEITURA ---
+
+def _table_version(conn):
+    """Identifica o conteúdo atual da tabela sem a ler: (n.º de linhas, relatório mais recente)."""
+    return tuple(conn.execute("SELECT COUNT(*), MAX(report_date) FROM cot_data").fetchone())
+
+def _load_cot_snapshot(conn):
+    """Leitura a partir do snapshot colunar da base (ver snapshot_store), ou None se não houver."""
+    try:
+        from .snapshot_store import snapshot_for, load_cot_snapshot
+        snapshot = snapshot_for(conn)
+        return None if snapshot is None else load_cot_snapshot(snapshot, conn)
+    except Exception as e:
+        print(f"Snapshot do COT indisponível, leitura na base: {e}")
+        return None
+
+def load_cot_data(db_path=None, conn=None):
+    """
+    Lê a tabela 'cot_data' completa, em formato longo, com 'report_date' como datetime. Se existir
+    um snapshot colunar da base, os relatórios já exportados vêm dele.
+    """
+    own_conn = conn is None
+    conn = conn or sqlite3.connect(db_path or DB_PATH)
+    try:
+        df = _load_cot_snapshot(conn)
+        if df is not None:
+            return df
+        df = pd.read_sql_query("SELECT * FROM cot_data", conn)
+    finally:
+        if own_conn:
+            conn.close()
+    df['report_date'] = pd.to_datetime(df['report_date'])
+    return df
+
+# --- CÁLCULO ---
+
+def _rolling_cot_index(net, window):
+    low = net.rolling(window, min_periods=1).min()
+    high = net.rolling(window, min_periods=1).max()
+    span = (high - low).where(lambda s: s > 0)
+    return ((net - low) / span * 100).where(net.notna())
+
+def build_cot_panel(df_cot, window=DEFAULT_WINDOW):
+    """
+    Constrói as métricas de todos os mercados a partir da tabela em formato longo.
+
+    Args:
+        df_cot (pd.DataFrame): Linhas de 'cot_data'.
+        window (int, optional): Janela (em semanas) do COT index e do percentil. Defaults to DEFAULT_WINDOW.
+
+    Returns:
+        dict: {"dates", "markets", "window", "version", e por grupo (noncomm/comm/retail) um dicionário
+               com DataFrames largos (datas x mercados): "net", "change", "cot_index", "percentile", "long_pct"}.
+    """
+    panel = {"window": window, "version": None}
+    if df_cot is None or df_cot.empty:
+        panel.update(dates=pd.DatetimeIndex([]), markets=pd.Index([]))
+        empty = pd.DataFrame()
+        for group in COT_GROUPS:
+            panel[group] = {key: empty for key in ("net", "change", "cot_index", "percentile", "long_pct")}
+        return panel
+
+    columns = [c for pair in COT_GROUPS.values() for c in pair]
+    # Um único pivot para todas as colunas: (datas) x (coluna, mercado).
+    wide = df_cot.pivot_table(index='report_date', columns='market_name', values=columns, aggfunc='last').sort_index()
+    panel["dates"] = wide.index
+    panel["markets"] = wide.columns.get_level_values(1).unique().sort_values()
+
+    for group, (long_col, short_col) in COT_GROUPS.items():
+        longs = wide[long_col].reindex(columns=panel["markets"])
+        shorts = wide[short_col].reindex(columns=panel["markets"])
+        net = longs - shorts
+        # Variação face ao último relatório disponível do mesmo mercado (há mercados com semanas em falta).
+        change = (net - net.ffill().shift(1)).where(net.notna())
+        total = (longs + shorts).where(lambda t: t > 0)
+        panel[group] = {
+            "net": net,
+            "change": change,
+            "cot_index": _rolling_cot_index(net, window),
+            "percentile": net.rolling(window, min_periods=1).rank(pct=True).mul(100).where(net.notna()),
+            "long_pct": longs / total * 100,
+        }
+    return panel
+
+def latest_positioning(panel, group="noncomm"):
+    """
+    Resumo do último relatório de cada mercado para um grupo de participantes.
+
+    Returns:
+        pd.DataFrame: Uma linha por mercado com a data do relatório, líquida, variação semanal,
+                      COT index, percentil e percentagem long; ordenado pelo COT index.
+    """
+    metrics = panel[group]
+    if metrics["net"].empty:
+        return pd.DataFrame()
+    net = metrics["net"]
+    # Posição (linha) do último relatório de cada mercado.
+    last_row = net.notna().to_numpy()[::-1].argmax(axis=0)
+    last_row = len(net) - 1 - last_row
+    cols = range(net.shape[1])
+    summary = pd.DataFrame({
+        "report_date": net.index[last_row],
+        "net": net.to_numpy()[last_row, cols],
+        "change": metrics["change"].to_numpy()[last_row, cols],
+        "cot_index": metrics["cot_index"].to_numpy()[last_row, cols],
+        "percentile": metrics["percentile"].to_numpy()[last_row, cols],
+        "long_pct": metrics["long_pct"].to_numpy()[last_row, cols],
+    }, index=net.columns)
+    summary.index.name = "market_name"
+    return summary.sort_values("cot_index", ascending=False)
+
+def market_history(panel, market, group="noncomm"):
+    """Série temporal de todas as métricas de um mercado (sem SQL adicional)."""
+    metrics = panel[group]
+    if market not in metrics["net"].columns:
+        return pd.DataFrame()
+    history = pd.DataFrame({key: frame[market] for key, frame in metrics.items()})
+    return history.dropna(subset=["net"])
+
+# --- CACHE ---
+
+def get_cot_panel(db_path=None, window=DEFAULT_WINDOW):
+    """
+    Devolve as métricas COT de todos os mercados, recalculando-as apenas se a tabela mudou.
+
+    Args:
+        db_path (str, optional): Caminho da base de dados. Defaults to DB_PATH.
+        window (int, optional): Janela do COT index. Defaults to DEFAULT_WINDOW.
+    """
+    key = (db_path or DB_PATH, window)
+    conn = sqlite3.connect(db_path or DB_PATH)
+    try:
+        version = _table_version(conn)
+        with _cache_lock:
+            cached = _cache.get(key)
+            if cached is not None and cached["version"] == version:
+                return cached
+        disk_key = f"cot_panel:{key[0]}:{window}:{version}"
+        hit, panel = get_default_cache().get("cot", disk_key)
+        if not hit:
+            panel = build_cot_panel(load_cot_data(conn=conn), window=window)
+            panel["version"] = version
+            get_default_cache().set("cot", disk_key, panel)
+    finally:
+        conn.close()
+    with _cache_lock:
+        _cache[key] = panel
+    return panel
+
+def invalidate_cot_cache(db_path=None):
+    """Descarta as métricas em cache (ex.: depois de inserir novos relatórios)."""
+    get_default_cache().invalidate("cot")
+    with _cache_lock:
+        for key in [k for k in _cache if db_path is None or k[0] == db_path]:
+            _cache.pop(key, None)
@@ -0,0 +1,243 @@
+# marketlens/utils/cot_ingest.py
+
+"""
+Ingestão incremental do relatório COT da CFTC (Legacy, Futures Only, no portal Socrata
+publicreporting.cftc.gov) para a tabela 'cot_data'.
+
+Cada execução pede apenas os relatórios posteriores ao último já ingerido, em páginas, e grava
+todas as linhas com um único executemany (INSERT OR REPLACE) numa transação. Por defeito entram
+só os mercados de config.cot_market_map (pelo código do contrato na CFTC); com all_markets=True
+entram todos os mercados do relatório, como na tabela distribuída com a aplicação.
+
+O último relatório ingerido fica registado em 'cot_sync' por âmbito ("mapped" ou "all"), com a
+duração e o número de linhas da última execução: uma execução só com os mercados do mapa não faz
+avançar o ponto de partida da ingestão de todos os mercados. Na primeira execução, o ponto de
+partida dos dois âmbitos é o relatório mais recente da tabela.
+
+O cliente é injetável: qualquer objeto com get(dataset, select=, where=, order=, limit=, offset=)
+que devolva uma lista de dicionários, como o sodapy.Socrata (por defeito).
+
+    python -m utils.cot_ingest [--all-markets] [--since 2024-01-01]
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from .config import DB_PATH, cot_market_map
+
+CFTC_DOMAIN = "publicreporting.cftc.gov"
+# Legacy - Futures Only (as colunas de 'cot_data' são as do relatório legacy).
+COT_DATASET = "6dca-aqww"
+PAGE_SIZE = 50000
+SOCRATA_TIMEOUT = 60
+
+DATE_FIELD = "report_date_as_yyyy_mm_dd"
+NAME_FIELD = "market_and_exchange_names"
+CODE_FIELD = "cftc_contract_market_code"
+# Coluna de 'cot_data' -> campo do dataset.
+VALUE_FIELDS = {
+    "comm_long": "comm_positions_long_all",
+    "comm_short": "comm_positions_short_all",
+    "noncomm_long": "noncomm_positions_long_all",
+    "noncomm_short": "noncomm_positions_short_all",
+    "retail_long": "nonrept_positions_long_all",
+    "retail_short": "nonrept_positions_short_all",
+}
+COT_COLUMNS = ["report_date", "market_name", *VALUE_FIELDS]
+
+_write_lock = threading.Lock()
+
+# --- LIGAÇÃO E ESQUEMA ---
+
+def get_connection(db_path=None):
+    """Abre uma ligação à base de dados local e garante o esquema da ingestão do COT."""
+    conn = sqlite3.connect(db_path or DB_PATH, timeout=30, check_same_thread=False)
+    ensure_schema(conn)
+    return conn
+
+def ensure_schema(conn):
+    """Cria (se necessário) 'cot_data' e 'cot_sync' (último relatório ingerido por âmbito)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cot_data (
+            report_date TEXT,
+            market_name TEXT,
+            comm_long REAL,
+            comm_short REAL,
+            noncomm_long REAL,
+            noncomm_short REAL,
+            retail_long REAL,
+            retail_short REAL,
+            PRIMARY KEY (report_date, market_name)
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cot_sync (
+            scope TEXT PRIMARY KEY,
+            last_report_date TEXT,
+            last_run TEXT,
+            rows INTEGER,
+            seconds REAL
+        )""")
+    conn.commit()
+
+# --- CLIENTE SOCRATA ---
+
+def get_socrata_client(app_token=None, timeout=SOCRATA_TIMEOUT):
+    """
+    Cliente sodapy do portal da CFTC. O app token (CFTC_APP_TOKEN ou st.secrets['cftc_app_token'])
+    é opcional; sem ele o Socrata aplica limites de pedidos mais apertados.
+    """
+    from sodapy import Socrata
+    app_token = app_token or os.environ.get("CFTC_APP_TOKEN")
+    if not app_token:
+        try:
+            import streamlit as st
+            app_token = st.secrets.get("cftc_app_token")
+        except Exception:
+            app_token = None
+    return Socrata(CFTC_DOMAIN, app_token, timeout=timeout)
+
+def build_where(since=None, codes=None):
+    """Filtro SoQL: relatórios posteriores a 'since' e, se dados, só os códigos de mercado pedidos."""
+    clauses = []
+    if since:
+        clauses.append(f"{DATE_FIELD} > '{since}T00:00:00.000'")
+    if codes:
+        clauses.append(f"{CODE_FIELD} in({', '.join(repr(str(c)) for c in codes)})")
+    return " AND ".join(clauses) or None
+
+def iter_report_pages(client, since=None, codes=None, page_size=PAGE_SIZE, dataset=COT_DATASET):
+    """Percorre os registos do dataset em páginas (lista de dicionários por página)."""
+    select = ", ".join([DATE_FIELD, NAME_FIELD, CODE_FIELD, *VALUE_FIELDS.values()])
+    where = build_where(since, codes)
+    offset = 0
+    while True:
+        page = client.get(dataset, select=select, where=where, order=f"{DATE_FIELD}, {CODE_FIELD}",
+                          limit=page_size, offset=offset)
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        offset += page_size
+
+def _number(value):
+    return None if value is None or value == "" else float(value)
+
+def records_to_rows(records):
+    """Converte registos do Socrata em linhas de 'cot_data', pela ordem de COT_COLUMNS."""
+    fields = list(VALUE_FIELDS.values())
+    return [(r[DATE_FIELD][:10], r[NAME_FIELD].strip(), *(_number(r.get(f)) for f in fields)) for r in records]
+
+# --- INGESTÃO ---
+
+def _watermark(conn, scope):
+    """
+    Último relatório já ingerido no âmbito pedido. Na primeira ingestão, os dois âmbitos são
+    registados a partir do relatório mais recente da tabela (que cobre todos os mercados).
+    """
+    synced = dict(conn.execute("SELECT scope, last_report_date FROM cot_sync").fetchall())
+    if not synced:
+        table_max = conn.execute("SELECT MAX(report_date) FROM cot_data").fetchone()[0]
+        if table_max:
+            with _write_lock:
+                conn.executemany("INSERT INTO cot_sync (scope, last_report_date) VALUES (?, ?)",
+                                 [("all", table_max), ("mapped", table_max)])
+                conn.commit()
+        synced = {"all": table_max, "mapped": table_max}
+    if scope == "all":
+        return synced.get("all")
+    # A ingestão de todos os mercados também cobre os mercados do mapa.
+    return max(filter(None, [synced.get("mapped"), synced.get("all")]), default=None)
+
+def ingest_cot(client=None, db_path=None, conn=None, all_markets=False, since=None, page_size=PAGE_SIZE, refresh_snapshot=True):
+    """
+    Acrescenta a 'cot_data' os relatórios da CFTC posteriores ao último já ingerido.
+
+    Args:
+        client (optional): Cliente com a interface de sodapy.Socrata.get. Defaults to get_socrata_client().
+        db_path (str, optional): Caminho da base de dados. Defaults to DB_PATH.
+        conn (sqlite3.Connection, optional): Ligação já aberta.
+        all_markets (bool, optional): Todos os mercados do relatório, em vez dos de cot_market_map. Defaults to False.
+        since (str, optional): Pede os relatórios posteriores a esta data (YYYY-MM-DD) em vez do último ingerido.
+        page_size (int, optional): Registos por pedido. Defaults to PAGE_SIZE.
+        refresh_snapshot (bool, optional): Atualiza o snapshot colunar da base, se existir. Defaults to True.
+
+    Returns:
+        dict: {"scope", "since", "rows", "markets", "last_report_date", "pages", "fetch_seconds",
+               "write_seconds", "seconds", "rows_per_second"}.
+    """
+    t0 = time.perf_counter()
+    scope = "all" if all_markets else "mapped"
+    codes = None if all_markets else sorted(set(cot_market_map.values()))
+    own_conn, own_client = conn is None, client is None
+    conn = conn or get_connection(db_path)
+    if not own_conn:
+        ensure_schema(conn)
+    try:
+        since = since or _watermark(conn, scope)
+        client = client or get_socrata_client()
+        rows, pages = [], 0
+        try:
+            for page in iter_report_pages(client, since, codes, page_size):
+                rows.extend(records_to_rows(page))
+                pages += 1
+        finally:
+            if own_client and hasattr(client, "close"):
+                client.close()
+        fetch_seconds = time.perf_counter() - t0
+
+        previous = conn.execute("SELECT last_report_date FROM cot_sync WHERE scope = ?", (scope,)).fetchone()
+        last_report = max(filter(None, [max((r[0] for r in rows), default=None), since, previous and previous[0]]), default=None)
+        with _write_lock:
+            conn.executemany(f"INSERT OR REPLACE INTO cot_data ({', '.join(COT_COLUMNS)}) VALUES ({', '.join('?' * len(COT_COLUMNS))})", rows)
+            conn.execute("INSERT OR REPLACE INTO cot_sync (scope, last_report_date, last_run, rows, seconds) VALUES (?, ?, ?, ?, ?)",
+                         (scope, last_report, datetime.now().isoformat(timespec="seconds"), len(rows), time.perf_counter() - t0))
+            conn.commit()
+        write_seconds = time.perf_counter() - t0 - fetch_seconds
+    finally:
+        if own_conn:
+            conn.close()
+
+    if rows:
+        from .cot_engine import invalidate_cot_cache
+        invalidate_cot_cache(db_path)
+        if refresh_snapshot:
+            try:
+                from .snapshot_store import refresh_snapshots
+                refresh_snapshots(db_path)
+            except Exception as e:
+                print(f"Erro ao atualizar o snapshot depois da ingestão do COT: {e}")
+    seconds = time.perf_counter() - t0
+    stats = {"scope": scope, "since": since, "rows": len(rows), "markets": len({r[1] for r in rows}),
+             "last_report_date": last_report, "pages": pages, "fetch_seconds": fetch_seconds,
+             "write_seconds": write_seconds, "seconds": seconds, "rows_per_second": len(rows) / seconds if seconds else 0.0}
+    print(f"COT ({scope}): {stats['rows']} linhas de {stats['markets']} mercados posteriores a {since} em {seconds:.2f} s "
+          f"({stats['rows_per_second']:,.0f} linhas/s; pedidos {fetch_seconds:.2f} s, escrita {write_seconds:.2f} s)")
+    return stats
+
+def last_sync(db_path=None):
+    """Registos de 'cot_sync' ({âmbito: dict}), para mostrar a última ingestão ({} se ainda não houve nenhuma)."""
+    conn = sqlite3.connect(db_path or DB_PATH)
+    try:
+        cursor = conn.execute("SELECT * FROM cot_sync")
+        columns = [c[0] for c in cursor.description]
+        return {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
+    except sqlite3.OperationalError:
+        return {}
+    finally:
+        conn.close()
+
+# --- LINHA DE COMANDOS ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingestão incremental do relatório COT da CFTC em marketlens_data.db.")
+    parser.add_argument("--db", default=DB_PATH, help="Base de dados SQLite.")
+    parser.add_argument("--all-markets", action="store_true", help="Todos os mercados do relatório (não só os de cot_market_map).")
+    parser.add_argument("--since", help="Pede os relatórios posteriores a esta data (YYYY-MM-DD).")
+    args = parser.parse_args(argv)
+    ingest_cot(db_path=args.db, all_markets=args.all_markets, since=args.since)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+# marketlens/utils/cross_asset.py
+
+"""
+Análise entre ativos de todo o universo de ASSET_CATEGORIES: correlações móveis, betas ao US500
+e a um índice do dólar sintético, e força relativa das moedas do Forex.
+
+Os fechos de todos os ativos são lidos do armazenamento local (price_store) para uma única
+matriz alinhada (dias úteis, valores em falta preenchidos com o último fecho), da qual saem os
+retornos logarítmicos diários ou semanais. Para cada (janela, frequência), as covariâncias
+móveis de todos os pares ficam num array (datas x ativos x ativos) calculado com somas
+acumuladas; correlações e betas são cortes desse array.
+
+Quando chegam barras novas, apenas os fechos a partir da última data conhecida de cada ativo
+são relidos e, em cada resultado guardado, só as linhas a partir do primeiro retorno alterado
+são recalculadas.
+"""
+
+import threading
+import numpy as np
+import pandas as pd
+from .config import DB_PATH, ASSET_CATEGORIES, yahoo_finance_map
+from .price_store import get_connection, has_price_table, read_prices, period_to_start
+
+HISTORY_PERIOD = "5y"
+FREQUENCIES = {"daily": None, "weekly": "W-FRI"}
+DEFAULT_WINDOWS = {"daily": 60, "weekly": 26}
+
+# Índice do dólar sintético: pesos do DXY (ICE) sem a coroa sueca, renormalizados. O sinal indica
+# se o dólar é a moeda cotada (EUR/USD, GBP/USD) ou a base (USD/JPY, ...) do par.
+DXY_PROXY = "DXY (proxy)"
+DXY_WEIGHTS = {"EUR/USD": -0.576, "USD/JPY": 0.136, "GBP/USD": -0.119, "USD/CAD": 0.091, "USD/CHF": 0.036}
+BENCHMARKS = ("US500", DXY_PROXY)
+FOREX_CATEGORIES = ("--- Forex Majors ---", "--- Forex Crosses ---")
+
+# Ativos do universo, pela ordem de ASSET_CATEGORIES.
+UNIVERSE = [asset for assets in ASSET_CATEGORIES.values() for asset in assets if asset in yahoo_finance_map]
+FOREX_PAIRS = [asset for category in FOREX_CATEGORIES for asset in ASSET_CATEGORIES.get(category, []) if asset in yahoo_finance_map]
+
+# --- PRIMITIVAS ---
+
+def align_closes(closes, frequency="daily"):
+    """
+    Alinha os fechos (datas x ativos) em dias úteis, preenchendo os dias sem barra com o último
+    fecho, e reamostra para a frequência pedida (último fecho de cada semana no semanal).
+    """
+    aligned = closes[closes.index.dayofweek < 5].sort_index().ffill()
+    rule = FREQUENCIES[frequency]
+    return aligned.resample(rule).last() if rule else aligned
+
+def log_returns(aligned):
+    """Retornos logarítmicos, com a coluna do índice do dólar sintético acrescentada no fim."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.log(aligned.where(aligned > 0)).diff()
+    dxy = sum(weight * returns[pair] for pair, weight in DXY_WEIGHTS.items()) / sum(abs(w) for w in DXY_WEIGHTS.values())
+    returns[DXY_PROXY] = dxy
+    return returns
+
+def rolling_covariance(returns, window, start=0):
+    """
+    Covariâncias móveis de todos os pares a partir de somas acumuladas.
+
+    Args:
+        returns (np.ndarray): Retornos (datas x ativos), NaN onde não há dados.
+        window (int): Janela em observações; só janelas completas têm valor.
+        start (int, optional): Primeira linha a calcular. Defaults to 0.
+
+    Returns:
+        np.ndarray: float32 (linhas start.. x ativos x ativos), NaN onde a janela de um dos ativos
+                    não está completa.
+    """
+    first = max(start - window + 1, 0)
+    block = returns[first:]
+    valid = ~np.isnan(block)
+    x = np.where(valid, block, 0.0)
+    zero = lambda a: np.concatenate([np.zeros((1,) + a.shape[1:]), np.cumsum(a, axis=0)])
+    c_xy, c_x, c_n = zero(np.einsum('ti,tj->tij', x, x)), zero(x), zero(valid.astype(np.int64))
+    # Linhas (locais) a devolver e o início da janela de cada uma.
+    rows = np.arange(start - first, len(block)) + 1
+    lower = np.maximum(rows - window, 0)
+    s_xy, s_x, n = c_xy[rows] - c_xy[lower], c_x[rows] - c_x[lower], c_n[rows] - c_n[lower]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = (s_xy - s_x[:, :, None] * s_x[:, None, :] / window) / (window - 1)
+    complete = n == window
+    cov[~(complete[:, :, None] & complete[:, None, :])] = np.nan
+    return cov.astype(np.float32)
+
+def first_changed_row(old, new):
+    """Primeira linha em que dois DataFrames de retornos diferem (datas ou valores)."""
+    n = min(len(old), len(new))
+    same_dates = old.index[:n] == new.index[:n]
+    a, b = old.to_numpy()[:n], new.to_numpy()[:n]
+    same_values = ((a == b) | (np.isnan(a) & np.isnan(b))).all(axis=1)
+    changed = ~(same_dates & same_values)
+    return int(np.argmax(changed)) if changed.any() else n
+
+def currency_incidence(pairs=FOREX_PAIRS):
+    """Matriz (pares x moedas): +1 na moeda base e -1 na cotada de cada par."""
+    currencies = list(dict.fromkeys(c for pair in pairs for c in pair.split("/")))
+    matrix = np.zeros((len(pairs), len(currencies)))
+    for i, pair in enumerate(pairs):
+        base, quote = pair.split("/")
+        matrix[i, currencies.index(base)], matrix[i, currencies.index(quote)] = 1.0, -1.0
+    return currencies, matrix
+
+# --- SERVIÇO ---
+
+class CrossAssetService:
+    """Fechos alinhados do universo e resultados por (janela, frequência), atualizados incrementalmente."""
+
+    def __init__(self, db_path=None, period=HISTORY_PERIOD):
+        self.db_path = db_path or DB_PATH
+        self.start = period_to_start(period)
+        self.closes = pd.DataFrame()
+        self.last_dates = {}  # ticker -> última data de preço já lida (YYYY-MM-DD)
+        self.first_dates = {}  # ticker -> primeira data do período já lida (YYYY-MM-DD)
+        self.version = 0
+        self._returns = {}  # frequência -> (versão, DataFrame de retornos)
+        self._results = {}  # (janela, frequência) -> {"version", "returns", "cov"}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """
+        Lê as barras de 'price_data' a partir da última data já lida de cada ativo. Um ativo com
+        barras anteriores à primeira já lida (histórico acrescentado no início, dentro do período)
+        é relido desde o início do período.
+
+        Returns:
+            int: Número de tickers com barras novas.
+        """
+        tickers = [yahoo_finance_map[a] for a in UNIVERSE]
+        start = self.start.isoformat()
+        conn = get_connection(self.db_path)
+        try:
+            if not has_price_table(conn):
+                return 0
+            # Primeira barra do período e última barra por ticker: duas procuras no índice (Ticker, Date) cada.
+            values = ",".join(["(?)"] * len(tickers))
+            spans = {t: (first, last) for t, first, last in conn.execute(f"""
+                WITH t(Ticker) AS (VALUES {values})
+                SELECT Ticker,
+                       (SELECT MIN(Date) FROM price_data p WHERE p.Ticker = t.Ticker AND p.Date >= ?),
+                       (SELECT MAX(Date) FROM price_data p WHERE p.Ticker = t.Ticker)
+                FROM t""", [*tickers, start]) if last}
+            backfilled = [t for t, (first, _) in spans.items()
+                          if t in self.first_dates and first and first < self.first_dates[t]]
+            stale = [t for t, (_, last) in spans.items()
+                     if t not in backfilled and last > (self.last_dates.get(t) or "")]
+            if not stale and not backfilled:
+                return 0
+            pieces = []
+            if stale:
+                # Relê desde a última barra conhecida: pode ter sido guardada ainda incompleta.
+                since = min(self.last_dates.get(t) or start for t in stale)
+                pieces.append(read_prices(stale, start=since, conn=conn))
+            if backfilled:
+                pieces.append(read_prices(backfilled, start=start, conn=conn))
+        finally:
+            conn.close()
+        with self._lock:
+            closes = self.closes.drop(columns=backfilled, errors='ignore')
+            for fresh in pieces:
+                closes = fresh.combine_first(closes) if not closes.empty else fresh
+            self.closes = closes
+            for t in stale + backfilled:
+                self.last_dates[t] = spans[t][1]
+                if spans[t][0]:
+                    self.first_dates[t] = spans[t][0]
+            self.version += 1
+        return len(stale) + len(backfilled)
+
+    def returns(self, frequency="daily"):
+        """Retornos logarítmicos de todos os ativos do universo (colunas com o nome do ativo)."""
+        with self._lock:
+            cached = self._returns.get(frequency)
+            if cached is not None and cached[0] == self.version:
+                return cached[1]
+            columns = [yahoo_finance_map[a] for a in UNIVERSE]
+            closes = self.closes.reindex(columns=columns)
+            closes.columns = UNIVERSE
+            returns = log_returns(align_closes(closes, frequency)) if not closes.empty else pd.DataFrame(columns=UNIVERSE + [DXY_PROXY])
+            self._returns[frequency] = (self.version, returns)
+            return returns
+
+    def _result(self, window, frequency):
+        """Covariâncias móveis de (janela, frequência), recalculadas só a partir da primeira linha alterada."""
+        returns = self.returns(frequency)
+        key = (window, frequency)
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None and entry["version"] == self.version:
+                return entry
+            start = first_changed_row(entry["returns"], returns) if entry is not None else 0
+            values = returns.to_numpy(dtype=float)
+            fresh = rolling_covariance(values, window, start) if len(values) > start else np.empty((0,) + (values.shape[1],) * 2, dtype=np.float32)
+            cov = np.concatenate([entry["cov"][:start], fresh]) if start else fresh
+            entry = self._results[key] = {"version": self.version, "returns": returns, "cov": cov}
+            return entry
+
+    # --- CONSULTAS ---
+
+    def _row(self, entry, date):
+        if date is None:
+            return len(entry["returns"]) - 1
+        return int(entry["returns"].index.searchsorted(pd.Timestamp(date), side="right")) - 1
+
+    def correlation(self, window=None, frequency="daily", date=None):
+        """
+        Matriz de correlação (ativos x ativos) da janela que termina na última data (ou em 'date').
+
+        Returns:
+            pd.DataFrame: Correlações; vazio se ainda não houver uma janela completa.
+        """
+        entry = self._result(window or DEFAULT_WINDOWS[frequency], frequency)
+        row = self._row(entry, date)
+        if row < 0:
+            return pd.DataFrame()
+        cov = entry["cov"][row].astype(float)
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = cov / np.outer(std, std)
+        names = entry["returns"].columns
+        return pd.DataFrame(np.clip(corr, -1, 1), index=names, columns=names)
+
+    def correlation_series(self, asset_a, asset_b, window=None, frequency="daily"):
+        """Correlação móvel entre dois ativos ao longo do tempo."""
+        entry = self._result(window or DEFAULT_WINDOWS[frequency], frequency)
+        names = list(entry["returns"].columns)
+        i, j = names.index(asset_a), names.index(asset_b)
+        cov = entry["cov"]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = cov[:, i, j] / np.sqrt(cov[:, i, i] * cov[:, j, j])
+        return pd.Series(np.clip(corr, -1, 1), index=entry["returns"].index, name=f"{asset_a} x {asset_b}")
+
+    def betas(self, window=None, frequency="daily", benchmarks=BENCHMARKS, date=None):
+        """
+        Beta de cada ativo a cada referência (cov(ativo, ref) / var(ref)) na última janela.
+
+        Returns:
+            pd.DataFrame: Ativos x referências; vazio se ainda não houver uma janela completa.
+        """
+        entry = self._result(window or DEFAULT_WINDOWS[frequency], frequency)
+        row = self._row(entry, date)
+        if row < 0:
+            return pd.DataFrame()
+        names = list(entry["returns"].columns)
+        positions = [names.index(b) for b in benchmarks]
+        cov = entry["cov"][row].astype(float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            betas = cov[:, positions] / np.diag(cov)[positions]
+        return pd.DataFrame(betas, index=names, columns=list(benchmarks))
+
+    def currency_strength(self, window=None, frequency="daily"):
+        """
+        Força relativa das moedas a partir de todos os pares do Forex.
+
+        O retorno de cada par é a diferença entre a força da moeda base e a da cotada; a força de
+        cada data é a solução de mínimos quadrados (com soma zero) desse sistema, obtida para
+        todas as datas com uma única multiplicação pela pseudo-inversa da matriz de incidência.
+
+        Returns:
+            dict: "index" (pd.DataFrame datas x moedas, base 100) e "change" (pd.Series, variação
+                  em % na última janela, da mais forte para a mais fraca).
+        """
+        window = window or DEFAULT_WINDOWS[frequency]
+        returns = self.returns(frequency)
+        currencies, incidence = currency_incidence()
+        pairs = returns.reindex(columns=FOREX_PAIRS).to_numpy(dtype=float)
+        strength = np.nan_to_num(pairs) @ np.linalg.pinv(incidence).T
+        index = pd.DataFrame(100 * np.exp(np.cumsum(strength, axis=0)), index=returns.index, columns=currencies)
+        change = (np.exp(strength[-window:].sum(axis=0)) - 1) * 100 if len(strength) else np.full(len(currencies), np.nan)
+        return {"index": index, "change": pd.Series(change, index=currencies).sort_values(ascending=False)}
+
+# --- SERVIÇO PARTILHADO ---
+
+_services = {}
+_services_lock = threading.Lock()
+
+def get_cross_asset_service(db_path=None, refresh=True):
+    """Devolve o serviço partilhado pelo processo, atualizado com as barras novas de 'price_data'."""
+    key = db_path or DB_PATH
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            service = _services[key] = CrossAssetService(key)
+    if refresh:
+        service.refresh()
+    return service
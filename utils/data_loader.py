@@ -2,15 +2,22 @@
 
 import streamlit as st
 import pandas as pd
-import yfinance as yf
 from datetime import datetime
+from .price_store import get_prices
+from .fetch_scheduler import get_default_scheduler
+from .seasonality_engine import get_seasonality_cube
+from .cross_asset import get_cross_asset_service
+from .config import yahoo_finance_map
+from .disk_cache import cached
 
 # --- FUNÇÃO DE CARREGAMENTO DE DADOS DE PREÇOS ---
 
-@st.cache_data(ttl=900) # Cache de 15 minutos para dados de preço
+@cached("prices") # Cache de 15 minutos (memória + disco partilhado entre processos)
 def get_yfinance_data(tickers, period="5y", start=None, end=None, include_ohlc=False):
     """
     Busca dados de preços do Yahoo Finance de forma robusta.
+    Os preços de fecho são servidos pelo armazenamento local (price_store), que só pede
+    ao yfinance as barras em falta; os pedidos OHLC de um único ticker vão diretamente ao yfinance.
 
     Args:
         tickers (str or list): O(s) ticker(s) do(s) ativo(s).
@@ -24,13 +31,24 @@ def get_yfinance_data(tickers, period="5y", start=None, end=None, include_ohlc=F
         pd.DataFrame: Um DataFrame com os dados do ativo. Retorna um DataFrame vazio em caso de erro.
     """
     try:
+        if not (isinstance(tickers, str) and include_ohlc):
+            # O agendador partilhado junta pedidos concorrentes de vários gráficos numa só chamada.
+            prices = get_prices(tickers, period=period, start=start, end=end, fetcher=get_default_scheduler().fetch)
+            if prices.empty:
+                return pd.DataFrame()
+            # Mantém o formato anterior: coluna 'Close' para um único ticker, uma coluna por ticker para vários.
+            return prices.rename(columns={tickers: 'Close'}) if isinstance(tickers, str) else prices
+
+        import yfinance as yf  # Só os gráficos OHLC precisam do yfinance nesta página.
+        from .http_client import get_yfinance_session
         data = yf.download(
             tickers=tickers,
             period=period,
             start=start,
             end=end,
             progress=False,
-            auto_adjust=True # auto_adjust=True já remove colunas como "Adj Close"
+            auto_adjust=True, # auto_adjust=True já remove colunas como "Adj Close"
+            session=get_yfinance_session() # Sessão curl_cffi partilhada (pool de ligações)
         )
         if data.empty:
             return pd.DataFrame()
@@ -53,3 +71,19 @@ def get_yfinance_data(tickers, period="5y", start=None, end=None, include_ohlc=F
         st.error(f"Erro ao buscar dados do yfinance para {tickers}: {e}")
         return pd.DataFrame()
 
+def prefetch_yahoo_universe(period="5y"):
+    """
+    Atualiza de uma só vez o armazenamento local para todos os ativos de 'yahoo_finance_map',
+    em chamadas multi-ticker em vez de uma por ativo, passa as barras novas ao cubo de sazonalidade
+    e ao serviço entre ativos, e atualiza o snapshot colunar (se existir).
+    """
+    try:
+        prices = get_prices(list(yahoo_finance_map.values()), period=period, fetcher=get_default_scheduler().fetch)
+        get_seasonality_cube()
+        get_cross_asset_service()
+        from .snapshot_store import refresh_snapshots
+        refresh_snapshots()
+        return prices
+    except Exception as e:
+        st.error(f"Erro ao pré-carregar o universo de ativos: {e}")
+        return pd.DataFrame()
@@ -0,0 +1,252 @@
+# marketlens/utils/disk_cache.py
+
+"""
+Cache em dois níveis para os carregadores de dados (preços, COT e leituras do Firestore).
+
+O primeiro nível é uma LRU em memória, limitada em bytes; o segundo é um ficheiro SQLite
+partilhado por todos os processos Streamlit da mesma máquina (modo WAL, escritas atómicas),
+que sobrevive a reinícios. Cada classe de dados tem a sua validade (CACHE_TTLS); uma entrada
+lida do disco fica em memória apenas até ao fim da validade registada no disco.
+
+Os valores são guardados serializados (pickle): cada leitura devolve uma cópia, como o
+st.cache_data. Resultados vazios (None, DataFrame ou lista vazios) não são guardados, para
+que um erro momentâneo do fornecedor não fique em cache.
+
+As escritas da aplicação invalidam as entradas afetadas no disco e na memória do processo que
+escreve; os outros processos deixam de ver a entrada antiga no disco de imediato e na sua
+memória, no máximo, ao fim da validade.
+
+    @cached("prices")
+    def get_yfinance_data(tickers, period="5y", ...): ...
+
+    @cached("firestore", tag_param="user_id")      # invalidate("firestore", tag=user_id)
+    def get_trading_accounts(user_id): ...
+"""
+
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from .config import DB_PATH
+
+# Validade (segundos) de cada classe de dados.
+CACHE_TTLS = {
+    "prices": 900,
+    "cot": 24 * 3600,
+    "firestore": 300,
+}
+MEMORY_MAX_BYTES = int(os.environ.get("MARKETLENS_CACHE_MEMORY_BYTES", 256 * 1024 * 1024))
+DISK_MAX_BYTES = int(os.environ.get("MARKETLENS_CACHE_DISK_BYTES", 1024 * 1024 * 1024))
+DISK_CACHE_PATH = os.environ.get("MARKETLENS_CACHE_PATH", os.path.join(os.path.dirname(DB_PATH), "marketlens_cache.db"))
+# A limpeza do disco (expirados e excesso de tamanho) corre a cada N escritas.
+PRUNE_EVERY_WRITES = 50
+
+COUNTERS = ("memory_hits", "disk_hits", "misses", "writes", "evictions", "invalidations")
+
+def _is_empty(value):
+    if value is None:
+        return True
+    empty = getattr(value, "empty", None)
+    if isinstance(empty, bool):
+        return empty
+    return isinstance(value, (list, dict, tuple)) and len(value) == 0
+
+class TwoLevelCache:
+    """LRU em memória (limitada em bytes) à frente de um armazenamento SQLite partilhado."""
+
+    def __init__(self, path=None, memory_max_bytes=MEMORY_MAX_BYTES, disk_max_bytes=DISK_MAX_BYTES, ttls=None):
+        self.path = path or DISK_CACHE_PATH
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.ttls = {**CACHE_TTLS, **(ttls or {})}
+        self._memory = OrderedDict()  # chave -> (classe, etiqueta, expira_em, bytes, valor serializado)
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        self.counters = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+
+    # --- DISCO ---
+
+    def _conn(self):
+        """Uma ligação por thread; WAL permite leituras concorrentes de vários processos."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    data_class TEXT,
+                    tag TEXT,
+                    expires_at REAL,
+                    size INTEGER,
+                    value BLOB
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_tag ON cache_entries (data_class, tag)")
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    def _prune_disk(self, now):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+            if total > self.disk_max_bytes:
+                # Remove primeiro as entradas que expiram mais cedo até ficar abaixo do limite.
+                excess, removed = total - self.disk_max_bytes, []
+                for key, size in conn.execute("SELECT key, size FROM cache_entries ORDER BY expires_at"):
+                    removed.append((key,)); excess -= size
+                    if excess <= 0:
+                        break
+                conn.executemany("DELETE FROM cache_entries WHERE key = ?", removed)
+
+    # --- MEMÓRIA ---
+
+    def _remember(self, key, data_class, tag, expires_at, blob):
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old[4])
+            if len(blob) > self.memory_max_bytes:
+                return
+            self._memory[key] = (data_class, tag, expires_at, len(blob), blob)
+            self._memory_bytes += len(blob)
+            while self._memory_bytes > self.memory_max_bytes:
+                _, (evicted_class, _, _, size, _) = self._memory.popitem(last=False)
+                self._memory_bytes -= size
+                self.counters[evicted_class]["evictions"] += 1
+
+    # --- API ---
+
+    def get(self, data_class, key):
+        """Devolve (True, valor) se a chave estiver em cache e válida, senão (False, None)."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[2] > now:
+                    self._memory.move_to_end(key)
+                    self.counters[data_class]["memory_hits"] += 1
+                    blob = entry[4]
+                else:
+                    self._memory.pop(key); self._memory_bytes -= entry[3]; blob = None
+                if blob is not None:
+                    return True, pickle.loads(blob)
+        try:
+            row = self._conn().execute(
+                "SELECT tag, expires_at, value FROM cache_entries WHERE key = ? AND expires_at > ?", (key, now)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Erro ao ler a cache em disco: {e}")
+            row = None
+        if row is None:
+            self.counters[data_class]["misses"] += 1
+            return False, None
+        tag, expires_at, blob = row
+        self._remember(key, data_class, tag, expires_at, blob)
+        self.counters[data_class]["disk_hits"] += 1
+        return True, pickle.loads(blob)
+
+    def set(self, data_class, key, value, tag=None, ttl=None):
+        """Guarda um valor nos dois níveis, com a validade da sua classe."""
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.ttls[data_class])
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._remember(key, data_class, tag, expires_at, blob)
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO cache_entries (key, data_class, tag, expires_at, size, value) VALUES (?, ?, ?, ?, ?, ?)",
+                             (key, data_class, tag, expires_at, len(blob), blob))
+            self._writes += 1
+            if self._writes % PRUNE_EVERY_WRITES == 0:
+                self._prune_disk(now)
+        except sqlite3.Error as e:
+            print(f"Erro ao escrever na cache em disco: {e}")
+        self.counters[data_class]["writes"] += 1
+
+    def invalidate(self, data_class, tag=None):
+        """Descarta as entradas de uma classe (todas, ou apenas as de uma etiqueta, ex.: um utilizador)."""
+        tag = None if tag is None else str(tag)
+        with self._lock:
+            for key in [k for k, e in self._memory.items() if e[0] == data_class and (tag is None or e[1] == tag)]:
+                self._memory_bytes -= self._memory.pop(key)[3]
+        try:
+            conn = self._conn()
+            with conn:
+                if tag is None:
+                    conn.execute("DELETE FROM cache_entries WHERE data_class = ?", (data_class,))
+                else:
+                    conn.execute("DELETE FROM cache_entries WHERE data_class = ? AND tag = ?", (data_class, tag))
+        except sqlite3.Error as e:
+            print(f"Erro ao invalidar a cache em disco: {e}")
+        self.counters[data_class]["invalidations"] += 1
+
+    def stats(self):
+        """Contadores por classe de dados e ocupação da memória."""
+        return {"memory_bytes": self._memory_bytes, "memory_entries": len(self._memory),
+                "classes": {c: dict(v) for c, v in self.counters.items()}}
+
+# --- CACHE PARTILHADA E DECORADOR ---
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_default_cache():
+    """Devolve a cache partilhada pelo processo."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = TwoLevelCache()
+        return _default_cache
+
+def invalidate(data_class, tag=None):
+    """Atalho para invalidar a cache partilhada (ex.: depois de uma escrita no Firestore)."""
+    get_default_cache().invalidate(data_class, tag)
+
+def cache_stats():
+    """Contadores da cache partilhada."""
+    return get_default_cache().stats()
+
+def cached(data_class, tag_param=None, ttl=None):
+    """
+    Decorador: guarda o resultado da função na cache partilhada, por argumentos.
+
+    Args:
+        data_class (str): Classe de dados ("prices", "cot", "firestore"); define a validade.
+        tag_param (str, optional): Argumento usado como etiqueta para invalidate(data_class, tag). Defaults to None.
+        ttl (float, optional): Validade própria, em segundos (em vez da da classe). Defaults to None.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        prefix = f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            try:
+                digest = hashlib.sha256(pickle.dumps(sorted(bound.arguments.items()), protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+            except Exception:
+                return func(*args, **kwargs)  # Argumentos não serializáveis: sem cache.
+            key = f"{prefix}:{digest}"
+            cache = get_default_cache()
+            hit, value = cache.get(data_class, key)
+            if hit:
+                return value
+            value = func(*args, **kwargs)
+            if not _is_empty(value):
+                tag = bound.arguments.get(tag_param) if tag_param else None
+                cache.set(data_class, key, value, tag=None if tag is None else str(tag), ttl=ttl)
+            return value
+
+        wrapper.uncached = func
+        return wrapper
+    return decorator
@@ -0,0 +1,134 @@
+# marketlens/utils/fetch_scheduler.py
+
+"""
+Agendador de pedidos de preços: junta pedidos concorrentes de um só ticker em chamadas
+multi-ticker ao fornecedor (yf.download aceita vários tickers de uma vez).
+
+Os pedidos que chegam dentro de uma pequena janela de tempo são agrupados pela data de fim e
+por datas de início próximas (até MAX_START_SPREAD_DAYS da mais antiga do grupo): um ticker sem
+histórico, que pede anos, não alarga as chamadas dos que só precisam da cauda. Cada grupo é
+pedido com a sua menor data de início e o resultado é depois repartido por quem pediu.
+Pedidos repetidos (mesmo ticker e intervalo) ainda em curso partilham o mesmo resultado.
+"""
+
+import threading
+from concurrent.futures import Future
+import pandas as pd
+
+# Distância máxima entre datas de início de pedidos enviados na mesma chamada.
+MAX_START_SPREAD_DAYS = 31
+
+class FetchScheduler:
+    """Agrupa e deduplica pedidos de preços antes de os enviar ao fornecedor."""
+
+    def __init__(self, fetcher=None, window=0.05, max_batch=50):
+        """
+        Args:
+            fetcher (callable, optional): fetcher(tickers, start, end) -> DataFrame largo de fechos.
+                                          Defaults to price_store.http_fetcher.
+            window (float, optional): Segundos de espera para juntar pedidos. Defaults to 0.05.
+            max_batch (int, optional): Número máximo de tickers por chamada. Defaults to 50.
+        """
+        if fetcher is None:
+            from .price_store import http_fetcher
+            fetcher = http_fetcher
+        self.fetcher = fetcher
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._pending = {}   # (ticker, start, end) -> Future, ainda por enviar
+        self._inflight = {}  # (ticker, start, end) -> Future, por resolver
+        self._timer = None
+        self.stats = {"requests": 0, "deduplicated": 0, "upstream_calls": 0}
+
+    def fetch(self, tickers, start, end=None):
+        """Mesma assinatura de um fetcher: pode ser passado diretamente a price_store.get_prices."""
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        futures = []
+        with self._lock:
+            for t in tickers:
+                key = (t, start, end)
+                self.stats["requests"] += 1
+                if key in self._inflight:
+                    self.stats["deduplicated"] += 1
+                else:
+                    future = Future()
+                    self._inflight[key] = future
+                    self._pending[key] = future
+                futures.append(self._inflight[key])
+            if self._pending and self._timer is None:
+                self._timer = threading.Timer(self.window, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        frames = [f.result() for f in futures]
+        frames = [f for f in frames if not f.empty]
+        return pd.concat(frames, axis=1) if frames else pd.DataFrame()
+
+    def _flush(self):
+        """
+        Envia os pedidos acumulados, agrupados por data de fim e datas de início próximas,
+        em blocos de 'max_batch' tickers.
+        """
+        with self._lock:
+            pending, self._pending, self._timer = self._pending, {}, None
+
+        by_end = {}
+        for key in pending:
+            by_end.setdefault(key[2], []).append(key)
+        groups = []
+        for end, keys in by_end.items():
+            # Por ordem de início, um novo grupo começa quando o início se afasta demasiado do primeiro do grupo.
+            group_start = None
+            for key in sorted(keys, key=lambda k: pd.Timestamp(k[1])):
+                key_start = pd.Timestamp(key[1])
+                if group_start is None or key_start - group_start > pd.Timedelta(days=MAX_START_SPREAD_DAYS):
+                    group_start = key_start
+                    groups.append((end, []))
+                groups[-1][1].append(key)
+
+        for end, keys in groups:
+            tickers = list(dict.fromkeys(k[0] for k in keys))
+            for i in range(0, len(tickers), self.max_batch):
+                chunk = set(tickers[i:i + self.max_batch])
+                chunk_keys = [k for k in keys if k[0] in chunk]
+                self._run_batch(chunk_keys, end, pending)
+
+    def _run_batch(self, keys, end, pending):
+        tickers = list(dict.fromkeys(k[0] for k in keys))
+        start = min(k[1] for k in keys)
+        try:
+            with self._lock:
+                self.stats["upstream_calls"] += 1
+            frame = self.fetcher(tickers, start, end)
+            if frame is not None and not frame.empty:
+                frame = frame.copy()
+                frame.index = pd.to_datetime(frame.index)
+            for key in keys:
+                t, t_start, _ = key
+                if frame is None or frame.empty or t not in frame.columns:
+                    result = pd.DataFrame()
+                else:
+                    result = frame.loc[frame.index >= pd.Timestamp(t_start), [t]]
+                pending[key].set_result(result)
+        except Exception as e:
+            for key in keys:
+                if not pending[key].done():
+                    pending[key].set_exception(e)
+        finally:
+            with self._lock:
+                for key in keys:
+                    self._inflight.pop(key, None)
+
+# --- AGENDADOR PARTILHADO ---
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+def get_default_scheduler():
+    """Devolve o agendador partilhado pelo processo, sobre o fornecedor por defeito (price_store.http_fetcher)."""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = FetchScheduler()
+        return _default_scheduler
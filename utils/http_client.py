@@ -0,0 +1,191 @@
+# marketlens/utils/http_client.py
+
+"""
+Cliente HTTP partilhado pelos carregadores de dados.
+
+- get_session(): sessão requests-cache partilhada pelo processo, com cache HTTP em disco
+  (SQLite, junto da cache de dados) e um pool de ligações keep-alive por host. Respeita o
+  Cache-Control do servidor e, quando uma resposta expira, revalida-a com um pedido
+  condicional (If-None-Match / If-Modified-Since): um 304 renova a entrada sem voltar a
+  transferir o corpo. Se o servidor falhar, uma resposta expirada ainda serve.
+- get_yfinance_session(): sessão curl_cffi partilhada, injetada no yf.download. O yfinance
+  recusa sessões com cache (requests_cache) e precisa do curl_cffi para se apresentar como
+  um browser; por isso a cache HTTP aplica-se às chamadas diretas feitas com get_session().
+- fetch_json_async() / gather_json(): pedidos asyncio com concorrência limitada por um
+  semáforo e novas tentativas com backoff exponencial (e Retry-After) em 429, 5xx e erros de
+  ligação. Os pedidos correm em threads, sobre a mesma sessão (e o mesmo pool).
+
+As sessões são criadas na primeira chamada, como os clientes de firebase_config.
+"""
+
+import asyncio
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .config import DB_PATH
+
+HTTP_CACHE_PATH = os.environ.get("MARKETLENS_HTTP_CACHE_PATH", os.path.join(os.path.dirname(DB_PATH), "marketlens_http_cache.db"))
+# Validade de uma resposta sem Cache-Control do servidor (depois disso é revalidada).
+HTTP_CACHE_EXPIRE_SECONDS = 900
+# Ligações keep-alive guardadas por host (deve cobrir a concorrência máxima).
+POOL_MAXSIZE = 16
+MAX_CONCURRENCY = 8
+MAX_RETRIES = 3
+BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = 30
+REQUEST_TIMEOUT = 15
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/124.0 Safari/537.36")
+
+_session = None
+_yfinance_session = None
+_session_lock = threading.Lock()
+_yfinance_lock = threading.Lock()
+
+class HTTPFetchError(Exception):
+    """Pedido HTTP falhado (depois das novas tentativas, se o erro as justificar)."""
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+# --- SESSÕES ---
+
+def new_session(cache_path=HTTP_CACHE_PATH, expire_after=HTTP_CACHE_EXPIRE_SECONDS, pool_maxsize=POOL_MAXSIZE):
+    """
+    Cria uma sessão requests-cache com pool de ligações (use get_session() para a partilhada).
+
+    Args:
+        cache_path (str, optional): Ficheiro SQLite da cache HTTP; None desliga a cache. Defaults to HTTP_CACHE_PATH.
+        expire_after (int, optional): Validade (s) das respostas sem Cache-Control. Defaults to HTTP_CACHE_EXPIRE_SECONDS.
+        pool_maxsize (int, optional): Ligações keep-alive por host. Defaults to POOL_MAXSIZE.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    if cache_path is None:
+        session = requests.Session()
+    else:
+        import requests_cache
+        session = requests_cache.CachedSession(
+            cache_path, backend="sqlite", expire_after=expire_after, cache_control=True,
+            allowable_codes=(200,), stale_if_error=True,
+        )
+    # As novas tentativas são feitas em fetch_json_async (com backoff), não no adaptador.
+    adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT, "Accept": "application/json"})
+    return session
+
+def get_session():
+    """Sessão HTTP com cache e pool, criada na primeira chamada e partilhada pelo processo."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = new_session()
+    return _session
+
+def get_yfinance_session():
+    """
+    Sessão curl_cffi partilhada para passar ao yfinance (session=...), ou None se o curl_cffi
+    não estiver instalado (o yfinance usa então a sua própria sessão).
+    """
+    global _yfinance_session
+    if _yfinance_session is None:
+        with _yfinance_lock:
+            if _yfinance_session is None:
+                try:
+                    from curl_cffi import requests as curl_requests
+                except ImportError:
+                    return None
+                _yfinance_session = curl_requests.Session(impersonate="chrome")
+    return _yfinance_session
+
+# --- PEDIDOS ASSÍNCRONOS ---
+
+def _retry_after(response):
+    value = response.headers.get("Retry-After")
+    try:
+        return min(float(value), MAX_BACKOFF_SECONDS) if value is not None else None
+    except ValueError:
+        return None
+
+def _get_json(session, url, params, timeout):
+    import requests
+    try:
+        response = session.get(url, params=params, timeout=timeout)
+    except requests.RequestException as e:
+        raise HTTPFetchError(f"{url}: {e}") from e
+    if response.status_code != 200:
+        raise HTTPFetchError(f"{url}: HTTP {response.status_code}", response.status_code, _retry_after(response))
+    return response.json()
+
+async def fetch_json_async(url, params=None, session=None, semaphore=None, retries=MAX_RETRIES,
+                           backoff=BACKOFF_SECONDS, timeout=REQUEST_TIMEOUT, executor=None):
+    """
+    GET de um documento JSON, com novas tentativas em erros transitórios.
+
+    Args:
+        url (str): Endereço.
+        params (dict, optional): Parâmetros da query string.
+        session (optional): Sessão requests. Defaults to get_session().
+        semaphore (asyncio.Semaphore, optional): Limita os pedidos simultâneos (partilhado entre pedidos).
+        retries (int, optional): Novas tentativas depois da primeira. Defaults to MAX_RETRIES.
+        backoff (float, optional): Espera base (s), duplicada a cada tentativa, com jitter. Defaults to BACKOFF_SECONDS.
+        timeout (float, optional): Timeout de cada pedido (s). Defaults to REQUEST_TIMEOUT.
+        executor (Executor, optional): Onde correm os pedidos (bloqueantes). Defaults to o executor do event loop.
+
+    Raises:
+        HTTPFetchError: Erro não transitório (ex.: 404) ou tentativas esgotadas.
+    """
+    session = session or get_session()
+    loop = asyncio.get_running_loop()
+    for attempt in range(retries + 1):
+        try:
+            if semaphore is None:
+                return await loop.run_in_executor(executor, _get_json, session, url, params, timeout)
+            async with semaphore:
+                return await loop.run_in_executor(executor, _get_json, session, url, params, timeout)
+        except HTTPFetchError as e:
+            if attempt == retries or (e.status is not None and e.status not in RETRY_STATUSES):
+                raise
+            # A espera é feita fora do semáforo, para não ocupar uma vaga.
+            delay = e.retry_after if e.retry_after is not None else backoff * 2 ** attempt * (1 + random.random() / 4)
+            await asyncio.sleep(min(delay, MAX_BACKOFF_SECONDS))
+
+async def gather_json(requests_, concurrency=MAX_CONCURRENCY, **kwargs):
+    """
+    Vários pedidos JSON em paralelo, no máximo 'concurrency' de cada vez.
+
+    Args:
+        requests_ (list): [(url, params)].
+        concurrency (int, optional): Pedidos simultâneos. Defaults to MAX_CONCURRENCY.
+        **kwargs: Argumentos de fetch_json_async (session, retries, backoff, timeout).
+
+    Returns:
+        list: Um resultado por pedido, pela mesma ordem: o JSON ou a exceção (HTTPFetchError).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    # Um executor por lote, com uma thread por vaga do semáforo.
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="marketlens-http")
+    try:
+        return await asyncio.gather(*(fetch_json_async(url, params, semaphore=semaphore, executor=executor, **kwargs)
+                                      for url, params in requests_), return_exceptions=True)
+    finally:
+        executor.shutdown(wait=False)
+
+def run_async(coro):
+    """
+    Executa uma corrotina a partir de código síncrono (páginas Streamlit, fetchers do price_store).
+    Se já houver um event loop a correr nesta thread, a corrotina corre numa thread à parte.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
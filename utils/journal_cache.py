@@ -0,0 +1,200 @@
+# marketlens/utils/journal_cache.py
+
+"""
+Cache de leitura do diário de trading, por utilizador.
+
+O diário é lido por completo uma única vez; as sincronizações seguintes pedem ao Firestore
+apenas os documentos com 'updated_at' ou 'created_at' mais recente do que o último visto (os
+registos criados por outros clientes podem não ter 'updated_at'). As escritas feitas pela
+aplicação (add/update/delete_journal_entry) são aplicadas diretamente na cache, e uma
+sincronização completa periódica apanha apagamentos e escritas sem nenhum dos dois campos.
+
+'stats' conta os documentos lidos (total e na última sincronização), para mostrar o custo das
+leituras (ver benchmarks/bench_journal_cache.py).
+
+O registo por utilizador é limitado: as caches sem uso há IDLE_EVICT_SECONDS são esquecidas, e
+acima de MAX_CACHED_USERS sai a usada há mais tempo. O logout esquece a cache do utilizador.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+import pandas as pd
+
+# Intervalo máximo entre duas leituras completas do diário.
+FULL_RESYNC_SECONDS = 600
+# Limites do registo de caches (por processo).
+MAX_CACHED_USERS = 50
+IDLE_EVICT_SECONDS = 3600
+
+_caches = OrderedDict()  # user_id -> (JournalCache, último acesso em time.monotonic()), do mais antigo ao mais recente
+_registry_lock = threading.Lock()
+
+def _as_utc(value):
+    """Normaliza um tempo (naive = UTC, como o datetime.utcnow() usado nas escritas) para UTC com fuso."""
+    if not isinstance(value, datetime):
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def _prepare_trade(doc_id, data):
+    trade = dict(data)
+    trade['doc_id'] = doc_id
+    if 'trade_date' in trade and isinstance(trade['trade_date'], str):
+        trade['trade_date'] = pd.to_datetime(trade['trade_date'])
+    return trade
+
+class JournalCache:
+    """Cópia local do diário de um utilizador, mantida por deltas."""
+
+    def __init__(self, user_id, client=None, full_resync_seconds=FULL_RESYNC_SECONDS):
+        """
+        Args:
+            user_id (str): O utilizador.
+            client (optional): Cliente Firestore (ou um substituto em memória). Defaults to firebase_config.get_db().
+            full_resync_seconds (int, optional): Intervalo entre leituras completas.
+        """
+        if client is None:
+            from firebase_config import get_db
+            client = get_db()
+        self.user_id = user_id
+        self.client = client
+        self.full_resync_seconds = full_resync_seconds
+        self.trades = {}          # doc_id -> registo (com 'doc_id' e 'trade_date' convertido)
+        self.watermark = None     # maior 'updated_at'/'created_at' visto (UTC)
+        self.last_full_sync = None
+        self.stats = {"syncs": 0, "full_syncs": 0, "docs_read": 0, "last_sync_reads": 0}
+        self._frame = None        # DataFrame construído a partir de 'trades', invalidado em cada alteração
+        self._lock = threading.Lock()
+
+    def _collection(self):
+        return self.client.collection("user_profiles").document(self.user_id).collection("journal_entries")
+
+    def _track(self, trade):
+        for field in ('updated_at', 'created_at'):
+            stamp = _as_utc(trade.get(field))
+            if stamp is not None:
+                if self.watermark is None or stamp > self.watermark:
+                    self.watermark = stamp
+                break
+
+    def sync(self, force_full=False):
+        """
+        Sincroniza com o Firestore: leitura completa na primeira vez (ou quando expira o intervalo),
+        senão apenas os documentos alterados desde a última sincronização.
+
+        Returns:
+            int: Número de documentos lidos nesta sincronização.
+        """
+        with self._lock:
+            now = datetime.now(timezone.utc)
+            full = (force_full or self.last_full_sync is None or self.watermark is None
+                    or (now - self.last_full_sync).total_seconds() > self.full_resync_seconds)
+            if full:
+                docs = self._collection().stream()
+                trades, self.watermark = {}, None
+            else:
+                from google.cloud.firestore_v1.base_query import FieldFilter, Or
+                # Uma só consulta (cada documento é lido uma vez, mesmo que cumpra as duas condições).
+                docs = self._collection().where(filter=Or([FieldFilter("updated_at", ">", self.watermark),
+                                                           FieldFilter("created_at", ">", self.watermark)])).stream()
+                trades = self.trades
+
+            reads = 0
+            for doc in docs:
+                trade = _prepare_trade(doc.id, doc.to_dict())
+                trades[doc.id] = trade
+                self._track(trade)
+                reads += 1
+            self.trades = trades
+
+            if full:
+                self.last_full_sync = now
+                self.stats["full_syncs"] += 1
+            if full or reads:
+                self._frame = None
+            self.stats["syncs"] += 1
+            self.stats["docs_read"] += reads
+            self.stats["last_sync_reads"] = reads
+            return reads
+
+    # --- INVALIDAÇÃO EXPLÍCITA (ESCRITAS FEITAS PELA APLICAÇÃO) ---
+
+    def apply_write(self, doc_id, entry_data, merge=True):
+        """
+        Aplica localmente uma escrita já confirmada no Firestore (criação ou atualização).
+        A marca de sincronização não avança: outras escritas concorrentes continuam a ser apanhadas
+        pelo próximo delta (que relê também esta, com um custo de uma leitura).
+        """
+        with self._lock:
+            base = self.trades.get(doc_id, {}) if merge else {}
+            self.trades[doc_id] = _prepare_trade(doc_id, {**base, **entry_data})
+            self._frame = None
+
+    def remove(self, doc_id):
+        """Retira localmente um registo apagado no Firestore."""
+        with self._lock:
+            if self.trades.pop(doc_id, None) is not None:
+                self._frame = None
+
+    # --- LEITURA ---
+
+    def records(self, status_filter="Todos"):
+        """
+        Registos em cache (os próprios dicionários, só para leitura) com o filtro de status, pela
+        ordem de to_dataframe (mais recentes primeiro), sem construir o DataFrame do diário.
+        """
+        with self._lock:
+            trades = list(self.trades.values())
+        if status_filter == "Abertos":
+            trades = [t for t in trades if t.get('status') in ("Em Aberto", "Pendente")]
+        elif status_filter != "Todos":
+            trades = [t for t in trades if t.get('status') == status_filter]
+        dated = sorted((t for t in trades if t.get('trade_date') is not None), key=lambda t: t['trade_date'], reverse=True)
+        return dated + [t for t in trades if t.get('trade_date') is None]
+
+    def to_dataframe(self, status_filter="Todos"):
+        """Devolve o diário em cache no formato de get_journal_entries, com o filtro de status aplicado localmente."""
+        with self._lock:
+            if self._frame is None:
+                df = pd.DataFrame(list(self.trades.values()))
+                if 'trade_date' in df.columns:
+                    df = df.sort_values(by='trade_date', ascending=False)
+                self._frame = df
+            df = self._frame
+
+        if df.empty:
+            return pd.DataFrame()
+        if status_filter == "Abertos":
+            df = df[df['status'].isin(["Em Aberto", "Pendente"])]
+        elif status_filter != "Todos":
+            df = df[df['status'] == status_filter]
+        return df.copy()
+
+# --- REGISTO POR UTILIZADOR ---
+
+def _evict(now):
+    """Retira do registo as caches paradas há mais de IDLE_EVICT_SECONDS e as excedentes (LRU). Chamar com o lock."""
+    while _caches:
+        user_id, (_, last_used) = next(iter(_caches.items()))
+        if len(_caches) <= MAX_CACHED_USERS and now - last_used <= IDLE_EVICT_SECONDS:
+            break
+        del _caches[user_id]
+
+def get_journal_cache(user_id, client=None, create=True):
+    """Devolve a cache do diário do utilizador (partilhada pelo processo); None se não existir e create=False."""
+    with _registry_lock:
+        now = time.monotonic()
+        entry = _caches.pop(user_id, None)
+        if entry is None and not create:
+            _evict(now)
+            return None
+        cache = entry[0] if entry is not None else JournalCache(user_id, client=client)
+        _caches[user_id] = (cache, now)
+        _evict(now)
+        return cache
+
+def drop_journal_cache(user_id):
+    """Esquece a cache de um utilizador (ex.: no logout)."""
+    with _registry_lock:
+        _caches.pop(user_id, None)
@@ -0,0 +1,186 @@
+# marketlens/utils/journal_export.py
+
+"""
+Exportação completa do diário (CSV ou Parquet) com as colunas derivadas dos relatórios.
+
+O diário é percorrido em blocos (a cache do diário, se já estiver carregada, ou páginas do
+Firestore com start_after/limit); em cada bloco são calculadas as colunas derivadas
+(r_multiple e pnl_usd, como em reporting_engine.prepare_trades, e o P&L atribuído a cada
+conta, como em account_attribution) e o bloco é escrito de imediato no destino: CSV por
+blocos de texto, Parquet por row groups. Em memória fica apenas um bloco de cada vez, por
+isso o pico de memória não cresce com o tamanho do diário.
+
+As colunas (e o schema Parquet) são fixas, definidas pelas contas do utilizador, para que
+todos os blocos tenham o mesmo formato.
+"""
+
+import io
+import numpy as np
+import pandas as pd
+from firebase_config import get_db
+from .journal_cache import get_journal_cache
+from .reporting_engine import prepare_trades
+from .account_attribution import build_weights
+
+EXPORT_FORMATS = ("csv", "parquet")
+EXPORT_CHUNK_SIZE = 1000
+MIME_TYPES = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+DATE_COLUMNS = ["trade_date", "exit_date"]
+TEXT_COLUMNS = ["doc_id", "asset", "direction", "selected_setup", "status", "accounts", "notes"]
+NUMERIC_COLUMNS = ["entry_price", "stop_loss", "target_price", "exit_price", "risk_percentage", "risk_usd", "r_multiple", "pnl_usd"]
+BASE_COLUMNS = ["doc_id", "trade_date", "exit_date", "asset", "direction", "selected_setup", "status",
+                "entry_price", "stop_loss", "target_price", "exit_price", "risk_percentage", "risk_usd",
+                "r_multiple", "pnl_usd", "accounts", "notes"]
+
+# --- LEITURA DO DIÁRIO EM BLOCOS ---
+
+def iter_journal_chunks(user_id, chunk_size=EXPORT_CHUNK_SIZE, status_filter="Todos"):
+    """
+    Percorre o diário em blocos de até chunk_size registos (mais recentes primeiro).
+
+    Se a cache do diário já tiver uma leitura completa, os blocos são construídos diretamente a
+    partir dos registos dela (sem leituras no Firestore nem um DataFrame do diário inteiro); caso
+    contrário o diário é paginado no Firestore, uma página por bloco.
+
+    Yields:
+        pd.DataFrame: Registos do bloco, no formato de get_journal_entries (com 'doc_id').
+    """
+    cache = get_journal_cache(user_id, create=False)
+    if cache is not None and cache.last_full_sync is not None:
+        cache.sync()
+        records = cache.records(status_filter)
+        for start in range(0, len(records), chunk_size):
+            yield pd.DataFrame(records[start:start + chunk_size])
+        return
+
+    from firebase_admin import firestore
+    from google.cloud.firestore_v1.base_query import FieldFilter
+    query = get_db().collection("user_profiles").document(user_id).collection("journal_entries")
+    if status_filter == "Abertos":
+        query = query.where(filter=FieldFilter("status", "in", ["Em Aberto", "Pendente"]))
+    elif status_filter != "Todos":
+        query = query.where(filter=FieldFilter("status", "==", status_filter))
+    query = query.order_by("trade_date", direction=firestore.Query.DESCENDING)
+    cursor = None
+    while True:
+        page = query.start_after(cursor) if cursor is not None else query
+        docs = list(page.limit(chunk_size).stream())
+        if docs:
+            yield pd.DataFrame([{**doc.to_dict(), 'doc_id': doc.id} for doc in docs])
+        if len(docs) < chunk_size:
+            return
+        cursor = docs[-1]
+
+# --- COLUNAS DERIVADAS ---
+
+def account_columns(accounts):
+    """{doc_id da conta: nome da coluna de P&L atribuído}, pela ordem das contas."""
+    columns, used = {}, set()
+    for acc in accounts or []:
+        name = f"pnl_usd [{acc.get('account_name') or acc['doc_id']}]"
+        if name in used:
+            name = f"pnl_usd [{acc.get('account_name')} {acc['doc_id']}]"
+        used.add(name)
+        columns[acc['doc_id']] = name
+    return columns
+
+def export_columns(accounts):
+    """Colunas da exportação: as do diário, as derivadas e uma de P&L por conta."""
+    return BASE_COLUMNS + list(account_columns(accounts).values())
+
+def derive_export_columns(chunk, accounts=None):
+    """
+    Converte um bloco do diário nas colunas da exportação.
+
+    r_multiple e pnl_usd vêm de reporting_engine.prepare_trades (NaN nas operações não
+    finalizadas); o P&L de cada conta é pnl_usd x a fração dessa conta na operação.
+    """
+    accounts = accounts or []
+    df = chunk.reset_index(drop=True)
+    out = df.reindex(columns=BASE_COLUMNS)
+    for col in DATE_COLUMNS:
+        out[col] = pd.to_datetime(out[col], errors='coerce')
+    for col in NUMERIC_COLUMNS:
+        out[col] = pd.to_numeric(out[col], errors='coerce').astype(float)
+
+    prepared = prepare_trades(df)
+    for col in ("r_multiple", "pnl_usd"):
+        out[col] = prepared[col].reindex(out.index) if col in prepared.columns else np.nan
+
+    names = {acc['doc_id']: acc.get('account_name') or acc['doc_id'] for acc in accounts}
+    trade_accounts = df['accounts'] if 'accounts' in df.columns else pd.Series([None] * len(df))
+    out['accounts'] = ["; ".join(names.get(a, a) for a in ids) if isinstance(ids, (list, tuple)) else None for ids in trade_accounts]
+
+    by_account = account_columns(accounts)
+    if by_account:
+        weights = build_weights(df, accounts)
+        shares = np.zeros((len(df), len(weights["account_ids"])))
+        np.add.at(shares, (weights["rows"], weights["cols"]), weights["weights"])
+        pnl = out['pnl_usd'].to_numpy()
+        for account_id, column in by_account.items():
+            out[column] = pnl * shares[:, weights["account_ids"].index(account_id)]
+
+    for col in TEXT_COLUMNS:
+        if col != 'accounts':
+            out[col] = out[col].map(lambda v: None if v is None or (isinstance(v, float) and np.isnan(v)) else str(v))
+    return out[export_columns(accounts)]
+
+# --- ESCRITA ---
+
+def _parquet_schema(columns):
+    import pyarrow as pa
+    types = {**{c: pa.timestamp("ns") for c in DATE_COLUMNS}, **{c: pa.string() for c in TEXT_COLUMNS}}
+    return pa.schema([(c, types.get(c, pa.float64())) for c in columns])
+
+def write_export(chunks, sink, fmt="csv", accounts=None):
+    """
+    Escreve os blocos do diário num destino binário, um bloco de cada vez.
+
+    Args:
+        chunks (iterable): Blocos do diário (ex.: iter_journal_chunks).
+        sink: Ficheiro binário aberto (ou io.BytesIO) onde escrever.
+        fmt (str): "csv" ou "parquet" (um row group por bloco, compressão zstd).
+        accounts (list, optional): Contas do utilizador (nomes e colunas de P&L por conta).
+
+    Returns:
+        int: Número de linhas exportadas.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato de exportação desconhecido: {fmt}")
+    columns = export_columns(accounts)
+    writer = None
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = _parquet_schema(columns)
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    rows = 0
+    try:
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            out = derive_export_columns(chunk, accounts)
+            if writer is not None:
+                writer.write_table(pa.Table.from_pandas(out, schema=schema, preserve_index=False))
+            else:
+                sink.write(out.to_csv(index=False, header=rows == 0, date_format="%Y-%m-%d %H:%M:%S").encode("utf-8"))
+            rows += len(out)
+        if writer is None and rows == 0:
+            sink.write(pd.DataFrame(columns=columns).to_csv(index=False).encode("utf-8"))
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+def export_journal(user_id, fmt="csv", accounts=None, status_filter="Todos", chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Exporta o diário de um utilizador para um buffer de download (usado pelo st.download_button
+    da página, que só a executa quando o utilizador pede o ficheiro).
+
+    Returns:
+        bytes: Conteúdo do ficheiro CSV ou Parquet.
+    """
+    buffer = io.BytesIO()
+    write_export(iter_journal_chunks(user_id, chunk_size, status_filter), buffer, fmt, accounts)
+    return buffer.getvalue()
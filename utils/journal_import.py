@@ -0,0 +1,512 @@
+# marketlens/utils/journal_import.py
+
+"""
+Importação em massa de extratos de corretora (CSV genérico, MT4 e MT5) para o diário.
+
+O ficheiro é lido em streaming: as linhas da tabela são produzidas por geradores (csv.reader
+ou um HTMLParser alimentado aos blocos) e nunca há mais do que um lote de operações em
+memória. Cada linha passa por três passos:
+
+1. leitura: o cabeçalho é reconhecido pelos nomes das colunas (HEADER_ALIASES), o que cobre
+   o CSV genérico, o "Detailed Statement" do MT4 e o relatório "Positions" do MT5;
+2. normalização: o símbolo da corretora é convertido no nome do ativo de yahoo_finance_map
+   (EURUSD.m -> EUR/USD, XAUUSD -> Ouro, ...), os campos são validados e o risco em USD é
+   calculado para que o P&L do diário (R x risco) seja o lucro do extrato;
+3. escrita: as operações são gravadas em WriteBatch de até 500 escritas, incluindo os
+   incrementos dos agregados de P&L do lote (um documento por dimensão).
+
+A importação é idempotente: o id de cada documento é um hash dos campos que identificam a
+operação (ticket, símbolo, direção, abertura), por isso importar o mesmo extrato duas vezes
+não duplica nada. Uma operação importada em aberto e que apareça fechada num extrato
+posterior é atualizada com os dados de fecho.
+"""
+
+import csv
+import codecs
+import hashlib
+import re
+from datetime import datetime
+from html.parser import HTMLParser
+from itertools import chain
+import streamlit as st
+from firebase_config import get_db
+from .config import yahoo_finance_map
+from .account_attribution import capital_weights
+from .journal_cache import get_journal_cache
+from .rollup_utils import ROLLUP_DIMENSIONS, rollup_delta, combine_rollup_deltas, apply_rollup_delta
+
+# Limite de escritas de um WriteBatch do Firestore; cada lote reserva uma escrita por
+# dimensão dos agregados de P&L.
+MAX_BATCH_WRITES = 500
+IMPORT_CHUNK_SIZE = MAX_BATCH_WRITES - len(ROLLUP_DIMENSIONS)
+# Erros de linha guardados no resumo (os restantes são apenas contados).
+MAX_REPORTED_ERRORS = 50
+READ_BLOCK_SIZE = 64 * 1024
+
+# Nomes de coluna aceites para cada campo (em minúsculas). "time" e "price" aparecem duas
+# vezes nos extratos do MetaTrader: a primeira é a abertura e a segunda o fecho.
+HEADER_ALIASES = {
+    "ticket": ("ticket", "position", "order id", "trade id", "id"),
+    "symbol": ("symbol", "item", "asset", "instrument", "ticker", "ativo"),
+    "type": ("type", "side", "direction", "action", "direção"),
+    "volume": ("volume", "size", "lots", "quantity", "qty"),
+    "open_time": ("open time", "open date", "entry time", "opened", "date", "data"),
+    "open_price": ("open price", "entry price", "entry", "preço de entrada"),
+    "stop_loss": ("s / l", "s/l", "sl", "stop loss", "stop"),
+    "take_profit": ("t / p", "t/p", "tp", "take profit", "target"),
+    "close_time": ("close time", "close date", "exit time", "closed"),
+    "close_price": ("close price", "exit price", "exit", "preço de saída"),
+    "profit": ("profit", "p/l", "pnl", "net profit", "lucro"),
+}
+REPEATED_COLUMNS = {"time": ("open_time", "close_time"), "price": ("open_price", "close_price")}
+REQUIRED_COLUMNS = ("symbol", "type", "open_time", "open_price")
+# Secções dos relatórios do MT5 com o mesmo aspeto mas que não são posições (ordens e deals).
+REJECTED_COLUMNS = ("deal", "state")
+_FIELDS_BY_NAME = {**{name: (field,) for field, aliases in HEADER_ALIASES.items() for name in aliases}, **REPEATED_COLUMNS}
+_SYMBOL_NAMES = frozenset(HEADER_ALIASES["symbol"])
+_REJECTED_NAMES = frozenset(REJECTED_COLUMNS)
+
+DATE_FORMATS = ("%Y.%m.%d %H:%M:%S", "%Y.%m.%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M",
+                "%Y-%m-%dT%H:%M:%S", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d.%m.%Y %H:%M:%S",
+                "%d.%m.%Y %H:%M", "%Y.%m.%d", "%Y-%m-%d", "%d/%m/%Y")
+
+# Nomes usados pelas corretoras que não derivam dos nomes de yahoo_finance_map.
+BROKER_SYMBOL_ALIASES = {
+    "XAUUSD": "Ouro", "GOLD": "Ouro", "XAGUSD": "Prata", "SILVER": "Prata",
+    "USOIL": "Petróleo WTI", "WTI": "Petróleo WTI", "XTIUSD": "Petróleo WTI", "CL": "Petróleo WTI",
+    "XPTUSD": "Platina", "PLATINUM": "Platina", "COPPER": "Cobre", "XCUUSD": "Cobre", "HG": "Cobre",
+    "SPX500": "US500", "SP500": "US500", "US500": "US500", "ES": "US500",
+    "NAS100": "US100", "USTEC": "US100", "US100": "US100", "NQ": "US100",
+    "US30": "US30", "DJ30": "US30", "WS30": "US30", "YM": "US30",
+    "GER40": "DAX", "GER30": "DAX", "DE40": "DAX", "DE30": "DAX", "DAX": "DAX",
+    "UK100": "FTSE 100", "FTSE100": "FTSE 100", "FRA40": "CAC 40", "F40": "CAC 40",
+    "EUSTX50": "Euro Stoxx 50", "STOXX50": "Euro Stoxx 50", "EU50": "Euro Stoxx 50",
+    "JPN225": "Nikkei 225", "JP225": "Nikkei 225", "NIKKEI": "Nikkei 225",
+    "HK50": "Hang Seng", "HSI": "Hang Seng", "CHINA50": "Shanghai Comp.",
+    "BTCUSD": "Bitcoin", "XBTUSD": "Bitcoin", "ETHUSD": "Ethereum",
+    "AAPL": "Apple", "MSFT": "Microsoft", "GOOGL": "Google", "GOOG": "Google", "AMZN": "Amazon",
+    "NVDA": "NVIDIA", "META": "Meta", "TSLA": "Tesla",
+}
+
+class ImportRowError(ValueError):
+    """Linha do extrato que não pode ser importada (o motivo vai na mensagem)."""
+
+# --- SÍMBOLOS ---
+
+def _symbol_key(symbol):
+    return re.sub(r"[^A-Z0-9]", "", str(symbol).upper())
+
+def _build_symbol_aliases():
+    aliases = {_symbol_key(name): name for name in yahoo_finance_map}
+    aliases.update(BROKER_SYMBOL_ALIASES)
+    # Os mais longos primeiro: "EURUSD" deve ganhar a "EUR" num símbolo como "EURUSDPRO".
+    return dict(sorted(aliases.items(), key=lambda item: -len(item[0])))
+
+SYMBOL_ALIASES = _build_symbol_aliases()
+
+def map_symbol(symbol):
+    """
+    Converte um símbolo da corretora no nome do ativo usado no diário (chave de yahoo_finance_map).
+    Sufixos de conta são ignorados (EURUSD.m, EURUSDpro, US500.cash, #AAPL).
+
+    Returns:
+        str: O nome do ativo, ou None se o símbolo não for reconhecido.
+    """
+    raw = str(symbol or "").strip().lstrip("#")
+    if not raw:
+        return None
+    key = _symbol_key(re.split(r"[.#_]", raw)[0]) or _symbol_key(raw)
+    if key in SYMBOL_ALIASES:
+        return SYMBOL_ALIASES[key]
+    for alias, name in SYMBOL_ALIASES.items():
+        if len(alias) >= 3 and key.startswith(alias):
+            return name
+    return None
+
+# --- LEITURA DOS EXTRATOS ---
+
+def open_statement(binary_stream):
+    """
+    Envolve um ficheiro binário (ex.: o UploadedFile do Streamlit) num leitor de texto, com a
+    codificação detetada pelo BOM (os relatórios HTML do MT5 vêm em UTF-16).
+    """
+    head = binary_stream.read(4)
+    binary_stream.seek(binary_stream.tell() - len(head))
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        encoding = "utf-16"
+    elif head.startswith(codecs.BOM_UTF8):
+        encoding = "utf-8-sig"
+    else:
+        encoding = "utf-8"
+    return codecs.getreader(encoding)(binary_stream, errors="replace")
+
+class _TableRowParser(HTMLParser):
+    """Recolhe as linhas (<tr>) de tabelas HTML como listas de textos, com colspan expandido."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows, self._row, self._cell, self._span = [], None, None, 1
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "tr":
+            self._row = []
+        elif tag in ("td", "th") and self._row is not None:
+            self._cell = []
+            span = dict(attrs).get("colspan") or "1"
+            self._span = int(span) if span.isdigit() else 1
+        elif tag == "br" and self._cell is not None:
+            self._cell.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in ("td", "th") and self._cell is not None:
+            self._row.extend([" ".join("".join(self._cell).split())] + [""] * (self._span - 1))
+            self._cell = None
+        elif tag == "tr" and self._row is not None:
+            if self._cell is not None:
+                self.handle_endtag("td")
+            self.rows.append(self._row)
+            self._row = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+def iter_html_rows(blocks):
+    """Linhas das tabelas de um relatório HTML (MT4/MT5), a partir de blocos de texto."""
+    parser = _TableRowParser()
+    for block in blocks:
+        parser.feed(block)
+        yield from parser.rows
+        parser.rows.clear()
+    parser.close()
+    yield from parser.rows
+
+def iter_delimited_rows(lines, delimiter=","):
+    """Linhas de um CSV/TSV."""
+    yield from csv.reader(lines, delimiter=delimiter)
+
+def _lines(blocks):
+    pending = ""
+    for block in blocks:
+        lines = (pending + block).splitlines(keepends=True)
+        pending = lines.pop() if lines and not lines[-1].endswith(("\n", "\r")) else ""
+        yield from lines
+    if pending:
+        yield pending
+
+def iter_table_rows(stream, block_size=READ_BLOCK_SIZE):
+    """Linhas de um extrato em texto, lido aos blocos, em HTML ou CSV consoante o conteúdo."""
+    blocks = iter(lambda: stream.read(block_size), "")
+    head = next(blocks, "")
+    blocks = chain([head], blocks)
+    if head.lstrip().startswith("<"):
+        return iter_html_rows(blocks)
+    # O separador (',', ';' ou tabulação) é o mais frequente no início do ficheiro.
+    return iter_delimited_rows(_lines(blocks), delimiter=max((",", ";", "\t"), key=head.count))
+
+def resolve_header(cells):
+    """
+    Reconhece uma linha de cabeçalho de operações.
+
+    Returns:
+        dict: {campo: índice da coluna}, ou None se a linha não for um cabeçalho de operações.
+    """
+    names = [" ".join(str(c).lower().split()) for c in cells]
+    # Verificação rápida para as linhas de dados: um cabeçalho tem sempre a coluna do símbolo.
+    if _SYMBOL_NAMES.isdisjoint(names) or not _REJECTED_NAMES.isdisjoint(names):
+        return None
+    columns = {}
+    for index, name in enumerate(names):
+        field = next((f for f in _FIELDS_BY_NAME.get(name, ()) if f not in columns), None)
+        if field:
+            columns[field] = index
+    if not all(field in columns for field in REQUIRED_COLUMNS):
+        return None
+    return columns
+
+def iter_statement_records(rows):
+    """
+    Percorre as linhas de um extrato e produz um dicionário por linha de operação, com os
+    campos de HEADER_ALIASES em texto. As linhas fora de uma secção de operações (títulos,
+    totais, resumo da conta) são ignoradas; um novo cabeçalho inicia uma nova secção.
+    """
+    columns = None
+    for line_number, cells in enumerate(rows, start=1):
+        if not any(str(c).strip() for c in cells):
+            continue
+        header = resolve_header(cells)
+        if header is not None:
+            columns = header
+            continue
+        if columns is None:
+            continue
+        if len(cells) <= max(columns.values()):
+            # Linha de título ou de totais: a secção de operações terminou.
+            if len(cells) <= 2:
+                columns = None
+            continue
+        record = {field: str(cells[index]).strip() for field, index in columns.items()}
+        record["line"] = line_number
+        yield record
+
+def iter_statement(binary_stream):
+    """Atalho: registos de operações de um ficheiro de extrato binário."""
+    return iter_statement_records(iter_table_rows(open_statement(binary_stream)))
+
+# --- NORMALIZAÇÃO ---
+
+def parse_number(value):
+    """Número de um extrato ("1 234.50", "1,5", "") ou None se vazio."""
+    text = str(value or "").replace("\xa0", "").replace(" ", "")
+    if not text:
+        return None
+    if "," in text:
+        text = text.replace(",", "") if "." in text else text.replace(",", ".")
+    try:
+        return float(text)
+    except ValueError:
+        raise ImportRowError(f"número inválido: '{value}'")
+
+def parse_datetime(value, date_format=None):
+    """
+    Data/hora de um extrato nos formatos de DATE_FORMATS.
+
+    'date_format' é uma lista de um elemento, própria de cada importação, com o último formato
+    usado: é tentado primeiro e atualizado quando muda (sem estado partilhado entre importações).
+    """
+    text = str(value or "").strip()
+    if not text:
+        return None
+    for fmt in chain(date_format or (), DATE_FORMATS):
+        try:
+            parsed = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        if date_format is not None:
+            date_format[0] = fmt
+        return parsed
+    raise ImportRowError(f"data inválida: '{value}'")
+
+def parse_direction(value):
+    """'buy'/'sell' (e variantes) em "Compra"/"Venda"; None para linhas que não são operações (balance, ordens pendentes)."""
+    text = str(value or "").strip().lower()
+    if re.search(r"limit|stop|balance|credit|deposit|withdraw", text):
+        return None
+    if text in ("buy", "long", "compra", "b"):
+        return "Compra"
+    if text in ("sell", "short", "venda", "s"):
+        return "Venda"
+    return None
+
+def record_key(record, date_format=None):
+    """Hash que identifica uma operação do extrato (independente do estado de fecho). 'date_format' como em parse_datetime."""
+    parts = [record.get("ticket", ""), _symbol_key(record.get("symbol")), str(record.get("type", "")).lower(),
+             str(parse_datetime(record.get("open_time"), date_format)), str(parse_number(record.get("open_price")))]
+    if not record.get("ticket"):
+        parts.append(str(parse_number(record.get("volume"))))
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:24]
+
+def build_entry(record, risk_usd=0.0, risk_percentage=1.0, capital=0.0, setup=None, accounts=(), source="", date_format=None):
+    """
+    Converte um registo do extrato num registo do diário, no formato do formulário do Journaling.
+
+    O P&L do diário é R x risco em USD (ver rollup_utils.trade_pnl). Numa operação fechada com
+    stop e lucro no extrato, o risco em USD é o que torna esse P&L igual ao lucro da corretora;
+    sem stop, é usado o risco do formulário e o stop é implícito (a distância que perde esse risco).
+    Operações em aberto usam o risco do formulário.
+
+    Args:
+        record (dict): Registo de iter_statement_records.
+        risk_usd (float): Risco por operação do formulário (percentagem x capital das contas).
+        risk_percentage (float): Percentagem de risco do formulário.
+        capital (float): Capital das contas escolhidas (para a percentagem de risco derivada).
+        setup (str, optional): Setup do playbook a atribuir.
+        accounts (list): doc_ids das contas de execução.
+        source (str): Nome do ficheiro, guardado nas notas.
+        date_format (list, optional): Último formato de data usado nesta importação (ver parse_datetime).
+
+    Returns:
+        dict: O registo do diário, ou None se a linha não for uma operação (balance, ordem pendente).
+
+    Raises:
+        ImportRowError: Se a linha for uma operação mas não puder ser importada.
+    """
+    direction = parse_direction(record.get("type"))
+    if direction is None:
+        return None
+    asset = map_symbol(record.get("symbol"))
+    if asset is None:
+        raise ImportRowError(f"símbolo não reconhecido: '{record.get('symbol')}'")
+    trade_date = parse_datetime(record.get("open_time"), date_format)
+    if trade_date is None:
+        raise ImportRowError("sem data de abertura")
+    entry_price = parse_number(record.get("open_price")) or 0.0
+    if entry_price <= 0:
+        raise ImportRowError("preço de entrada inválido")
+    stop_loss = parse_number(record.get("stop_loss")) or 0.0
+    target_price = parse_number(record.get("take_profit")) or 0.0
+    exit_price = parse_number(record.get("close_price")) or 0.0
+    profit = parse_number(record.get("profit"))
+    # Com coluna de fecho, só as linhas com data de fecho estão finalizadas (as "Open Trades" do MT4 trazem o preço atual).
+    exit_date = parse_datetime(record.get("close_time"), date_format) if "close_time" in record else None
+    closed = exit_price > 0 and (exit_date is not None if "close_time" in record else True)
+
+    notes = f"Importado de {source}" if source else "Importado de extrato"
+    if record.get("ticket"):
+        notes += f" (ticket {record['ticket']})"
+    entry = {
+        "asset": asset, "direction": direction, "selected_setup": setup,
+        "entry_price": entry_price, "stop_loss": stop_loss, "target_price": target_price,
+        "status": "Finalizado" if closed else "Em Aberto", "exit_price": exit_price if closed else 0.0,
+        "accounts": list(accounts), "risk_percentage": risk_percentage, "risk_usd": risk_usd,
+        "notes": notes, "trade_date": trade_date.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    if not closed:
+        return entry
+
+    sign = 1 if direction == "Compra" else -1
+    pnl_points = sign * (exit_price - entry_price)
+    entry["pnl"] = pnl_points
+    if exit_date is not None:
+        entry["exit_date"] = exit_date.strftime("%Y-%m-%d %H:%M:%S")
+    if profit and pnl_points:
+        if stop_loss > 0:
+            entry["risk_usd"] = abs(profit * (entry_price - stop_loss) / pnl_points)
+        elif risk_usd > 0 and entry_price - sign * abs(pnl_points) * risk_usd / abs(profit) > 0:
+            entry["stop_loss"] = entry_price - sign * abs(pnl_points) * risk_usd / abs(profit)
+            entry["notes"] += "; stop implícito (sem S/L no extrato)"
+        if capital > 0:
+            entry["risk_percentage"] = round(entry["risk_usd"] / capital * 100, 4)
+    return entry
+
+# --- ESCRITA ---
+
+def _chunk_writes(client, collection, user_id, chunk, accounts=None):
+    """
+    Grava um lote de (doc_id, registo) num único WriteBatch, com os incrementos dos agregados.
+    Os documentos que já existem não são recriados; os que estavam em aberto e chegam
+    fechados recebem os dados de fecho.
+
+    Returns:
+        tuple: ([(doc_id, dados, merge)] efetivamente escritos, número de duplicados ignorados).
+    """
+    refs = [collection.document(doc_id) for doc_id, _ in chunk]
+    existing = {snap.id: snap.to_dict() or {} for snap in client.get_all(refs) if snap.exists}
+    batch, deltas, written, duplicates = client.batch(), [], [], 0
+    for ref, (doc_id, entry) in zip(refs, chunk):
+        old = existing.get(doc_id)
+        if old is None:
+            batch.create(ref, entry)
+            deltas.append(rollup_delta(None, entry, accounts))
+            written.append((doc_id, entry, False))
+        elif old.get("status") != "Finalizado" and entry["status"] == "Finalizado":
+            update = {k: entry[k] for k in ("status", "exit_price", "exit_date", "pnl", "risk_usd", "risk_percentage", "stop_loss") if k in entry}
+            update["updated_at"] = entry["updated_at"]
+            batch.update(ref, update)
+            deltas.append(rollup_delta(old, {**old, **update}, accounts))
+            written.append((doc_id, update, True))
+        else:
+            duplicates += 1
+    if written:
+        apply_rollup_delta(batch, user_id, combine_rollup_deltas(deltas), client)
+        batch.commit()
+    return written, duplicates
+
+def iter_import(user_id, records, accounts=None, selected_accounts=(), setup=None, risk_percentage=1.0,
+                source="", client=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Importa registos de um extrato para o diário, em lotes, e produz o progresso após cada lote.
+
+    Args:
+        user_id (str): O utilizador.
+        records (iterable): Registos de iter_statement (consumidos em streaming).
+        accounts (list, optional): Contas do utilizador (get_trading_accounts), para o capital e as frações por conta.
+        selected_accounts (list): doc_ids das contas de execução das operações importadas.
+        setup (str, optional): Setup do playbook atribuído às operações.
+        risk_percentage (float): Risco por operação (%) sobre o capital das contas, como no formulário.
+        source (str): Nome do ficheiro (guardado nas notas e em 'import_source').
+        client (optional): Cliente Firestore. Defaults to firebase_config.get_db().
+        chunk_size (int): Operações por WriteBatch (com os agregados, no máximo MAX_BATCH_WRITES escritas).
+
+    Yields:
+        dict: Contadores acumulados: rows (linhas de operações lidas), imported, closed (em aberto
+              atualizadas para finalizadas), duplicates, skipped (balance, ordens), invalid,
+              batches, e errors ([(linha, motivo)], até MAX_REPORTED_ERRORS).
+    """
+    client = client or get_db()
+    collection = client.collection("user_profiles").document(user_id).collection("journal_entries")
+    chunk_size = max(1, min(chunk_size, IMPORT_CHUNK_SIZE))
+    selected_accounts = list(selected_accounts)
+    capital = sum(float(acc.get('initial_capital', 0) or 0) for acc in (accounts or []) if acc['doc_id'] in selected_accounts)
+    weights = capital_weights(selected_accounts, accounts) if accounts is not None else None
+    risk_usd = (risk_percentage / 100) * capital
+    stats = dict(rows=0, imported=0, closed=0, duplicates=0, skipped=0, invalid=0, batches=0, errors=[])
+    seen, chunk = set(), []
+    date_format = [DATE_FORMATS[0]]  # último formato de data do extrato (ver parse_datetime)
+    cache = get_journal_cache(user_id, create=False)
+
+    def flush():
+        from google.api_core.exceptions import Conflict
+        try:
+            written, duplicates = _chunk_writes(client, collection, user_id, chunk, accounts)
+        except Conflict:
+            # Outra importação criou parte do lote entretanto: o lote falhou por inteiro e é refeito.
+            written, duplicates = _chunk_writes(client, collection, user_id, chunk, accounts)
+        stats["batches"] += 1
+        stats["duplicates"] += duplicates
+        for doc_id, data, merge in written:
+            stats["closed" if merge else "imported"] += 1
+            if cache is not None:
+                cache.apply_write(doc_id, data, merge=merge)
+        chunk.clear()
+
+    for record in records:
+        stats["rows"] += 1
+        try:
+            entry = build_entry(record, risk_usd, risk_percentage, capital, setup, selected_accounts, source, date_format)
+            if entry is None:
+                stats["skipped"] += 1
+                continue
+            doc_id = f"imp-{record_key(record, date_format)}"
+        except ImportRowError as e:
+            stats["invalid"] += 1
+            if len(stats["errors"]) < MAX_REPORTED_ERRORS:
+                stats["errors"].append((record.get("line"), str(e)))
+            continue
+        if doc_id in seen:
+            stats["duplicates"] += 1
+            continue
+        seen.add(doc_id)
+        if weights is not None:
+            entry["account_weights"] = weights
+        entry["import_source"] = source
+        entry["created_at"] = entry["updated_at"] = datetime.utcnow()
+        chunk.append((doc_id, entry))
+        if len(chunk) >= chunk_size:
+            flush()
+            yield {**stats, "errors": list(stats["errors"])}
+    if chunk:
+        flush()
+    yield {**stats, "errors": list(stats["errors"])}
+
+def import_statement(user_id, binary_stream, progress=None, **kwargs):
+    """
+    Importa um ficheiro de extrato (CSV genérico, MT4 ou MT5) para o diário.
+
+    Args:
+        user_id (str): O utilizador.
+        binary_stream: Ficheiro aberto em modo binário (ex.: st.file_uploader).
+        progress (callable, optional): Chamado após cada lote com os contadores acumulados.
+        **kwargs: Argumentos de iter_import (accounts, selected_accounts, setup, risk_percentage, source, client).
+
+    Returns:
+        dict: Os contadores finais de iter_import (os do último lote gravado, se a importação falhar).
+    """
+    stats = None
+    try:
+        for stats in iter_import(user_id, iter_statement(binary_stream), **kwargs):
+            if progress is not None:
+                progress(stats)
+    except Exception as e:
+        st.error(f"Erro ao importar o extrato: {e}")
+    return stats
@@ -0,0 +1,119 @@
+# marketlens/utils/journal_query.py
+
+"""
+Planeamento das consultas ao diário de trading.
+
+Os filtros pedidos (status, intervalo de datas, conta, ativos, setups) são repartidos entre
+o que o Firestore consegue executar no servidor e o que tem de ser filtrado localmente:
+
+- status: '==' (ou 'in' para "Abertos");
+- conta: 'array_contains' sobre o campo 'accounts';
+- ativos/setups: 'in' (no máximo 30 valores, e apenas uma cláusula 'in' por consulta);
+- datas: intervalo sobre 'trade_date' (guardado como texto "%Y-%m-%d %H:%M:%S", que ordena
+  como as datas), com a ordenação pelo mesmo campo.
+
+As consultas com vários campos precisam de índices compostos; composite_indexes() gera as
+definições para todas as combinações que o planeador pode produzir. Para regenerar o ficheiro:
+
+    python -m utils.journal_query > firestore.indexes.json
+"""
+
+import json
+from itertools import product
+import pandas as pd
+
+OPEN_STATUSES = ["Em Aberto", "Pendente"]
+# Limite do Firestore para o número de valores numa cláusula 'in'.
+MAX_IN_VALUES = 30
+TRADE_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def _status_values(status_filter):
+    if not status_filter or status_filter == "Todos":
+        return None
+    return OPEN_STATUSES if status_filter == "Abertos" else [status_filter]
+
+def _format_trade_date(value):
+    return pd.Timestamp(value).strftime(TRADE_DATE_FORMAT)
+
+def plan_journal_query(status_filter="Todos", start_date=None, end_date=None, account_id=None, assets=None, setups=None):
+    """
+    Reparte os filtros entre o servidor e o cliente.
+
+    Returns:
+        tuple: (server, local). 'server' é uma lista de (campo, operador, valor) para FieldFilter;
+               'local' é um dicionário com os filtros que ficam para filter_journal_frame().
+    """
+    server, local = [], {}
+    in_used = False
+
+    statuses = _status_values(status_filter)
+    if statuses:
+        if len(statuses) == 1:
+            server.append(("status", "==", statuses[0]))
+        else:
+            server.append(("status", "in", statuses)); in_used = True
+
+    if account_id:
+        server.append(("accounts", "array_contains", account_id))
+
+    # Apenas uma cláusula 'in' por consulta: a primeira lista elegível vai para o servidor.
+    for field, key, values in (("asset", "assets", assets), ("selected_setup", "setups", setups)):
+        if not values:
+            continue
+        values = list(dict.fromkeys(values))
+        if not in_used and len(values) <= MAX_IN_VALUES:
+            server.append((field, "in", values)); in_used = True
+        else:
+            local[key] = values
+
+    if start_date is not None:
+        server.append(("trade_date", ">=", _format_trade_date(start_date)))
+    if end_date is not None:
+        server.append(("trade_date", "<=", _format_trade_date(end_date)))
+    return server, local
+
+def filter_journal_frame(df, status_filter="Todos", start_date=None, end_date=None, account_id=None, assets=None, setups=None):
+    """Aplica os filtros a um DataFrame do diário já carregado (mesma semântica das consultas ao servidor)."""
+    if df.empty:
+        return df
+    mask = pd.Series(True, index=df.index)
+    statuses = _status_values(status_filter)
+    if statuses:
+        mask &= df['status'].isin(statuses)
+    if start_date is not None:
+        mask &= df['trade_date'] >= pd.Timestamp(start_date)
+    if end_date is not None:
+        mask &= df['trade_date'] <= pd.Timestamp(end_date)
+    if account_id:
+        mask &= df['accounts'].map(lambda accs: isinstance(accs, (list, tuple)) and account_id in accs)
+    if assets:
+        mask &= df['asset'].isin(assets)
+    if setups:
+        mask &= df['selected_setup'].isin(setups)
+    return df[mask]
+
+# --- ÍNDICES COMPOSTOS ---
+
+def composite_indexes(collection_group="journal_entries"):
+    """
+    Gera as definições de índices compostos (formato firestore.indexes.json) para todas as
+    combinações de filtros que plan_journal_query() pode enviar ao servidor, ordenadas por 'trade_date'.
+    """
+    indexes = []
+    # conta x status x (ativo | setup | nenhum); ativo e setup nunca vão juntos para o servidor.
+    for with_account, with_status, in_field in product((False, True), (False, True), (None, "asset", "selected_setup")):
+        fields = []
+        if with_account:
+            fields.append({"fieldPath": "accounts", "arrayConfig": "CONTAINS"})
+        if with_status:
+            fields.append({"fieldPath": "status", "order": "ASCENDING"})
+        if in_field:
+            fields.append({"fieldPath": in_field, "order": "ASCENDING"})
+        if not fields:
+            continue  # 'trade_date' sozinho usa o índice automático de campo único.
+        fields.append({"fieldPath": "trade_date", "order": "DESCENDING"})
+        indexes.append({"collectionGroup": collection_group, "queryScope": "COLLECTION", "fields": fields})
+    return {"indexes": indexes, "fieldOverrides": []}
+
+if __name__ == "__main__":
+    print(json.dumps(composite_indexes(), indent=2))
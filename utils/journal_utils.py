@@ -1,63 +1,155 @@
 # synapse_desk/utils/journal_utils.py
 
 import streamlit as st
-from firebase_config import db
+from firebase_config import get_db
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from google.cloud.firestore_v1.base_query import FieldFilter
+from .journal_cache import get_journal_cache
+from .journal_query import plan_journal_query, filter_journal_frame
+from .rollup_utils import ROLLUP_DIMENSIONS, rollup_delta, combine_rollup_deltas, apply_rollup_delta
+from .account_attribution import capital_weights
+from .accounts_utils import get_trading_accounts
 
-def get_journal_entries(user_id, status_filter="Todos"):
+def get_journal_entries(user_id, status_filter="Todos", start_date=None, end_date=None, account_id=None, assets=None, setups=None):
     """
-    Busca todos os registos do diário de um utilizador, com um filtro opcional de status.
-    CORREÇÃO: Utiliza a sintaxe recomendada 'FieldFilter' para as queries.
+    Busca os registos do diário de um utilizador, com filtros opcionais.
+
+    Sem filtros além do status, os registos vêm da cache do diário (journal_cache), que só lê do
+    Firestore os documentos alterados desde a última sincronização. Com filtros, e se a cache
+    ainda não estiver carregada, a consulta é feita no Firestore com os filtros que ele suporta
+    (ver journal_query.plan_journal_query) e só o restante é filtrado localmente.
+
+    Args:
+        user_id (str): O utilizador.
+        status_filter (str, optional): "Todos", "Abertos" ou um status concreto. Defaults to "Todos".
+        start_date, end_date (datetime, optional): Intervalo (inclusivo) de 'trade_date'. Defaults to None.
+        account_id (str, optional): Apenas operações executadas nesta conta. Defaults to None.
+        assets (list, optional): Apenas estes ativos. Defaults to None.
+        setups (list, optional): Apenas estes setups. Defaults to None.
     """
     if not user_id: return pd.DataFrame()
+    filters = dict(start_date=start_date, end_date=end_date, account_id=account_id, assets=assets, setups=setups)
+    try:
+        cache = get_journal_cache(user_id, create=not any(filters.values()))
+        if cache is not None and (cache.last_full_sync is not None or not any(filters.values())):
+            cache.sync()
+            df = cache.to_dataframe(status_filter)
+            return filter_journal_frame(df, **filters).copy() if any(filters.values()) else df
+
+        from firebase_admin import firestore
+        from google.cloud.firestore_v1.base_query import FieldFilter
+        server, local = plan_journal_query(status_filter, **filters)
+        query = get_db().collection("user_profiles").document(user_id).collection("journal_entries")
+        for field, op, value in server:
+            query = query.where(filter=FieldFilter(field, op, value))
+        # Mesma ordenação dos índices gerados em firestore.indexes.json.
+        query = query.order_by("trade_date", direction=firestore.Query.DESCENDING)
+
+        entries = []
+        for doc in query.stream():
+            entry = doc.to_dict()
+            entry['doc_id'] = doc.id
+            if 'trade_date' in entry and isinstance(entry['trade_date'], str):
+                entry['trade_date'] = pd.to_datetime(entry['trade_date'])
+            entries.append(entry)
+
+        df = pd.DataFrame(entries)
+        if df.empty:
+            return df
+        df = filter_journal_frame(df, **local)
+        return df.sort_values(by='trade_date', ascending=False)
+
+    except Exception as e:
+        st.error(f"Erro ao buscar o diário: {e}")
+        return pd.DataFrame()
+
+def get_journal_page(user_id, page_size=20, cursor=None, status_filter="Todos"):
+    """
+    Busca uma página do diário, ordenada por 'trade_date' (mais recentes primeiro).
+    A paginação é feita no Firestore (start_after/limit): só os registos da página são lidos.
+
+    Args:
+        user_id (str): O utilizador.
+        page_size (int, optional): Registos por página. Defaults to 20.
+        cursor (DocumentSnapshot, optional): Último documento da página anterior. Defaults to None (primeira página).
+        status_filter (str, optional): "Todos", "Abertos" ou um status concreto. Defaults to "Todos".
+
+    Returns:
+        tuple: (pd.DataFrame da página, cursor da página seguinte ou None se for a última).
+    """
+    if not user_id: return pd.DataFrame(), None
     try:
-        journal_ref = db.collection("user_profiles").document(user_id).collection("journal_entries")
-        
-        # Query simplificada ao Firebase, sem ordenação
+        from firebase_admin import firestore
+        from google.cloud.firestore_v1.base_query import FieldFilter
+        query = get_db().collection("user_profiles").document(user_id).collection("journal_entries")
         if status_filter == "Abertos":
-            query = journal_ref.where(filter=FieldFilter("status", "in", ["Em Aberto", "Pendente"]))
+            query = query.where(filter=FieldFilter("status", "in", ["Em Aberto", "Pendente"]))
         elif status_filter != "Todos":
-            query = journal_ref.where(filter=FieldFilter("status", "==", status_filter))
-        else:
-            query = journal_ref
-
-        docs = query.stream()
-        trades_list = []
-        for doc in docs:
-            trade = doc.to_dict()
-            trade['doc_id'] = doc.id
-            if 'trade_date' in trade and isinstance(trade['trade_date'], str):
-                trade['trade_date'] = pd.to_datetime(trade['trade_date'])
-            trades_list.append(trade)
-        
-        if not trades_list:
-            return pd.DataFrame()
-
-        df = pd.DataFrame(trades_list)
-        if 'trade_date' in df.columns:
-            df = df.sort_values(by='trade_date', ascending=False)
-        return df
+            query = query.where(filter=FieldFilter("status", "==", status_filter))
+        query = query.order_by("trade_date", direction=firestore.Query.DESCENDING)
+        if cursor is not None:
+            query = query.start_after(cursor)
+        # Pede um registo a mais apenas para saber se existe página seguinte.
+        docs = list(query.limit(page_size + 1).stream())
+
+        next_cursor = docs[page_size - 1] if len(docs) > page_size else None
+        entries = []
+        for doc in docs[:page_size]:
+            entry = doc.to_dict()
+            entry['doc_id'] = doc.id
+            if 'trade_date' in entry and isinstance(entry['trade_date'], str):
+                entry['trade_date'] = pd.to_datetime(entry['trade_date'])
+            entries.append(entry)
+        return pd.DataFrame(entries), next_cursor
 
     except Exception as e:
         st.error(f"Erro ao buscar o diário: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), None
+
+def _journal_collection(user_id):
+    return get_db().collection("user_profiles").document(user_id).collection("journal_entries")
 
-def add_journal_entry(user_id, entry_data):
-    """Adiciona um único registo manual ao diário."""
+def add_journal_entry(user_id, entry_data, accounts=None):
+    """
+    Adiciona um único registo manual ao diário e atualiza os agregados de P&L na mesma escrita.
+
+    Args:
+        user_id (str): O utilizador.
+        entry_data (dict): Os dados da operação.
+        accounts (list, optional): Contas de trading do utilizador (como devolvidas por get_trading_accounts),
+                                   usadas para guardar a fração de capital de cada conta da operação.
+                                   Defaults to get_trading_accounts(user_id).
+    """
     if not user_id or not entry_data: return False
     try:
-        entry_data['created_at'] = datetime.utcnow()
-        db.collection("user_profiles").document(user_id).collection("journal_entries").add(entry_data)
+        accounts = get_trading_accounts(user_id) if accounts is None else accounts
+        if entry_data.get('accounts'):
+            entry_data['account_weights'] = capital_weights(entry_data.get('accounts'), accounts)
+        entry_data['created_at'] = entry_data['updated_at'] = datetime.utcnow()
+        doc_ref = _journal_collection(user_id).document()
+        batch = get_db().batch()
+        batch.set(doc_ref, entry_data)
+        apply_rollup_delta(batch, user_id, rollup_delta(None, entry_data, accounts))
+        batch.commit()
+        if (cache := get_journal_cache(user_id, create=False)) is not None:
+            cache.apply_write(doc_ref.id, entry_data, merge=False)
         return True
     except Exception as e:
         st.error(f"Erro ao adicionar registo: {e}"); return False
 
-def update_journal_entry(user_id, doc_id, entry_data):
-    """Atualiza um registo existente no diário."""
+def update_journal_entry(user_id, doc_id, entry_data, accounts=None):
+    """
+    Atualiza um registo existente no diário e, na mesma transação, os agregados de P&L.
+    Se as contas da operação mudarem, as frações de capital são recalculadas com 'accounts'
+    (por defeito, as contas atuais do utilizador).
+    """
     if not all([user_id, doc_id, entry_data]): return False
     try:
+        # As contas dão a fração de capital dos registos antigos sem 'account_weights' (agregados por conta).
+        accounts = get_trading_accounts(user_id) if accounts is None else accounts
+        if 'accounts' in entry_data:
+            entry_data['account_weights'] = capital_weights(entry_data['accounts'], accounts)
         if entry_data.get("status") == "Finalizado":
             entry_price = float(entry_data.get("entry_price", 0))
             exit_price = float(entry_data.get("exit_price", 0))
@@ -65,17 +157,183 @@ def update_journal_entry(user_id, doc_id, entry_data):
             if entry_price > 0 and exit_price > 0:
                 pnl = exit_price - entry_price if direction == "Compra" else entry_price - exit_price
                 entry_data['pnl'] = pnl
-        db.collection("user_profiles").document(user_id).collection("journal_entries").document(doc_id).update(entry_data)
+        entry_data['updated_at'] = datetime.utcnow()
+        doc_ref = _journal_collection(user_id).document(doc_id)
+        from firebase_admin import firestore
+
+        @firestore.transactional
+        def _update(transaction):
+            # O estado anterior é lido na transação para calcular a diferença nos agregados.
+            old_entry = doc_ref.get(transaction=transaction).to_dict() or {}
+            transaction.update(doc_ref, entry_data)
+            apply_rollup_delta(transaction, user_id, rollup_delta(old_entry, {**old_entry, **entry_data}, accounts))
+
+        _update(get_db().transaction())
+        if (cache := get_journal_cache(user_id, create=False)) is not None:
+            cache.apply_write(doc_id, entry_data)
         return True
     except Exception as e:
         st.error(f"Erro ao atualizar o registo: {e}"); return False
 
-def delete_journal_entry(user_id, doc_id):
-    """Apaga um registo do diário."""
+def delete_journal_entry(user_id, doc_id, accounts=None):
+    """Apaga um registo do diário e retira a sua contribuição dos agregados de P&L."""
     if not all([user_id, doc_id]): return False
     try:
-        db.collection("user_profiles").document(user_id).collection("journal_entries").document(doc_id).delete()
+        accounts = get_trading_accounts(user_id) if accounts is None else accounts
+        doc_ref = _journal_collection(user_id).document(doc_id)
+        from firebase_admin import firestore
+
+        @firestore.transactional
+        def _delete(transaction):
+            old_entry = doc_ref.get(transaction=transaction).to_dict() or {}
+            transaction.delete(doc_ref)
+            apply_rollup_delta(transaction, user_id, rollup_delta(old_entry, None, accounts))
+
+        _delete(get_db().transaction())
+        if (cache := get_journal_cache(user_id, create=False)) is not None:
+            cache.remove(doc_id)
         return True
     except Exception as e:
         st.error(f"Erro ao apagar o registo: {e}"); return False
 
+# --- ALTERAÇÕES EM MASSA ---
+# Uma transação do Firestore aceita até 500 escritas; cada lote reserva uma por dimensão dos agregados.
+BULK_CHUNK_SIZE = 500 - len(ROLLUP_DIMENSIONS)
+
+def closing_pnl(directions, entry_prices, exit_prices):
+    """
+    P&L em pontos de várias operações fechadas, de uma vez (mesma regra de update_journal_entry).
+
+    Returns:
+        np.ndarray: Saída - entrada nas compras, entrada - saída nas vendas; NaN sem preços válidos.
+    """
+    entry = np.asarray(entry_prices, dtype=float)
+    exit_ = np.asarray(exit_prices, dtype=float)
+    pnl = np.where(np.asarray(directions) == "Compra", exit_ - entry, entry - exit_)
+    return np.where((entry > 0) & (exit_ > 0), pnl, np.nan)
+
+def _bulk_mutate(user_id, doc_ids, build_changes, accounts=None):
+    """
+    Aplica alterações a vários registos do diário em transações de até BULK_CHUNK_SIZE registos.
+    Em cada transação os estados anteriores são lidos de uma vez (get_all), as alterações são
+    calculadas para o lote inteiro e os agregados de P&L recebem um único incremento combinado.
+    A cache do diário é atualizada localmente e a cache partilhada invalidada uma única vez.
+
+    Args:
+        user_id (str): O utilizador.
+        doc_ids (list): Registos a alterar (os que já não existirem são ignorados).
+        build_changes (callable): Recebe a lista dos registos anteriores (dicionários com 'doc_id')
+                                  e devolve, pela mesma ordem, o dicionário de alterações de cada
+                                  um, None para o apagar, ou {} para o deixar como está.
+        accounts (list, optional): Contas do utilizador (frações de capital dos registos sem
+                                   'account_weights'). Defaults to get_trading_accounts(user_id).
+
+    Returns:
+        int: Número de registos alterados ou apagados.
+    """
+    from firebase_admin import firestore
+    client = get_db()
+    collection = _journal_collection(user_id)
+    accounts = get_trading_accounts(user_id) if accounts is None else accounts
+    doc_ids = list(dict.fromkeys(doc_ids))
+    applied = []
+    try:
+        for start in range(0, len(doc_ids), BULK_CHUNK_SIZE):
+            refs = [collection.document(doc_id) for doc_id in doc_ids[start:start + BULK_CHUNK_SIZE]]
+
+            @firestore.transactional
+            def _apply(transaction):
+                old_entries = [{**(snap.to_dict() or {}), 'doc_id': snap.id}
+                               for snap in client.get_all(refs, transaction=transaction) if snap.exists]
+                changes = build_changes(old_entries) if old_entries else []
+                deltas, done = [], []
+                for old_entry, change in zip(old_entries, changes):
+                    ref = collection.document(old_entry.pop('doc_id'))
+                    if change is None:
+                        transaction.delete(ref)
+                        deltas.append(rollup_delta(old_entry, None, accounts))
+                    elif change:
+                        transaction.update(ref, change)
+                        deltas.append(rollup_delta(old_entry, {**old_entry, **change}, accounts))
+                    else:
+                        continue
+                    done.append((ref.id, change))
+                if done:
+                    apply_rollup_delta(transaction, user_id, combine_rollup_deltas(deltas))
+                return done
+
+            applied += _apply(client.transaction())
+    except Exception as e:
+        st.error(f"Erro na alteração em massa do diário: {e}")
+    finally:
+        if applied:
+            if (cache := get_journal_cache(user_id, create=False)) is not None:
+                for doc_id, change in applied:
+                    if change is None:
+                        cache.remove(doc_id)
+                    else:
+                        cache.apply_write(doc_id, change)
+    return len(applied)
+
+def bulk_close_journal_entries(user_id, exit_prices, exit_date=None):
+    """
+    Finaliza várias operações de uma vez, com o preço de saída de cada uma. As operações já
+    finalizadas (lidas na transação) ficam como estão.
+
+    Args:
+        user_id (str): O utilizador.
+        exit_prices (dict): {doc_id: preço de saída}; preços não positivos são ignorados.
+        exit_date (datetime, optional): Data de saída registada. Defaults to agora.
+
+    Returns:
+        int: Número de operações finalizadas.
+    """
+    exit_prices = {doc_id: float(price) for doc_id, price in (exit_prices or {}).items() if price and float(price) > 0}
+    if not user_id or not exit_prices: return 0
+    exit_date = (exit_date or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+
+    def _close(old_entries):
+        frame = pd.DataFrame(old_entries)
+        exits = frame['doc_id'].map(exit_prices).to_numpy(dtype=float)
+        entries = pd.to_numeric(frame.get('entry_price'), errors='coerce').fillna(0).to_numpy()
+        pnl = closing_pnl(frame.get('direction'), entries, exits)
+        now = datetime.utcnow()
+        changes = []
+        for status, exit_price, trade_pnl in zip(frame.get('status', pd.Series(index=frame.index, dtype=object)), exits, pnl):
+            if status == "Finalizado":
+                changes.append({})
+                continue
+            change = {"status": "Finalizado", "exit_price": exit_price, "exit_date": exit_date, "updated_at": now}
+            if not np.isnan(trade_pnl):
+                change["pnl"] = float(trade_pnl)
+            changes.append(change)
+        return changes
+
+    return _bulk_mutate(user_id, exit_prices, _close)
+
+def bulk_update_journal_entries(user_id, doc_ids, entry_data, accounts=None):
+    """
+    Aplica as mesmas alterações (ex.: contas de execução ou setup) a várias operações.
+    Se as contas mudarem, as frações de capital são recalculadas com 'accounts'
+    (por defeito, as contas atuais do utilizador).
+
+    Returns:
+        int: Número de operações atualizadas.
+    """
+    if not user_id or not doc_ids or not entry_data: return 0
+    entry_data = dict(entry_data)
+    accounts = get_trading_accounts(user_id) if accounts is None else accounts
+    if 'accounts' in entry_data:
+        entry_data['account_weights'] = capital_weights(entry_data['accounts'], accounts)
+    entry_data['updated_at'] = datetime.utcnow()
+    return _bulk_mutate(user_id, doc_ids, lambda old_entries: [entry_data] * len(old_entries), accounts)
+
+def bulk_delete_journal_entries(user_id, doc_ids, accounts=None):
+    """
+    Apaga várias operações e retira as suas contribuições dos agregados de P&L.
+
+    Returns:
+        int: Número de operações apagadas.
+    """
+    if not user_id or not doc_ids: return 0
+    return _bulk_mutate(user_id, doc_ids, lambda old_entries: [None] * len(old_entries), accounts)
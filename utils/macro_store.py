@@ -0,0 +1,398 @@
+# marketlens/utils/macro_store.py
+
+"""
+Indicadores macroeconómicos do FRED guardados em marketlens_data.db.
+
+- 'macro_data': observações (series_id, Date, Value);
+- 'macro_series': metadados de cada série: título, frequência, unidades, a vintage do FRED
+  (last_updated), o release a que pertence, a data da próxima publicação e quando o FRED foi
+  consultado e a série descarregada pela última vez.
+
+refresh_macro() só contacta o FRED para as séries cuja próxima publicação já chegou (ou, sem
+data conhecida, que não são consultadas há FALLBACK_RECHECK_DAYS). Para essas pede primeiro os
+metadados; as observações só são descarregadas se a vintage mudou e substituem a série inteira
+(as revisões alteram valores antigos), numa única transação. Os pedidos são feitos em lote
+pelo cliente, que é injetável (por defeito FredClient, em paralelo sobre a sessão HTTP
+partilhada de http_client).
+
+A leitura (read_indicators, series_metadata, get_country_indicators) é local e só de leitura:
+os gráficos não esperam pelo FRED e não escrevem na base de dados; o esquema só é criado por
+refresh_macro (botão da página do calendário ou linha de comandos).
+
+    python -m utils.macro_store [--country USD] [--force]
+"""
+
+import argparse
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+import pandas as pd
+from .config import DB_PATH, macro_indicator_map
+
+FRED_API_URL = "https://api.stlouisfed.org/fred/"
+# Intervalo mínimo entre duas consultas ao FRED para a mesma série (a publicação pode atrasar).
+MIN_RECHECK_SECONDS = 3600
+# Séries sem próxima publicação conhecida voltam a ser consultadas ao fim deste intervalo.
+FALLBACK_RECHECK_DAYS = 7
+UNITS_LABELS = {"chg": "variação", "pch": "% face ao período anterior", "pc1": "% face ao ano anterior"}
+
+_write_lock = threading.Lock()
+
+# --- LIGAÇÃO E ESQUEMA ---
+
+def get_connection(db_path=None):
+    """Abre uma ligação de escrita à base de dados local (o esquema é criado por refresh_macro)."""
+    return sqlite3.connect(db_path or DB_PATH, timeout=30, check_same_thread=False)
+
+def get_read_connection(db_path=None):
+    """
+    Ligação só de leitura à base de dados local, sem DDL nem commits. Devolve None se a base
+    de dados ou as tabelas dos indicadores ainda não existirem.
+    """
+    path = pathlib.Path(db_path or DB_PATH).absolute()
+    if not path.exists():
+        return None
+    conn = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True, timeout=30, check_same_thread=False)
+    found = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ('macro_data', 'macro_series')").fetchone()[0]
+    if found < 2:
+        conn.close()
+        return None
+    return conn
+
+def ensure_schema(conn):
+    """Cria (se necessário) as tabelas 'macro_data' e 'macro_series'."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS macro_data (
+            series_id TEXT,
+            Date TEXT,
+            Value REAL,
+            PRIMARY KEY (series_id, Date)
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS macro_series (
+            series_id TEXT PRIMARY KEY,
+            title TEXT,
+            frequency TEXT,
+            units TEXT,
+            seasonal_adjustment TEXT,
+            last_updated TEXT,
+            release_id INTEGER,
+            next_release TEXT,
+            observation_end TEXT,
+            last_checked TEXT,
+            last_fetched TEXT
+        )""")
+    conn.commit()
+
+# --- CLIENTE FRED ---
+
+def split_key(series_key):
+    """'CPIAUCSL:pc1' -> ('CPIAUCSL', 'pc1'); sem sufixo, as unidades são None (série original)."""
+    base, _, units = series_key.partition(":")
+    return base, units or None
+
+class FredClient:
+    """
+    Cliente em lote da API JSON do FRED. Cada método recebe uma lista e devolve
+    {chave: resultado}, com a exceção no lugar do resultado quando o pedido falha.
+    """
+
+    def __init__(self, api_key, session=None, base_url=FRED_API_URL, concurrency=None):
+        self.api_key = api_key
+        self.session = session
+        self.base_url = base_url
+        self.concurrency = concurrency
+
+    def _get_many(self, endpoint, params_by_key):
+        from .http_client import gather_json, run_async, MAX_CONCURRENCY
+        keys = list(params_by_key)
+        requests_ = [(self.base_url + endpoint, {**params_by_key[k], "api_key": self.api_key, "file_type": "json"}) for k in keys]
+        results = run_async(gather_json(requests_, concurrency=self.concurrency or MAX_CONCURRENCY, session=self.session))
+        return dict(zip(keys, results))
+
+    def series_info(self, series_ids):
+        """{ID: dict com title, frequency, units, seasonal_adjustment e last_updated (a vintage)}."""
+        out = {}
+        for series_id, payload in self._get_many("series", {s: {"series_id": s} for s in series_ids}).items():
+            info = None if isinstance(payload, Exception) else (payload.get("seriess") or [None])[0]
+            if info is None:
+                out[series_id] = payload if isinstance(payload, Exception) else LookupError(f"Série {series_id} não encontrada no FRED")
+                continue
+            out[series_id] = {"title": info.get("title"), "frequency": info.get("frequency_short"),
+                              "units": info.get("units_short"), "seasonal_adjustment": info.get("seasonal_adjustment_short"),
+                              "last_updated": info.get("last_updated")}
+        return out
+
+    def observations(self, series_keys):
+        """{chave: pd.Series de valores indexada pela data}, já transformada se a chave tiver unidades."""
+        params = {}
+        for key in series_keys:
+            base, units = split_key(key)
+            params[key] = {"series_id": base, **({"units": units} if units else {})}
+        out = {}
+        for key, payload in self._get_many("series/observations", params).items():
+            if isinstance(payload, Exception):
+                out[key] = payload
+                continue
+            obs = payload.get("observations") or []
+            # O FRED marca as observações em falta com ".".
+            values = pd.to_numeric(pd.Series([o.get("value") for o in obs], dtype=object), errors='coerce')
+            out[key] = pd.Series(values.to_numpy(dtype=float), index=pd.to_datetime([o.get("date") for o in obs])).dropna()
+        return out
+
+    def release_ids(self, series_ids):
+        """{ID: ID do release do FRED (ex.: 10 = Consumer Price Index)}."""
+        out = {}
+        for series_id, payload in self._get_many("series/release", {s: {"series_id": s} for s in series_ids}).items():
+            releases = None if isinstance(payload, Exception) else payload.get("releases")
+            out[series_id] = releases[0]["id"] if releases else (payload if isinstance(payload, Exception) else None)
+        return out
+
+    def next_release_dates(self, release_ids, after):
+        """{ID do release: primeira data de publicação >= after, ou None se não houver calendário}."""
+        params = {rid: {"release_id": rid, "realtime_start": after.isoformat(), "include_release_dates_with_no_data": "true",
+                        "sort_order": "asc", "limit": 10} for rid in release_ids}
+        out = {}
+        for rid, payload in self._get_many("release/dates", params).items():
+            if isinstance(payload, Exception):
+                out[rid] = payload
+                continue
+            dates = [date.fromisoformat(d["date"]) for d in payload.get("release_dates") or []]
+            out[rid] = min((d for d in dates if d >= after), default=None)
+        return out
+
+def fred_api_key():
+    """Chave da API do FRED (FRED_API_KEY ou st.secrets['fred_api_key']), ou None se não estiver definida."""
+    api_key = os.environ.get("FRED_API_KEY")
+    if not api_key:
+        try:
+            import streamlit as st
+            api_key = st.secrets.get("fred_api_key")
+        except Exception:
+            api_key = None
+    return api_key or None
+
+def get_fred_client():
+    """FredClient com a chave de fred_api_key(); RuntimeError se não estiver definida."""
+    api_key = fred_api_key()
+    if not api_key:
+        raise RuntimeError("Chave da API do FRED não definida (FRED_API_KEY ou st.secrets['fred_api_key']).")
+    return FredClient(api_key)
+
+# --- ATUALIZAÇÃO ---
+
+def all_series_keys(countries=None):
+    """Séries de macro_indicator_map (de todas as zonas ou das pedidas), sem repetições."""
+    countries = countries or list(macro_indicator_map)
+    return list(dict.fromkeys(key for c in countries for key in macro_indicator_map[c].values()))
+
+def _load_meta(conn, series_keys):
+    placeholders = ",".join("?" * len(series_keys))
+    cursor = conn.execute(f"SELECT * FROM macro_series WHERE series_id IN ({placeholders})", series_keys)
+    columns = [c[0] for c in cursor.description]
+    return {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
+
+def is_due(meta, now):
+    """Indica se uma série deve ser consultada no FRED (ver o docstring do módulo)."""
+    if not meta or not meta.get("last_checked"):
+        return True
+    since_check = now - datetime.fromisoformat(meta["last_checked"])
+    if since_check.total_seconds() < MIN_RECHECK_SECONDS:
+        return False
+    if not meta.get("last_fetched"):
+        return True
+    if meta.get("next_release"):
+        return date.fromisoformat(meta["next_release"]) <= now.date()
+    return since_check >= timedelta(days=FALLBACK_RECHECK_DAYS)
+
+def refresh_macro(series_keys=None, client=None, db_path=None, conn=None, now=None, force=False):
+    """
+    Atualiza as séries cuja publicação já chegou (ou todas as pedidas, com force=True).
+
+    Args:
+        series_keys (list, optional): Chaves das séries ('ID' ou 'ID:units'). Defaults to todas as de macro_indicator_map.
+        client (optional): Cliente com a interface de FredClient. Defaults to get_fred_client() (só se houver séries a consultar).
+        db_path (str, optional): Caminho da base de dados. Defaults to DB_PATH.
+        conn (sqlite3.Connection, optional): Ligação já aberta.
+        now (datetime, optional): Instante de referência. Defaults to datetime.now().
+        force (bool, optional): Consulta e descarrega todas as séries pedidas. Defaults to False.
+
+    Returns:
+        dict: {"series", "checked", "updated", "rows", "errors" ({chave: mensagem}), "seconds"}.
+    """
+    t0 = time.perf_counter()
+    keys = list(dict.fromkeys(series_keys or all_series_keys()))
+    now = now or datetime.now()
+    today = now.date()
+    stats = {"series": len(keys), "checked": 0, "updated": 0, "rows": 0, "errors": {}}
+    own_conn = conn is None
+    conn = conn or get_connection(db_path)
+    try:
+        ensure_schema(conn)
+        meta = _load_meta(conn, keys)
+        due = [k for k in keys if force or is_due(meta.get(k), now)]
+        if not due:
+            stats["seconds"] = time.perf_counter() - t0
+            return stats
+        client = client or get_fred_client()
+        stats["checked"] = len(due)
+        errors = stats["errors"]
+
+        # 1. Metadados (vintage) de cada série base; só as séries com nova vintage são descarregadas.
+        infos = client.series_info(list(dict.fromkeys(split_key(k)[0] for k in due)))
+        current = {}
+        for k in due:
+            info = infos.get(split_key(k)[0])
+            if info is None or isinstance(info, Exception):
+                errors[k] = str(info)
+            else:
+                current[k] = info
+        changed = [k for k, info in current.items()
+                   if force or not (meta.get(k) or {}).get("last_fetched") or info["last_updated"] != meta[k]["last_updated"]]
+        fetched = {}
+        for k, series in (client.observations(changed) if changed else {}).items():
+            if isinstance(series, Exception):
+                errors[k] = str(series)
+            else:
+                fetched[k] = series
+
+        # 2. Próxima publicação: depois de hoje para as séries já atualizadas, a partir de hoje para as restantes.
+        release_of = {k: (meta.get(k) or {}).get("release_id") for k in current}
+        missing = list(dict.fromkeys(split_key(k)[0] for k, rid in release_of.items() if not rid))
+        if missing:
+            found = client.release_ids(missing)
+            for k, rid in release_of.items():
+                found_rid = found.get(split_key(k)[0])
+                if not rid and not isinstance(found_rid, Exception):
+                    release_of[k] = found_rid
+        after_of = {k: today + timedelta(days=1) if k in fetched else today for k in current}
+        next_release = {}
+        for after in set(after_of.values()):
+            rids = sorted({release_of[k] for k in current if after_of[k] == after and release_of[k]})
+            for rid, day in (client.next_release_dates(rids, after) if rids else {}).items():
+                next_release[(rid, after)] = None if isinstance(day, Exception) else day
+
+        # 3. Gravação numa única transação: observações das séries descarregadas e metadados.
+        stamp = now.isoformat(timespec="seconds")
+        data_rows, meta_rows = [], []
+        for k, info in current.items():
+            old = meta.get(k) or {}
+            series = fetched.get(k)
+            if series is not None:
+                data_rows.extend((k, d.strftime("%Y-%m-%d"), float(v)) for d, v in series.items())
+            units = split_key(k)[1]
+            day = next_release.get((release_of[k], after_of[k]))
+            meta_rows.append((
+                k,
+                info["title"] + (f" ({UNITS_LABELS.get(units, units)})" if units else ""),
+                info["frequency"],
+                UNITS_LABELS.get(units, units) if units else info["units"],
+                info["seasonal_adjustment"],
+                # Sem observações novas, a vintage guardada fica a anterior (a série volta a ser descarregada).
+                info["last_updated"] if series is not None or k not in changed else old.get("last_updated"),
+                release_of[k],
+                day.isoformat() if day else None,
+                series.index.max().strftime("%Y-%m-%d") if series is not None and not series.empty else old.get("observation_end"),
+                stamp,
+                stamp if series is not None else old.get("last_fetched"),
+            ))
+        with _write_lock:
+            conn.executemany("DELETE FROM macro_data WHERE series_id = ?", [(k,) for k in fetched])
+            conn.executemany("INSERT INTO macro_data (series_id, Date, Value) VALUES (?, ?, ?)", data_rows)
+            conn.executemany("INSERT OR REPLACE INTO macro_series VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", meta_rows)
+            # Séries sem metadados (erro no FRED): só regista a consulta, para não repetir o pedido antes de MIN_RECHECK_SECONDS.
+            conn.executemany("INSERT INTO macro_series (series_id, last_checked) VALUES (?, ?) "
+                             "ON CONFLICT(series_id) DO UPDATE SET last_checked = excluded.last_checked",
+                             [(k, stamp) for k in due if k not in current])
+            conn.commit()
+        stats["updated"], stats["rows"] = len(fetched), len(data_rows)
+        if errors:
+            print(f"Erro ao atualizar indicadores do FRED: {errors}")
+    finally:
+        if own_conn:
+            conn.close()
+    stats["seconds"] = time.perf_counter() - t0
+    return stats
+
+# --- LEITURA LOCAL ---
+
+def read_indicators(series_keys, start=None, db_path=None, conn=None):
+    """
+    Lê do disco as séries pedidas, sem contactar o FRED.
+
+    Returns:
+        pd.DataFrame: Índice de datas e uma coluna por série, pela ordem pedida.
+    """
+    series_keys = [series_keys] if isinstance(series_keys, str) else list(series_keys)
+    own_conn = conn is None
+    conn = conn or get_read_connection(db_path)
+    if conn is None:
+        return pd.DataFrame()
+    try:
+        placeholders = ",".join("?" * len(series_keys))
+        query = f"SELECT Date, series_id, Value FROM macro_data WHERE series_id IN ({placeholders})"
+        params = list(series_keys)
+        if start is not None:
+            query += " AND Date >= ?"; params.append(pd.Timestamp(start).strftime("%Y-%m-%d"))
+        rows = conn.execute(query, params).fetchall()
+    finally:
+        if own_conn:
+            conn.close()
+    if not rows:
+        return pd.DataFrame()
+    wide = pd.DataFrame(rows, columns=['Date', 'series_id', 'Value']).pivot(index='Date', columns='series_id', values='Value')
+    wide.index = pd.to_datetime(wide.index)
+    wide.columns.name = None
+    return wide.reindex(columns=[k for k in series_keys if k in wide.columns]).sort_index()
+
+def series_metadata(series_keys, db_path=None, conn=None):
+    """Metadados guardados das séries pedidas (uma linha por série, indexada por series_id)."""
+    series_keys = [series_keys] if isinstance(series_keys, str) else list(series_keys)
+    own_conn = conn is None
+    conn = conn or get_read_connection(db_path)
+    if conn is None:
+        return pd.DataFrame()
+    try:
+        meta = _load_meta(conn, series_keys)
+    finally:
+        if own_conn:
+            conn.close()
+    return pd.DataFrame([meta[k] for k in series_keys if k in meta]).set_index("series_id") if meta else pd.DataFrame()
+
+def get_country_indicators(country, start=None, refresh=False, client=None, db_path=None):
+    """
+    Todos os indicadores de uma zona monetária (ex.: "USD"), numa única leitura local. Com
+    refresh=True, as séries com publicação pendente são atualizadas antes (pedidos ao FRED e
+    escrita na base de dados); se o FRED não estiver disponível, servem os dados já guardados.
+
+    Returns:
+        dict: {nome do indicador: pd.Series}, pela ordem de macro_indicator_map (vazia se não houver dados).
+    """
+    if country not in macro_indicator_map:
+        raise ValueError(f"Sem indicadores macro para '{country}'. Disponíveis: {list(macro_indicator_map)}")
+    indicators = macro_indicator_map[country]
+    if refresh:
+        try:
+            refresh_macro(list(indicators.values()), client=client, db_path=db_path)
+        except Exception as e:
+            print(f"FRED indisponível, a usar os indicadores guardados: {e}")
+    wide = read_indicators(list(indicators.values()), start=start, db_path=db_path)
+    return {name: (wide[key].dropna().rename(name) if key in wide.columns else pd.Series(dtype=float, name=name))
+            for name, key in indicators.items()}
+
+# --- LINHA DE COMANDOS ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Atualiza os indicadores macro do FRED em marketlens_data.db.")
+    parser.add_argument("--country", action="append", choices=list(macro_indicator_map), help="Zona(s) a atualizar (por defeito todas).")
+    parser.add_argument("--force", action="store_true", help="Descarrega todas as séries, mesmo sem publicação pendente.")
+    args = parser.parse_args(argv)
+    stats = refresh_macro(all_series_keys(args.country), force=args.force)
+    print(f"{stats['checked']}/{stats['series']} séries consultadas, {stats['updated']} atualizadas "
+          f"({stats['rows']} observações) em {stats['seconds']:.2f} s; erros: {len(stats['errors'])}")
+
+if __name__ == "__main__":
+    main()
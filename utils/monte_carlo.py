@@ -0,0 +1,180 @@
+# marketlens/utils/monte_carlo.py
+
+"""
+Simulação Monte Carlo de avaliações de mesas proprietárias.
+
+Cada caminho é uma sequência de trades cujos R-múltiplos são sorteados (com reposição) do
+histórico do utilizador; com um risco fixo por trade, o caminho termina quando atinge o
+objetivo de lucro (aprovado), quando perde o drawdown máximo permitido (reprovado) ou quando
+se esgota o número de trades (em aberto).
+
+Os caminhos são simulados em blocos de matrizes NumPy (caminhos x trades) e repartidos em
+fragmentos por uma ProcessPoolExecutor. Cada fragmento tem a sua semente, derivada de uma
+SeedSequence, por isso o resultado depende apenas da semente e do número de caminhos, e não do
+número de processos nem da ordem em que os fragmentos terminam. iter_simulation() devolve o
+resultado acumulado à medida que cada fragmento termina, para a interface mostrar o progresso.
+"""
+
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+DEFAULT_SHARD_PATHS = 5_000
+# Caminhos simulados de uma vez dentro de um fragmento (limita a memória das matrizes).
+BLOCK_PATHS = 2_000
+FINAL_PERCENTILES = (5, 25, 50, 75, 95)
+
+# --- SIMULAÇÃO DE UM FRAGMENTO ---
+
+def simulate_paths(r_multiples, rules, n_paths, rng):
+    """
+    Simula n_paths caminhos de uma avaliação.
+
+    Args:
+        r_multiples (np.ndarray): R-múltiplos históricos (amostra para o bootstrap).
+        rules (dict): "initial_capital", "risk_pct" (risco por trade, % do capital inicial),
+                      "profit_target_pct", "max_drawdown_pct", "trailing" (drawdown a partir do
+                      máximo atingido) e "max_trades".
+        n_paths (int): Número de caminhos.
+        rng (np.random.Generator): Gerador de números aleatórios.
+
+    Returns:
+        dict: "outcome" (int8 por caminho: 1 aprovado, -1 reprovado, 0 em aberto), "trades"
+              (trades até ao fim de cada caminho) e "final_pct" (resultado final, % do capital).
+    """
+    initial = float(rules["initial_capital"])
+    risk = initial * rules["risk_pct"] / 100
+    target = initial * (1 + rules["profit_target_pct"] / 100)
+    drawdown = initial * rules["max_drawdown_pct"] / 100
+    horizon = int(rules["max_trades"])
+
+    outcome = np.zeros(n_paths, dtype=np.int8)
+    trades = np.full(n_paths, horizon, dtype=np.int32)
+    final_pct = np.zeros(n_paths, dtype=np.float32)
+    for start in range(0, n_paths, BLOCK_PATHS):
+        n = min(BLOCK_PATHS, n_paths - start)
+        equity = initial + np.cumsum(rng.choice(r_multiples, size=(n, horizon)) * risk, axis=1)
+        if rules.get("trailing"):
+            floor = np.maximum.accumulate(np.maximum(equity, initial), axis=1) - drawdown
+        else:
+            floor = initial - drawdown
+        hit_target, breached = equity >= target, equity <= floor
+        # Primeiro trade em que cada condição se verifica (horizon se nunca se verificar).
+        first_target = np.where(hit_target.any(axis=1), hit_target.argmax(axis=1), horizon)
+        first_breach = np.where(breached.any(axis=1), breached.argmax(axis=1), horizon)
+        end = np.minimum(np.minimum(first_target, first_breach), horizon - 1)
+
+        block = slice(start, start + n)
+        outcome[block] = np.where(first_target < first_breach, 1, np.where(first_breach < first_target, -1, 0))
+        trades[block] = end + 1
+        final_pct[block] = (equity[np.arange(n), end] / initial - 1) * 100
+    return {"outcome": outcome, "trades": trades, "final_pct": final_pct}
+
+def _run_shard(r_multiples, rules, n_paths, seed_sequence):
+    """Ponto de entrada de um processo: simula um fragmento com a sua própria semente."""
+    return simulate_paths(r_multiples, rules, n_paths, np.random.default_rng(seed_sequence))
+
+# --- AGREGAÇÃO ---
+
+def summarize(results, n_total=None):
+    """
+    Resume os fragmentos já simulados.
+
+    Returns:
+        dict: Contagens e probabilidades de aprovação/reprovação/em aberto, mediana de trades até
+              à aprovação, percentis do resultado final e progresso (0 a 1).
+    """
+    outcome = np.concatenate([r["outcome"] for r in results]) if results else np.array([], dtype=np.int8)
+    trades = np.concatenate([r["trades"] for r in results]) if results else np.array([], dtype=np.int32)
+    final_pct = np.concatenate([r["final_pct"] for r in results]) if results else np.array([], dtype=np.float32)
+    n = len(outcome)
+    passed, failed = int((outcome == 1).sum()), int((outcome == -1).sum())
+    return {
+        "paths": n,
+        "progress": n / n_total if n_total else 1.0,
+        "passed": passed, "failed": failed, "open": n - passed - failed,
+        "pass_prob": passed / n * 100 if n else 0.0,
+        "fail_prob": failed / n * 100 if n else 0.0,
+        "open_prob": (n - passed - failed) / n * 100 if n else 0.0,
+        "median_trades_to_pass": float(np.median(trades[outcome == 1])) if passed else None,
+        "median_trades_to_fail": float(np.median(trades[outcome == -1])) if failed else None,
+        "final_percentiles": dict(zip(FINAL_PERCENTILES, np.percentile(final_pct, FINAL_PERCENTILES).tolist())) if n else {},
+        "final_pct": final_pct,
+    }
+
+# --- POOL DE PROCESSOS ---
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+def _get_pool(max_workers):
+    """
+    Pool partilhada pelo processo, criada na primeira simulação. Usa 'spawn': o servidor
+    Streamlit tem várias threads e um fork a meio delas pode bloquear o processo filho.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != max_workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = max_workers
+        return _pool
+
+def shutdown_pool():
+    """Termina os processos da pool partilhada (ex.: no fim de um benchmark)."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+        _pool, _pool_workers = None, 0
+
+# --- API PÚBLICA ---
+
+def iter_simulation(r_multiples, rules, n_paths=20_000, seed=None, max_workers=None, shard_paths=DEFAULT_SHARD_PATHS):
+    """
+    Simula uma avaliação e devolve o resumo acumulado sempre que um fragmento termina.
+
+    Args:
+        r_multiples (array-like): R-múltiplos históricos (ex.: prepare_trades(df)['r_multiple']).
+        rules (dict): Regras da avaliação (ver simulate_paths).
+        n_paths (int, optional): Número total de caminhos. Defaults to 20 000.
+        seed (int, optional): Semente; com a mesma semente o resultado é sempre o mesmo. Defaults to None.
+        max_workers (int, optional): Processos a usar (1 = no próprio processo). Defaults to os.cpu_count().
+        shard_paths (int, optional): Caminhos por fragmento. Defaults to DEFAULT_SHARD_PATHS.
+
+    Yields:
+        dict: Resumo (ver summarize) dos fragmentos terminados até ao momento.
+    """
+    r_multiples = np.asarray(r_multiples, dtype=float)
+    r_multiples = r_multiples[np.isfinite(r_multiples)]
+    if r_multiples.size == 0:
+        raise ValueError("Não há R-múltiplos para simular.")
+    sizes = [min(shard_paths, n_paths - start) for start in range(0, n_paths, shard_paths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(sizes)))
+
+    results = [None] * len(sizes)
+    if max_workers == 1:
+        for i, (size, seed_sequence) in enumerate(zip(sizes, seeds)):
+            results[i] = _run_shard(r_multiples, rules, size, seed_sequence)
+            yield summarize([r for r in results if r is not None], n_paths)
+        return
+
+    pool = _get_pool(max_workers)
+    futures = {pool.submit(_run_shard, r_multiples, rules, size, seed_sequence): i
+               for i, (size, seed_sequence) in enumerate(zip(sizes, seeds))}
+    for future in as_completed(futures):
+        results[futures[future]] = future.result()
+        # Os fragmentos são juntos pela ordem original: o resultado final não depende da ordem de chegada.
+        yield summarize([r for r in results if r is not None], n_paths)
+
+def run_simulation(r_multiples, rules, n_paths=20_000, seed=None, max_workers=None, shard_paths=DEFAULT_SHARD_PATHS):
+    """Corre a simulação completa e devolve apenas o resumo final (ver iter_simulation)."""
+    summary = None
+    for summary in iter_simulation(r_multiples, rules, n_paths, seed, max_workers, shard_paths):
+        pass
+    return summary
@@ -0,0 +1,63 @@
+# marketlens/utils/parallel_loader.py
+
+"""
+Carregamento paralelo dos dados de uma página.
+
+Cada página declara os conjuntos de dados de que precisa ({nome: função sem argumentos}) e
+load_page_data() executa-os em simultâneo numa pool de threads. As chamadas ao Firestore passam
+a maior parte do tempo à espera da rede, por isso o tempo total fica próximo do da consulta
+mais lenta em vez da soma de todas.
+
+Os tempos de cada carregamento ficam em st.session_state['page_load_timings'][página]; com
+MARKETLENS_LOG_LOAD_TIMINGS=1 são também escritos no log.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# Limite de threads por página; acima disto os pedidos ficam em fila.
+MAX_WORKERS = 8
+# Escreve os tempos de carregamento no log (diagnóstico).
+LOG_TIMINGS = os.environ.get("MARKETLENS_LOG_LOAD_TIMINGS", "0") != "0"
+
+def load_page_data(datasets, page=None, max_workers=MAX_WORKERS):
+    """
+    Carrega em paralelo os conjuntos de dados de uma página.
+
+    Args:
+        datasets (dict): {nome: função sem argumentos} (use lambda ou functools.partial).
+        page (str, optional): Nome da página, usado para guardar os tempos. Defaults to None.
+        max_workers (int, optional): Número máximo de threads. Defaults to MAX_WORKERS.
+
+    Returns:
+        dict: {nome: resultado}, pela ordem declarada. Um erro num carregamento é propagado.
+    """
+    ctx = get_script_run_ctx(suppress_warning=True)
+    timings = {}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(max_workers, max(len(datasets), 1)), thread_name_prefix="page-loader") as pool:
+        futures = {name: pool.submit(_run, name, loader, ctx, timings) for name, loader in datasets.items()}
+        results = {name: future.result() for name, future in futures.items()}
+    timings = {**{name: timings[name] for name in datasets}, "total": time.perf_counter() - start}
+
+    if page:
+        try:
+            st.session_state.setdefault('page_load_timings', {})[page] = timings
+        except Exception:
+            pass  # Fora de uma sessão do Streamlit (ex.: benchmarks) não há session_state.
+    if LOG_TIMINGS:
+        print(f"Carregamento '{page or 'página'}': " + ", ".join(f"{name}={secs * 1000:.0f}ms" for name, secs in timings.items()))
+    return results
+
+def _run(name, loader, ctx, timings):
+    """Executa um carregamento dentro do contexto da sessão (para st.error/st.cache_data) e mede-o."""
+    if ctx is not None:
+        add_script_run_ctx(None, ctx)
+    start = time.perf_counter()
+    try:
+        return loader()
+    finally:
+        timings[name] = time.perf_counter() - start
@@ -1,7 +1,8 @@
 # synapse_desk/utils/planning_utils.py
 
 import streamlit as st
-from firebase_config import db
+from firebase_config import get_db
+from .disk_cache import cached, invalidate
 from datetime import datetime, date
 
 # --- Funções para o Plano Semanal ---
@@ -10,21 +11,23 @@ def get_week_id_from_date(selected_date: date):
     """Gera um ID único para a semana de uma data específica (YYYY-Www)."""
     return selected_date.strftime("%Y-W%U")
 
+@cached("firestore", tag_param="user_id")
 def get_weekly_plan(user_id, week_id):
     """Busca o plano de trading semanal estruturado de um utilizador."""
     if not user_id or not week_id: return {}
     try:
-        doc_ref = db.collection("user_profiles").document(user_id).collection("weekly_plans").document(week_id)
+        doc_ref = get_db().collection("user_profiles").document(user_id).collection("weekly_plans").document(week_id)
         doc = doc_ref.get()
         return doc.to_dict() if doc.exists else {}
     except Exception as e:
         st.error(f"Erro ao buscar o plano semanal: {e}"); return {}
 
+@cached("firestore", tag_param="user_id")
 def get_all_weekly_plans(user_id):
     """Busca TODOS os planos semanais de um utilizador, ordenados do mais recente para o mais antigo."""
     if not user_id: return []
     try:
-        plans_ref = db.collection("user_profiles").document(user_id).collection("weekly_plans")
+        plans_ref = get_db().collection("user_profiles").document(user_id).collection("weekly_plans")
         # CORREÇÃO DEFINITIVA: Usa a string "__name__" para ordenar pelo ID do documento.
         docs = plans_ref.order_by("__name__", direction='DESCENDING').stream()
         plans_list = []
@@ -40,8 +43,9 @@ def update_weekly_plan(user_id, week_id, plan_data):
     """Cria ou atualiza um plano de trading semanal estruturado."""
     if not user_id or not week_id or not isinstance(plan_data, dict): return False
     try:
-        doc_ref = db.collection("user_profiles").document(user_id).collection("weekly_plans").document(week_id)
-        doc_ref.set(plan_data); return True
+        doc_ref = get_db().collection("user_profiles").document(user_id).collection("weekly_plans").document(week_id)
+        doc_ref.set(plan_data)
+        invalidate("firestore", tag=user_id); return True
     except Exception as e:
         st.error(f"Erro ao guardar o plano semanal: {e}"); return False
 
@@ -51,21 +55,23 @@ def get_date_id_from_date(selected_date: date):
     """Gera um ID único para uma data específica no formato YYYY-MM-DD."""
     return selected_date.strftime("%Y-%m-%d")
 
+@cached("firestore", tag_param="user_id")
 def get_daily_checklist(user_id, date_id):
     """Busca o checklist diário de um utilizador no Firestore."""
     if not user_id or not date_id: return {}
     try:
-        doc_ref = db.collection("user_profiles").document(user_id).collection("daily_checklists").document(date_id)
+        doc_ref = get_db().collection("user_profiles").document(user_id).collection("daily_checklists").document(date_id)
         doc = doc_ref.get()
         return doc.to_dict() if doc.exists else {}
     except Exception as e:
         st.error(f"Erro ao buscar o checklist diário: {e}"); return {}
 
+@cached("firestore", tag_param="user_id")
 def get_all_daily_checklists(user_id):
     """Busca TODOS os checklists diários de um utilizador, ordenados do mais recente para o mais antigo."""
     if not user_id: return []
     try:
-        checklists_ref = db.collection("user_profiles").document(user_id).collection("daily_checklists")
+        checklists_ref = get_db().collection("user_profiles").document(user_id).collection("daily_checklists")
         # Ordena pelo ID do documento (que é a nossa date_id 'YYYY-MM-DD') em ordem descendente
         docs = checklists_ref.order_by("__name__", direction='DESCENDING').stream()
         checklists_list = []
@@ -81,8 +87,9 @@ def update_daily_checklist(user_id, date_id, checklist_data):
     """Cria ou atualiza o checklist diário de um utilizador no Firestore."""
     if not user_id or not date_id or not isinstance(checklist_data, dict): return False
     try:
-        doc_ref = db.collection("user_profiles").document(user_id).collection("daily_checklists").document(date_id)
-        doc_ref.set(checklist_data); return True
+        doc_ref = get_db().collection("user_profiles").document(user_id).collection("daily_checklists").document(date_id)
+        doc_ref.set(checklist_data)
+        invalidate("firestore", tag=user_id); return True
     except Exception as e:
         st.error(f"Erro ao guardar o checklist diário: {e}"); return False
 
@@ -1,9 +1,11 @@
 # synapse_desk/utils/playbook_utils.py
 
 import streamlit as st
-from firebase_config import db
+from firebase_config import get_db
+from .disk_cache import cached, invalidate
 from datetime import datetime
 
+@cached("firestore", tag_param="user_id")
 def get_playbook_setups(user_id):
     """
     Busca todos os setups do playbook de um utilizador no Firestore.
@@ -11,7 +13,7 @@ def get_playbook_setups(user_id):
     if not user_id:
         return []
     try:
-        setups_ref = db.collection("user_profiles").document(user_id).collection("playbook_setups")
+        setups_ref = get_db().collection("user_profiles").document(user_id).collection("playbook_setups")
         docs = setups_ref.order_by("created_at", direction="DESCENDING").stream()
 
         setups_list = []
@@ -34,8 +36,9 @@ def add_playbook_setup(user_id, setup_data):
     try:
         # Adiciona um timestamp de criação para ordenação
         setup_data['created_at'] = datetime.utcnow()
-        setups_ref = db.collection("user_profiles").document(user_id).collection("playbook_setups")
+        setups_ref = get_db().collection("user_profiles").document(user_id).collection("playbook_setups")
         setups_ref.add(setup_data)
+        invalidate("firestore", tag=user_id)
         return True
     except Exception as e:
         st.error(f"Erro ao adicionar o setup ao playbook: {e}")
@@ -48,8 +51,9 @@ def update_playbook_setup(user_id, doc_id, setup_data):
     if not user_id or not doc_id or not setup_data:
         return False
     try:
-        doc_ref = db.collection("user_profiles").document(user_id).collection("playbook_setups").document(doc_id)
+        doc_ref = get_db().collection("user_profiles").document(user_id).collection("playbook_setups").document(doc_id)
         doc_ref.update(setup_data)
+        invalidate("firestore", tag=user_id)
         return True
     except Exception as e:
         st.error(f"Erro ao atualizar o setup: {e}")
@@ -62,8 +66,9 @@ def delete_playbook_setup(user_id, doc_id):
     if not user_id or not doc_id:
         return False
     try:
-        doc_ref = db.collection("user_profiles").document(user_id).collection("playbook_setups").document(doc_id)
+        doc_ref = get_db().collection("user_profiles").document(user_id).collection("playbook_setups").document(doc_id)
         doc_ref.delete()
+        invalidate("firestore", tag=user_id)
         return True
     except Exception as e:
         st.error(f"Erro ao apagar o setup: {e}")
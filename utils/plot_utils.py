@@ -22,6 +22,50 @@ def prepare_seasonality_data_for_lines(df_price):
     normalized_prices.index = normalized_prices.index.map(month_map)
     return normalized_prices
 
+MONTH_LABELS = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+
+def seasonality_stats_frame(stats, granularity="monthly"):
+    """
+    Converte as estatísticas do cubo de sazonalidade (SeasonalityCube.stats) numa tabela por período,
+    com as colunas 'Retorno Médio (%)', 'Taxa de Acerto (%)', 'Dispersão (%)' e 'Trajetória (%)'.
+    """
+    if not stats:
+        return pd.DataFrame()
+    n = len(stats["avg"])
+    if granularity == "monthly":
+        labels = MONTH_LABELS[:n]
+    elif granularity == "weekly":
+        labels = [f"S{i}" for i in range(1, n + 1)]
+    else:
+        labels = list(range(1, n + 1))
+    frame = pd.DataFrame({'Retorno Médio (%)': stats["avg"], 'Taxa de Acerto (%)': stats["hit_rate"],
+                          'Dispersão (%)': stats["std"], 'Trajetória (%)': stats["path"]}, index=labels)
+    # Períodos sem nenhum ano com dados (ex.: semana 53, dia 366) não entram no gráfico.
+    return frame[frame['Retorno Médio (%)'].notna()]
+
+def create_seasonality_chart(stats, asset, granularity="monthly"):
+    """
+    Gráfico de sazonalidade a partir do cubo: trajetória média acumulada (linha) e retorno médio de
+    cada período (barras), com a taxa de acerto na legenda de cada barra.
+    """
+    frame = seasonality_stats_frame(stats, granularity)
+    if frame.empty:
+        return None
+    avg = frame['Retorno Médio (%)']
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=frame.index, y=avg, name='Retorno médio', yaxis='y2', opacity=0.6,
+                         marker_color=['#4caf50' if v > 0 else '#f44336' for v in avg],
+                         customdata=frame[['Taxa de Acerto (%)', 'Dispersão (%)']].to_numpy(),
+                         hovertemplate='%{x}: %{y:+.2f}%<br>Acerto: %{customdata[0]:.0f}%<br>Dispersão: %{customdata[1]:.2f}%<extra></extra>'))
+    fig.add_trace(go.Scatter(x=frame.index, y=frame['Trajetória (%)'], mode='lines', name='Trajetória média',
+                             line=dict(color='#f59e0b', width=2), hovertemplate='%{x}: %{y:+.2f}%<extra></extra>'))
+    first, last = stats["years"]
+    fig.update_layout(title=f'Sazonalidade de {asset} ({first}-{last})', plot_bgcolor='#131722', paper_bgcolor='#131722',
+                      font_color='white', showlegend=True, legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+                      yaxis=dict(title='Trajetória (%)'), yaxis2=dict(title='Retorno médio (%)', overlaying='y', side='right', showgrid=False),
+                      xaxis=dict(type='category'))
+    return fig
+
 def calculate_cot_percentages(df_cot):
     """Calcula o percentual de posições Long vs. Short para Institucional e Varejo."""
     if df_cot is None or df_cot.empty:
@@ -42,6 +86,50 @@ def style_cot_table(val):
     elif val < 40: return 'background-color: #8B0000; color: white;'
     return ''
 
+def create_cot_heatmap(metric_frame, title="COT Index", weeks=26, markets=None):
+    """
+    Cria um heatmap (mercados x semanas) a partir de uma métrica larga do motor COT
+    (ex.: get_cot_panel()["noncomm"]["cot_index"]), sem consultas adicionais por mercado.
+    """
+    if metric_frame is None or metric_frame.empty:
+        return None
+    data = metric_frame if markets is None else metric_frame.reindex(columns=markets)
+    data = data.iloc[-weeks:].dropna(axis=1, how='all')
+    if data.empty:
+        return None
+    # Ordena os mercados pelo último valor disponível (mais alto no topo).
+    data = data[data.ffill().iloc[-1].sort_values(ascending=True).index]
+    fig = go.Figure(go.Heatmap(
+        x=data.index.strftime('%d/%m/%Y'), y=data.columns, z=data.T.values,
+        colorscale=[[0, '#8B0000'], [0.5, '#2c2c2c'], [1, '#006400']], zmin=0, zmax=100, zmid=50,
+        hoverongaps=False, hovertemplate='<b>%{y}</b><br>%{x}<br>' + title + ': %{z:.1f}<extra></extra>'
+    ))
+    fig.update_layout(title=title, plot_bgcolor='#131722', paper_bgcolor='#131722', font_color='white',
+                      height=max(400, 18 * data.shape[1]), margin=dict(l=20, r=20, t=50, b=20),
+                      yaxis=dict(tickfont=dict(size=9)))
+    return fig
+
+def create_correlation_heatmap(corr, title="Correlação", assets=None):
+    """
+    Cria um heatmap (ativos x ativos) a partir de uma matriz de correlação do serviço entre ativos
+    (ex.: get_cross_asset_service().correlation(60)), omitindo os ativos sem dados.
+    """
+    if corr is None or corr.empty:
+        return None
+    data = corr if assets is None else corr.reindex(index=assets, columns=assets)
+    data = data.dropna(axis=0, how='all').dropna(axis=1, how='all')
+    if data.empty:
+        return None
+    fig = go.Figure(go.Heatmap(
+        x=data.columns, y=data.index, z=data.values,
+        colorscale=[[0, '#8B0000'], [0.5, '#2c2c2c'], [1, '#006400']], zmin=-1, zmax=1, zmid=0,
+        hoverongaps=False, hovertemplate='<b>%{y}</b> x <b>%{x}</b><br>' + title + ': %{z:.2f}<extra></extra>'
+    ))
+    fig.update_layout(title=title, plot_bgcolor='#131722', paper_bgcolor='#131722', font_color='white',
+                      height=max(500, 16 * data.shape[0]), margin=dict(l=20, r=20, t=50, b=20),
+                      xaxis=dict(tickfont=dict(size=9)), yaxis=dict(tickfont=dict(size=9), autorange='reversed'))
+    return fig
+
 def create_indicator_bar_chart(series_data, series_name):
     """Cria um gráfico de barras com os últimos 12 meses de um indicador económico."""
     if series_data is None or series_data.empty or len(series_data) < 12:
@@ -0,0 +1,352 @@
+# marketlens/utils/price_store.py
+
+"""
+Armazenamento local de preços de fecho, sobre a tabela 'price_data' de marketlens_data.db.
+
+O histórico de cada ticker fica guardado em disco. Num pedido, apenas o que falta é
+pedido ao fornecedor (por defeito a API de gráficos do Yahoo, ver http_fetcher): a "cauda"
+desde a última barra guardada e, se o período pedido for mais antigo do que o já coberto,
+o troço inicial em falta.
+O fornecedor é injetável (argumento 'fetcher'), o que permite trabalhar offline.
+"""
+
+import re
+import sqlite3
+from urllib.parse import quote
+import threading
+from datetime import date, datetime, timedelta
+import pandas as pd
+from .config import DB_PATH
+
+# Intervalo mínimo entre duas consultas ao fornecedor para a cauda do mesmo ticker.
+SYNC_TTL_SECONDS = 900
+# Início usado para period="max" (o yfinance devolve a partir da primeira barra disponível).
+MAX_START = date(1970, 1, 2)
+YAHOO_CHART_URL = "https://query2.finance.yahoo.com/v8/finance/chart/{ticker}"
+
+_write_lock = threading.Lock()
+
+# --- LIGAÇÃO E ESQUEMA ---
+
+def get_connection(db_path=None):
+    """
+    Abre uma ligação à base de dados local. O esquema não é criado aqui: as leituras não fazem
+    DDL nem escritas, e top_up (o único caminho de escrita) chama ensure_schema.
+    """
+    return sqlite3.connect(db_path or DB_PATH, timeout=30, check_same_thread=False)
+
+def ensure_schema(conn):
+    """
+    Cria (se necessário) as tabelas do armazenamento de preços.
+    'price_sync' regista, por ticker, desde quando o histórico está coberto e quando foi
+    consultado o fornecedor pela última vez.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS price_data (
+            Date TEXT,
+            Ticker TEXT,
+            Close REAL,
+            PRIMARY KEY (Date, Ticker)
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS price_sync (
+            Ticker TEXT PRIMARY KEY,
+            covered_from TEXT,
+            last_checked TEXT
+        )""")
+    # A chave primária começa pela data; as leituras são por ticker.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_price_data_ticker_date ON price_data (Ticker, Date)")
+    conn.commit()
+
+def has_price_table(conn):
+    """Indica se a base já tem a tabela 'price_data' (as leituras não a criam)."""
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'price_data'").fetchone() is not None
+
+# --- FORNECEDOR POR DEFEITO ---
+
+def yfinance_fetcher(tickers, start, end=None):
+    """
+    Busca os preços de fecho de vários tickers numa única chamada ao yfinance, sobre a sessão
+    curl_cffi partilhada (http_client.get_yfinance_session).
+
+    Returns:
+        pd.DataFrame: Índice de datas e uma coluna de fecho por ticker.
+    """
+    import yfinance as yf
+    from .http_client import get_yfinance_session
+    tickers = list(tickers)
+    data = yf.download(tickers=tickers, start=start, end=end, progress=False, auto_adjust=True, session=get_yfinance_session())
+    if data is None or data.empty:
+        return pd.DataFrame()
+    if isinstance(data.columns, pd.MultiIndex):
+        return data['Close'] if 'Close' in data.columns.get_level_values(0) else pd.DataFrame()
+    if 'Close' in data.columns:
+        return data[['Close']].rename(columns={'Close': tickers[0]})
+    return pd.DataFrame()
+
+def parse_chart(payload):
+    """
+    Fechos diários de uma resposta da API de gráficos do Yahoo (v8/finance/chart).
+    Usa o fecho ajustado quando existe (como o auto_adjust=True do yfinance) e datas na
+    hora local da bolsa, sem fuso.
+
+    Returns:
+        pd.Series: Fechos indexados pela data, ou vazia se a resposta não tiver barras.
+    """
+    result = ((payload or {}).get("chart") or {}).get("result") or []
+    if not result or not result[0].get("timestamp"):
+        return pd.Series(dtype=float)
+    result = result[0]
+    indicators = result.get("indicators") or {}
+    adjclose = (indicators.get("adjclose") or [{}])[0].get("adjclose")
+    closes = adjclose or (indicators.get("quote") or [{}])[0].get("close") or []
+    timezone = (result.get("meta") or {}).get("exchangeTimezoneName") or "UTC"
+    index = pd.to_datetime(result["timestamp"], unit="s", utc=True).tz_convert(timezone).tz_localize(None).normalize()
+    series = pd.Series(pd.to_numeric(pd.Series(closes, dtype=object), errors='coerce').to_numpy(dtype=float), index=index)
+    series = series.dropna()
+    return series[~series.index.duplicated(keep="last")]
+
+async def fetch_closes_async(tickers, start, end=None, session=None, concurrency=None, base_url=YAHOO_CHART_URL):
+    """
+    Fechos de vários tickers pela API de gráficos do Yahoo, um pedido por ticker em paralelo
+    (concorrência limitada e novas tentativas em http_client.gather_json).
+
+    O fim por omissão é o início do dia seguinte, para que o URL (e a entrada na cache HTTP)
+    se mantenha ao longo do dia; o fim dado é exclusivo, como no yfinance.
+
+    Returns:
+        tuple: (pd.DataFrame largo de fechos, {ticker: exceção} dos tickers que falharam).
+    """
+    from .http_client import gather_json, MAX_CONCURRENCY
+    tickers = list(tickers)
+    period1 = int(pd.Timestamp(start, tz="UTC").timestamp())
+    period2 = int((pd.Timestamp(end, tz="UTC") if end else pd.Timestamp.now(tz="UTC").normalize() + pd.Timedelta(days=1)).timestamp())
+    params = {"period1": period1, "period2": period2, "interval": "1d", "includeAdjustedClose": "true", "events": "div,split"}
+    results = await gather_json([(base_url.format(ticker=quote(t, safe="")), params) for t in tickers],
+                                concurrency=concurrency or MAX_CONCURRENCY, session=session)
+    series, errors = {}, {}
+    for ticker, result in zip(tickers, results):
+        if isinstance(result, Exception):
+            errors[ticker] = result
+            continue
+        closes = parse_chart(result)
+        closes = closes[(closes.index >= pd.Timestamp(start)) & ((closes.index < pd.Timestamp(end)) if end else True)]
+        if not closes.empty:
+            series[ticker] = closes
+    return (pd.DataFrame(series).sort_index() if series else pd.DataFrame()), errors
+
+def http_fetcher(tickers, start, end=None):
+    """
+    Fornecedor por defeito: fechos pela API de gráficos do Yahoo sobre a sessão HTTP partilhada
+    (pool de ligações e cache HTTP com revalidação). Os tickers em que esse caminho falhar
+    (ex.: bloqueio ou limite de pedidos do Yahoo) são pedidos ao yfinance numa única chamada.
+    """
+    from .http_client import run_async
+    tickers = list(tickers)
+    frame, errors = run_async(fetch_closes_async(tickers, start, end))
+    if errors:
+        print(f"API de gráficos falhou para {sorted(errors)}; a usar o yfinance. ({next(iter(errors.values()))})")
+        fallback = yfinance_fetcher(list(errors), start, end)
+        if not fallback.empty:
+            frame = fallback if frame.empty else frame.join(fallback, how="outer")
+    return frame
+
+# --- FUNÇÕES AUXILIARES ---
+
+def period_to_start(period, today=None):
+    """Converte um período do yfinance ("5d", "6mo", "5y", "ytd", "max") numa data de início."""
+    today = today or date.today()
+    if not period or period == "max":
+        return MAX_START
+    if period == "ytd":
+        return today.replace(month=1, day=1)
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if not match:
+        raise ValueError(f"Período inválido: {period}")
+    n, unit = int(match.group(1)), match.group(2)
+    if unit == "d":
+        return today - timedelta(days=n)
+    if unit == "wk":
+        return today - timedelta(weeks=n)
+    if unit == "mo":
+        return (pd.Timestamp(today) - pd.DateOffset(months=n)).date()
+    return (pd.Timestamp(today) - pd.DateOffset(years=n)).date()
+
+def _to_date(value):
+    if value is None:
+        return None
+    return pd.Timestamp(value).date()
+
+def _fmt(d):
+    return d.strftime("%Y-%m-%d")
+
+def _frame_to_rows(frame, tickers):
+    """Converte um DataFrame largo (datas x tickers) em linhas (Date, Ticker, Close) sem NaN."""
+    if frame is None or frame.empty:
+        return []
+    frame = frame.copy()
+    index = pd.to_datetime(frame.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    frame.index = index.strftime("%Y-%m-%d")
+    columns = [t for t in tickers if t in frame.columns]
+    if not columns:
+        return []
+    long = frame[columns].stack().dropna()
+    return [(d, t, float(v)) for (d, t), v in long.items()]
+
+def _sync_state(conn, tickers):
+    """Devolve {ticker: (covered_from, last_date, last_checked)} para os tickers pedidos."""
+    placeholders = ",".join("?" * len(tickers))
+    stored = {t: (first, last) for t, first, last in conn.execute(
+        f"SELECT Ticker, MIN(Date), MAX(Date) FROM price_data WHERE Ticker IN ({placeholders}) GROUP BY Ticker", tickers)}
+    synced = {t: (covered, checked) for t, covered, checked in conn.execute(
+        f"SELECT Ticker, covered_from, last_checked FROM price_sync WHERE Ticker IN ({placeholders})", tickers)}
+    state = {}
+    for t in tickers:
+        first, last = stored.get(t, (None, None))
+        covered, checked = synced.get(t, (None, None))
+        # Sem registo de sincronização (dados já distribuídos na base), a cobertura começa na primeira barra.
+        covered = covered or first
+        state[t] = (_to_date(covered), _to_date(last), datetime.fromisoformat(checked) if checked else None)
+    return state
+
+# --- API PÚBLICA ---
+
+def _read_snapshot(tickers, start, end, conn):
+    """Leitura a partir do snapshot colunar da base (ver snapshot_store), ou None se não houver."""
+    try:
+        from .snapshot_store import snapshot_for, read_prices_snapshot
+        snapshot = snapshot_for(conn)
+        return None if snapshot is None else read_prices_snapshot(snapshot, tickers, conn, start, end)
+    except Exception as e:
+        print(f"Snapshot de preços indisponível, leitura na base: {e}")
+        return None
+
+def read_prices(tickers, start=None, end=None, db_path=None, conn=None):
+    """
+    Lê do disco os preços de fecho guardados, sem contactar o fornecedor. Se existir um snapshot
+    colunar da base, o histórico vem dele e a base só é lida para as barras mais recentes.
+
+    Returns:
+        pd.DataFrame: Índice de datas ('Date') e uma coluna por ticker, pela ordem pedida.
+    """
+    tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+    own_conn = conn is None
+    conn = conn or get_connection(db_path)
+    try:
+        snapshot_prices = _read_snapshot(tickers, start, end, conn)
+        if snapshot_prices is not None:
+            return snapshot_prices
+        placeholders = ",".join("?" * len(tickers))
+        query = f"SELECT Date, Ticker, Close FROM price_data WHERE Ticker IN ({placeholders})"
+        params = list(tickers)
+        if start is not None:
+            query += " AND Date >= ?"; params.append(_fmt(_to_date(start)))
+        if end is not None:
+            query += " AND Date < ?"; params.append(_fmt(_to_date(end)))
+        rows = conn.execute(query, params).fetchall() if has_price_table(conn) else []
+    finally:
+        if own_conn:
+            conn.close()
+
+    if not rows:
+        return pd.DataFrame()
+    df = pd.DataFrame(rows, columns=['Date', 'Ticker', 'Close'])
+    wide = df.pivot(index='Date', columns='Ticker', values='Close')
+    wide.index = pd.to_datetime(wide.index)
+    wide.columns.name = None
+    return wide.reindex(columns=[t for t in tickers if t in wide.columns]).sort_index()
+
+def top_up(tickers, start, end=None, fetcher=None, db_path=None, conn=None, now=None):
+    """
+    Garante que o intervalo [start, end) está guardado em disco para cada ticker,
+    buscando ao fornecedor apenas os troços em falta. Tickers com o mesmo troço em falta
+    são pedidos em conjunto.
+
+    Returns:
+        int: Número de chamadas feitas ao fornecedor.
+    """
+    tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+    fetcher = fetcher or http_fetcher
+    now = now or datetime.now()
+    start, end = _to_date(start), _to_date(end)
+    own_conn = conn is None
+    conn = conn or get_connection(db_path)
+    try:
+        ensure_schema(conn)
+        state = _sync_state(conn, tickers)
+        # Agrupa os pedidos por janela (início, fim) para os fazer numa única chamada.
+        windows = {}
+        new_covered, checked = {}, set()
+        for t in tickers:
+            covered, last, last_checked = state[t]
+            is_stale = last_checked is None or (now - last_checked).total_seconds() > SYNC_TTL_SECONDS
+            if last is None:
+                # Nada guardado: pede a janela completa (respeitando o TTL para tickers sem dados).
+                if is_stale or covered is None or start < covered:
+                    windows.setdefault((start, end), []).append(t)
+                    new_covered[t] = min(start, covered) if covered else start; checked.add(t)
+                continue
+            if start < covered:
+                windows.setdefault((start, covered), []).append(t)
+                new_covered[t] = start
+            wants_tail = end is None or end > last + timedelta(days=1)
+            if wants_tail and is_stale:
+                # Volta a pedir a última barra: pode ter sido guardada ainda incompleta.
+                windows.setdefault((last, end), []).append(t)
+                checked.add(t)
+
+        calls = 0
+        for (w_start, w_end), group in windows.items():
+            try:
+                frame = fetcher(group, _fmt(w_start), _fmt(w_end) if w_end else None)
+                calls += 1
+            except Exception as e:
+                print(f"Erro ao buscar preços de {group} ({w_start} a {w_end}): {e}")
+                for t in group:
+                    new_covered.pop(t, None); checked.discard(t)
+                continue
+            rows = _frame_to_rows(frame, group)
+            with _write_lock:
+                conn.executemany("INSERT OR REPLACE INTO price_data (Date, Ticker, Close) VALUES (?, ?, ?)", rows)
+                conn.commit()
+
+        if new_covered or checked:
+            stamp = now.isoformat(timespec="seconds")
+            sync_rows = []
+            for t in set(new_covered) | checked:
+                covered = new_covered.get(t) or state[t][0] or start
+                last_checked = stamp if t in checked else (state[t][2].isoformat(timespec="seconds") if state[t][2] else None)
+                sync_rows.append((t, _fmt(covered), last_checked))
+            with _write_lock:
+                conn.executemany("INSERT OR REPLACE INTO price_sync (Ticker, covered_from, last_checked) VALUES (?, ?, ?)", sync_rows)
+                conn.commit()
+        return calls
+    finally:
+        if own_conn:
+            conn.close()
+
+def get_prices(tickers, period="5y", start=None, end=None, fetcher=None, db_path=None):
+    """
+    Devolve os preços de fecho servidos a partir do disco, completando antes o que faltar.
+
+    Args:
+        tickers (str or list): O(s) ticker(s) do(s) ativo(s).
+        period (str, optional): Período a usar quando 'start' não é dado. Defaults to "5y".
+        start (str, optional): Data de início (YYYY-MM-DD). Defaults to None.
+        end (str, optional): Data de fim, exclusiva (YYYY-MM-DD). Defaults to None.
+        fetcher (callable, optional): fetcher(tickers, start, end) -> DataFrame largo de fechos.
+                                      Defaults to http_fetcher.
+        db_path (str, optional): Caminho da base de dados. Defaults to DB_PATH.
+
+    Returns:
+        pd.DataFrame: Índice de datas e uma coluna por ticker. Vazio se não houver dados.
+    """
+    start = _to_date(start) if start else period_to_start(period)
+    conn = get_connection(db_path)
+    try:
+        top_up(tickers, start, end, fetcher=fetcher, conn=conn)
+        return read_prices(tickers, start, end, conn=conn)
+    finally:
+        conn.close()
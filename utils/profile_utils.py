@@ -1,8 +1,10 @@
 # marketlens/utils/profile_utils.py
 
 import streamlit as st
-from firebase_config import db
+from firebase_config import get_db
+from .disk_cache import cached, invalidate
 
+@cached("firestore", tag_param="user_id")
 def get_user_profile(user_id):
     """
     Busca o perfil de um utilizador no Firestore.
@@ -10,7 +12,7 @@ def get_user_profile(user_id):
     if not user_id:
         return None
     try:
-        doc_ref = db.collection("user_profiles").document(user_id)
+        doc_ref = get_db().collection("user_profiles").document(user_id)
         doc = doc_ref.get()
         if doc.exists:
             return doc.to_dict()
@@ -28,9 +30,10 @@ def update_user_profile(user_id, profile_data):
     if not user_id or not profile_data:
         return False
     try:
-        doc_ref = db.collection("user_profiles").document(user_id)
+        doc_ref = get_db().collection("user_profiles").document(user_id)
         # merge=True garante que não apagamos dados existentes que não estão no formulário
         doc_ref.set(profile_data, merge=True)
+        invalidate("firestore", tag=user_id)
         return True
     except Exception as e:
         st.error(f"Erro ao atualizar o perfil do utilizador: {e}")
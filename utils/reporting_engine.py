@@ -1,32 +1,38 @@
 # marketlens/utils/reporting_engine.py
 
+import itertools
 import pandas as pd
 import numpy as np
-from datetime import datetime
+from datetime import datetime, timedelta
 
-def calculate_dashboard_metrics(df_journal, setups_data):
+WEEKDAY_LABELS = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
+# Campos do diário que influenciam as colunas derivadas (usados para detetar trades alterados).
+VERSION_COLUMNS = ['status', 'entry_price', 'exit_price', 'stop_loss', 'risk_usd', 'direction', 'trade_date', 'asset', 'updated_at', 'created_at']
+
+def _empty_metrics():
+    """Estrutura vazia e completa para evitar erros na UI."""
+    return {
+        "kpis": {"total_pnl": 0, "win_rate": 0, "avg_rr_ratio": 0, "expectancy": 0, "total_trades": 0},
+        "equity_curve": pd.Series(dtype=float),
+        "calendar_data": pd.Series(dtype=float), "time_summary": {"pnl_week": 0, "pnl_month": 0, "pnl_year": 0},
+        "daily_summary": {"avg_win_day": 0, "avg_loss_day": 0, "best_day_pnl": 0, "best_day_date": "N/A", "worst_day_pnl": 0, "worst_day_date": "N/A"},
+        "synapse_score_data": {"win_rate": 0, "avg_win_loss_ratio": 0, "profit_factor": 0, "score": 0},
+        "recent_trades": pd.DataFrame(),
+        "asset_distribution": pd.Series(dtype=float),
+        "weekday_summary": {"best_day": "N/A", "best_day_pnl": 0, "worst_day": "N/A", "worst_day_pnl": 0}
+    }
+
+def prepare_trades(df_journal):
     """
-    Calcula um conjunto abrangente de métricas para o Dashboard Analítico 4.0.
+    Filtra as operações finalizadas e calcula as colunas derivadas por trade
+    (r_multiple, pnl_usd, dia e dia da semana), de forma vetorizada.
     """
-    # --- Passo 1: Filtrar operações finalizadas e preparar dados ---
-    df = df_journal[
-        (df_journal['status'] == 'Finalizado') &
-        (df_journal['exit_price'].notna()) &
-        (df_journal['exit_price'] > 0)
-    ].copy()
-
+    if df_journal.empty or not {'status', 'exit_price'}.issubset(df_journal.columns):
+        return pd.DataFrame()
+    exit_prices = pd.to_numeric(df_journal['exit_price'], errors='coerce')
+    df = df_journal[(df_journal['status'] == 'Finalizado') & (exit_prices > 0)].copy()
     if df.empty:
-        # Retorna uma estrutura vazia e completa para evitar erros na UI
-        return {
-            "kpis": {"total_pnl": 0, "win_rate": 0, "avg_rr_ratio": 0, "expectancy": 0, "total_trades": 0},
-            "equity_curve": pd.Series(dtype=float),
-            "calendar_data": pd.Series(dtype=float), "time_summary": {"pnl_week": 0, "pnl_month": 0, "pnl_year": 0},
-            "daily_summary": {"avg_win_day": 0, "avg_loss_day": 0, "best_day_pnl": 0, "best_day_date": "N/A", "worst_day_pnl": 0, "worst_day_date": "N/A"},
-            "synapse_score_data": {"win_rate": 0, "avg_win_loss_ratio": 0, "profit_factor": 0, "score": 0},
-            "recent_trades": pd.DataFrame(),
-            "asset_distribution": pd.Series(dtype=float),
-            "weekday_summary": {"best_day": "N/A", "best_day_pnl": 0, "worst_day": "N/A", "worst_day_pnl": 0}
-        }
+        return df
 
     numeric_cols = ['entry_price', 'exit_price', 'stop_loss', 'risk_usd']
     for col in numeric_cols:
@@ -34,45 +40,93 @@ def calculate_dashboard_metrics(df_journal, setups_data):
     df['risk_usd'] = df['risk_usd'].fillna(0)
     df['trade_date'] = pd.to_datetime(df['trade_date'])
 
-    # --- Passo 2: Recalcular P&L e R-Múltiplo ---
-    stop_distance_points = abs(df['entry_price'] - df['stop_loss'])
+    # Recalcular P&L e R-Múltiplo
+    stop_distance_points = np.abs(df['entry_price'].to_numpy() - df['stop_loss'].to_numpy())
     pnl_points = np.where(df['direction'] == 'Compra', df['exit_price'] - df['entry_price'], df['entry_price'] - df['exit_price'])
     df['r_multiple'] = np.divide(pnl_points, stop_distance_points, out=np.zeros_like(pnl_points, dtype=float), where=stop_distance_points != 0)
     df['pnl_usd'] = df['r_multiple'] * df['risk_usd']
 
-    # --- Passo 3: Cálculos de Agrupamento ---
-    df['trade_day'] = df['trade_date'].dt.date
-    daily_pnl = df.groupby('trade_day')['pnl_usd'].sum()
-    df['day_of_week_name'] = df['trade_date'].dt.day_name()
-    weekday_pnl = df.groupby('day_of_week_name')['pnl_usd'].sum().reindex(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']).fillna(0)
-    weekday_pnl.index = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
-
-    # --- Passo 4: Cálculo dos KPIs ---
-    total_pnl = df['pnl_usd'].sum()
-    total_trades = len(df)
-    wins = df[df['pnl_usd'] > 0]
-    losses = df[df['pnl_usd'] < 0]
-    num_wins = len(wins)
+    df['trade_day'] = df['trade_date'].dt.normalize()
+    df['day_of_week'] = df['trade_date'].dt.dayofweek
+    return df
+
+# Colunas dos trades preparados que alimentam as somas agregadas.
+AGG_COLUMNS = ('pnl_usd', 'risk_usd', 'trade_day', 'day_of_week', 'asset')
+
+def _aggregate(df, signs=None):
+    """
+    Somas aditivas de um conjunto de trades preparados. Com 'signs' (+1/-1 por linha), o
+    mesmo conjunto pode juntar trades a somar e trades a retirar numa única passagem.
+    """
+    return _aggregate_arrays(*(df[col].to_numpy() for col in AGG_COLUMNS), signs)
+
+def _aggregate_arrays(pnl, risk, days, day_of_week, assets, signs=None):
+    signs = np.ones(len(pnl)) if signs is None else signs
+    # P&L em falta (entrada ou stop inválidos) não entra nas somas, como em Series.sum().
+    weighted = np.where(np.isnan(pnl), 0.0, pnl) * signs
+    wins, losses, risked = pnl > 0, pnl < 0, risk > 0
+    return {
+        "count": signs.sum(), "total_pnl": weighted.sum(),
+        "n_wins": signs[wins].sum(), "sum_wins": weighted[wins].sum(),
+        "n_losses": signs[losses].sum(), "sum_losses": weighted[losses].sum(),
+        "n_risked": signs[risked].sum(), "sum_risk": (risk * signs)[risked].sum(),
+        "daily_pnl": pd.Series(weighted).groupby(days).sum(),
+        "daily_count": pd.Series(signs).groupby(days).sum(),
+        "weekday_pnl": np.bincount(day_of_week, weights=weighted, minlength=7),
+        "assets": pd.Series(signs).groupby(assets).sum(),
+    }
+
+def _delta(removed, added):
+    """
+    Contribuição de retirar os trades 'removed' e somar os 'added' (trades preparados), a partir
+    dos arrays das colunas agregadas, sem concatenar DataFrames.
+    """
+    frames = [frame for frame in (removed, added) if len(frame)]
+    arrays = [np.concatenate([frame[col].to_numpy() for frame in frames]) for col in AGG_COLUMNS]
+    signs = np.concatenate([-np.ones(len(removed)), np.ones(len(added))])
+    return _aggregate_arrays(*arrays, signs)
+
+def _combine(agg, delta):
+    """Soma as contribuições (com sinal) de 'delta' a 'agg'."""
+    out = {}
+    for key in ("count", "total_pnl", "n_wins", "sum_wins", "n_losses", "sum_losses", "n_risked", "sum_risk", "weekday_pnl"):
+        out[key] = agg[key] + delta[key]
+    for key in ("daily_pnl", "daily_count", "assets"):
+        out[key] = agg[key].add(delta[key], fill_value=0)
+    # Dias e ativos sem trades deixam de aparecer, tal como num recálculo completo.
+    alive = out["daily_count"] > 0.5
+    out["daily_count"], out["daily_pnl"] = out["daily_count"][alive], out["daily_pnl"][alive]
+    out["assets"] = out["assets"][out["assets"] > 0.5]
+    return out
+
+def _assemble_metrics(agg, df_sorted):
+    """Calcula os KPIs, sumários e dados de gráficos a partir das somas e dos trades ordenados por data."""
+    # --- Cálculo dos KPIs ---
+    total_pnl = agg["total_pnl"]
+    total_trades = int(round(agg["count"]))
+    num_wins = int(round(agg["n_wins"]))
     win_rate = (num_wins / total_trades) * 100 if total_trades > 0 else 0
-    avg_win_usd = wins['pnl_usd'].mean() if num_wins > 0 else 0
-    avg_loss_usd = abs(losses['pnl_usd'].mean()) if not losses.empty else 0
-    risked_trades = df[df['risk_usd'] > 0]
-    avg_risk_per_trade = risked_trades['risk_usd'].mean() if not risked_trades.empty else 0
+    avg_win_usd = agg["sum_wins"] / num_wins if num_wins > 0 else 0
+    avg_loss_usd = abs(agg["sum_losses"] / agg["n_losses"]) if agg["n_losses"] > 0 else 0
+    avg_risk_per_trade = agg["sum_risk"] / agg["n_risked"] if agg["n_risked"] > 0 else 0
     avg_rr_ratio = avg_win_usd / avg_risk_per_trade if avg_risk_per_trade > 0 else 0
     win_rate_dec = win_rate / 100
     loss_rate_dec = 1 - win_rate_dec
     expectancy = (win_rate_dec * avg_win_usd) - (loss_rate_dec * avg_loss_usd)
     kpis = {"total_pnl": total_pnl, "win_rate": win_rate, "avg_rr_ratio": avg_rr_ratio, "expectancy": expectancy, "total_trades": total_trades}
 
-    # --- Passo 5: Cálculos de Sumário ---
+    # --- Cálculos de Sumário ---
+    daily_pnl = agg["daily_pnl"].sort_index()
+    if not isinstance(daily_pnl.index, pd.DatetimeIndex):
+        daily_pnl.index = pd.to_datetime(daily_pnl.index)
+    daily_pnl.index.name, daily_pnl.name = 'trade_day', 'pnl_usd'
     today = datetime.now().date()
-    current_week_start = today - pd.to_timedelta(today.weekday(), unit='d')
-    daily_pnl.index = pd.to_datetime(daily_pnl.index)
-    pnl_this_week = daily_pnl[daily_pnl.index.date >= current_week_start].sum()
+    current_week_start = today - timedelta(days=today.weekday())
+    pnl_this_week = daily_pnl[daily_pnl.index >= pd.Timestamp(current_week_start)].sum()
     pnl_this_month = daily_pnl[(daily_pnl.index.month == today.month) & (daily_pnl.index.year == today.year)].sum()
     pnl_this_year = daily_pnl[daily_pnl.index.year == today.year].sum()
     time_summary = {"pnl_week": pnl_this_week, "pnl_month": pnl_this_month, "pnl_year": pnl_this_year}
-    
+
     winning_days = daily_pnl[daily_pnl > 0]
     losing_days = daily_pnl[daily_pnl < 0]
     avg_win_day = winning_days.mean() if not winning_days.empty else 0
@@ -84,16 +138,15 @@ def calculate_dashboard_metrics(df_journal, setups_data):
     daily_summary = {"avg_win_day": avg_win_day, "avg_loss_day": avg_loss_day, "best_day_pnl": best_day_pnl, "best_day_date": best_day_date, "worst_day_pnl": worst_day_pnl, "worst_day_date": worst_day_date}
 
     # Melhor e pior dia da semana
-    best_weekday = weekday_pnl.idxmax() if not weekday_pnl.empty else "N/A"
-    worst_weekday = weekday_pnl.idxmin() if not weekday_pnl.empty else "N/A"
-    weekday_summary = {"best_day": best_weekday, "best_day_pnl": weekday_pnl.max(), "worst_day": worst_weekday, "worst_day_pnl": weekday_pnl.min()}
+    weekday_pnl = pd.Series(agg["weekday_pnl"], index=WEEKDAY_LABELS)
+    weekday_summary = {"best_day": weekday_pnl.idxmax(), "best_day_pnl": weekday_pnl.max(), "worst_day": weekday_pnl.idxmin(), "worst_day_pnl": weekday_pnl.min()}
 
-    # --- Passo 6: Dados para o Synapse Score ---
-    total_gross_profit = wins['pnl_usd'].sum()
-    total_gross_loss = abs(losses['pnl_usd'].sum())
+    # --- Dados para o Synapse Score ---
+    total_gross_profit = agg["sum_wins"]
+    total_gross_loss = abs(agg["sum_losses"])
     profit_factor = total_gross_profit / total_gross_loss if total_gross_loss > 0 else total_gross_profit
     avg_win_loss_ratio = avg_win_usd / avg_loss_usd if avg_loss_usd > 0 else avg_win_usd
-    
+
     # Normalização dos fatores para o Score
     win_rate_score = win_rate
     awl_score = min(avg_win_loss_ratio, 3) / 3 * 100
@@ -102,19 +155,18 @@ def calculate_dashboard_metrics(df_journal, setups_data):
 
     synapse_score_data = {"win_rate": win_rate, "avg_win_loss_ratio": avg_win_loss_ratio, "profit_factor": profit_factor, "score": synapse_score}
 
-    # --- Passo 7: Preparar Dados para Gráficos e Tabelas ---
-    df_sorted = df.sort_values(by='trade_date', ascending=False)
-    equity_curve = df_sorted.sort_values(by='trade_date')['pnl_usd'].cumsum()
-    
-    recent_trades = df_sorted.head(5).copy()
+    # --- Preparar Dados para Gráficos e Tabelas ---
+    equity_curve = df_sorted['pnl_usd'].cumsum()
+
+    recent_trades = df_sorted.tail(5).iloc[::-1].copy()
     recent_trades['Resultado'] = np.where(recent_trades['pnl_usd'] > 0, 'Ganho', 'Perda')
     recent_trades['Data'] = recent_trades['trade_date'].dt.strftime('%d/%m/%Y')
     recent_trades.rename(columns={'asset': 'Ativo', 'direction': 'Direção', 'pnl_usd': 'PnL (USD)', 'r_multiple': 'RR'}, inplace=True)
     recent_trades = recent_trades[['Data', 'Ativo', 'Direção', 'Resultado', 'PnL (USD)', 'RR']]
 
-    asset_distribution = df['asset'].value_counts()
-    
-    # --- Passo 8: Montar Dicionário de Retorno ---
+    asset_distribution = agg["assets"].round().astype(int).sort_values(ascending=False, kind='stable').rename('count')
+    asset_distribution.index.name = 'asset'
+
     return {
         "kpis": kpis, "equity_curve": equity_curve, "calendar_data": daily_pnl,
         "time_summary": time_summary, "daily_summary": daily_summary,
@@ -122,3 +174,168 @@ def calculate_dashboard_metrics(df_journal, setups_data):
         "asset_distribution": asset_distribution, "weekday_summary": weekday_summary
     }
 
+def _sort_trades(df):
+    """
+    Ordena os trades por data; o doc_id desempata, para o recálculo completo e o incremental darem
+    a mesma ordem. Só as datas repetidas são reordenadas pelo doc_id (ordenar texto é lento).
+    """
+    df = df.sort_values(by='trade_date', kind='stable')
+    if 'doc_id' not in df.columns or len(df) < 2:
+        return df
+    dates = df['trade_date'].to_numpy()
+    same = dates[1:] == dates[:-1]
+    if not same.any():
+        return df
+    tied = np.zeros(len(df), dtype=bool)
+    tied[1:] |= same; tied[:-1] |= same
+    positions = np.flatnonzero(tied)
+    # Os empates de cada data são contíguos: reordená-los entre si mantém a ordem das datas.
+    order = np.arange(len(df))
+    order[positions] = positions[np.lexsort((df['doc_id'].to_numpy(dtype=object)[positions], dates[positions]))]
+    return df.iloc[order]
+
+def calculate_dashboard_metrics(df_journal, setups_data):
+    """
+    Calcula um conjunto abrangente de métricas para o Dashboard Analítico 4.0.
+    """
+    df = prepare_trades(df_journal)
+    if df.empty:
+        return _empty_metrics()
+    df_sorted = _sort_trades(df)
+    return _assemble_metrics(_aggregate(df), df_sorted)
+
+def journal_versions(df_journal):
+    """
+    Devolve (doc_ids, versões): a versão de cada trade é o tempo da última atualização
+    ('updated_at', ou 'created_at' para registos nunca editados), em nanossegundos.
+    Dois trades com a mesma versão não mudaram. Sem tempos no diário, usa um hash dos
+    campos que alimentam as colunas derivadas.
+    """
+    stamps = None
+    for col in ('updated_at', 'created_at'):
+        if col in df_journal.columns:
+            values = df_journal[col]
+            col_stamps = values if pd.api.types.is_datetime64_any_dtype(values) else pd.to_datetime(values, utc=True, errors='coerce')
+            stamps = col_stamps if stamps is None else stamps.fillna(col_stamps)
+    if stamps is not None:
+        versions = stamps.astype('int64').to_numpy()
+    else:
+        cols = [c for c in VERSION_COLUMNS if c in df_journal.columns]
+        versions = pd.util.hash_pandas_object(df_journal[cols], index=False).to_numpy().view('int64')
+    return df_journal['doc_id'].to_numpy(dtype=object), versions
+
+class IncrementalReport:
+    """
+    Mantém o conjunto de trades preparados e as somas agregadas entre reruns, com a versão
+    de cada doc_id. Em cada 'update' apenas os trades novos, alterados ou apagados são
+    reprocessados; se nada mudou, as métricas anteriores são devolvidas sem recálculo.
+
+    Um trade alterado é encontrado pelo doc_id e pela versão: a sua contribuição antiga é
+    retirada das somas e a nova acrescentada (uma edição custa o mesmo que um trade novo).
+    """
+
+    _MISSING = np.iinfo(np.int64).min + 1
+
+    def __init__(self):
+        self.doc_ids = None    # doc_ids do último diário visto, pela ordem recebida
+        self.versions = None   # versões correspondentes
+        self.version_map = {}  # doc_id -> versão
+        self.trades = None     # trades finalizados preparados, ordenados por trade_date e doc_id
+        self.agg = None
+        self.metrics = None
+
+    def reset(self):
+        self.__init__()
+
+    def update(self, df_journal):
+        """Atualiza o estado com o diário atual e devolve o mesmo dicionário que calculate_dashboard_metrics."""
+        if df_journal.empty or 'doc_id' not in df_journal.columns:
+            self.reset()
+            return calculate_dashboard_metrics(df_journal, None)
+
+        doc_ids, versions = journal_versions(df_journal)
+        if self.doc_ids is None:
+            return self._rebuild(df_journal, doc_ids, versions)
+
+        n_old, n_extra = len(self.doc_ids), len(doc_ids) - len(self.doc_ids)
+        if n_extra == 0 and np.array_equal(doc_ids, self.doc_ids):
+            # Mesma ordem de documentos (rerun ou edição sem mudança de data): comparação posicional.
+            differs = versions != self.versions
+            if not differs.any():
+                return self.metrics
+            removed = set()
+        elif n_extra > 0 and np.array_equal(doc_ids[n_extra:], self.doc_ids):
+            # Trades novos no topo do diário (ordenado do mais recente para o mais antigo).
+            differs = np.concatenate([np.ones(n_extra, dtype=bool), versions[n_extra:] != self.versions])
+            removed = set()
+        elif n_extra > 0 and np.array_equal(doc_ids[:n_old], self.doc_ids):
+            differs = np.concatenate([versions[:n_old] != self.versions, np.ones(n_extra, dtype=bool)])
+            removed = set()
+        else:
+            id_list = doc_ids.tolist()
+            previous = np.fromiter(map(self.version_map.get, id_list, itertools.repeat(self._MISSING)), dtype=np.int64, count=len(id_list))
+            differs = previous != versions
+            n_kept = len(id_list) - int((previous == self._MISSING).sum())
+            removed = set(self.version_map).difference(id_list) if n_kept < len(self.version_map) else set()
+
+        touched_ids = set(doc_ids[differs].tolist())
+        for doc_id, version in zip(doc_ids[differs].tolist(), versions[differs].tolist()):
+            self.version_map[doc_id] = version
+        for doc_id in removed:
+            del self.version_map[doc_id]
+
+        trades, agg = self.trades, self.agg
+        stale_pos = np.flatnonzero(trades['doc_id'].isin(touched_ids | removed).to_numpy())
+        fresh = prepare_trades(df_journal.iloc[np.flatnonzero(differs)])
+        fresh = _sort_trades(fresh[trades.columns]) if not fresh.empty else trades.iloc[:0]
+        previous = trades.iloc[stale_pos]
+
+        # Retira as contribuições antigas dos trades alterados ou apagados e soma as novas.
+        if stale_pos.size or not fresh.empty:
+            delta = _delta(previous, fresh)
+            agg = _combine(agg, delta) if agg is not None else delta
+
+        in_place = stale_pos.size == len(fresh) > 0 and all(
+            np.array_equal(fresh[col].to_numpy(dtype=object), previous[col].to_numpy(dtype=object))
+            for col in ('doc_id', 'trade_date', 'asset'))
+        if in_place:
+            # Edição sem mudança de data nem de ativo: só as colunas alteradas são substituídas
+            # (arrays numéricos; a direção, em texto, apenas se mudou).
+            changed = {}
+            for col in ('risk_usd', 'r_multiple', 'pnl_usd'):
+                values = trades[col].to_numpy(copy=True)
+                values[stale_pos] = fresh[col].to_numpy()
+                changed[col] = values
+            trades = trades.assign(**changed)
+            if not np.array_equal(fresh['direction'].to_numpy(dtype=object), previous['direction'].to_numpy(dtype=object)):
+                trades.iloc[stale_pos, trades.columns.get_loc('direction')] = fresh['direction'].to_numpy()
+        else:
+            if stale_pos.size:
+                keep = np.ones(len(trades), dtype=bool); keep[stale_pos] = False
+                trades = trades[keep]
+            if trades.empty:
+                trades = fresh if not fresh.empty else trades
+            elif not fresh.empty and ((fresh['trade_date'].iloc[0], fresh['doc_id'].iloc[0])
+                                      > (trades['trade_date'].iloc[-1], trades['doc_id'].iloc[-1])):
+                # Caso habitual: o novo trade é o mais recente e a ordem mantém-se.
+                trades = pd.concat([trades, fresh])
+            elif not fresh.empty:
+                trades = _sort_trades(pd.concat([trades, fresh]))
+
+        self.doc_ids, self.versions, self.trades, self.agg = doc_ids, versions, trades, agg
+        self.metrics = _assemble_metrics(agg, trades) if not trades.empty else _empty_metrics()
+        return self.metrics
+
+    def _rebuild(self, df_journal, doc_ids, versions):
+        df = prepare_trades(df_journal)
+        cols = ['doc_id', 'trade_date', 'trade_day', 'day_of_week', 'asset', 'direction', 'risk_usd', 'r_multiple', 'pnl_usd']
+        if df.empty:
+            self.trades = pd.DataFrame(columns=cols)
+            self.agg, self.metrics = None, _empty_metrics()
+        else:
+            self.trades = _sort_trades(df[cols])
+            self.agg = _aggregate(self.trades)
+            self.metrics = _assemble_metrics(self.agg, self.trades)
+        self.doc_ids, self.versions = doc_ids, versions
+        self.version_map = dict(zip(doc_ids.tolist(), versions.tolist()))
+        return self.metrics
@@ -0,0 +1,197 @@
+# marketlens/utils/risk_analytics.py
+
+"""
+Métricas de risco da curva de capital, calculadas de forma vetorizada.
+
+Todas as métricas partem de poucos arrays calculados uma vez (P&L por trade, capital acumulado,
+máximo acumulado, P&L diário e as suas somas acumuladas) e são obtidas em passagens O(n) sobre
+eles: drawdown máximo e atual (com duração), curva underwater, sequências de ganhos/perdas,
+expectativa móvel, Sharpe/Sortino móveis sobre o P&L diário e distribuição dos R-múltiplos.
+
+A entrada é o conjunto de trades preparados de reporting_engine (prepare_trades, ou
+IncrementalReport.trades), ordenado por 'trade_date'.
+"""
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS_PER_YEAR = 252
+R_PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+# --- PRIMITIVAS ---
+
+def _rolling_sum(cumsum, window):
+    """Somas móveis a partir de uma soma acumulada (com zero à cabeça)."""
+    out = cumsum[window:] - cumsum[:-window]
+    return np.concatenate([cumsum[1:window], out]) if len(cumsum) > window else cumsum[1:]
+
+def _run_lengths(flags):
+    """Comprimento da sequência de True que termina em cada posição."""
+    flags = np.asarray(flags, dtype=bool)
+    idx = np.arange(1, len(flags) + 1)
+    # Última posição (1-based) em que a sequência foi interrompida.
+    last_break = np.maximum.accumulate(np.where(flags, 0, idx))
+    return np.where(flags, idx - last_break, 0)
+
+def drawdown_stats(equity, dates=None, peak_base=None):
+    """
+    Drawdown da curva de capital.
+
+    Args:
+        equity (np.ndarray): Capital após cada trade.
+        dates (array-like, optional): Data de cada ponto (para datas e duração em dias).
+        peak_base (float, optional): Capital inicial (conta como primeiro máximo). Defaults to None.
+
+    Returns:
+        tuple: (dicionário de estatísticas, array underwater em valor, array underwater em %).
+    """
+    base = equity[0] if peak_base is None else peak_base
+    peak = np.maximum.accumulate(np.maximum(equity, base))
+    underwater = equity - peak
+    with np.errstate(divide='ignore', invalid='ignore'):
+        underwater_pct = np.where(peak > 0, underwater / peak * 100, 0.0)
+
+    trough = int(np.argmin(underwater))
+    in_dd = underwater < 0
+    durations = _run_lengths(in_dd)
+    longest_end = int(np.argmax(durations))
+    stats = {
+        "max_drawdown": float(underwater[trough]),
+        "max_drawdown_pct": float(underwater_pct.min()),
+        "max_drawdown_trades": int(durations.max()),
+        "current_drawdown": float(underwater[-1]),
+        "current_drawdown_pct": float(underwater_pct[-1]),
+        "current_drawdown_trades": int(durations[-1]),
+    }
+    if dates is not None:
+        dates = pd.DatetimeIndex(dates)
+        # O drawdown máximo começa no último máximo antes do vale.
+        peak_pos = trough - int(durations[trough])
+        stats["max_drawdown_start"] = dates[max(peak_pos, 0)] if underwater[trough] < 0 else None
+        stats["max_drawdown_trough"] = dates[trough] if underwater[trough] < 0 else None
+        longest_start = longest_end - int(durations[longest_end])
+        stats["max_drawdown_days"] = int((dates[longest_end] - dates[max(longest_start, 0)]).days) if durations.max() else 0
+        stats["current_drawdown_days"] = int((dates[-1] - dates[max(len(dates) - 1 - int(durations[-1]), 0)]).days) if durations[-1] else 0
+    return stats, underwater, underwater_pct
+
+def streak_stats(pnl):
+    """Sequências mais longas de ganhos e perdas e a sequência atual (positiva = ganhos)."""
+    wins, losses = _run_lengths(pnl > 0), _run_lengths(pnl < 0)
+    current = int(wins[-1]) if wins[-1] else -int(losses[-1])
+    return {"longest_win_streak": int(wins.max()), "longest_loss_streak": int(losses.max()), "current_streak": current}
+
+def rolling_ratios(daily_pnl, window, periods_per_year=TRADING_DAYS_PER_YEAR):
+    """Sharpe e Sortino móveis (anualizados) sobre o P&L diário, a partir de somas acumuladas."""
+    x = np.asarray(daily_pnl, dtype=float)
+    n = np.minimum(np.arange(1, len(x) + 1), window)
+    s1 = _rolling_sum(np.concatenate([[0.0], np.cumsum(x)]), window)
+    s2 = _rolling_sum(np.concatenate([[0.0], np.cumsum(x * x)]), window)
+    d2 = _rolling_sum(np.concatenate([[0.0], np.cumsum(np.minimum(x, 0) ** 2)]), window)
+    mean = s1 / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var = np.maximum(s2 / n - mean ** 2, 0) * n / np.maximum(n - 1, 1)
+        std, downside = np.sqrt(var), np.sqrt(d2 / n)
+        scale = np.sqrt(periods_per_year)
+        sharpe = np.where((std > 0) & (n > 1), mean / std * scale, np.nan)
+        sortino = np.where((downside > 0) & (n > 1), mean / downside * scale, np.nan)
+    return sharpe, sortino
+
+def r_distribution(r_multiples, bins=20):
+    """Percentis, média, desvio e histograma dos R-múltiplos."""
+    r = np.asarray(r_multiples, dtype=float)
+    r = r[np.isfinite(r)]
+    if r.size == 0:
+        return {"percentiles": {}, "mean": 0.0, "std": 0.0, "histogram": (np.array([]), np.array([]))}
+    values = np.percentile(r, R_PERCENTILES)
+    return {
+        "percentiles": dict(zip(R_PERCENTILES, values.tolist())),
+        "mean": float(r.mean()), "std": float(r.std(ddof=1)) if r.size > 1 else 0.0,
+        "histogram": np.histogram(r, bins=bins),
+    }
+
+# --- API PÚBLICA ---
+
+def compute_risk_analytics(trades, initial_capital=0.0, trade_window=20, daily_window=30,
+                           periods_per_year=TRADING_DAYS_PER_YEAR):
+    """
+    Calcula todas as métricas de risco de um conjunto de trades preparados.
+
+    Args:
+        trades (pd.DataFrame): Trades preparados (pnl_usd, r_multiple, trade_date, trade_day), por ordem cronológica.
+        initial_capital (float, optional): Capital inicial da curva. Defaults to 0.
+        trade_window (int, optional): Janela (em trades) da expectativa móvel. Defaults to 20.
+        daily_window (int, optional): Janela (em dias com trades) do Sharpe/Sortino. Defaults to 30.
+        periods_per_year (int, optional): Períodos por ano para anualizar. Defaults to 252.
+
+    Returns:
+        dict: "drawdown", "streaks", "r_distribution" (dicionários), "underwater" e "rolling" (DataFrames
+              por trade), "daily" (DataFrame por dia com P&L, Sharpe e Sortino móveis). None se não houver trades.
+    """
+    if trades is None or trades.empty:
+        return None
+    pnl = trades['pnl_usd'].to_numpy(dtype=float)
+    dates = trades['trade_date'].to_numpy()
+    equity = initial_capital + np.cumsum(pnl)
+
+    dd, underwater, underwater_pct = drawdown_stats(equity, dates, peak_base=initial_capital)
+
+    # Expectativa e taxa de acerto móveis por trade.
+    n = np.minimum(np.arange(1, len(pnl) + 1), trade_window)
+    expectancy = _rolling_sum(np.concatenate([[0.0], np.cumsum(pnl)]), trade_window) / n
+    win_rate = _rolling_sum(np.concatenate([[0], np.cumsum(pnl > 0)]), trade_window) / n * 100
+
+    # P&L diário: os trades estão ordenados, por isso cada dia é um bloco contíguo.
+    days = trades['trade_day'].to_numpy()
+    starts = np.flatnonzero(np.concatenate([[True], days[1:] != days[:-1]]))
+    daily_pnl = np.add.reduceat(pnl, starts)
+    sharpe, sortino = rolling_ratios(daily_pnl, daily_window, periods_per_year)
+
+    index = pd.DatetimeIndex(dates)
+    return {
+        "drawdown": dd,
+        "streaks": streak_stats(pnl),
+        "r_distribution": r_distribution(trades['r_multiple'].to_numpy(dtype=float)),
+        "underwater": pd.DataFrame({"equity": equity, "underwater": underwater, "underwater_pct": underwater_pct}, index=index),
+        "rolling": pd.DataFrame({"expectancy": expectancy, "win_rate": win_rate}, index=index),
+        "daily": pd.DataFrame({"pnl": daily_pnl, "sharpe": sharpe, "sortino": sortino}, index=pd.DatetimeIndex(days[starts])),
+    }
+
+def account_equity_curves(values, dates, weights, accounts):
+    """
+    Curva de capital de cada conta, a partir do capital inicial, com o P&L atribuído
+    (ver account_attribution.build_weights), para todas as contas numa só passagem.
+
+    Args:
+        values (array-like): P&L de cada linha do diário usado em build_weights (0 nas não finalizadas).
+        dates (array-like): 'trade_date' de cada linha do mesmo diário.
+        weights (dict): Resultado de account_attribution.build_weights.
+        accounts (list): Contas do utilizador (para o capital inicial).
+
+    Returns:
+        dict: {doc_id da conta: pd.Series de capital indexada pela data}.
+    """
+    values = np.nan_to_num(np.asarray(values, dtype=float))
+    dates = np.asarray(pd.DatetimeIndex(dates))
+    rows, cols, shares = weights["rows"], weights["cols"], weights["weights"]
+    keep = values[rows] != 0
+    rows, cols, shares = rows[keep], cols[keep], shares[keep]
+    if rows.size == 0:
+        return {}
+    order = np.lexsort((dates[rows], cols))
+    rows, cols = rows[order], cols[order]
+    contrib = values[rows] * shares[order]
+
+    # Soma acumulada por conta: soma acumulada global menos o acumulado no início de cada grupo.
+    cumulative = np.cumsum(contrib)
+    starts = np.flatnonzero(np.concatenate([[True], cols[1:] != cols[:-1]]))
+    group_sizes = np.diff(np.append(starts, len(cols)))
+    offsets = np.repeat(cumulative[starts] - contrib[starts], group_sizes)
+    capital = {acc['doc_id']: float(acc.get('initial_capital', 0) or 0) for acc in (accounts or [])}
+    initial = np.array([capital.get(a, 0.0) for a in weights["account_ids"]])
+    equity = initial[cols] + cumulative - offsets
+
+    curves = {}
+    for start, size in zip(starts, group_sizes):
+        account_id = weights["account_ids"][cols[start]]
+        curves[account_id] = pd.Series(equity[start:start + size], index=pd.DatetimeIndex(dates[rows[start:start + size]]), name=account_id)
+    return curves
@@ -0,0 +1,259 @@
+# marketlens/utils/rollup_utils.py
+
+"""
+Agregados de P&L materializados por utilizador.
+
+Cada operação finalizada contribui com o seu P&L, uma contagem de trade e uma contagem de
+ganho para cinco dimensões: dia, semana ISO, mês, conta e setup. Os totais ficam em cinco
+documentos pequenos em user_profiles/{uid}/pnl_rollups/{dimensão}, no formato
+{chave: {"pnl": ..., "trades": ..., "wins": ...}}.
+
+add/update/delete_journal_entry aplicam a diferença entre o estado anterior e o novo da
+operação (com Increment, na mesma escrita atómica que altera o diário). reconcile_rollups()
+recalcula tudo a partir do diário, compara com o que está guardado e, opcionalmente, corrige;
+o dashboard chama-a quando os agregados não batem certo com o diário (ex.: diários anteriores
+aos agregados). rollup_summaries() dá ao dashboard o calendário e os sumários diário e semanal.
+"""
+
+import math
+from collections import defaultdict
+from datetime import datetime
+import pandas as pd
+import streamlit as st
+from firebase_config import get_db
+from .account_attribution import capital_weights
+from .reporting_engine import WEEKDAY_LABELS
+
+ROLLUP_DIMENSIONS = ("daily", "weekly", "monthly", "account", "setup")
+ROLLUP_FIELDS = ("pnl", "trades", "wins")
+# Tolerância da reconciliação (somas de Increment em vírgula flutuante).
+RECONCILE_TOLERANCE = 1e-6
+
+def _rollups_collection(user_id, client=None):
+    return (client or get_db()).collection("user_profiles").document(user_id).collection("pnl_rollups")
+
+# --- CONTRIBUIÇÃO DE UMA OPERAÇÃO ---
+
+def _number(value):
+    """Valor numérico de um campo do diário, ou NaN se faltar ou não for um número (como pd.to_numeric(errors='coerce'))."""
+    try:
+        return float(value) if value is not None and value != "" else math.nan
+    except (TypeError, ValueError):
+        return math.nan
+
+def trade_pnl(entry):
+    """
+    P&L em USD de uma operação finalizada, ou None se a operação não contar para os resultados.
+
+    Segue as regras de reporting_engine.prepare_trades: só contam as operações finalizadas com
+    preço de saída > 0; o P&L é R-múltiplo x risco em USD (risco em falta = 0, distância ao stop
+    nula = 0R). Sem preço de entrada ou stop válidos a operação conta como trade, mas com P&L 0
+    (o motor soma-a como NaN, que as somas ignoram).
+    """
+    if not entry or entry.get('status') != 'Finalizado':
+        return None
+    exit_price = _number(entry.get('exit_price'))
+    if not exit_price > 0:
+        return None
+    entry_price, stop_loss = _number(entry.get('entry_price')), _number(entry.get('stop_loss'))
+    risk_usd = _number(entry.get('risk_usd'))
+    risk_usd = 0.0 if math.isnan(risk_usd) else risk_usd
+    pnl_points = exit_price - entry_price if entry.get('direction') == 'Compra' else entry_price - exit_price
+    stop_distance = abs(entry_price - stop_loss)
+    pnl = (pnl_points / stop_distance) * risk_usd if stop_distance != 0 else 0.0
+    return 0.0 if math.isnan(pnl) else pnl
+
+def trade_contributions(entry, accounts=None):
+    """
+    Devolve [(dimensão, chave, {"pnl", "trades", "wins"})] com a contribuição de uma operação.
+    'accounts' (contas do utilizador) dá a fração de capital dos registos antigos sem 'account_weights'.
+    """
+    pnl = trade_pnl(entry)
+    if pnl is None or not entry.get('trade_date'):
+        return []
+    trade_date = pd.Timestamp(entry['trade_date'])
+    iso = trade_date.isocalendar()
+    values = {"pnl": pnl, "trades": 1, "wins": 1 if pnl > 0 else 0}
+    keys = [
+        ("daily", trade_date.strftime("%Y-%m-%d")),
+        ("weekly", f"{iso[0]}-W{iso[1]:02d}"),
+        ("monthly", trade_date.strftime("%Y-%m")),
+        ("setup", entry.get('selected_setup') or "N/A"),
+    ]
+    contributions = [(dimension, key, values) for dimension, key in keys]
+    # Por conta, o P&L é repartido pela fração de capital de cada conta (ver account_attribution).
+    shares = entry.get('account_weights') or capital_weights(entry.get('accounts'), accounts)
+    for account_id, share in shares.items():
+        contributions.append(("account", account_id, {**values, "pnl": pnl * share}))
+    return contributions
+
+def rollup_delta(old_entry, new_entry, accounts=None):
+    """
+    Diferença nos agregados entre o estado anterior e o novo de uma operação
+    (None em old_entry para uma criação, None em new_entry para um apagamento).
+    'accounts' é usado como em trade_contributions.
+
+    Returns:
+        dict: {dimensão: {chave: {campo: variação}}}, apenas com variações não nulas.
+    """
+    delta = defaultdict(lambda: defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0)))
+    for sign, entry in ((-1, old_entry), (1, new_entry)):
+        for dimension, key, values in trade_contributions(entry, accounts):
+            cell = delta[dimension][key]
+            for field in ROLLUP_FIELDS:
+                cell[field] += sign * values[field]
+    return {
+        dimension: {key: cell for key, cell in cells.items() if any(abs(v) > 1e-12 for v in cell.values())}
+        for dimension, cells in delta.items()
+        if any(any(abs(v) > 1e-12 for v in cell.values()) for cell in cells.values())
+    }
+
+def combine_rollup_deltas(deltas):
+    """
+    Soma várias diferenças de rollup_delta numa só (ex.: as de um lote de operações importadas),
+    para que o lote escreva cada documento de agregados uma única vez.
+    """
+    total = defaultdict(lambda: defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0)))
+    for delta in deltas:
+        for dimension, cells in delta.items():
+            for key, values in cells.items():
+                cell = total[dimension][key]
+                for field in ROLLUP_FIELDS:
+                    cell[field] += values.get(field, 0)
+    return {
+        dimension: {key: cell for key, cell in cells.items() if any(abs(v) > 1e-12 for v in cell.values())}
+        for dimension, cells in total.items()
+        if any(any(abs(v) > 1e-12 for v in cell.values()) for cell in cells.values())
+    }
+
+def apply_rollup_delta(writer, user_id, delta, client=None):
+    """
+    Acrescenta a uma escrita em curso (WriteBatch ou Transaction) os incrementos dos agregados.
+    Não faz nada se a operação não alterar os resultados.
+    """
+    from firebase_admin import firestore
+    collection = _rollups_collection(user_id, client)
+    for dimension, cells in delta.items():
+        increments = {key: {field: firestore.Increment(value) for field, value in cell.items() if value}
+                      for key, cell in cells.items()}
+        writer.set(collection.document(dimension), increments, merge=True)
+
+# --- LEITURA ---
+
+def get_pnl_rollups(user_id, client=None):
+    """
+    Lê os agregados de P&L de um utilizador (cinco documentos).
+
+    Returns:
+        dict: {dimensão: pd.DataFrame com índice na chave e colunas pnl, trades, wins}.
+    """
+    rollups = {dimension: pd.DataFrame(columns=list(ROLLUP_FIELDS)) for dimension in ROLLUP_DIMENSIONS}
+    if not user_id: return rollups
+    try:
+        for doc in _rollups_collection(user_id, client).stream():
+            if doc.id in rollups:
+                data = doc.to_dict() or {}
+                frame = pd.DataFrame.from_dict(data, orient='index').reindex(columns=list(ROLLUP_FIELDS)).fillna(0)
+                rollups[doc.id] = frame.sort_index()
+        return rollups
+    except Exception as e:
+        st.error(f"Erro ao buscar os agregados de P&L: {e}")
+        return rollups
+
+def rollup_summaries(rollups, today=None):
+    """
+    Dados do dashboard (visão de todas as contas) a partir dos agregados, no formato de
+    reporting_engine: totais dos KPIs, P&L diário do calendário, sumário por período, sumário
+    diário e sumário por dia da semana.
+
+    Returns:
+        dict: {"totals": {"total_pnl", "total_trades", "win_rate"}, "calendar_data", "time_summary",
+               "daily_summary", "weekday_summary"}.
+    """
+    daily = rollups.get("daily", pd.DataFrame(columns=list(ROLLUP_FIELDS)))
+    daily = daily[daily["trades"] > 0] if not daily.empty else daily
+    daily_pnl = pd.Series(daily["pnl"].to_numpy(dtype=float), index=pd.to_datetime(daily.index), name='pnl_usd').sort_index()
+    daily_pnl.index.name = 'trade_day'
+    total_trades = int(round(daily["trades"].sum())) if not daily.empty else 0
+    wins = int(round(daily["wins"].sum())) if not daily.empty else 0
+    totals = {"total_pnl": float(daily_pnl.sum()), "total_trades": total_trades,
+              "win_rate": wins / total_trades * 100 if total_trades else 0}
+
+    # Semana e mês correntes saem dos documentos semanal e mensal (uma chave cada).
+    today = today or datetime.now().date()
+    iso = today.isocalendar()
+    weekly, monthly = rollups.get("weekly"), rollups.get("monthly")
+    cell = lambda frame, key: float(frame.loc[key, "pnl"]) if frame is not None and key in frame.index else 0.0
+    year_months = monthly.index[monthly.index.str.startswith(f"{today.year}-")] if monthly is not None and not monthly.empty else []
+    time_summary = {"pnl_week": cell(weekly, f"{iso[0]}-W{iso[1]:02d}"), "pnl_month": cell(monthly, today.strftime("%Y-%m")),
+                    "pnl_year": float(monthly.loc[year_months, "pnl"].sum()) if len(year_months) else 0.0}
+
+    winning_days, losing_days = daily_pnl[daily_pnl > 0], daily_pnl[daily_pnl < 0]
+    best_day_pnl = daily_pnl.max() if not daily_pnl.empty else 0
+    worst_day_pnl = daily_pnl.min() if not daily_pnl.empty else 0
+    daily_summary = {"avg_win_day": winning_days.mean() if not winning_days.empty else 0,
+                     "avg_loss_day": losing_days.mean() if not losing_days.empty else 0,
+                     "best_day_pnl": best_day_pnl, "best_day_date": daily_pnl.idxmax().strftime('%d/%m/%Y') if best_day_pnl > 0 else "N/A",
+                     "worst_day_pnl": worst_day_pnl, "worst_day_date": daily_pnl.idxmin().strftime('%d/%m/%Y') if worst_day_pnl < 0 else "N/A"}
+
+    weekday_pnl = daily_pnl.groupby(daily_pnl.index.weekday).sum().reindex(range(7), fill_value=0.0)
+    weekday_pnl.index = WEEKDAY_LABELS
+    weekday_summary = {"best_day": weekday_pnl.idxmax(), "best_day_pnl": weekday_pnl.max(),
+                       "worst_day": weekday_pnl.idxmin(), "worst_day_pnl": weekday_pnl.min()}
+    return {"totals": totals, "calendar_data": daily_pnl, "time_summary": time_summary,
+            "daily_summary": daily_summary, "weekday_summary": weekday_summary}
+
+# --- RECONCILIAÇÃO ---
+
+def compute_rollups(entries, accounts=None):
+    """Recalcula de raiz os agregados a partir de uma lista de operações (dicionários)."""
+    totals = {dimension: defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0)) for dimension in ROLLUP_DIMENSIONS}
+    for entry in entries:
+        for dimension, key, values in trade_contributions(entry, accounts):
+            cell = totals[dimension][key]
+            for field in ROLLUP_FIELDS:
+                cell[field] += values[field]
+    return {dimension: {key: cell for key, cell in cells.items() if cell["trades"]} for dimension, cells in totals.items()}
+
+def _diff_rollups(expected, stored):
+    mismatches = []
+    for dimension in ROLLUP_DIMENSIONS:
+        exp, got = expected.get(dimension, {}), stored.get(dimension, {})
+        for key in set(exp) | set(got):
+            a = exp.get(key, dict.fromkeys(ROLLUP_FIELDS, 0))
+            b = got.get(key) or {}
+            for field in ROLLUP_FIELDS:
+                if abs(a.get(field, 0) - (b.get(field) or 0)) > RECONCILE_TOLERANCE:
+                    mismatches.append((dimension, key, field, a.get(field, 0), b.get(field)))
+    return mismatches
+
+def reconcile_rollups(user_id, fix=False, client=None, accounts=None):
+    """
+    Recalcula os agregados a partir do diário completo e compara-os com os guardados.
+
+    Args:
+        user_id (str): O utilizador.
+        fix (bool, optional): Se True, reescreve os documentos quando há diferenças (ou se não existirem).
+        client (optional): Cliente Firestore. Defaults to firebase_config.get_db().
+        accounts (list, optional): Contas do utilizador (frações de capital dos registos antigos).
+                                   Defaults to as contas lidas do Firestore.
+
+    Returns:
+        list: Diferenças encontradas, como (dimensão, chave, campo, esperado, guardado).
+    """
+    client = client or get_db()
+    user_ref = client.collection("user_profiles").document(user_id)
+    if accounts is None:
+        accounts = [{**(doc.to_dict() or {}), 'doc_id': doc.id} for doc in user_ref.collection("trading_accounts").stream()]
+    entries = [doc.to_dict() for doc in user_ref.collection("journal_entries").stream()]
+    expected = compute_rollups(entries, accounts)
+    collection = _rollups_collection(user_id, client)
+    stored = {doc.id: doc.to_dict() or {} for doc in collection.stream()}
+    mismatches = _diff_rollups(expected, stored)
+
+    if fix and (mismatches or set(ROLLUP_DIMENSIONS) - set(stored)):
+        batch = client.batch()
+        for dimension in ROLLUP_DIMENSIONS:
+            batch.set(collection.document(dimension), expected[dimension])
+        batch.commit()
+    return mismatches
@@ -0,0 +1,278 @@
+# marketlens/utils/seasonality_engine.py
+
+"""
+Motor de sazonalidade multi-ativo.
+
+Para cada ticker, os retornos por período (mês, semana ISO e dia do ano) ficam guardados num
+cubo NumPy (anos x períodos). O cubo é calculado a partir de 'price_data', guardado na mesma
+base de dados (tabela 'seasonality_cube') e atualizado incrementalmente: quando chegam novas
+barras, apenas os períodos a partir da última data processada são recalculados; quando chega
+histórico anterior à primeira data processada, o ticker é recalculado de raiz.
+
+Com o cubo em memória, a trajetória sazonal média, a taxa de acerto e a dispersão de qualquer
+ativo para qualquer janela de anos são simples cortes e médias sobre arrays pequenos.
+"""
+
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+from .config import DB_PATH, yahoo_finance_map
+
+# Granularidades: número de períodos por ano e dias de histórico a reler numa atualização
+# incremental (tem de cobrir o período anterior, que serve de base ao retorno).
+GRANULARITIES = {
+    "monthly": {"buckets": 12, "overlap_days": 70},
+    "weekly": {"buckets": 53, "overlap_days": 21},
+    "daily": {"buckets": 366, "overlap_days": 10},
+}
+
+# --- ESQUEMA ---
+
+def ensure_schema(conn):
+    """Cria (se necessário) a tabela onde o cubo é guardado, um blob float32 por ticker e granularidade."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS seasonality_cube (
+            Ticker TEXT,
+            granularity TEXT,
+            first_year INTEGER,
+            last_date TEXT,
+            data BLOB,
+            first_date TEXT,
+            PRIMARY KEY (Ticker, granularity)
+        )""")
+    # Cubos gravados antes de 'first_date' existir: a coluna fica vazia e o ticker é recalculado.
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(seasonality_cube)")}
+    if "first_date" not in columns:
+        conn.execute("ALTER TABLE seasonality_cube ADD COLUMN first_date TEXT")
+    conn.commit()
+
+# --- CÁLCULO DOS RETORNOS POR PERÍODO ---
+
+def _period_keys(index, granularity):
+    """Devolve (ano, período) de cada data; o período começa em 1."""
+    if granularity == "monthly":
+        return index.year.to_numpy(), index.month.to_numpy()
+    if granularity == "weekly":
+        iso = index.isocalendar()
+        return iso["year"].to_numpy().astype(int), iso["week"].to_numpy().astype(int)
+    return index.year.to_numpy(), index.dayofyear.to_numpy()
+
+def period_returns(close, granularity):
+    """
+    Retornos de cada período (do último fecho do período anterior ao último fecho deste).
+
+    Returns:
+        pd.DataFrame: Colunas 'year', 'bucket' e 'ret', uma linha por período; o primeiro período
+                      não tem base e não é devolvido.
+    """
+    close = close.dropna()
+    if close.empty:
+        return pd.DataFrame(columns=['year', 'bucket', 'ret'])
+    years, buckets = _period_keys(pd.DatetimeIndex(close.index), granularity)
+    keys = years * 1000 + buckets
+    last = pd.Series(close.to_numpy(), index=keys).groupby(level=0, sort=True).last()
+    ret = last.pct_change().iloc[1:]
+    return pd.DataFrame({'year': ret.index // 1000, 'bucket': ret.index % 1000, 'ret': ret.to_numpy()})
+
+def _place(returns, first_year, array, n_buckets):
+    """Escreve os retornos no array (anos x períodos), alargando-o para anos novos."""
+    if returns.empty:
+        return first_year, array
+    if first_year is None:
+        first_year = int(returns['year'].min())
+        array = np.full((0, n_buckets), np.nan, dtype=np.float32)
+    n_years = int(returns['year'].max()) - first_year + 1
+    if n_years > array.shape[0]:
+        array = np.vstack([array, np.full((n_years - array.shape[0], n_buckets), np.nan, dtype=np.float32)])
+    rows = returns['year'].to_numpy() - first_year
+    keep = rows >= 0
+    array[rows[keep], returns['bucket'].to_numpy()[keep] - 1] = returns['ret'].to_numpy()[keep]
+    return first_year, array
+
+def year_complete(last_date, today=None):
+    """
+    Indica se o ano da última barra já terminou e está coberto até ao fim: o último dia útil do
+    ano já passou e a barra é de um dos últimos dias úteis (o fecho do ano pode ser a 29 ou 30
+    de dezembro, ou antes, com feriados).
+    """
+    if not last_date:
+        return False
+    last = pd.Timestamp(last_date)
+    year_end = last + pd.offsets.BYearEnd(0)
+    today = pd.Timestamp(today or pd.Timestamp.today()).normalize()
+    return today > year_end and last >= year_end - pd.offsets.BDay(3)
+
+# --- CUBO ---
+
+class SeasonalityCube:
+    """Cubo de retornos sazonais de vários tickers, persistido em 'seasonality_cube'."""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or DB_PATH
+        # (ticker, granularidade) -> (primeiro ano, array float32 anos x períodos)
+        self.arrays = {}
+        self.last_dates = {}  # ticker -> última data de preço já processada (YYYY-MM-DD)
+        self.first_dates = {}  # ticker -> primeira data de preço já processada (YYYY-MM-DD)
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        # Só leitura: a tabela (e a coluna 'first_date') só são criadas quando há algo a gravar.
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(seasonality_cube)")}
+            if not columns:
+                return
+            first_date = "first_date" if "first_date" in columns else "NULL"
+            rows = conn.execute(f"SELECT Ticker, granularity, first_year, last_date, {first_date}, data FROM seasonality_cube").fetchall()
+        finally:
+            conn.close()
+        for ticker, granularity, first_year, last_date, first_date, data in rows:
+            n_buckets = GRANULARITIES[granularity]["buckets"]
+            self.arrays[(ticker, granularity)] = (first_year, np.frombuffer(data, dtype=np.float32).reshape(-1, n_buckets).copy())
+            self.last_dates[ticker] = last_date
+            self.first_dates[ticker] = first_date
+
+    def refresh(self, tickers=None):
+        """
+        Atualiza o cubo com as barras de 'price_data' mais recentes do que a última data processada
+        de cada ticker, e guarda os tickers alterados. Um ticker com barras anteriores à primeira
+        data processada (histórico acrescentado no início) é recalculado de raiz.
+
+        Args:
+            tickers (list, optional): Tickers a atualizar. Defaults to todos os de yahoo_finance_map.
+
+        Returns:
+            int: Número de tickers atualizados.
+        """
+        tickers = list(tickers or yahoo_finance_map.values())
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            # Um MIN e um MAX por ticker: cada subconsulta é uma procura no índice (Ticker, Date),
+            # em vez de um GROUP BY que percorre a tabela toda.
+            values = ",".join(["(?)"] * len(tickers))
+            spans = {t: (first, last) for t, first, last in conn.execute(f"""
+                WITH t(Ticker) AS (VALUES {values})
+                SELECT Ticker,
+                       (SELECT MIN(Date) FROM price_data p WHERE p.Ticker = t.Ticker),
+                       (SELECT MAX(Date) FROM price_data p WHERE p.Ticker = t.Ticker)
+                FROM t""", tickers) if last}
+            # Cabeça recuada: há barras antes da primeira processada (ou esta não é conhecida).
+            rebuild = {t for t, (first, _) in spans.items()
+                       if t in self.last_dates and first and first < (self.first_dates.get(t) or "9999")}
+            stale = [t for t, (_, last) in spans.items() if t in rebuild or (last and last > (self.last_dates.get(t) or ""))]
+            if not stale:
+                return 0
+
+            ensure_schema(conn)
+            latest = {t: last for t, (_, last) in spans.items()}
+            updates = []
+            with self._lock:
+                for ticker in stale:
+                    if ticker in rebuild:
+                        for granularity in GRANULARITIES:
+                            self.arrays.pop((ticker, granularity), None)
+                        self.last_dates.pop(ticker, None)
+                    known = self.last_dates.get(ticker)
+                    # Relê apenas o necessário para recalcular os períodos a partir da última data processada.
+                    overlap = max(g["overlap_days"] for g in GRANULARITIES.values())
+                    since = (pd.Timestamp(known) - pd.Timedelta(days=overlap)).strftime("%Y-%m-%d") if known else "0000-00-00"
+                    prices = pd.read_sql_query(
+                        "SELECT Date, Close FROM price_data WHERE Ticker = ? AND Date >= ? ORDER BY Date",
+                        conn, params=(ticker, since))
+                    close = pd.Series(prices['Close'].to_numpy(), index=pd.to_datetime(prices['Date']))
+
+                    for granularity, spec in GRANULARITIES.items():
+                        returns = period_returns(close, granularity)
+                        if known:
+                            # Descarta períodos completamente anteriores à última data (já estão no cubo).
+                            k_year, k_bucket = _period_keys(pd.DatetimeIndex([pd.Timestamp(known)]), granularity)
+                            returns = returns[returns['year'] * 1000 + returns['bucket'] >= k_year[0] * 1000 + k_bucket[0]]
+                        first_year, array = self.arrays.get((ticker, granularity), (None, None))
+                        first_year, array = _place(returns, first_year, array, spec["buckets"])
+                        if array is None:
+                            continue
+                        self.arrays[(ticker, granularity)] = (first_year, array)
+                        updates.append((ticker, granularity, first_year, latest[ticker], spans[ticker][0], array.astype(np.float32).tobytes()))
+                    self.last_dates[ticker] = latest[ticker]
+                    self.first_dates[ticker] = spans[ticker][0]
+
+            conn.executemany("INSERT OR REPLACE INTO seasonality_cube (Ticker, granularity, first_year, last_date, first_date, data) VALUES (?, ?, ?, ?, ?, ?)", updates)
+            conn.commit()
+            return len(stale)
+        finally:
+            conn.close()
+
+    # --- CONSULTAS ---
+
+    def cube(self, tickers=None, granularity="monthly"):
+        """
+        Devolve o cubo (tickers x anos x períodos) de uma granularidade, com um eixo de anos comum.
+
+        Returns:
+            tuple: (lista de tickers, array de anos, ndarray float32).
+        """
+        n_buckets = GRANULARITIES[granularity]["buckets"]
+        tickers = [t for t in (tickers or yahoo_finance_map.values()) if (t, granularity) in self.arrays]
+        if not tickers:
+            return [], np.array([], dtype=int), np.empty((0, 0, n_buckets), dtype=np.float32)
+        spans = [(self.arrays[(t, granularity)][0], self.arrays[(t, granularity)][1].shape[0]) for t in tickers]
+        y0 = min(f for f, _ in spans); y1 = max(f + n for f, n in spans)
+        out = np.full((len(tickers), y1 - y0, n_buckets), np.nan, dtype=np.float32)
+        for i, t in enumerate(tickers):
+            first_year, array = self.arrays[(t, granularity)]
+            out[i, first_year - y0:first_year - y0 + array.shape[0]] = array
+        return tickers, np.arange(y0, y1), out
+
+    def stats(self, ticker, granularity="monthly", lookback=10, end_year=None):
+        """
+        Estatísticas sazonais de um ticker para os últimos 'lookback' anos.
+
+        Args:
+            ticker (str): O ticker.
+            granularity (str, optional): "monthly", "weekly" ou "daily". Defaults to "monthly".
+            lookback (int, optional): Número de anos. Defaults to 10.
+            end_year (int, optional): Último ano incluído. Defaults to o último ano completo
+                (o da última barra se esse ano já terminou, ver year_complete; senão o anterior).
+
+        Returns:
+            dict: {"avg", "hit_rate", "std", "path", "years"}; os quatro primeiros são arrays por período
+                  (path é a trajetória acumulada dos retornos médios, em %). None se não houver dados.
+        """
+        entry = self.arrays.get((ticker, granularity))
+        if entry is None:
+            return None
+        first_year, array = entry
+        last_row = array.shape[0] - 1 if end_year is None else end_year - first_year
+        if end_year is None and not year_complete(self.last_dates.get(ticker)):
+            last_row -= 1  # O ano corrente ainda não está completo.
+        rows = array[max(last_row - lookback + 1, 0):last_row + 1]
+        if rows.size == 0:
+            return None
+        valid = ~np.isnan(rows)
+        counts = valid.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            total = np.where(valid, rows, 0).sum(axis=0)
+            avg = total / counts
+            hit_rate = (rows > 0).sum(axis=0) / counts * 100
+            std = np.sqrt(np.where(valid, (rows - avg) ** 2, 0).sum(axis=0) / counts)
+        path = (np.cumprod(1 + np.nan_to_num(avg)) - 1) * 100
+        return {"avg": avg * 100, "hit_rate": hit_rate, "std": std * 100, "path": path,
+                "years": (first_year + max(last_row - lookback + 1, 0), first_year + last_row)}
+
+# --- CUBO PARTILHADO ---
+
+_cubes = {}
+_cubes_lock = threading.Lock()
+
+def get_seasonality_cube(db_path=None, refresh=True):
+    """Devolve o cubo partilhado pelo processo, atualizado com as barras novas de 'price_data'."""
+    key = db_path or DB_PATH
+    with _cubes_lock:
+        cube = _cubes.get(key)
+        if cube is None:
+            cube = _cubes[key] = SeasonalityCube(key)
+    if refresh:
+        cube.refresh()
+    return cube
@@ -0,0 +1,361 @@
+# marketlens/utils/snapshot_store.py
+
+"""
+Snapshots colunares das tabelas 'price_data' e 'cot_data'.
+
+Cada tabela é exportada para ficheiros Arrow IPC (ou Parquet) partidos por ticker / mercado,
+com as datas já como timestamp e os valores como float64:
+
+    snapshots/manifest.json
+    snapshots/price_data/Ticker=%5EGSPC.arrow
+    snapshots/cot_data/market_name=GOLD%20-%20COMMODITY%20EXCHANGE%20INC..arrow
+
+Os ficheiros Arrow sem compressão são lidos por memory-map e convertidos em DataFrames sem
+cópia nem conversão de texto. O manifest guarda, por partição, o número de linhas e a primeira
+e última data exportadas; a leitura usa o snapshot para o histórico e pede à base SQLite apenas
+as linhas fora desse intervalo (barras novas, a última barra, que pode ser revista, e troços
+anteriores acrescentados depois da exportação). No COT, os relatórios anteriores ao último
+exportado vêm do snapshot apenas se a contagem de linhas na base coincidir; caso contrário a
+leitura é feita na base. Alterações de valores dentro do intervalo exportado (que o
+armazenamento de preços e a ingestão do COT não fazem) exigem nova exportação.
+
+    python -m utils.snapshot_store export [--format parquet]   # exporta (só partições alteradas)
+    python -m utils.snapshot_store import                      # repõe as tabelas a partir do snapshot
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from urllib.parse import quote
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+from .config import DB_PATH
+
+SNAPSHOT_DIR = os.environ.get("MARKETLENS_SNAPSHOT_DIR", os.path.join(os.path.dirname(DB_PATH), "snapshots"))
+# MARKETLENS_SNAPSHOTS=0 desliga a leitura a partir dos snapshots.
+SNAPSHOTS_ENABLED = os.environ.get("MARKETLENS_SNAPSHOTS", "1") != "0"
+MANIFEST_NAME = "manifest.json"
+FORMATS = {"arrow": ".arrow", "parquet": ".parquet"}
+
+# Tabelas exportadas: coluna de partição, coluna de data e colunas de valores.
+TABLES = {
+    "price_data": {"partition": "Ticker", "date": "Date", "values": ["Close"]},
+    "cot_data": {"partition": "market_name", "date": "report_date",
+                 "values": ["comm_long", "comm_short", "noncomm_long", "noncomm_short", "retail_long", "retail_short"]},
+}
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+# --- EXPORTAÇÃO ---
+
+def _partition_file(table, key, fmt):
+    return os.path.join(table, f"{TABLES[table]['partition']}={quote(key, safe='')}{FORMATS[fmt]}")
+
+def _write_partition(path, frame, fmt):
+    """Escreve uma partição de forma atómica (ficheiro temporário + rename)."""
+    arrow_table = pa.Table.from_pandas(frame, preserve_index=False)
+    tmp = f"{path}.tmp"
+    if fmt == "arrow":
+        with pa.OSFile(tmp, "wb") as sink, ipc.new_file(sink, arrow_table.schema) as writer:
+            writer.write_table(arrow_table)
+    else:
+        pq.write_table(arrow_table, tmp)
+    os.replace(tmp, path)
+
+def _database_file(conn):
+    """Caminho absoluto do ficheiro da base principal de uma ligação."""
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    return os.path.abspath(path) if path else ""
+
+def _read_manifest(snapshot_dir):
+    path = os.path.join(snapshot_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def export_snapshots(db_path=None, snapshot_dir=None, tables=tuple(TABLES), fmt="arrow", conn=None, full=False):
+    """
+    Exporta as tabelas para o diretório de snapshots, reescrevendo apenas as partições cujo
+    número de linhas ou intervalo de datas mudou desde a última exportação.
+
+    Args:
+        db_path (str, optional): Base de dados de origem. Defaults to DB_PATH.
+        snapshot_dir (str, optional): Diretório de destino. Defaults to SNAPSHOT_DIR.
+        tables (tuple, optional): Tabelas a exportar. Defaults to todas.
+        fmt (str, optional): "arrow" (memory-map sem cópia) ou "parquet". Defaults to "arrow".
+        conn (sqlite3.Connection, optional): Ligação já aberta (pode ser só de leitura).
+        full (bool, optional): Reescreve todas as partições. Defaults to False.
+
+    Returns:
+        dict: {tabela: número de partições escritas}.
+    """
+    snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+    manifest = _read_manifest(snapshot_dir) or {}
+    if manifest.get("format", fmt) != fmt:
+        manifest, full = {}, True  # Mudança de formato: exporta tudo de novo.
+    own_conn = conn is None
+    conn = conn or sqlite3.connect(f"file:{db_path or DB_PATH}?mode=ro", uri=True)
+    source = _database_file(conn)
+    if manifest.get("source", source) != source:
+        manifest, full = {}, True  # Snapshot de outra base: exporta tudo de novo.
+    manifest.update({"format": fmt, "source": source, "tables": manifest.get("tables", {})})
+    written = {}
+    try:
+        existing = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for table in tables:
+            if table not in existing:
+                continue
+            spec = TABLES[table]
+            part_col, date_col = spec["partition"], spec["date"]
+            os.makedirs(os.path.join(snapshot_dir, table), exist_ok=True)
+            known = manifest["tables"].get(table, {}).get("partitions", {})
+            summary = {key: (rows, first, last) for key, rows, first, last in conn.execute(
+                f"SELECT {part_col}, COUNT(*), MIN({date_col}), MAX({date_col}) FROM {table} GROUP BY {part_col}")}
+            changed = [key for key, (rows, first, last) in summary.items()
+                       if full or (known.get(key) or {}).get("rows") != rows
+                       or known[key]["first"] != first or known[key]["last"] != last]
+            partitions = {k: v for k, v in known.items() if k in summary}
+            for key in changed:
+                frame = pd.read_sql_query(
+                    f"SELECT {date_col}, {', '.join(spec['values'])} FROM {table} WHERE {part_col} = ? ORDER BY {date_col}",
+                    conn, params=(key,))
+                frame[date_col] = pd.to_datetime(frame[date_col])
+                frame[spec["values"]] = frame[spec["values"]].astype("float64")
+                relative = _partition_file(table, key, fmt)
+                _write_partition(os.path.join(snapshot_dir, relative), frame, fmt)
+                rows, first, last = summary[key]
+                partitions[key] = {"file": relative, "rows": rows, "first": first, "last": last}
+            for key in set(known) - set(summary):
+                path = os.path.join(snapshot_dir, known[key]["file"])
+                if os.path.exists(path):
+                    os.remove(path)
+            manifest["tables"][table] = {"partition": part_col, "date": date_col, "partitions": partitions}
+            written[table] = len(changed)
+    finally:
+        if own_conn:
+            conn.close()
+
+    manifest["exported_at"] = datetime.now().isoformat(timespec="seconds")
+    tmp = os.path.join(snapshot_dir, MANIFEST_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, os.path.join(snapshot_dir, MANIFEST_NAME))
+    return written
+
+def refresh_snapshots(db_path=None, snapshot_dir=None):
+    """
+    Exporta as partições alteradas se já existir um snapshot desta base (a criação do snapshot
+    é sempre explícita, pela linha de comandos). Devolve o resultado de export_snapshots ou None.
+    """
+    snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+    manifest = _read_manifest(snapshot_dir)
+    if not SNAPSHOTS_ENABLED or manifest is None or manifest.get("source") != os.path.abspath(db_path or DB_PATH):
+        return None
+    return export_snapshots(db_path, snapshot_dir, tuple(manifest["tables"]), fmt=manifest["format"])
+
+def import_snapshots(db_path=None, snapshot_dir=None, tables=tuple(TABLES)):
+    """Repõe as tabelas da base a partir do snapshot (INSERT OR REPLACE). Devolve {tabela: linhas}."""
+    snapshot = Snapshot(snapshot_dir or SNAPSHOT_DIR)
+    conn = sqlite3.connect(db_path or DB_PATH, timeout=30)
+    imported = {}
+    try:
+        for table in tables:
+            if table not in snapshot.manifest["tables"]:
+                continue
+            spec = TABLES[table]
+            columns = [spec["date"], spec["partition"], *spec["values"]]
+            total = 0
+            with conn:
+                for key in snapshot.partitions(table):
+                    frame = snapshot.partition_frame(table, key)
+                    dates = frame[spec["date"]].dt.strftime("%Y-%m-%d")
+                    rows = zip(dates, [key] * len(frame), *(frame[c].tolist() for c in spec["values"]))
+                    conn.executemany(f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows)
+                    total += len(frame)
+            imported[table] = total
+    finally:
+        conn.close()
+    return imported
+
+# --- LEITURA ---
+
+class Snapshot:
+    """Snapshot aberto: manifest e partições já mapeadas em memória (abertas a pedido)."""
+
+    def __init__(self, snapshot_dir):
+        self.snapshot_dir = snapshot_dir
+        self.manifest = _read_manifest(snapshot_dir)
+        if self.manifest is None:
+            raise FileNotFoundError(f"Sem snapshot em {snapshot_dir}")
+        self._tables = {}  # (tabela, chave) -> pyarrow.Table
+        self._lock = threading.Lock()
+
+    def partitions(self, table):
+        return self.manifest["tables"].get(table, {}).get("partitions", {})
+
+    def arrow_table(self, table, key):
+        """Tabela Arrow de uma partição (memory-map sem cópia no formato Arrow)."""
+        with self._lock:
+            cached = self._tables.get((table, key))
+            if cached is None:
+                path = os.path.join(self.snapshot_dir, self.partitions(table)[key]["file"])
+                if self.manifest["format"] == "arrow":
+                    cached = ipc.open_file(pa.memory_map(path, "r")).read_all()
+                else:
+                    cached = pq.read_table(path, memory_map=True)
+                self._tables[(table, key)] = cached
+            return cached
+
+    def partition_frame(self, table, key):
+        return self.arrow_table(table, key).to_pandas(split_blocks=True)
+
+    def cot_body(self):
+        """
+        Todas as partições de 'cot_data' numa só tabela (concatenação Arrow sem cópia), com
+        'market_name' como categoria pela ordem do manifest. None se não houver partições.
+        """
+        markets = list(self.partitions("cot_data"))
+        if not markets:
+            return None
+        tables = [self.arrow_table("cot_data", m) for m in markets]
+        lengths = np.array([t.num_rows for t in tables])
+        combined = pa.concat_tables(tables).to_pandas(split_blocks=True)
+        combined.insert(1, "market_name", pd.Categorical.from_codes(np.repeat(np.arange(len(markets)), lengths), categories=markets))
+        return combined
+
+def open_snapshot(snapshot_dir=None):
+    """Devolve o snapshot do diretório (reaberto se o manifest mudou), ou None se não existir."""
+    snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+    path = os.path.join(snapshot_dir, MANIFEST_NAME)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _snapshots_lock:
+        cached = _snapshots.get(snapshot_dir)
+        if cached is None or cached[0] != mtime:
+            cached = _snapshots[snapshot_dir] = (mtime, Snapshot(snapshot_dir))
+        return cached[1]
+
+def snapshot_for(conn, snapshot_dir=None):
+    """
+    Snapshot exportado da base desta ligação, ou None (snapshots desligados, inexistentes ou
+    exportados de outra base).
+    """
+    if not SNAPSHOTS_ENABLED:
+        return None
+    snapshot = open_snapshot(snapshot_dir)
+    if snapshot is None or snapshot.manifest.get("source") != _database_file(conn):
+        return None
+    return snapshot
+
+def read_prices_snapshot(snapshot, tickers, conn, start=None, end=None):
+    """
+    Fechos dos tickers, no mesmo formato de price_store.read_prices: o histórico vem do snapshot
+    e a base só é consultada para as datas fora do intervalo exportado de cada ticker.
+    """
+    partitions = snapshot.partitions("price_data")
+    start_ts = pd.Timestamp(start) if start is not None else None
+    end_ts = pd.Timestamp(end) if end is not None else None
+    pieces, unknown = [], []  # pieces: (coluna, datas, valores)
+    tails, heads = {}, {}  # data limite -> tickers
+    for ticker in tickers:
+        info = partitions.get(ticker)
+        if info is None:
+            unknown.append(ticker)
+            continue
+        table = snapshot.arrow_table("price_data", ticker)
+        dates = table.column("Date").to_numpy()
+        # Do snapshot: [first, last) dentro de [start, end). A última barra exportada vem da base.
+        lo = np.searchsorted(dates, start_ts.to_datetime64(), side="left") if start_ts is not None else 0
+        hi = np.searchsorted(dates, pd.Timestamp(info["last"]).to_datetime64(), side="left")
+        if end_ts is not None:
+            hi = min(hi, np.searchsorted(dates, end_ts.to_datetime64(), side="left"))
+        if hi > lo:
+            pieces.append((ticker, dates[lo:hi], table.column("Close").to_numpy()[lo:hi]))
+        tails.setdefault(info["last"], []).append(ticker)
+        heads.setdefault(info["first"], []).append(ticker)
+
+    # Uma subconsulta por data limite: 'Date' é a primeira coluna da chave primária, por isso cada
+    # uma lê só um intervalo do índice (um OR entre elas obrigaria a percorrer a tabela toda).
+    subqueries, params = [], []
+    bounds = []
+    if start is not None:
+        bounds.append(("Date >= ?", start_ts.strftime("%Y-%m-%d")))
+    if end is not None:
+        bounds.append(("Date < ?", end_ts.strftime("%Y-%m-%d")))
+    groups = [("Date >= ?", d, g) for d, g in tails.items()] + [("Date < ?", d, g) for d, g in heads.items()]
+    groups += [(None, None, unknown)] if unknown else []
+    for condition, boundary, group in groups:
+        where = [f"Ticker IN ({','.join('?' * len(group))})"] + ([condition] if condition else []) + [b[0] for b in bounds]
+        subqueries.append(f"SELECT Date, Ticker, Close FROM price_data WHERE {' AND '.join(where)}")
+        params += list(group) + ([boundary] if condition else []) + [b[1] for b in bounds]
+    if subqueries:
+        rows = conn.execute(" UNION ALL ".join(subqueries), params).fetchall()
+        if rows:
+            extra = pd.DataFrame(rows, columns=["Date", "Ticker", "Close"])
+            extra["Date"] = pd.to_datetime(extra["Date"])
+            for ticker, group in extra.groupby("Ticker", sort=False):
+                pieces.append((ticker, group["Date"].to_numpy(), group["Close"].to_numpy()))
+
+    if not pieces:
+        return pd.DataFrame()
+    # Alinha todos os tickers num eixo de datas comum (união ordenada) sem pivot.
+    unit = np.datetime_data(pieces[0][1].dtype)[0]
+    index = np.unique(np.concatenate([d.astype(f"datetime64[{unit}]") for _, d, _ in pieces]))
+    columns = [t for t in tickers if any(p[0] == t for p in pieces)]
+    position = {t: i for i, t in enumerate(columns)}
+    values = np.full((len(index), len(columns)), np.nan)
+    for ticker, dates, closes in pieces:
+        values[np.searchsorted(index, dates.astype(index.dtype)), position[ticker]] = closes
+    return pd.DataFrame(values, index=pd.DatetimeIndex(index, name="Date"), columns=columns)
+
+def load_cot_snapshot(snapshot, conn):
+    """
+    Tabela 'cot_data' completa, no formato de cot_engine.load_cot_data: os relatórios anteriores
+    ao último exportado vêm do snapshot e os restantes da base. Devolve None se a base tiver, antes
+    dessa data, um número de linhas diferente do snapshot (a leitura deve então ser feita na base).
+    """
+    spec = TABLES["cot_data"]
+    columns = [spec["date"], spec["partition"], *spec["values"]]
+    partitions = snapshot.partitions("cot_data")
+    body = snapshot.cot_body()
+    if body is None:
+        return None
+    boundary = max(info["last"] for info in partitions.values())
+    body = body[body["report_date"] < pd.Timestamp(boundary)]
+    # Contagem pelo índice da chave primária (report_date, market_name): apanha linhas novas ou
+    # apagadas antes da fronteira, que o snapshot não conhece.
+    if conn.execute("SELECT COUNT(*) FROM cot_data WHERE report_date < ?", (boundary,)).fetchone()[0] != len(body):
+        return None
+    body = body.assign(market_name=body["market_name"].astype(object))
+    extra = pd.read_sql_query(f"SELECT {', '.join(columns)} FROM cot_data WHERE report_date >= ?", conn, params=(boundary,))
+    extra["report_date"] = pd.to_datetime(extra["report_date"])
+    return pd.concat([body, extra], ignore_index=True)[columns] if not extra.empty else body[columns].reset_index(drop=True)
+
+# --- LINHA DE COMANDOS ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshots Arrow/Parquet de price_data e cot_data.")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("--db", default=DB_PATH, help="Base de dados SQLite.")
+    parser.add_argument("--dir", default=SNAPSHOT_DIR, help="Diretório dos snapshots.")
+    parser.add_argument("--format", default="arrow", choices=list(FORMATS), help="Formato dos ficheiros.")
+    parser.add_argument("--full", action="store_true", help="Reescreve todas as partições.")
+    args = parser.parse_args(argv)
+    if args.action == "export":
+        result = export_snapshots(args.db, args.dir, fmt=args.format, full=args.full)
+        print(f"Partições escritas: {result}")
+    else:
+        print(f"Linhas repostas: {import_snapshots(args.db, args.dir)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+# marketlens/utils/trade_excursion.py
+
+"""
+Excursão das operações finalizadas: MAE/MFE, tempo em operação e o que foi tocado primeiro.
+
+Todas as operações são tratadas num só lote: são agrupadas por ticker (via yahoo_finance_map),
+o histórico de fechos de todos os tickers é pedido numa única chamada ao armazenamento local
+(price_store) e os intervalos [entrada, saída] de cada operação são convertidos em posições no
+histórico com np.searchsorted. As barras de todos os intervalos são lidas de uma vez (índices
+concatenados) e os extremos e os primeiros toques saem de np.maximum/minimum.reduceat.
+
+O histórico guardado tem apenas fechos diários, por isso as excursões e os toques no stop/alvo
+são medidos sobre os fechos. A saída é 'exit_date' (registado quando a operação é finalizada)
+ou, em registos antigos, 'updated_at'.
+
+Os preços são lidos apenas do armazenamento local, para o render nunca esperar pela rede: os
+tickers ainda não completados (ou completados há mais de TOP_UP_INTERVAL_SECONDS) são pedidos
+em segundo plano, e as operações desses tickers são mostradas com o que já existe no disco mas
+recalculadas no render seguinte.
+
+Os resultados ficam em cache por doc_id (com um hash dos campos usados), partilhada pelo
+processo: o Diário e o Dashboard mostram-nos sem voltar a pedir preços. Operações sem barras
+no intervalo (preços ainda por chegar ou em falta) também ficam registadas, mas só durante
+EMPTY_RETRY_SECONDS: depois disso voltam a ser pedidas.
+"""
+
+import threading
+import time
+import numpy as np
+import pandas as pd
+import streamlit as st
+from .config import yahoo_finance_map
+
+# Limite de dias de uma operação (protege contra datas de saída em falta ou erradas).
+MAX_HOLD_DAYS = 365
+# Intervalo até voltar a pedir preços para uma operação que ficou sem barras.
+EMPTY_RETRY_SECONDS = 600
+# Intervalo até voltar a completar um ticker em segundo plano (como price_store.SYNC_TTL_SECONDS).
+TOP_UP_INTERVAL_SECONDS = 900
+SIGNATURE_FIELDS = ('asset', 'direction', 'entry_price', 'stop_loss', 'target_price', 'exit_price', 'trade_date', 'exit_end')
+RESULT_COLUMNS = ['ticker', 'bars', 'days_in_trade', 'mae', 'mfe', 'mae_r', 'mfe_r', 'mae_pct', 'mfe_pct',
+                  'stop_touched', 'target_touched', 'first_touch']
+
+_caches = {}
+_registry_lock = threading.Lock()
+
+def default_price_loader(tickers, start):
+    """Fechos diários a partir de 'start' já guardados no armazenamento local (sem rede)."""
+    from .price_store import read_prices
+    return read_prices(tickers, start=start)
+
+def default_top_up(tickers, start):
+    """Completa o armazenamento local a partir de 'start', pelo agendador partilhado (pedidos à rede)."""
+    from .price_store import top_up
+    from .fetch_scheduler import get_default_scheduler
+    top_up(tickers, start, fetcher=get_default_scheduler().fetch)
+
+# --- PREPARAÇÃO ---
+
+def _exit_times(df):
+    """Fim de cada operação: 'exit_date', senão 'updated_at', limitado a MAX_HOLD_DAYS após a entrada."""
+    entry = pd.to_datetime(df['trade_date'])
+    end = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    for col in ('exit_date', 'updated_at'):
+        if col in df.columns:
+            values = pd.to_datetime(df[col], errors='coerce', utc=True).dt.tz_localize(None)
+            end = end.fillna(values.astype('datetime64[ns]'))
+    end = end.fillna(entry).clip(lower=entry, upper=entry + pd.Timedelta(days=MAX_HOLD_DAYS))
+    return entry, end
+
+def finalized_trades(df_journal):
+    """Operações finalizadas com os campos numéricos, o ticker e o intervalo [entrada, saída]."""
+    if df_journal.empty or 'status' not in df_journal.columns:
+        return pd.DataFrame()
+    df = df_journal[df_journal['status'] == 'Finalizado'].copy()
+    if df.empty:
+        return df
+    for col in ('entry_price', 'stop_loss', 'target_price', 'exit_price'):
+        df[col] = pd.to_numeric(df[col], errors='coerce') if col in df.columns else np.nan
+    df['ticker'] = df['asset'].map(yahoo_finance_map)
+    df['trade_date'], df['exit_end'] = _exit_times(df)
+    return df[df['ticker'].notna() & (df['entry_price'] > 0)]
+
+def trade_signatures(trades):
+    """Identifica, por operação, o estado relevante para a excursão (um hash por linha)."""
+    hashes = pd.util.hash_pandas_object(trades[list(SIGNATURE_FIELDS)], index=False)
+    return pd.Series(hashes.to_numpy(), index=trades['doc_id'].to_numpy())
+
+# --- CÁLCULO EM LOTE ---
+
+def compute_excursions(trades, prices):
+    """
+    Calcula a excursão de um lote de operações finalizadas.
+
+    Args:
+        trades (pd.DataFrame): Resultado de finalized_trades (com 'doc_id').
+        prices (pd.DataFrame): Fechos diários, uma coluna por ticker (índice de datas).
+
+    Returns:
+        pd.DataFrame: Índice no doc_id, colunas RESULT_COLUMNS. Operações sem barras no
+                      intervalo ficam com NaN nas excursões.
+    """
+    n = len(trades)
+    out = pd.DataFrame(index=pd.Index(trades['doc_id'].to_numpy(), name='doc_id'), columns=RESULT_COLUMNS)
+    out['ticker'] = trades['ticker'].to_numpy()
+    out['days_in_trade'] = ((trades['exit_end'] - trades['trade_date']).dt.total_seconds() / 86400).to_numpy()
+    if n == 0:
+        return out
+
+    # Histórico de todos os tickers concatenado num só array, com o deslocamento de cada ticker.
+    flat, starts, ends = [], np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64)
+    offset = 0
+    tickers = trades['ticker'].to_numpy()
+    entry_days = trades['trade_date'].dt.normalize().to_numpy()
+    exit_days = trades['exit_end'].dt.normalize().to_numpy()
+    for ticker in pd.unique(tickers):
+        mask = tickers == ticker
+        if ticker not in prices.columns:
+            continue
+        close = prices[ticker].dropna()
+        dates = close.index.to_numpy(dtype='datetime64[ns]')
+        starts[mask] = offset + np.searchsorted(dates, entry_days[mask], side='left')
+        ends[mask] = offset + np.searchsorted(dates, exit_days[mask], side='right')
+        flat.append(close.to_numpy(dtype=float)); offset += len(close)
+    lengths = np.maximum(ends - starts, 0)
+    out['bars'] = lengths
+    has_bars = lengths > 0
+    if not has_bars.any():
+        return out
+
+    # Índices de todas as barras de todos os intervalos, de uma vez.
+    lengths_b, starts_b = lengths[has_bars], starts[has_bars]
+    group_start = np.concatenate([[0], np.cumsum(lengths_b)[:-1]])
+    local = np.arange(lengths_b.sum()) - np.repeat(group_start, lengths_b)
+    closes = np.concatenate(flat)[np.repeat(starts_b, lengths_b) + local]
+
+    sign = np.where(trades['direction'].to_numpy() == 'Compra', 1.0, -1.0)[has_bars]
+    entry = trades['entry_price'].to_numpy(dtype=float)[has_bars]
+    stop = trades['stop_loss'].to_numpy(dtype=float)[has_bars]
+    target = trades['target_price'].to_numpy(dtype=float)[has_bars]
+    s_rep = np.repeat(sign, lengths_b)
+
+    excursion = s_rep * (closes - np.repeat(entry, lengths_b))
+    mfe = np.maximum(np.maximum.reduceat(excursion, group_start), 0)
+    mae = np.maximum(-np.minimum.reduceat(excursion, group_start), 0)
+
+    # Primeira barra (posição local) em que o fecho passa o stop e o alvo.
+    never = np.iinfo(np.int64).max
+    stop_hit = (s_rep * (closes - np.repeat(stop, lengths_b)) <= 0) & np.repeat(stop > 0, lengths_b)
+    target_hit = (s_rep * (closes - np.repeat(target, lengths_b)) >= 0) & np.repeat(target > 0, lengths_b)
+    first_stop = np.minimum.reduceat(np.where(stop_hit, local, never), group_start)
+    first_target = np.minimum.reduceat(np.where(target_hit, local, never), group_start)
+
+    risk = np.abs(entry - stop)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mae_r = np.where(risk > 0, mae / risk, np.nan)
+        mfe_r = np.where(risk > 0, mfe / risk, np.nan)
+    first_touch = np.where(first_stop < first_target, 'stop', np.where(first_target < first_stop, 'target', None))
+
+    rows = np.flatnonzero(has_bars)
+    for col, values in (('mae', mae), ('mfe', mfe), ('mae_r', mae_r), ('mfe_r', mfe_r),
+                        ('mae_pct', mae / entry * 100), ('mfe_pct', mfe / entry * 100),
+                        ('stop_touched', first_stop != never), ('target_touched', first_target != never),
+                        ('first_touch', first_touch)):
+        out.iloc[rows, out.columns.get_loc(col)] = values
+    return out
+
+# --- CACHE POR OPERAÇÃO ---
+
+class ExcursionCache:
+    """Resultados de excursão por doc_id, recalculados apenas para operações novas ou alteradas."""
+
+    def __init__(self, price_loader=None, top_up=None):
+        """
+        Args:
+            price_loader (callable, optional): price_loader(tickers, start) -> DataFrame de fechos, sem rede.
+                                               Defaults to default_price_loader.
+            top_up (callable, optional): top_up(tickers, start), chamado em segundo plano para completar
+                                         o que price_loader lê. Defaults to default_top_up.
+        """
+        self.price_loader = price_loader or default_price_loader
+        self.top_up = top_up or default_top_up
+        self.synced = {}  # ticker -> (início completado 'YYYY-MM-DD', instante em time.monotonic())
+        self._top_up_thread = None
+        self.frame = pd.DataFrame(columns=RESULT_COLUMNS, index=pd.Index([], name='doc_id'))
+        self.signatures = pd.Series(dtype='uint64')  # doc_id -> assinatura do estado calculado
+        # Operações calculadas sem barras: assinatura e instante (time.monotonic) a partir do qual são repetidas.
+        self.empty_signatures = pd.Series(dtype='uint64')
+        self.empty_until = pd.Series(dtype=float)
+        self._lock = threading.Lock()
+
+    def get(self, df_journal):
+        """
+        Devolve a excursão das operações finalizadas do diário, calculando apenas as que faltam.
+
+        Returns:
+            pd.DataFrame: Índice no doc_id, colunas RESULT_COLUMNS (vazio se não houver operações).
+        """
+        trades = finalized_trades(df_journal)
+        if trades.empty:
+            return self.frame.iloc[0:0].copy()
+        signatures = trade_signatures(trades)
+        with self._lock:
+            known = self.signatures.reindex(signatures.index, fill_value=0)
+            missing = (known != signatures).to_numpy()
+            now = time.monotonic()
+            if not self.empty_signatures.empty:
+                # Sem barras no último cálculo e ainda dentro do intervalo de repetição: não pede preços.
+                waiting = ((self.empty_signatures.reindex(signatures.index, fill_value=0) == signatures)
+                           & (self.empty_until.reindex(signatures.index, fill_value=0.0) > now))
+                missing = missing & ~waiting.to_numpy()
+            if missing.any():
+                pending = trades[missing]
+                # Um único pedido de preços para todos os tickers, desde a entrada mais antiga.
+                start = pending['trade_date'].min().strftime('%Y-%m-%d')
+                prices = self.price_loader(sorted(pending['ticker'].unique()), start)
+                computed = compute_excursions(pending, prices if prices is not None else pd.DataFrame())
+                # Tickers por completar: o resultado é mostrado, mas sem assinatura (volta a ser calculado).
+                unsynced = self._start_top_up(pending, now)
+                provisional = computed.index.isin(pending.loc[pending['ticker'].isin(unsynced), 'doc_id'])
+                # Operações ainda sem barras (ex.: preço do dia por chegar) ficam de fora do resultado
+                # e só voltam a ser calculadas ao fim de EMPTY_RETRY_SECONDS.
+                has_bars = (computed['bars'].fillna(0).astype(int) > 0).to_numpy()
+                empty_ids = computed.index[~has_bars & ~provisional]
+                final_ids = computed.index[has_bars & ~provisional]
+                computed = computed[has_bars]
+                stale = self.frame.index.intersection(pending['doc_id'])
+                self.frame = pd.concat([self.frame.drop(stale), computed]) if not self.frame.empty else computed
+                self.signatures = pd.concat([self.signatures.drop(stale, errors='ignore'), signatures[missing].loc[final_ids]])
+                retried = self.empty_signatures.index.intersection(pending['doc_id'])
+                self.empty_signatures = pd.concat([self.empty_signatures.drop(retried), signatures[missing].loc[empty_ids]])
+                self.empty_until = pd.concat([self.empty_until.drop(retried),
+                                              pd.Series(now + EMPTY_RETRY_SECONDS, index=empty_ids, dtype=float)])
+            return self.frame.loc[self.frame.index.intersection(signatures.index, sort=False)]
+
+    def _start_top_up(self, pending, now):
+        """
+        Tickers de 'pending' ainda não completados desde a entrada mais antiga (ou há mais de
+        TOP_UP_INTERVAL_SECONDS). Se houver, e nenhum estiver já em curso, completa-os numa thread.
+        Chamar com o lock.
+        """
+        needed = pending.groupby('ticker')['trade_date'].min().dt.strftime('%Y-%m-%d')
+        unsynced = {t: day for t, day in needed.items()
+                    if t not in self.synced or self.synced[t][0] > day or now - self.synced[t][1] > TOP_UP_INTERVAL_SECONDS}
+        if unsynced and (self._top_up_thread is None or not self._top_up_thread.is_alive()):
+            self._top_up_thread = threading.Thread(target=self._run_top_up, args=(unsynced,), daemon=True,
+                                                   name="excursion-top-up")
+            self._top_up_thread.start()
+        return set(unsynced)
+
+    def _run_top_up(self, unsynced):
+        by_start = {}
+        for ticker, day in unsynced.items():
+            by_start.setdefault(day, []).append(ticker)
+        for day, tickers in sorted(by_start.items()):
+            try:
+                self.top_up(sorted(tickers), day)
+            except Exception as e:
+                print(f"Erro ao completar os preços de {tickers} para a excursão: {e}")
+        # Com ou sem erro, os tickers só voltam a ser pedidos ao fim de TOP_UP_INTERVAL_SECONDS.
+        with self._lock:
+            stamp = time.monotonic()
+            for ticker, day in unsynced.items():
+                self.synced[ticker] = (min(day, self.synced.get(ticker, (day,))[0]), stamp)
+
+    def invalidate(self, doc_id=None):
+        """Esquece uma operação (ou todas)."""
+        with self._lock:
+            if doc_id is None:
+                self.frame, self.signatures = self.frame.iloc[0:0], self.signatures.iloc[0:0]
+                self.empty_signatures, self.empty_until = self.empty_signatures.iloc[0:0], self.empty_until.iloc[0:0]
+            else:
+                self.frame = self.frame.drop(doc_id, errors='ignore')
+                self.signatures = self.signatures.drop(doc_id, errors='ignore')
+                self.empty_signatures = self.empty_signatures.drop(doc_id, errors='ignore')
+                self.empty_until = self.empty_until.drop(doc_id, errors='ignore')
+
+def get_excursion_cache(user_id, price_loader=None, top_up=None):
+    """Devolve a cache de excursões do utilizador (partilhada pelo processo)."""
+    with _registry_lock:
+        cache = _caches.get(user_id)
+        if cache is None:
+            cache = _caches[user_id] = ExcursionCache(price_loader, top_up)
+        return cache
+
+def get_trade_excursions(user_id, df_journal):
+    """
+    Excursão das operações finalizadas de um diário, através da cache do utilizador.
+
+    Returns:
+        pd.DataFrame: Índice no doc_id, colunas RESULT_COLUMNS. Vazio em caso de erro.
+    """
+    try:
+        return get_excursion_cache(user_id).get(df_journal)
+    except Exception as e:
+        st.error(f"Erro ao calcular a excursão das operações: {e}")
+        return pd.DataFrame(columns=RESULT_COLUMNS, index=pd.Index([], name='doc_id'))
+
+def excursion_summary(excursions):
+    """Médias de MAE/MFE (em R) e frequência com que o stop ou o alvo foram tocados primeiro."""
+    valid = excursions.dropna(subset=['mae_r', 'mfe_r']) if not excursions.empty else excursions
+    if valid.empty:
+        return None
+    touch = valid['first_touch']
+    return {
+        "trades": len(valid),
+        "avg_mae_r": float(valid['mae_r'].astype(float).mean()),
+        "avg_mfe_r": float(valid['mfe_r'].astype(float).mean()),
+        "stop_first_pct": float((touch == 'stop').mean() * 100),
+        "target_first_pct": float((touch == 'target').mean() * 100),
+        "avg_days_in_trade": float(valid['days_in_trade'].astype(float).mean()),
+    }
@@ -25,7 +25,9 @@ def setup_sidebar():
         
         # 2. Adiciona o botão de Logout à barra lateral
         if st.sidebar.button("Logout"):
-            # Limpa todas as informações da sessão
+            # Esquece a cópia do diário guardada no servidor e limpa todas as informações da sessão
+            from utils.journal_cache import drop_journal_cache
+            drop_journal_cache(st.session_state['user_info'].get('localId'))
             st.session_state.clear()
             # Re-executa o script para atualizar a página e refletir o estado de logout
             st.rerun()